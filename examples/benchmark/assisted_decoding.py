@@ -0,0 +1,94 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Benchmark assisted (speculative) decoding with a draft model against greedy search.
+
+Usage:
+    python examples/benchmark/assisted_decoding.py --num_prompts 8 --max_new_tokens 64
+    python examples/benchmark/assisted_decoding.py --model gpt2-large --assistant_model gpt2
+"""
+
+import time
+import argparse
+import numpy as np
+
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+
+
+def build_model(name, n_layer, n_embd, n_head):
+    """build a pretrained or a randomly initialized gpt2"""
+    if name is not None:
+        return GPT2LMHeadModel.from_pretrained(name)
+    config = GPT2Config(n_layer=n_layer, n_embd=n_embd, n_head=n_head)
+    return GPT2LMHeadModel(config)
+
+
+def main():
+    """main"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=str, default=None, help="pretrained gpt2 name, random weights if not set")
+    parser.add_argument("--assistant_model", type=str, default=None,
+                        help="pretrained gpt2 name of the draft model, random weights if not set")
+    parser.add_argument("--n_layer", type=int, default=12)
+    parser.add_argument("--n_embd", type=int, default=768)
+    parser.add_argument("--n_head", type=int, default=12)
+    parser.add_argument("--assistant_n_layer", type=int, default=2)
+    parser.add_argument("--num_prompts", type=int, default=8)
+    parser.add_argument("--prompt_length", type=int, default=32)
+    parser.add_argument("--max_new_tokens", type=int, default=64)
+    parser.add_argument("--num_assistant_tokens", type=int, default=5)
+    args = parser.parse_args()
+
+    model = build_model(args.model, args.n_layer, args.n_embd, args.n_head)
+    assistant_model = build_model(args.assistant_model, args.assistant_n_layer, args.n_embd, args.n_head)
+    if args.assistant_model is None:
+        # a random draft model never agrees with the target, share the weights of the first layers instead so that
+        # the acceptance rate is not zero
+        mindspore.load_param_into_net(assistant_model, {param.name: param for param in model.get_parameters()})
+    model.set_train(False)
+    assistant_model.set_train(False)
+
+    rng = np.random.default_rng(0)
+    prompts = [Tensor(rng.integers(1, model.config.vocab_size, (1, args.prompt_length)), mindspore.int64)
+               for _ in range(args.num_prompts)]
+
+    start = time.time()
+    for input_ids in prompts:
+        model.generate(input_ids, max_new_tokens=args.max_new_tokens)
+    greedy = time.time() - start
+
+    num_candidates, num_accepted, num_steps = 0, 0, 0
+    start = time.time()
+    for input_ids in prompts:
+        model.generate(input_ids, max_new_tokens=args.max_new_tokens, assistant_model=assistant_model,
+                       num_assistant_tokens=args.num_assistant_tokens)
+        num_candidates += model.assisted_decoding_stats["num_candidates"]
+        num_accepted += model.assisted_decoding_stats["num_accepted"]
+        num_steps += model.assisted_decoding_stats["num_steps"]
+    assisted = time.time() - start
+
+    num_tokens = args.num_prompts * args.max_new_tokens
+    print(f"{'mode':<12}{'latency(s)':>12}{'tokens/s':>12}{'speedup':>12}")
+    print(f"{'greedy':<12}{greedy:>12.3f}{num_tokens / greedy:>12.1f}{1.0:>12.2f}")
+    print(f"{'assisted':<12}{assisted:>12.3f}{num_tokens / assisted:>12.1f}{greedy / assisted:>12.2f}")
+    print(f"acceptance rate: {num_accepted / max(num_candidates, 1):.3f} "
+          f"({num_accepted}/{num_candidates} candidates), forwards of the model: {num_steps}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Benchmark beam search against greedy search.
+
+Usage:
+    python examples/benchmark/beam_search.py --batch_size 4 --num_beams 2 4 8
+    python examples/benchmark/beam_search.py --model gpt2
+"""
+
+import time
+import argparse
+import numpy as np
+
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+
+
+def build_model(args):
+    """build a pretrained or a randomly initialized gpt2"""
+    if args.model is not None:
+        return GPT2LMHeadModel.from_pretrained(args.model)
+    config = GPT2Config(n_layer=args.n_layer, n_embd=args.n_embd, n_head=args.n_head)
+    return GPT2LMHeadModel(config)
+
+
+def run(model, input_ids, num_beams, max_new_tokens, repeats):
+    """return the mean latency of `generate` in seconds"""
+    # warmup
+    model.generate(input_ids, num_beams=num_beams, max_new_tokens=max_new_tokens, pad_token_id=0)
+    start = time.time()
+    for _ in range(repeats):
+        model.generate(input_ids, num_beams=num_beams, max_new_tokens=max_new_tokens, pad_token_id=0)
+    return (time.time() - start) / repeats
+
+
+def main():
+    """main"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=str, default=None, help="pretrained gpt2 name, random weights if not set")
+    parser.add_argument("--n_layer", type=int, default=4)
+    parser.add_argument("--n_embd", type=int, default=256)
+    parser.add_argument("--n_head", type=int, default=8)
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--prompt_length", type=int, default=32)
+    parser.add_argument("--max_new_tokens", type=int, default=32)
+    parser.add_argument("--num_beams", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    model = build_model(args)
+    model.set_train(False)
+    input_ids = Tensor(np.random.randint(1, model.config.vocab_size, (args.batch_size, args.prompt_length)),
+                       mindspore.int64)
+
+    greedy = run(model, input_ids, 1, args.max_new_tokens, args.repeats)
+    new_tokens = args.batch_size * args.max_new_tokens
+    print(f"{'mode':<12}{'latency(s)':>12}{'ms/token':>12}{'vs greedy':>12}{'per beam':>12}")
+    print(f"{'greedy':<12}{greedy:>12.3f}{greedy * 1000 / new_tokens:>12.2f}{1.0:>12.2f}{1.0:>12.2f}")
+    for num_beams in args.num_beams:
+        latency = run(model, input_ids, num_beams, args.max_new_tokens, args.repeats)
+        ratio = latency / greedy
+        print(f"{'beam=' + str(num_beams):<12}{latency:>12.3f}{latency * 1000 / new_tokens:>12.2f}"
+              f"{ratio:>12.2f}{ratio / num_beams:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Benchmark the continuous batching scheduler against static batches of `generate` under mixed-length traffic.
+
+Usage:
+    python examples/benchmark/continuous_batching.py --num_requests 64 --batch_size 8
+    python examples/benchmark/continuous_batching.py --model gpt2
+"""
+
+import time
+import argparse
+import numpy as np
+
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+from mindnlp.generation import ContinuousBatchingScheduler
+
+
+def build_model(args):
+    """build a pretrained or a randomly initialized gpt2"""
+    if args.model is not None:
+        return GPT2LMHeadModel.from_pretrained(args.model)
+    config = GPT2Config(n_layer=args.n_layer, n_embd=args.n_embd, n_head=args.n_head)
+    return GPT2LMHeadModel(config)
+
+
+def build_requests(args, vocab_size):
+    """prompts and generation lengths drawn uniformly"""
+    rng = np.random.default_rng(0)
+    requests = []
+    for _ in range(args.num_requests):
+        prompt_length = int(rng.integers(args.min_prompt_length, args.max_prompt_length + 1))
+        max_new_tokens = int(rng.integers(args.min_new_tokens, args.max_new_tokens + 1))
+        requests.append((rng.integers(1, vocab_size, (prompt_length,)).tolist(), max_new_tokens))
+    return requests
+
+
+def run_static(model, requests, batch_size, pad_token_id):
+    """static batches: every batch runs until its longest request is done"""
+    start = time.time()
+    for idx in range(0, len(requests), batch_size):
+        batch = requests[idx: idx + batch_size]
+        max_prompt_length = max(len(prompt) for prompt, _ in batch)
+        input_ids = np.full((len(batch), max_prompt_length), pad_token_id)
+        attention_mask = np.zeros((len(batch), max_prompt_length))
+        for row, (prompt, _) in enumerate(batch):
+            input_ids[row, max_prompt_length - len(prompt):] = prompt
+            attention_mask[row, max_prompt_length - len(prompt):] = 1
+        model.generate(Tensor(input_ids, mindspore.int64), attention_mask=Tensor(attention_mask, mindspore.int64),
+                       max_new_tokens=max(max_new_tokens for _, max_new_tokens in batch), pad_token_id=pad_token_id)
+    return time.time() - start
+
+
+def run_continuous(model, requests, batch_size, pad_token_id):
+    """continuous batching: finished requests leave the batch"""
+    scheduler = ContinuousBatchingScheduler(model, max_batch_size=batch_size, pad_token_id=pad_token_id)
+    for prompt, max_new_tokens in requests:
+        scheduler.add_request(prompt, max_new_tokens=max_new_tokens)
+    start = time.time()
+    scheduler.run()
+    return time.time() - start, scheduler.num_steps
+
+
+def main():
+    """main"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=str, default=None, help="pretrained gpt2 name, random weights if not set")
+    parser.add_argument("--n_layer", type=int, default=4)
+    parser.add_argument("--n_embd", type=int, default=256)
+    parser.add_argument("--n_head", type=int, default=8)
+    parser.add_argument("--num_requests", type=int, default=64)
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--min_prompt_length", type=int, default=8)
+    parser.add_argument("--max_prompt_length", type=int, default=64)
+    parser.add_argument("--min_new_tokens", type=int, default=4)
+    parser.add_argument("--max_new_tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    model = build_model(args)
+    model.set_train(False)
+    requests = build_requests(args, model.config.vocab_size)
+    # requested tokens, eos may end a request earlier in both modes
+    num_tokens = sum(max_new_tokens for _, max_new_tokens in requests)
+
+    static = run_static(model, requests, args.batch_size, 0)
+    continuous, num_steps = run_continuous(model, requests, args.batch_size, 0)
+    print(f"{'mode':<12}{'latency(s)':>12}{'tokens/s':>12}{'speedup':>12}")
+    print(f"{'static':<12}{static:>12.3f}{num_tokens / static:>12.1f}{1.0:>12.2f}")
+    print(f"{'continuous':<12}{continuous:>12.3f}{num_tokens / continuous:>12.1f}{static / continuous:>12.2f}")
+    print(f"decoding steps of the scheduler: {num_steps}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Benchmark the bit-parallel ROUGE-L against the dynamic programming table on summary pairs.
+
+Usage:
+    python examples/benchmark/rouge_l.py --num_pairs 10000 --num_workers 8
+    python examples/benchmark/rouge_l.py --num_pairs 1000 --baseline_pairs 1000
+"""
+
+import time
+import argparse
+import numpy as np
+
+from mindnlp.metrics import rouge_l_scores
+
+
+def build_pairs(args):
+    """summaries and references drawn from a zipfian vocabulary, references share part of the summary"""
+    rng = np.random.default_rng(0)
+    cand_lists, ref_lists = [], []
+    for _ in range(args.num_pairs):
+        cand_length = int(rng.integers(args.min_length, args.max_length + 1))
+        ref_length = int(rng.integers(args.min_length, args.max_length + 1))
+        cand = (rng.zipf(1.3, cand_length) % args.vocab_size).tolist()
+        ref = (rng.zipf(1.3, ref_length) % args.vocab_size).tolist()
+        keep = rng.random(min(cand_length, ref_length)) < args.overlap
+        ref[:len(keep)] = [token if kept else ref_token for token, ref_token, kept in zip(cand, ref, keep)]
+        cand_lists.append([str(token) for token in cand])
+        ref_lists.append([[str(token) for token in ref]])
+    return cand_lists, ref_lists
+
+
+def lcs_table(strg, sub):
+    """the former dynamic programming table, filled one cell at a time"""
+    if len(strg) < len(sub):
+        sub, strg = strg, sub
+    lengths = np.zeros((len(strg) + 1, len(sub) + 1))
+    for j in range(1, len(sub) + 1):
+        for i in range(1, len(strg) + 1):
+            if strg[i - 1] == sub[j - 1]:
+                lengths[i][j] = lengths[i - 1][j - 1] + 1
+            else:
+                lengths[i][j] = max(lengths[i - 1][j], lengths[i][j - 1])
+    return lengths[len(strg)][len(sub)]
+
+
+def rouge_l_table(cand_list, ref_list, beta):
+    """ROUGE-L score with the dynamic programming table"""
+    lengths = [lcs_table(cand_list, ref) for ref in ref_list]
+    prec_max = max(length / len(cand_list) for length in lengths)
+    rec_max = max(length / len(ref) for length, ref in zip(lengths, ref_list))
+    if prec_max != 0 and rec_max != 0:
+        return ((1 + beta**2) * prec_max * rec_max) / float(rec_max + beta**2 * prec_max)
+    return 0.0
+
+
+def main():
+    """main"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_pairs', type=int, default=10000)
+    parser.add_argument('--baseline_pairs', type=int, default=200,
+                        help='pairs scored with the table, its time is extrapolated to all the pairs')
+    parser.add_argument('--min_length', type=int, default=40)
+    parser.add_argument('--max_length', type=int, default=400)
+    parser.add_argument('--vocab_size', type=int, default=20000)
+    parser.add_argument('--overlap', type=float, default=0.4)
+    parser.add_argument('--num_workers', type=int, default=4)
+    args = parser.parse_args()
+
+    cand_lists, ref_lists = build_pairs(args)
+    num_baseline = min(args.baseline_pairs, args.num_pairs)
+
+    start = time.time()
+    expected = [rouge_l_table(cand, refs, 1.2) for cand, refs in zip(cand_lists[:num_baseline], ref_lists)]
+    table_time = (time.time() - start) * args.num_pairs / max(num_baseline, 1)
+
+    start = time.time()
+    scores = rouge_l_scores(cand_lists, ref_lists)
+    serial_time = time.time() - start
+
+    start = time.time()
+    parallel_scores = rouge_l_scores(cand_lists, ref_lists, num_workers=args.num_workers)
+    parallel_time = time.time() - start
+
+    assert scores[:num_baseline] == expected, 'the bit-parallel scores differ from the table'
+    assert parallel_scores == scores, 'the process pool scores differ from the serial scores'
+
+    print(f'{args.num_pairs} pairs of {args.min_length}-{args.max_length} tokens, mean ROUGE-L {np.mean(scores):.4f}')
+    print(f'table (extrapolated from {num_baseline} pairs): {table_time:.2f}s')
+    print(f'bit-parallel: {serial_time:.2f}s ({table_time / serial_time:.1f}x)')
+    print(f'bit-parallel, {args.num_workers} processes: {parallel_time:.2f}s ({table_time / parallel_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -38,6 +38,12 @@ class GenerationConfig:
         self.num_beam_groups = kwargs.pop("num_beam_groups", 1)
         self.penalty_alpha = kwargs.pop("penalty_alpha", None)
         self.use_cache = kwargs.pop("use_cache", True)
+        self.static_shape = kwargs.pop("static_shape", False)
+        self.jit_step = kwargs.pop("jit_step", False)
+        self.seed = kwargs.pop("seed", None)
+        self.paged_kv_cache = kwargs.pop("paged_kv_cache", False)
+        self.kv_cache_block_size = kwargs.pop("kv_cache_block_size", 16)
+        self.num_assistant_tokens = kwargs.pop("num_assistant_tokens", 5)
 
         # Parameters for manipulation of the model output logits
         self.temperature = kwargs.pop("temperature", 1.0)
@@ -21,6 +21,7 @@
 # pylint: disable=E1121
 # pylint: disable=R1710
 # pylint: disable=E1102
+# pylint: disable=W0212
 """
 Generation mixin.
 """
@@ -52,13 +53,23 @@ from mindnlp.generation.logits_process import (
     SuppressTokensLogitsProcessor,
     SuppressTokensAtBeginLogitsProcessor,
     ForceTokensLogitsProcessor,
-    LogitNormalization
+    LogitNormalization,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+    TypicalLogitsWarper,
+    EpsilonLogitsWarper,
+    EtaLogitsWarper,
 )
 
 from mindnlp.generation.beam_search import BeamScorer, BeamSearchScorer, ConstrainedBeamSearchScorer
 
 from mindnlp.generation.beam_constraints import DisjunctiveConstraint, PhrasalConstraint
 
+from mindnlp.generation.utils import concat_past_key_values, trim_past_key_values, crop_past_key_values
+from mindnlp.generation.kv_cache import KVCache, PagedKVCache
+from mindnlp.generation import assisted, beam_decoding, sampling, static_greedy
+
 from mindnlp.generation.stopping_criteria import (
     MaxLengthCriteria,
     MaxTimeCriteria,
@@ -73,6 +84,9 @@ class GenerationMixin:
     class GenerationMixin
     A class containing all functions for auto-regressive text generation, to be used as a mixin in [`PreTrainedModel`].
     """
+    # whether the model accepts a `KVCache` as `past_key_values`, see `mindnlp.generation.kv_cache`
+    _supports_paged_kv_cache = False
+
     def prepare_inputs_for_generation(self, *args, **kwargs):
         """
         prepare_inputs_for_generation
@@ -236,13 +250,41 @@ class GenerationMixin:
         input_ids: Optional[mindspore.Tensor] = None,
         **model_kwargs,
     ) -> Tuple[mindspore.Tensor, Dict[str, Any]]:
-        raise NotImplementedError(
-            "TODO: You need to implement this function."
-        )
+        """Expands tensors from [batch_size, ...] to [batch_size * expand_size, ...]"""
+
+        def _expand_for_generation(to_expand):
+            if isinstance(to_expand, mindspore.Tensor):
+                return to_expand.repeat(expand_size, axis=0)
+            if isinstance(to_expand, dict):
+                return {key: _expand_for_generation(value) for key, value in to_expand.items()}
+            if isinstance(to_expand, (tuple, list)):
+                return type(to_expand)(_expand_for_generation(value) for value in to_expand)
+            return to_expand
+
+        if input_ids is not None:
+            input_ids = input_ids.repeat(expand_size, axis=0)
+
+        encoder_outputs = model_kwargs.pop("encoder_outputs", None)
+        model_kwargs = {
+            key: value.repeat(expand_size, axis=0) if isinstance(value, mindspore.Tensor) else value
+            for key, value in model_kwargs.items()
+        }
+
+        if is_encoder_decoder:
+            if encoder_outputs is None:
+                raise ValueError("If `is_encoder_decoder` is True, make sure that `encoder_outputs` is defined.")
+            model_kwargs["encoder_outputs"] = _expand_for_generation(encoder_outputs)
+        elif encoder_outputs is not None:
+            model_kwargs["encoder_outputs"] = encoder_outputs
+
+        return input_ids, model_kwargs
 
     def _extract_past_from_model_output(self, outputs, standardize_cache_format: bool = False):
         past_key_values = None
-        if "past_key_values" in outputs:
+        if isinstance(outputs, tuple):
+            # models returning tuples put the cache right after the logits
+            past_key_values = outputs[1] if len(outputs) > 1 else None
+        elif "past_key_values" in outputs:
             past_key_values = outputs.past_key_values
         elif "mems" in outputs:
             past_key_values = outputs.mems
@@ -251,10 +293,30 @@ class GenerationMixin:
 
         # Bloom fix: standardizes the cache format when requested
         if standardize_cache_format and hasattr(self, "_convert_to_standard_cache"):
-            batch_size = outputs.logits.shape[0]
+            batch_size = outputs[0].shape[0]
             past_key_values = self._convert_to_standard_cache(past_key_values, batch_size=batch_size)
         return past_key_values
 
+    def _extract_decoder_states_from_model_output(self, outputs, output_attentions, output_hidden_states):
+        """
+        The attentions and hidden states of the outputs of a decoder-only model, None when they are not requested.
+        Models returning tuples lay them out like `(logits, past_key_values, hidden_states, attentions)`, leaving out
+        the entries which are not requested.
+        """
+        if not isinstance(outputs, tuple):
+            attentions = outputs.attentions if output_attentions else None
+            hidden_states = outputs.hidden_states if output_hidden_states else None
+            return attentions, hidden_states
+
+        idx = 2
+        attentions, hidden_states = None, None
+        if output_hidden_states and len(outputs) > idx:
+            hidden_states = outputs[idx]
+            idx += 1
+        if output_attentions and len(outputs) > idx:
+            attentions = outputs[idx]
+        return attentions, hidden_states
+
     def _update_model_kwargs_for_generation(
         self,
         outputs,
@@ -262,23 +324,112 @@ class GenerationMixin:
         is_encoder_decoder: bool = False,
         standardize_cache_format: bool = False,
     ) -> Dict[str, Any]:
-        raise NotImplementedError(
-            "TODO: You need to implement this function."
+        # update past_key_values
+        model_kwargs["past_key_values"] = self._extract_past_from_model_output(
+            outputs, standardize_cache_format=standardize_cache_format
         )
 
+        # update token_type_ids with last value
+        if "token_type_ids" in model_kwargs and model_kwargs["token_type_ids"] is not None:
+            token_type_ids = model_kwargs["token_type_ids"]
+            model_kwargs["token_type_ids"] = ops.cat([token_type_ids, token_type_ids[:, -1:]], axis=-1)
+
+        if not is_encoder_decoder:
+            # update attention mask
+            if "attention_mask" in model_kwargs and model_kwargs["attention_mask"] is not None:
+                attention_mask = model_kwargs["attention_mask"]
+                model_kwargs["attention_mask"] = ops.cat(
+                    [attention_mask, ops.ones((attention_mask.shape[0], 1), attention_mask.dtype)], axis=-1
+                )
+        else:
+            # update decoder attention mask
+            if "decoder_attention_mask" in model_kwargs and model_kwargs["decoder_attention_mask"] is not None:
+                decoder_attention_mask = model_kwargs["decoder_attention_mask"]
+                model_kwargs["decoder_attention_mask"] = ops.cat(
+                    [decoder_attention_mask,
+                     ops.ones((decoder_attention_mask.shape[0], 1), decoder_attention_mask.dtype)],
+                    axis=-1,
+                )
+
+        return model_kwargs
+
     def _reorder_cache(self, past, beam_idx):
         raise NotImplementedError(
             f"Make sure that a `_reorder_cache` function is correctly implemented in {self.__class__.__module__} to"
             f" enable beam search for {self.__class__}"
         )
 
+    def prepare_inputs_for_continuous_batching(self, input_ids, past_key_values=None, attention_mask=None):
+        """
+        Prepares the inputs of a decoding step of the [`ContinuousBatchingScheduler`]. `input_ids` and
+        `attention_mask` are left padded, rows admitted later are padded more, `past_key_values` holds all the
+        positions but the last one.
+        """
+        return self.prepare_inputs_for_generation(
+            input_ids, past_key_values=past_key_values, attention_mask=attention_mask, use_cache=True
+        )
+
+    def _merge_cache(self, past, other_past):
+        """
+        Concatenates the `past_key_values` of two batches for the [`ContinuousBatchingScheduler`], the shorter one
+        is left padded. The default layout of the cached tensors is `(batch_size, num_heads, seq_length, head_dim)`.
+        """
+        return concat_past_key_values(past, other_past, batch_axis=0, seq_axis=2)
+
+    def _trim_cache(self, past, num_tokens):
+        """
+        Drops the first `num_tokens` positions of the `past_key_values`, used by the [`ContinuousBatchingScheduler`]
+        once these positions are padding in every remaining row.
+        """
+        return trim_past_key_values(past, num_tokens, seq_axis=2)
+
+    def _crop_cache(self, past, max_length):
+        """
+        Keeps the first `max_length` positions of the `past_key_values`, used by assisted decoding to roll back the
+        rejected candidate tokens. The default layout of the cached tensors is `(batch_size, num_heads, seq_length,
+        head_dim)`.
+        """
+        if isinstance(past, KVCache):
+            return past.crop(max_length)
+        return crop_past_key_values(past, max_length, seq_axis=2)
+
     def _get_logits_warper(
         self,
         generation_config: GenerationConfig,
     ) -> LogitsProcessorList:
-        raise NotImplementedError(
-            "TODO: You need to implement this function."
-        )
+        """
+        This class returns a [`LogitsProcessorList`] list object that contains all relevant [`LogitsWarper`] instances
+        used for multinomial sampling.
+        """
+
+        # instantiate warpers list
+        warpers = LogitsProcessorList()
+
+        # all samplers can be found in `generation/logits_process.py`
+        # beam search keeps at least 2 tokens so that a finished hypothesis does not starve the beam
+        min_tokens_to_keep = 2 if generation_config.num_beams > 1 else 1
+        if generation_config.temperature is not None and generation_config.temperature != 1.0:
+            warpers.append(TemperatureLogitsWarper(float(generation_config.temperature)))
+        if generation_config.top_k is not None and generation_config.top_k != 0:
+            warpers.append(TopKLogitsWarper(top_k=generation_config.top_k, min_tokens_to_keep=min_tokens_to_keep))
+        if generation_config.top_p is not None and generation_config.top_p < 1.0:
+            warpers.append(TopPLogitsWarper(top_p=generation_config.top_p, min_tokens_to_keep=min_tokens_to_keep))
+        if generation_config.typical_p is not None and generation_config.typical_p < 1.0:
+            warpers.append(
+                TypicalLogitsWarper(mass=generation_config.typical_p, min_tokens_to_keep=min_tokens_to_keep)
+            )
+        if generation_config.epsilon_cutoff is not None and 0.0 < generation_config.epsilon_cutoff < 1.0:
+            warpers.append(
+                EpsilonLogitsWarper(epsilon=generation_config.epsilon_cutoff, min_tokens_to_keep=min_tokens_to_keep)
+            )
+        if generation_config.eta_cutoff is not None and 0.0 < generation_config.eta_cutoff < 1.0:
+            warpers.append(
+                EtaLogitsWarper(epsilon=generation_config.eta_cutoff, min_tokens_to_keep=min_tokens_to_keep)
+            )
+        # `LogitNormalization` should always be the last logit processor, when present
+        if generation_config.renormalize_logits is True:
+            warpers.append(LogitNormalization())
+        return warpers
 
     def _get_logits_processor(
         self,
@@ -467,9 +618,16 @@ class GenerationMixin:
         stopping_criteria: Optional[StoppingCriteriaList] = None,
         prefix_allowed_tokens_fn: Optional[Callable[[int, mindspore.Tensor], List[int]]] = None,
         synced_gpus: Optional[bool] = False,
+        assistant_model: Optional["PreTrainedModel"] = None,
         **kwargs,
     ):
-        """Generates sequences of token ids for models with a language modeling head."""
+        """
+        Generates sequences of token ids for models with a language modeling head.
+
+        If `assistant_model` is given, greedy search runs as assisted decoding: the assistant, a smaller model
+        sharing the tokenizer of this model, proposes the next tokens and this model checks them in a single forward,
+        see [`~GenerationMixin.assisted_decoding`].
+        """
         # 1. Handle `generation_config` and kwargs that might update it, and validate the `.generate()` call
         self._validate_model_class()
         # priority: `generation_config` argument > `model.generation_config` (the default generation config)
@@ -595,6 +753,20 @@ class GenerationMixin:
                 generation_config.max_length
             )
 
+        # use the paged key/value cache instead of `past_key_values` tuples if requested
+        if generation_config.paged_kv_cache and generation_config.use_cache:
+            if self.config.is_encoder_decoder or not self._supports_paged_kv_cache:
+                raise ValueError(
+                    f"{self.__class__.__name__} does not support `paged_kv_cache`, only the decoder-only models which"
+                    " accept a `KVCache` as `past_key_values` do."
+                )
+            if model_kwargs.get("past_key_values") is None:
+                model_kwargs["past_key_values"] = PagedKVCache(
+                    self.config.num_hidden_layers,
+                    block_size=generation_config.kv_cache_block_size,
+                    max_length=generation_config.max_length,
+                )
+
         # 7. determine generation mode
         is_constraint_gen_mode = (
             generation_config.constraints is not None or generation_config.force_words_ids is not None
@@ -663,6 +835,10 @@ class GenerationMixin:
         stopping_criteria = self._get_stopping_criteria(
             generation_config=generation_config, stopping_criteria=stopping_criteria
         )
+        if assistant_model is not None and not is_greedy_gen_mode:
+            raise ValueError("Assisted decoding only supports greedy search, please set `num_beams=1` and"
+                             " `do_sample=False`.")
+
         # 10. go into different generation modes
         if is_greedy_gen_mode:
             if generation_config.num_return_sequences > 1:
@@ -671,6 +847,21 @@ class GenerationMixin:
                     " greedy search."
                 )
 
+            if assistant_model is not None:
+                # 11. run assisted decoding
+                return self.assisted_decoding(
+                    input_ids,
+                    assistant_model=assistant_model,
+                    num_assistant_tokens=generation_config.num_assistant_tokens,
+                    logits_processor=logits_processor,
+                    stopping_criteria=stopping_criteria,
+                    pad_token_id=generation_config.pad_token_id,
+                    eos_token_id=generation_config.eos_token_id,
+                    output_scores=generation_config.output_scores,
+                    return_dict_in_generate=generation_config.return_dict_in_generate,
+                    **model_kwargs,
+                )
+
             # 11. run greedy search
             return self.greedy_search(
                 input_ids,
@@ -681,6 +872,8 @@ class GenerationMixin:
                 output_scores=generation_config.output_scores,
                 return_dict_in_generate=generation_config.return_dict_in_generate,
                 synced_gpus=synced_gpus,
+                static_shape=generation_config.static_shape,
+                jit_step=generation_config.jit_step,
                 **model_kwargs,
             )
 
@@ -728,6 +921,7 @@ class GenerationMixin:
                 output_scores=generation_config.output_scores,
                 return_dict_in_generate=generation_config.return_dict_in_generate,
                 synced_gpus=synced_gpus,
+                seed=generation_config.seed,
                 **model_kwargs,
             )
 
@@ -742,6 +936,7 @@ class GenerationMixin:
             beam_scorer = BeamSearchScorer(
                 batch_size=batch_size,
                 num_beams=generation_config.num_beams,
+                max_length=stopping_criteria.max_length,
                 length_penalty=generation_config.length_penalty,
                 do_early_stopping=generation_config.early_stopping,
                 num_beam_hyps_to_keep=generation_config.num_return_sequences,
@@ -777,6 +972,7 @@ class GenerationMixin:
             beam_scorer = BeamSearchScorer(
                 batch_size=batch_size * generation_config.num_return_sequences,
                 num_beams=generation_config.num_beams,
+                max_length=stopping_criteria.max_length,
                 length_penalty=generation_config.length_penalty,
                 do_early_stopping=generation_config.early_stopping,
             )
@@ -801,6 +997,7 @@ class GenerationMixin:
                 output_scores=generation_config.output_scores,
                 return_dict_in_generate=generation_config.return_dict_in_generate,
                 synced_gpus=synced_gpus,
+                seed=generation_config.seed,
                 **model_kwargs,
             )
 
@@ -949,6 +1146,8 @@ class GenerationMixin:
         return_dict_in_generate: Optional[bool] = None,
         synced_gpus: bool = False,
         streamer: Optional["BaseStreamer"] = None,
+        static_shape: bool = False,
+        jit_step: bool = False,
         **model_kwargs,
     ) -> mindspore.Tensor:
         r"""
@@ -996,6 +1195,12 @@ class GenerationMixin:
             streamer (`BaseStreamer`, *optional*):
                 Streamer object that will be used to stream the generated sequences. Generated tokens are passed
                 through `streamer.put(token_ids)` and the streamer is responsible for any further processing.
+            static_shape (`bool`, *optional*, defaults to `False`):
+                Whether to decode into a preallocated `(batch_size, max_length)` buffer instead of growing `input_ids`
+                at every step. The model input keeps the same shape for the whole generation, so graph mode only
+                compiles once. Only decoder-only models are supported and the past key values are not used.
+            jit_step (`bool`, *optional*, defaults to `False`):
+                Whether to compile the single decoding step with `ms_jit`. Only used when `static_shape=True`.
             model_kwargs:
                 Additional model specific keyword arguments will be forwarded to the `forward` function of the model.
                 If model is an encoder-decoder model the kwargs should include `encoder_outputs`.
@@ -1071,6 +1276,25 @@ class GenerationMixin:
             else self.generation_config.return_dict_in_generate
         )
 
+        if static_shape:
+            if self.config.is_encoder_decoder:
+                raise ValueError("`static_shape` is only supported by decoder-only models.")
+            if eos_token_id is not None and pad_token_id is None:
+                raise ValueError("If `eos_token_id` is defined, make sure that `pad_token_id` is defined.")
+            return static_greedy.static_greedy_search(
+                self,
+                input_ids,
+                logits_processor=logits_processor,
+                stopping_criteria=stopping_criteria,
+                pad_token_id=pad_token_id,
+                eos_token_id_tensor=eos_token_id_tensor,
+                output_scores=output_scores,
+                return_dict_in_generate=return_dict_in_generate,
+                streamer=streamer,
+                jit_step=jit_step,
+                attention_mask=model_kwargs.get("attention_mask", None),
+            )
+
         # init attention / hidden states / scores tuples
         scores = () if (return_dict_in_generate and output_scores) else None
         decoder_attentions = () if (return_dict_in_generate and output_attentions) else None
@@ -1179,3 +1403,31 @@ class GenerationMixin:
                         cross_attentions, decoder_hidden_states)
             return (input_ids, scores, decoder_attentions, decoder_hidden_states)
         return input_ids
+
+    def beam_search(self, input_ids: mindspore.Tensor, beam_scorer: BeamScorer, *args, **kwargs):
+        r"""
+        Generates sequences of token ids using **beam search decoding**, see
+        [`~generation.beam_decoding.beam_search`] for the arguments.
+        """
+        return beam_decoding.beam_search(self, input_ids, beam_scorer, *args, **kwargs)
+
+    def sample(self, input_ids: mindspore.Tensor, *args, **kwargs):
+        r"""
+        Generates sequences of token ids using **multinomial sampling**, see [`~generation.sampling.sample`] for the
+        arguments.
+        """
+        return sampling.sample(self, input_ids, *args, **kwargs)
+
+    def beam_sample(self, input_ids: mindspore.Tensor, beam_scorer: BeamScorer, *args, **kwargs):
+        r"""
+        Generates sequences of token ids using **beam search multinomial sampling**, see
+        [`~generation.sampling.beam_sample`] for the arguments.
+        """
+        return sampling.beam_sample(self, input_ids, beam_scorer, *args, **kwargs)
+
+    def assisted_decoding(self, input_ids: mindspore.Tensor, assistant_model: "PreTrainedModel", *args, **kwargs):
+        r"""
+        Generates sequences of token ids with **greedy decoding** assisted by a smaller model, see
+        [`~generation.assisted.assisted_decoding`] for the arguments.
+        """
+        return assisted.assisted_decoding(self, input_ids, assistant_model, *args, **kwargs)
@@ -23,17 +23,21 @@ Abstract class for Pretrained models.
 """
 import os
 import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Optional
 from tqdm.autonotebook import tqdm
 
-from mindspore import nn, ops
+from mindspore import nn, ops, Tensor
 from mindspore import log as logger
 from mindspore.train.serialization import save_checkpoint
 
 from mindnlp.configs import HF_MODEL_URL_BASE
 from mindnlp.utils.download import cached_path, get_checkpoint_shard_files
+from mindnlp.utils.serialization import SafeTensorsFile, save_safetensors
 from mindnlp.abc.configs import PreTrainedConfig, GenerationConfig
 from mindnlp.abc.mixins import CellUtilMixin, GenerationMixin
+from mindnlp.parallel.plans import parallelize
 from mindnlp.utils import less_min_pynative_first
 if less_min_pynative_first:
     from mindspore import load_checkpoint
@@ -43,6 +47,8 @@ else:
 _init_weights = True
 WEIGHTS_NAME = "mindspore.ckpt"
 WEIGHTS_INDEX_NAME = "mindspore.ckpt.index.json"
+SAFE_WEIGHTS_NAME = "mindspore.safetensors"
+SAFE_WEIGHTS_INDEX_NAME = "mindspore.safetensors.index.json"
 HF_WEIGHTS_INDEX_NAME = "pytorch_model.bin.index.json"
 
 
@@ -54,6 +60,8 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
     pretrained_model_archive_map = {}
     base_model_prefix = ""
     main_input_name = "input_ids"
+    # the `TensorParallelPlan` of the model, applied by `from_pretrained(..., tensor_parallel=True)`
+    tensor_parallel_plan = None
 
     def __init__(self, config):
         super().__init__(config)
@@ -317,6 +325,7 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
         resume_download = kwargs.pop("resume_download", False)
         proxies = kwargs.pop("proxies", None)
         local_files_only = kwargs.pop("local_files_only", False)
+        tensor_parallel = kwargs.pop("tensor_parallel", False)
 
         is_sharded = False
         # Load config if we don't provide a configuration
@@ -344,8 +353,11 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
             if pretrained_model_name_or_path in cls.pretrained_model_archive_map and not from_pt:
                 archive_file = cls.pretrained_model_archive_map[pretrained_model_name_or_path]
             elif os.path.isdir(pretrained_model_name_or_path):
-                archive_file = os.path.join(
-                    pretrained_model_name_or_path, "mindspore_model.ckpt")
+                # memory-mapped safetensors weights are preferred to mindspore checkpoints
+                for weights_name in (SAFE_WEIGHTS_NAME, SAFE_WEIGHTS_INDEX_NAME, "mindspore_model.ckpt"):
+                    archive_file = os.path.join(pretrained_model_name_or_path, weights_name)
+                    if os.path.isfile(archive_file):
+                        break
             elif os.path.isfile(pretrained_model_name_or_path):
                 archive_file = pretrained_model_name_or_path
             elif from_pt:
@@ -357,12 +369,16 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
 
             # redirect to the cache, if necessary
             try:
-                resolved_archive_file = cached_path(
-                    archive_file,
-                    cache_dir=cache_dir,
-                    proxies=proxies,
-                    folder_name=folder_name
-                )[0]
+                if os.path.isfile(archive_file):
+                    # local files are used in place, `cached_path` only returns a path for them
+                    resolved_archive_file = archive_file
+                else:
+                    resolved_archive_file = cached_path(
+                        archive_file,
+                        cache_dir=cache_dir,
+                        proxies=proxies,
+                        folder_name=folder_name
+                    )[0]
 
                 if resolved_archive_file is None:
                     base_url = '/'.join(archive_file.split('/')[:-1])
@@ -388,6 +404,14 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
                         is_sharded = True
                     else:
                         raise EnvironmentError(f"Couldn't reach server at '{archive_file}' to download pretrained weights.")
+                elif str(resolved_archive_file).endswith(SAFE_WEIGHTS_INDEX_NAME):
+                    cached_filenames, _ = get_checkpoint_shard_files(
+                        pretrained_model_name_or_path=folder_name,
+                        index_filename=str(resolved_archive_file),
+                        cache_dir=cache_dir,
+                        proxies=proxies,
+                    )
+                    is_sharded = True
 
             except EnvironmentError as exc:
                 raise exc
@@ -404,14 +428,16 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
         # Instantiate model.
         model = cls(config, *model_args, **model_kwargs)
 
+        # the layers of the plan are replaced by the parallel ones of the rank, before loading so that every rank
+        # only reads its shards of the checkpoint
+        shard_specs = parallelize(model, copy_weights=False) if tensor_parallel else {}
 
         if from_pt:
             if is_sharded:
-                converted_filenames = []
-                for name in cached_filenames:
-                    converted = cls.convert_torch_to_mindspore(
-                        str(name), prefix=cls.base_model_prefix)
-                    converted_filenames.append(converted)
+                # shards are converted one at a time, like they are loaded, so that a single torch shard is held in
+                # memory, the converted ones are reused from the conversion cache
+                converted_filenames = [cls.convert_torch_to_mindspore(str(name), prefix=cls.base_model_prefix)
+                                       for name in cached_filenames]
             else:
                 resolved_archive_file = cls.convert_torch_to_mindspore(
                     str(resolved_archive_file), prefix=cls.base_model_prefix)
@@ -428,32 +454,89 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
                 ) from exc
             return state_dict
 
-        def load_param_into_net(model: nn.Cell, param_dict: dict, prefix: str):
-            not_loaded = list(param_dict.keys())
-            for _, param in model.parameters_and_names():
-                if param.name in param_dict:
-                    param_name = param.name
-                else:
-                    param_name = prefix + '.' + param.name
-                new_param = param_dict.get(param_name)
-                if new_param is not None:
-                    param.set_dtype(new_param.dtype)
-                    param.assign_value(new_param)
-                    not_loaded.remove(param_name)
+        # checkpoint names are the names of the parameters, optionally under the base model prefix
+        param_index = {cls.base_model_prefix + '.' + param.name: param for param in model.get_parameters()}
+        param_index.update({param.name: param for param in model.get_parameters()})
+
+        def read_array(param_name, array):
+            param = param_index.get(param_name)
+            spec = shard_specs.get(param.name) if param is not None else None
+            return array if spec is None else spec.shard(array)
+
+        def slice_state_dict(state_dict):
+            if not shard_specs:
+                return state_dict
+            return {name: Tensor(read_array(name, value.asnumpy())) for name, value in state_dict.items()}
+
+        def load_param_into_net(param_items):
+            not_loaded = []
+            for param_name, new_param in param_items:
+                param = param_index.get(param_name)
+                if param is None:
+                    not_loaded.append(param_name)
+                    continue
+                param.set_dtype(new_param.dtype)
+                param.assign_value(new_param)
+            return not_loaded
 
+        def load_safetensors(filename):
+            # every parameter is copied from the memory map on its own, the checkpoint is never held in memory
+            with SafeTensorsFile(filename) as checkpoint:
+                return load_param_into_net(
+                    (name, Tensor(read_array(name, checkpoint.get_array(name)))) for name in checkpoint.keys())
+
+        def read_ckpt_shard(filename):
+            start = time.time()
+            state_dict = slice_state_dict(load_ckpt(filename))
+            return state_dict, time.time() - start
+
+        def load_shards(filenames):
+            # `.ckpt` shards are read whole, the next one by a worker while the parameters of the current one are
+            # assigned, so at most two shards are held in memory. safetensors shards are copied parameter by parameter.
+            not_loaded = []
+            with ThreadPoolExecutor(max_workers=1) as executor, \
+                    tqdm(total=len(filenames), desc="Loading checkpoint shards") as progress:
+                prefetched = None
+                for idx, name in enumerate(filenames):
+                    if name.endswith('.safetensors'):
+                        start = time.time()
+                        not_loaded.extend(load_safetensors(name))
+                        load_time = time.time() - start
+                        logger.info(f"Loaded checkpoint shard {os.path.basename(name)}: load {load_time:.2f}s")
+                        progress.set_postfix(load=f"{load_time:.2f}s")
+                        progress.update()
+                        continue
+
+                    future = prefetched if prefetched is not None else executor.submit(read_ckpt_shard, name)
+                    prefetched = None
+                    if idx + 1 < len(filenames) and not filenames[idx + 1].endswith('.safetensors'):
+                        prefetched = executor.submit(read_ckpt_shard, filenames[idx + 1])
+                    shard_state_dict, read_time = future.result()
+                    start = time.time()
+                    not_loaded.extend(load_param_into_net(shard_state_dict.items()))
+                    assign_time = time.time() - start
+                    del shard_state_dict
+                    logger.info(f"Loaded checkpoint shard {os.path.basename(name)}: "
+                                f"read {read_time:.2f}s, assign {assign_time:.2f}s")
+                    progress.set_postfix(read=f"{read_time:.2f}s", assign=f"{assign_time:.2f}s")
+                    progress.update()
+            gc.collect()
             return not_loaded
 
+        load_start = time.time()
         if state_dict is None:
             if is_sharded:
-                not_loaded = []
-                for name in tqdm(converted_filenames, desc="Loading checkpoint shards"):
-                    state_dict = load_ckpt(name)
-                    not_loaded.extend(load_param_into_net(model, state_dict, cls.base_model_prefix))
-                    del state_dict
-                    gc.collect()
+                not_loaded = load_shards([str(name) for name in converted_filenames])
+            elif str(resolved_archive_file).endswith('.safetensors'):
+                not_loaded = load_safetensors(str(resolved_archive_file))
             else:
-                state_dict = load_ckpt(resolved_archive_file)
-                not_loaded = load_param_into_net(model, state_dict, cls.base_model_prefix)
+                state_dict = slice_state_dict(load_ckpt(resolved_archive_file))
+                not_loaded = load_param_into_net(state_dict.items())
+                del state_dict
+                gc.collect()
+        else:
+            not_loaded = load_param_into_net(slice_state_dict(state_dict).items())
+        logger.info(f"Loaded the weights of {cls.__name__} in {time.time() - load_start:.2f}s")
 
         if not_loaded:
             logger.warning(f'The following parameters in checkpoint files are not loaded:\n'
@@ -461,12 +544,14 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
 
         return model
 
-    def save(self, save_dir):
+    def save(self, save_dir, safe_serialization=False):
         """ Save a model and its configuration file to a directory, so that
             it can be re-loaded using the `:func:`PreTrainedModel.from_pretrained`` class method.
 
             Arguments:
                 save_dir: directory to which to save.
+                safe_serialization: whether to save the weights in the safetensors format, which
+                    `from_pretrained` loads through a memory map.
         """
         if os.path.isfile(save_dir):
             logger.error(f"Provided path ({save_dir}) should be a directory, not a file")
@@ -480,8 +565,12 @@ class PreTrainedModel(nn.Cell, CellUtilMixin, GenerationMixin):
         model_to_save.config.architectures = [model_to_save.__class__.__name__]
 
         # If we save using the predefined names, we can load using `from_pretrained`
-        output_model_file = os.path.join(save_dir, WEIGHTS_NAME)
-        save_checkpoint(model_to_save, output_model_file)
+        if safe_serialization:
+            output_model_file = os.path.join(save_dir, SAFE_WEIGHTS_NAME)
+            save_safetensors(model_to_save, output_model_file)
+        else:
+            output_model_file = os.path.join(save_dir, WEIGHTS_NAME)
+            save_checkpoint(model_to_save, output_model_file)
 
         logger.info(f"Model weights saved in {output_model_file}")
 
@@ -18,7 +18,8 @@ Cell mixin
 """
 
 import os
-from typing import Union, List, Optional, Dict
+from typing import Union, List, Optional, Dict, Tuple
+import numpy as np
 from mindspore import log as logger
 from mindspore.dataset.transforms.transforms import PyTensorOperation
 
@@ -116,6 +117,107 @@ class PreTrainedTokenizer(SpecialTokensMixin, PyTensorOperation):
         tokens = self._tokenizer.encode(text_input)
         return tokens
 
+    def encode_batch(
+        self,
+        text_input: Union[List[str], np.ndarray],
+        text_pair: Optional[Union[List[str], np.ndarray]] = None,
+        max_length: Optional[int] = None,
+        padding: str = "longest",
+        pad_to_multiple_of: Optional[int] = None,
+        add_special_tokens: bool = True,
+        return_token_type_ids: bool = True,
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Encodes a batch of texts at once with the parallel `encode_batch` of the `tokenizers` backend, and pads them.
+
+        The method can be used as a batched operation of a dataset, mapped on a string column after `batch`:
+
+            >>> dataset = dataset.batch(64)
+            >>> dataset = dataset.map(operations=tokenizer.encode_batch, input_columns="text",
+            ...                       output_columns=["input_ids", "attention_mask", "token_type_ids"])
+
+        Args:
+            text_input (`Union[List[str], np.ndarray]`):
+                The texts, a list of strings or a NumPy array of `str` or `bytes`.
+            text_pair (`Union[List[str], np.ndarray]`, *optional*):
+                The second texts of sequence pairs.
+            max_length (`int`, *optional*):
+                The sequences longer than `max_length` are truncated to it, keeping their special tokens.
+            padding (`str`, *optional*, defaults to `"longest"`):
+                `"longest"` pads to the longest sequence of the batch, `"max_length"` pads to `max_length`.
+            pad_to_multiple_of (`int`, *optional*):
+                Rounds the padded length up to a multiple of this value, so that batches have few distinct shapes.
+            add_special_tokens (`bool`, *optional*, defaults to `True`):
+                Whether or not to add the special tokens of the model.
+            return_token_type_ids (`bool`, *optional*, defaults to `True`):
+                Whether or not to return `token_type_ids`.
+
+        Returns:
+            Tuple of contiguous int32 arrays of shape `(batch_size, sequence_length)`: `input_ids`, `attention_mask`
+            and, if `return_token_type_ids`, `token_type_ids`. Padding positions are set to the id of the padding
+            token, or 0 if the tokenizer has none.
+        """
+        if padding not in ("longest", "max_length"):
+            raise ValueError(f"`padding` should be 'longest' or 'max_length', but got {padding}.")
+        if padding == "max_length" and max_length is None:
+            raise ValueError("`max_length` has to be set to pad to 'max_length'.")
+
+        if not hasattr(self._tokenizer, "encode_batch"):
+            raise NotImplementedError(f"{self.__class__.__name__} does not support `encode_batch`, its backend "
+                                      f"{self._tokenizer.__class__.__name__} has no batched encoding.")
+
+        texts = self._batch_to_unicode(text_input)
+        if text_pair is not None:
+            texts = list(zip(texts, self._batch_to_unicode(text_pair)))
+        # the backend truncates before adding the special tokens, so truncated sequences keep them
+        backend = self._tokenizer if max_length is None else self._truncating_backend(max_length)
+        encodings = backend.encode_batch(texts, add_special_tokens=add_special_tokens)
+
+        lengths = [len(encoding.ids) for encoding in encodings]
+        seq_length = max_length if padding == "max_length" else max(lengths, default=0)
+        if pad_to_multiple_of is not None:
+            seq_length = -(-seq_length // pad_to_multiple_of) * pad_to_multiple_of
+
+        pad_token_id = self.pad_token_id
+        input_ids = np.full((len(encodings), seq_length), pad_token_id if pad_token_id is not None else 0, np.int32)
+        attention_mask = np.zeros((len(encodings), seq_length), np.int32)
+        token_type_ids = np.zeros((len(encodings), seq_length), np.int32) if return_token_type_ids else None
+        for row, (encoding, length) in enumerate(zip(encodings, lengths)):
+            input_ids[row, :length] = encoding.ids[:length]
+            attention_mask[row, :length] = 1
+            if return_token_type_ids:
+                token_type_ids[row, :length] = encoding.type_ids[:length]
+
+        if return_token_type_ids:
+            return input_ids, attention_mask, token_type_ids
+        return input_ids, attention_mask
+
+    def _truncating_backend(self, max_length):
+        """
+        A copy of the backend truncating to `max_length`, cached by length. The shared backend is not reconfigured,
+        so that the workers of a dataset `map` can encode with different lengths at the same time.
+        """
+        backends = self.__dict__.setdefault("_truncating_backends", {})
+        source, backend = backends.get(max_length, (None, None))
+        if source is not self._tokenizer:
+            source = self._tokenizer
+            backend = Tokenizer.from_str(source.to_str())
+            backend.enable_truncation(max_length)
+            # only published once truncating
+            backends[max_length] = (source, backend)
+        return backend
+
+    @staticmethod
+    def _batch_to_unicode(text_input):
+        """Converts a batch of texts to a list of Unicode strings, assuming utf-8 input."""
+        if isinstance(text_input, str):
+            return [text_input]
+        if isinstance(text_input, np.ndarray):
+            if text_input.dtype.type is np.bytes_:
+                text_input = np.char.decode(text_input, "utf-8")
+            return [str(text) for text in text_input.reshape(-1)]
+        return [text.decode("utf-8", "ignore") if isinstance(text, bytes) else str(text) for text in text_input]
+
     def decode(
         self,
         token_ids,
@@ -20,3 +20,4 @@ from .timer_callback import TimerCallback
 from .earlystop_callback import EarlyStopCallback
 from .checkpoint_callback import CheckpointCallback
 from .best_model_callback import BestModelCallback
+from .profiler_callback import ProfilerCallback
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ============================================================================
+# pylint: disable=W0212
 """
 Callback for saving checkpoint.
 """
@@ -27,16 +28,29 @@ class CheckpointCallback(Callback):
     resume previous operations.
     Continue training a sample code using the most recent epoch
 
+    With `steps`, the full training state (the network, the optimizer moments, the loss scaler, the pending
+    accumulated gradients, the random generators and the position in the epoch) is saved every n steps by the
+    trainer as '{ckpt_name}_step_{global_step}.safetensors', and `Trainer.run(resume_from_checkpoint=save_path)`
+    resumes from the latest one. The checkpoints are written on a background thread from a snapshot of the
+    parameters.
+
+    The NumPy and Python generators are resumed where they were. The operator generator of MindSpore and the dataset
+    generator are only re-seeded with their seeds, their states are not saved: after a resume the random operators,
+    e.g. the dropout masks, restart their sequence from the beginning instead of continuing it. The iterator of the
+    dataset is not saved either, a mid-epoch resume skips the first batches of a new iterator, so the remaining
+    batches of the epoch are the ones which were not trained only if the dataset is not shuffled.
+
     Args:
         save_path (str, Path): The path to save the state. A specific path needs to be specified,
             such as 'checkpoints/'.
         ckpt_name (str): Checkpoint name to store. It will set model class name when not specified.
             Default: None.
-        epochs (int): Save a checkpoint file every n epochs.
+        epochs (int): Save a checkpoint file of the model every n epochs. Default: None.
         keep_checkpoint_max (int): Save checkpoint files at most. Default:5.
+        steps (int): Save a full-state checkpoint every n steps. Default: None.
 
     """
-    def __init__(self, save_path, ckpt_name=None, epochs=None, keep_checkpoint_max=5):
+    def __init__(self, save_path, ckpt_name=None, epochs=None, keep_checkpoint_max=5, steps=None):
         if isinstance(save_path, str):
             self.save_path = Path(save_path)
         elif isinstance(save_path, Path):
@@ -48,19 +62,12 @@ class CheckpointCallback(Callback):
             os.makedirs(str(self.save_path))
 
         self.epochs = epochs
+        self.steps = steps
         self.keep_checkpoint_max = keep_checkpoint_max
         self.ckpt_name = ckpt_name
         self.cached_ckpts = []
-
-        # to do
-
-        # self.steps = steps
-        # if (self.epochs is not None) & (self.steps is not None):
-        #     raise ValueError("The parameter epochs and steps cannot be assigned at the same time,\
-        #                         you can only keep one of them.")
-        # elif (self.epochs is None) & (self.steps is None):
-        #     raise ValueError("The parameter epochs and steps both are None,\
-        #                         you must assign one of them.")
+        self.cached_state_ckpts = []
+        self._pending = None
 
     def train_begin(self, run_context):
         """
@@ -70,10 +77,49 @@ class CheckpointCallback(Callback):
             run_context (RunContext): Information about the model.
 
         """
-        if self.epochs is None:
-            raise ValueError('For saving checkpoints, epoch cannont be `None` !')
+        if self.epochs is None and self.steps is None:
+            raise ValueError('For saving checkpoints, epochs and steps cannont be both `None` !')
         print(f"The train will start from the checkpoint saved in '{self.save_path}'.")
 
+    def train_step_end(self, run_context):
+        """
+        Save the full training state every n steps.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        if self.steps is None or run_context.global_step % self.steps != 0:
+            return
+        if self.ckpt_name is None:
+            self.ckpt_name = type(run_context.network).__name__
+        ckpt_name = f"{self.ckpt_name}_step_{run_context.global_step}.safetensors"
+        # a checkpoint only gets its name once written, the oldest one is pruned after the previous write
+        self._wait()
+        if len(self.cached_state_ckpts) == self.keep_checkpoint_max:
+            del_file = self.save_path.joinpath(self.cached_state_ckpts.pop(0))
+            if del_file.exists():
+                del_file.unlink()
+
+        self._pending = run_context.trainer._save_checkpoint(str(self.save_path.joinpath(ckpt_name).resolve()))
+        self.cached_state_ckpts.append(ckpt_name)
+
+    def _wait(self):
+        """Waits for the pending write, and raises its error if it failed."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def train_end(self, run_context):
+        """
+        Wait for the checkpoints being written.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        self._wait()
+
     def train_epoch_end(self, run_context):
         """
         Save checkpoint every n epochs at the end of the epoch.
@@ -97,6 +143,6 @@ class CheckpointCallback(Callback):
             del_file.chmod(0o777)
             del_file.unlink()
 
-        mindspore.save_checkpoint(model, str(self.save_path.joinpath(ckpt_name).resolve()))
+        mindspore.save_checkpoint(model, str(self.save_path.joinpath(ckpt_name).resolve()), async_save=True)
         self.cached_ckpts.append(ckpt_name)
         print(f"Checkpoint: '{ckpt_name}' has been saved in epoch: {run_context.cur_epoch_nums - 1}.")
@@ -0,0 +1,215 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Callback for profiling the training steps.
+"""
+import sys
+import csv
+import json
+import time
+from pathlib import Path
+import numpy as np
+from mindspore import Tensor
+from mindnlp.abc import Callback
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_FIELDS = ['epoch', 'step', 'global_step', 'fetch_time', 'step_time', 'samples', 'samples_per_sec', 'tokens',
+           'tokens_per_sec', 'padding_ratio', 'peak_rss_mb', 'compile']
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the process in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class ProfilerCallback(Callback):
+    """
+    Record a time series of the training steps, written as JSON lines or CSV rows, to tell whether a training is
+    bound by the input pipeline, by compilation or by compute.
+
+    Every step records the time spent fetching the batch and running the step, the samples and tokens per second,
+    the padding ratio of the batch, the peak host RSS and whether the step compiled the network, which happens on
+    the first step and, with `jit`, every time the shapes of the batch change. The trainer only pays for the
+    callbacks it is given, a training without this callback is not slowed down. The records are written as they
+    come and not kept in memory, only the totals of `summary` are.
+
+    Args:
+        save_path (str, Path): The file of the records, CSV if its suffix is '.csv', JSON lines otherwise.
+        tokens_column (str): The column of the token ids, counted for the tokens per second and the padding ratio.
+            Default: None.
+        pad_value (int): The id of the padding token in `tokens_column`. Default: 0.
+        sync (bool): Whether to wait for the device at the end of every step, so that `step_time` is the time of
+            the step and not of its launch. Default: True.
+    """
+    def __init__(self, save_path, tokens_column=None, pad_value=0, sync=True):
+        if not isinstance(save_path, (str, Path)):
+            raise ValueError(f"the 'save_path' argument must be str or Path, but got {type(save_path)}.")
+        self.save_path = Path(save_path)
+        self.tokens_column = tokens_column
+        self.pad_value = pad_value
+        self.sync = sync
+        self._file = None
+        self._writer = None
+        self._tokens_index = None
+        self._fetch_begin = 0.0
+        self._fetch_time = 0.0
+        self._step_begin = 0.0
+        self._batch_stats = (None, None, None, None)
+        self._shapes = set()
+        self._totals = {'fetch': 0.0, 'compute': 0.0, 'compile': 0.0}
+
+    def train_begin(self, run_context):
+        """
+        Open the file of the records.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        self.save_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.save_path, 'w', encoding='utf-8', newline='')  # pylint: disable=R1732
+        if self.save_path.suffix == '.csv':
+            self._writer = csv.DictWriter(self._file, fieldnames=_FIELDS)
+            self._writer.writeheader()
+        if self.tokens_column is not None:
+            columns = run_context.train_dataset.get_col_names()
+            if self.tokens_column not in columns:
+                raise ValueError(f"The column '{self.tokens_column}' is not a column of the dataset, "
+                                 f"the columns are {columns}.")
+            self._tokens_index = columns.index(self.tokens_column)
+
+    def fetch_data_begin(self, run_context):
+        """
+        Start timing the fetch of a batch.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        self._fetch_begin = time.perf_counter()
+
+    def fetch_data_end(self, run_context):
+        """
+        Stop timing the fetch of a batch and count its samples and tokens.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        self._fetch_time = time.perf_counter() - self._fetch_begin
+        batch = run_context.batch
+        samples = batch[0].shape[0] if batch[0].shape else 1
+        tokens, padding_ratio = None, None
+        if self._tokens_index is not None:
+            token_ids = batch[self._tokens_index]
+            token_ids = token_ids.asnumpy() if isinstance(token_ids, Tensor) else np.asarray(token_ids)
+            tokens = int((token_ids != self.pad_value).sum())
+            padding_ratio = 1 - tokens / max(token_ids.size, 1)
+        shapes = tuple((tuple(data.shape), str(data.dtype)) for data in batch)
+        self._batch_stats = (samples, tokens, padding_ratio, shapes)
+
+    def train_step_begin(self, run_context):
+        """
+        Start timing the step.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        self._step_begin = time.perf_counter()
+
+    def train_step_end(self, run_context):
+        """
+        Record the step.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        if self.sync and isinstance(run_context.loss, Tensor):
+            run_context.loss.asnumpy()
+        step_time = time.perf_counter() - self._step_begin
+        samples, tokens, padding_ratio, shapes = self._batch_stats
+        # in data sink mode the batches never reach the host, the steps are timed per sink and only the first one
+        # is taken as compiling
+        compile_step = not self._shapes or (getattr(run_context, 'jit', False) and shapes not in self._shapes)
+        self._shapes.add(shapes)
+        record = {
+            'epoch': run_context.cur_epoch_nums - 1,
+            'step': run_context.cur_step_nums,
+            'global_step': getattr(run_context, 'global_step', None),
+            'fetch_time': self._fetch_time,
+            'step_time': step_time,
+            'samples': samples,
+            'samples_per_sec': samples / step_time if samples is not None and step_time > 0 else None,
+            'tokens': tokens,
+            'tokens_per_sec': tokens / step_time if tokens is not None and step_time > 0 else None,
+            'padding_ratio': padding_ratio,
+            'peak_rss_mb': _peak_rss_mb(),
+            'compile': compile_step,
+        }
+        self._totals['fetch'] += self._fetch_time
+        self._totals['compile' if compile_step else 'compute'] += step_time
+        self._fetch_time = 0.0
+        self._batch_stats = (None, None, None, None)
+        if self._writer is not None:
+            self._writer.writerow(record)
+        elif self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+
+    def train_epoch_end(self, run_context):
+        """
+        Flush the records of the epoch.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def train_end(self, run_context):
+        """
+        Close the file of the records and print where the time went.
+
+        Args:
+            run_context (RunContext): Information about the model.
+
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+        summary = self.summary()
+        line = ', '.join(f'{name} {seconds:.3f}s ({ratio:.1%})' for name, (seconds, ratio) in summary.items())
+        print(f"Profile of the training steps: {line}, saved in '{self.save_path}'.")
+
+    def summary(self):
+        """
+        The time spent fetching data, compiling and computing, with their share of the total.
+
+        Returns:
+            Dict[str, Tuple[float, float]], seconds and ratio by name.
+        """
+        total = sum(self._totals.values()) or 1.0
+        return {name: (seconds, seconds / total) for name, seconds in self._totals.items()}
@@ -0,0 +1,176 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Full-state training checkpoints.
+
+A checkpoint is a safetensors file holding the parameters of the network, the optimizer, the loss scaler and the
+gradient accumulator, the position of the training and the states of the random generators are saved as JSON in its
+metadata. Only the global seed of MindSpore is saved, the random operators are re-seeded when a training resumes.
+"""
+
+import os
+import re
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import mindspore
+from mindspore import Tensor, Parameter
+import mindspore.dataset as ds
+
+from mindnlp.utils.serialization import SafeTensorsFile, save_safetensors
+
+_STATE_KEY = "trainer_state"
+_STEP_PATTERN = re.compile(r"_step_(\d+)\.safetensors$")
+
+
+def training_state_parameters(network, optimizer=None, loss_scaler=None, accumulator=None) -> Dict[str, Parameter]:
+    r"""
+    Collects the parameters making up the state of a training, by their names in the checkpoint.
+
+    Args:
+        network (Cell): The trained network.
+        optimizer (Cell): The optimizer, whose moments and step are saved. Default: None.
+        loss_scaler (LossScaler): The loss scaler, whose scale and counter are saved. Default: None.
+        accumulator (Accumulator): The gradient accumulator, whose pending gradients are saved. Default: None.
+
+    Returns:
+        Dict[str, Parameter], the parameters.
+    """
+    parameters = {}
+    cells = [network] if optimizer is None else [network, optimizer]
+    for cell in cells:
+        for param in cell.get_parameters():
+            parameters.setdefault(param.name, param)
+    if loss_scaler is not None:
+        for attr, value in vars(loss_scaler).items():
+            if isinstance(value, Parameter):
+                parameters[f"loss_scaler.{attr}"] = value
+    if accumulator is not None:
+        for param in accumulator.inner_grads:
+            parameters[f"accumulator.{param.name}"] = param
+        parameters["accumulator.counter"] = accumulator.counter
+        parameters["accumulator.finite"] = accumulator.finite
+    return parameters
+
+
+def training_state(epoch: int, step: int, global_step: int) -> Dict:
+    r"""
+    The position of a training and the states of the random generators.
+
+    Args:
+        epoch (int): The index of the current epoch.
+        step (int): The number of steps run in the current epoch.
+        global_step (int): The number of steps run since the beginning of the training.
+    """
+    np_state = np.random.get_state()
+    py_state = random.getstate()
+    return {
+        "epoch": epoch,
+        "step": step,
+        "global_step": global_step,
+        "rng": {
+            "numpy": [np_state[0], np_state[1].tolist(), np_state[2], np_state[3], np_state[4]],
+            "python": [py_state[0], list(py_state[1]), py_state[2]],
+            "mindspore_seed": mindspore.get_seed(),
+            "dataset_seed": ds.config.get_seed(),
+        }
+    }
+
+
+def _restore_rng(rng):
+    # the operator generator of MindSpore is re-seeded, so its sequence restarts instead of being resumed
+    numpy_state = rng["numpy"]
+    np.random.set_state((numpy_state[0], np.array(numpy_state[1], np.uint32), numpy_state[2], numpy_state[3],
+                         numpy_state[4]))
+    python_state = rng["python"]
+    random.setstate((python_state[0], tuple(python_state[1]), python_state[2]))
+    if rng["mindspore_seed"] is not None:
+        mindspore.set_seed(rng["mindspore_seed"])
+    ds.config.set_seed(rng["dataset_seed"])
+
+
+def load_training_state(filename: str, parameters: Dict[str, Parameter]) -> Dict:
+    r"""
+    Loads a checkpoint saved by [`AsyncCheckpointWriter`] into the parameters and restores the random generators.
+
+    Args:
+        filename (str): The path of the checkpoint.
+        parameters (Dict[str, Parameter]): The parameters to load, as returned by `training_state_parameters`.
+
+    Returns:
+        Dict, the state returned by `training_state` when the checkpoint was saved.
+    """
+    with SafeTensorsFile(filename) as checkpoint:
+        missing = [name for name in parameters if name not in checkpoint]
+        if missing:
+            raise ValueError(f"The parameters {missing} are not in the checkpoint '{filename}'.")
+        for name, param in parameters.items():
+            param.set_data(Tensor(np.array(checkpoint.get_array(name)), dtype=param.dtype))
+        state = json.loads(checkpoint.metadata[_STATE_KEY])
+    _restore_rng(state["rng"])
+    return state
+
+
+def latest_checkpoint(save_dir: str) -> Optional[str]:
+    """The checkpoint of the latest step in a directory, `None` if there is none."""
+    latest, latest_step = None, -1
+    for name in os.listdir(save_dir):
+        matched = _STEP_PATTERN.search(name)
+        if matched and int(matched.group(1)) > latest_step:
+            latest, latest_step = os.path.join(save_dir, name), int(matched.group(1))
+    return latest
+
+
+def _write(filename, arrays, state):
+    tmp_path = f"{filename}.tmp"
+    save_safetensors(arrays, tmp_path, metadata={_STATE_KEY: json.dumps(state)})
+    # a checkpoint is complete or absent, even when the process is killed while writing
+    os.replace(tmp_path, filename)
+    return filename
+
+
+class AsyncCheckpointWriter:
+    r"""
+    Writes checkpoints on a background thread.
+
+    `save` copies the parameters to the host, which is the only time the training waits, and returns while the copy is
+    written. A save waits for the previous write, so at most one snapshot is held in memory besides the parameters.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = None
+
+    def save(self, filename: str, parameters: Dict[str, Parameter], state: Dict):
+        """
+        Saves a snapshot of the parameters and the training state, returns the future of the write.
+        """
+        self.wait()
+        arrays = {name: param.asnumpy().copy() for name, param in parameters.items()}
+        self._pending = self._executor.submit(_write, filename, arrays, state)
+        return self._pending
+
+    def wait(self):
+        """Waits for the pending write, and raises its error if it failed."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+
+__all__ = ['training_state_parameters', 'training_state', 'load_training_state', 'latest_checkpoint',
+           'AsyncCheckpointWriter']
@@ -15,12 +15,13 @@
 """
 Evaluator for testing.
 """
-from inspect import signature
+import time
 from tqdm.autonotebook import tqdm
-from mindspore import log, mutable
+from mindspore import log, data_sink, JitConfig
 from mindnlp import ms_jit
 from mindnlp.abc import Metric
 from mindnlp.engine.callbacks.callback_manager import CallbackManager, RunContext
+from mindnlp.engine.utils import InputBinding
 
 
 class Evaluator:
@@ -37,12 +38,19 @@ class Evaluator:
         callbacks (Optional[list[Callback], Callback]): List of callback objects which should be executed
             while training. Default: None.
         jit (bool): Whether use Just-In-Time compile.
+        dataset_sink_mode (bool): Whether to feed the data through the device data queue. Default: False.
     """
 
-    def __init__(self, network, eval_dataset=None, metrics=None, callbacks=None, jit=False):
+    def __init__(self, network, eval_dataset=None, metrics=None, callbacks=None, jit=False, dataset_sink_mode=False):
         self.network = network
         self.callbacks = callbacks
         self.earlystop = False
+        self.jit = jit
+        self.dataset_sink_mode = dataset_sink_mode
+        self._sink_fn = None
+        self._bindings = {}
+        # mean seconds per step spent by the host outside of fetching data and the eval step
+        self.host_overhead = 0.0
 
         self._check_metric_type(metrics)
         self.eval_dataset = eval_dataset
@@ -109,30 +117,79 @@ class Evaluator:
         run_context = RunContext(args_dict)
         self.callback_manager.evaluate_begin(run_context)
         self.clear_metrics()
-        _ = self._run(tgt_columns)
+        if self.dataset_sink_mode:
+            _ = self._run_ds_sink(tgt_columns)
+        else:
+            _ = self._run(tgt_columns)
         self.callback_manager.evaluate_end(run_context)
         self.earlystop = getattr(run_context, 'earlystop', False)
 
     def _run(self, tgt_columns=None):
         """Evaluating process for non-data sinking mode. The data would be passed to network directly."""
         self.network.set_train(False)
+        bind = self._get_binding(tgt_columns).compile(self.eval_dataset.get_col_names())
+        host_time = 0.0
+        step_nums = 0
         with tqdm(total=self.total) as progress:
             progress.set_description('Evaluate')
-            for data in self.eval_dataset.create_dict_iterator():
-                inputs, tgts = self._data_process(data, tgt_columns)
+            for data in self.eval_dataset.create_tuple_iterator():
+                fetch_end = time.perf_counter()
+                inputs, tgts = bind(data)
+                step_begin = time.perf_counter()
                 outputs = self.eval_func(inputs)
+                step_end = time.perf_counter()
                 self._update_metrics(outputs, *tgts)
                 progress.update(1)
+                step_nums += 1
+                host_time += step_begin - fetch_end + time.perf_counter() - step_end
 
         progress.close()
+        self.host_overhead = host_time / max(step_nums, 1)
+        log.info(f"Evaluate: host overhead {self.host_overhead * 1000:.3f} ms per step.")
         metrics_result, metrics_names, metrics_values = self._get_metrics()
 
         print(f'Evaluate Score: {metrics_result}')
         return metrics_result, metrics_names, metrics_values
 
-    def _run_ds_sink(self):
-        """Evaluating process for data sinking mode."""
-        raise NotImplementedError
+    def _run_ds_sink(self, tgt_columns=None):
+        """
+        Evaluating process for data sinking mode. The batches are fed through the device data queue, every call runs
+        a single step since the metrics are updated with the outputs of every step.
+        """
+        self.network.set_train(False)
+        if self._sink_fn is None:
+            # the sink function is kept across evaluations, the data queue moves on to the next epoch of the dataset
+            self._check_reuse_dataset(self.eval_dataset)
+            self._sink_fn = data_sink(self._get_sink_step_fn(tgt_columns), self.eval_dataset, sink_size=1,
+                                      jit_config=JitConfig() if self.jit else None)
+        with tqdm(total=self.total) as progress:
+            progress.set_description('Evaluate')
+            for _ in range(self.total):
+                outputs, tgts = self._sink_fn()
+                self._update_metrics(outputs, *tgts)
+                progress.update(1)
+
+        progress.close()
+        metrics_result, metrics_names, metrics_values = self._get_metrics()
+
+        print(f'Evaluate Score: {metrics_result}')
+        return metrics_result, metrics_names, metrics_values
+
+    def _get_sink_step_fn(self, tgt_columns):
+        """Eval step taking the columns of the dataset in order, as the data sink feeds them."""
+        input_indices, tgt_indices = self._get_binding(tgt_columns).indices(self.eval_dataset.get_col_names())
+        eval_func = self.eval_func
+
+        def sink_step(*data):
+            inputs = ()
+            for idx in input_indices:
+                inputs = inputs + (data[idx],)
+            tgts = ()
+            for idx in tgt_indices:
+                tgts = tgts + (data[idx],)
+            return eval_func(inputs), tgts
+
+        return sink_step
 
     def _get_metrics(self):
         """Get all metrics values."""
@@ -158,25 +215,12 @@ class Evaluator:
             metric.update(logits, *tgts)
         return True
 
-    def _data_process(self, data, tgt_columns):
-        """Process data match the network construct"""
-        # prepare input dataset.
-        sig = signature(self.network.construct)
-        net_args = sig.parameters
-        inputs = ()
-        for arg in net_args:
-            if arg == 'self':
-                continue
-            if arg not in data.keys():
-                if str(net_args[arg])[-4:] == 'None':
-                    continue
-            inputs = inputs + (data[arg],)
-        # process target dataset.
-        tgt_columns = self._prepare_tgt_columns(tgt_columns)
-        tgts = ()
-        for tgt_column in tgt_columns:
-            tgts = tgts + (data[tgt_column],)
-        return mutable(inputs), mutable(tgts)
+    def _get_binding(self, tgt_columns):
+        """Binding of the columns to the network and the metrics, kept across evaluations."""
+        tgt_columns = tuple(self._prepare_tgt_columns(tgt_columns))
+        if tgt_columns not in self._bindings:
+            self._bindings[tgt_columns] = InputBinding(self.network, tgt_columns)
+        return self._bindings[tgt_columns]
 
     def _prepare_tgt_columns(self, tgt_columns):
         """Check and prepare target columns for training."""
@@ -17,17 +17,23 @@
 """
 Trainer for training.
 """
+import os
+import time
+from itertools import islice
 from typing import Optional, List, Union
-from inspect import signature
 from tqdm.autonotebook import tqdm
 from mindspore import nn, Tensor
-from mindspore import log, mutable, context
+from mindspore import log, context, data_sink, JitConfig
 from mindspore.dataset.engine import Dataset, TakeDataset
 from mindnlp.abc import Callback, Metric
 from mindnlp.engine.callbacks.callback_manager import CallbackManager, RunContext
 from mindnlp.engine.callbacks.earlystop_callback import EarlyStopCallback
 from mindnlp.engine.callbacks.best_model_callback import BestModelCallback
 from mindnlp.engine.evaluator import Evaluator
+from mindnlp.engine.utils import InputBinding
+from mindnlp.engine.checkpoint import AsyncCheckpointWriter, training_state_parameters, training_state, \
+    load_training_state, latest_checkpoint
+from mindnlp.modules.accumulator import Accumulator
 from mindnlp._legacy.amp import auto_mixed_precision, StaticLossScaler, NoLossScaler
 from mindnlp.engine.trainer.utils import get_default_forward_fn_with_loss_fn, \
     get_default_forward_fn_without_loss_fn, get_default_train_step_fn
@@ -61,6 +67,17 @@ class Trainer:
         callbacks (Optional[list[Callback], Callback]): List of callback objects which should be executed
             while training. Default: None.
         jit (bool): Whether use Just-In-Time compile.
+        dataset_sink_mode (bool): Whether to feed the data through the device data queue, running `sink_size` steps
+            per host call. Default: False.
+        sink_size (int): Number of steps run per host call in data sink mode, the callbacks fire once per call.
+            It should divide the number of steps of an epoch, -1 runs a whole epoch per call. Default: -1.
+        sync_steps (int): Number of steps between two updates of the loss shown by the progress bar. The loss is
+            accumulated on device and the host only waits for it at these steps and at the end of an epoch.
+            Default: 10.
+        accumulate_steps (int): Number of micro-batches whose gradients are averaged before the optimizer is applied,
+            the effective batch size is `accumulate_steps` times the batch size of `train_dataset`. The windows span
+            the epochs. Default: 1.
+        max_grad_norm (float): Maximum global norm of the gradients, clipped once per optimizer step. Default: None.
 
     """
 
@@ -79,6 +96,13 @@ class Trainer:
         epochs = kwargs.pop('epochs', None)
         jit = kwargs.pop('jit', False)
         check_gradients = kwargs.pop('check_gradients', False)
+        self.dataset_sink_mode = kwargs.pop('dataset_sink_mode', False)
+        self.sink_size = kwargs.pop('sink_size', -1)
+        self.sync_steps = max(kwargs.pop('sync_steps', 10), 1)
+        self.accumulate_steps = kwargs.pop('accumulate_steps', 1)
+        self.max_grad_norm = kwargs.pop('max_grad_norm', None)
+        if self.accumulate_steps < 1:
+            raise ValueError(f"`accumulate_steps` should be a positive integer, but got {self.accumulate_steps}.")
 
         # deprecated args
         self.jit = jit
@@ -95,6 +119,7 @@ class Trainer:
         self.optimizer = optimizer
         self.forward_fn = None
         self.train_fn = None
+        self.accumulator = None
 
         if loss_fn is None:
             self.obj_network = True
@@ -111,7 +136,15 @@ class Trainer:
 
         self.cur_epoch_nums = 0
         self.cur_step_nums = 0
+        self.global_step = 0
         self.earlystop = False
+        # position restored by `_load_checkpoint`
+        self._start_epoch = 0
+        self._resume_step = 0
+        self._checkpoint_writer = None
+        # mean seconds per step spent by the host outside of fetching data and the train step
+        self.host_overhead = 0.0
+        self._binding = None
         if callbacks:
             callbacks = self._prepare_callbacks(callbacks)
         self._prepare_eval(eval_dataset, metrics, callbacks, jit)
@@ -124,8 +157,11 @@ class Trainer:
                 if not self.obj_network else get_default_forward_fn_without_loss_fn(self.network, self.loss_scaler)
 
         if self.train_fn is None:
+            if self.accumulate_steps > 1 or self.max_grad_norm is not None:
+                self.accumulator = Accumulator(self.optimizer, self.accumulate_steps, self.max_grad_norm)
             self.train_fn = get_default_train_step_fn(self.forward_fn, self.optimizer, self.loss_scaler,
-                                                      self.check_gradients or self.amp_level != 'O0', self.jit, self.obj_network)
+                                                      self.check_gradients or self.amp_level != 'O0', self.jit, self.obj_network,
+                                                      self.accumulator)
 
     def _prepare_callbacks(self, callbacks):
         if isinstance(callbacks, Callback):
@@ -147,7 +183,7 @@ class Trainer:
     def _prepare_eval(self, eval_dataset, metrics, callbacks, jit):
         if eval_dataset is not None and metrics is not None:
             self.evaluator = Evaluator(network=self.network, eval_dataset=eval_dataset, metrics=metrics,
-                                       callbacks=callbacks, jit=jit)
+                                       callbacks=callbacks, jit=jit, dataset_sink_mode=self.dataset_sink_mode)
         elif eval_dataset is None and metrics is None:
             if callbacks:
                 self._check_callbacks_type(callbacks)
@@ -175,24 +211,36 @@ class Trainer:
             raise RuntimeError("The dataset object had been used in other model by model.train(...), "
                                "please create a new dataset.")
 
-    def run(self, tgt_columns=None):
+    def run(self, tgt_columns=None, resume_from_checkpoint=None):
         """
         Training process entry.
 
         Args:
             tgt_columns (Optional[list[str], str]): Target label column names for loss function.
+            resume_from_checkpoint (Optional[str]): A full-state checkpoint saved by `CheckpointCallback` with `steps`,
+                or a directory of them to resume from the latest one. The training resumes at the step after the
+                checkpoint, mid-epoch if needed, by skipping the first batches of the epoch: the skipped batches
+                are the trained ones only if `train_dataset` is not shuffled. Default: None.
 
         """
         if self.obj_network and tgt_columns is not None:
             log.warning("'tgt_columns' does not take effect when 'loss_fn' is `None`.")
 
         self._prepare_train_func()
+        if resume_from_checkpoint is not None:
+            self._load_checkpoint(resume_from_checkpoint)
+        self._binding = InputBinding(self.network, () if self.obj_network else self._prepare_tgt_columns(tgt_columns))
 
         args_dict = vars(self)
         run_context = RunContext(args_dict)
+        # e.g. for the checkpoints of the full training state
+        run_context.trainer = self
         self.callback_manager.train_begin(run_context)
 
-        self._run(run_context, tgt_columns)
+        if self.dataset_sink_mode:
+            self._run_ds_sink(run_context, tgt_columns)
+        else:
+            self._run(run_context, tgt_columns)
         self.callback_manager.train_end(run_context)
 
     def _run(self, run_context, tgt_columns=None):
@@ -206,37 +254,59 @@ class Trainer:
             context.set_context(mode=context.GRAPH_MODE)
 
         total = self.train_dataset.get_dataset_size()
+        bind = self._binding.compile(self.train_dataset.get_col_names())
         # train epoch begin
-        for epoch in range(0, self.epochs):
+        for epoch in range(self._start_epoch, self.epochs):
             self.network.set_train()
+            # the steps run before the checkpoint the training resumes from are skipped
+            skip_steps, self._resume_step = self._resume_step, 0
             self.cur_epoch_nums = epoch + 1
-            self.cur_step_nums = 0
+            self.cur_step_nums = skip_steps
             run_context.cur_epoch_nums = self.cur_epoch_nums
-            run_context.cur_step_nums = 0
+            run_context.cur_step_nums = skip_steps
             if self.earlystop is True:
                 break
             self.callback_manager.train_epoch_begin(run_context)
-            with tqdm(total=total) as progress:
+            with tqdm(total=total, initial=skip_steps) as progress:
                 progress.set_description(f'Epoch {epoch}')
                 loss_total = 0
+                host_time = 0.0
                 # step begin
-                for data in self.train_dataset.create_dict_iterator():
-                    inputs, tgts = self._data_process(data, tgt_columns)
+                iterator = islice(self.train_dataset.create_tuple_iterator(), skip_steps, None)
+                while True:
+                    self.callback_manager.fetch_data_begin(run_context)
+                    data = next(iterator, None)
+                    if data is None:
+                        break
+                    run_context.batch = data
+                    self.callback_manager.fetch_data_end(run_context)
+                    fetch_end = time.perf_counter()
+                    inputs, tgts = bind(data)
                     run_context.cur_step_nums += 1
                     self.cur_step_nums += 1
+                    self.global_step += 1
+                    run_context.global_step = self.global_step
                     self.callback_manager.train_step_begin(run_context)
+                    step_begin = time.perf_counter()
                     if self.obj_network:
                         loss = self.train_fn(inputs)
                     else:
                         loss = self.train_fn(inputs, tgts)
+                    step_end = time.perf_counter()
+                    # the running loss stays on device, reading it waits for the step to finish
                     loss_total += loss
-                    run_context.loss = loss_total/self.cur_step_nums
-                    progress.set_postfix(loss=loss_total/self.cur_step_nums)
+                    run_context.loss = loss_total/(self.cur_step_nums - skip_steps)
+                    if self.cur_step_nums % self.sync_steps == 0 or self.cur_step_nums == total:
+                        progress.set_postfix(loss=run_context.loss)
                     progress.update(1)
                     # step end
                     self.callback_manager.train_step_end(run_context)
+                    host_time += step_begin - fetch_end + time.perf_counter() - step_end
+                    self.host_overhead = host_time / (self.cur_step_nums - skip_steps)
+                    run_context.host_overhead = self.host_overhead
             # train epoch end
             progress.close()
+            log.info(f"Epoch {epoch}: host overhead {self.host_overhead * 1000:.3f} ms per step.")
             self.callback_manager.train_epoch_end(run_context)
             # do epoch evaluation
             if self.evaluator is not None:
@@ -245,18 +315,106 @@ class Trainer:
         # restore PYNATIVE_MODE after training.
         context.set_context(mode=context.PYNATIVE_MODE)
 
-    def _run_ds_sink(self, train_dataset, eval_dataset, list_callback,
-                     cb_params, print_steps, eval_steps):
-        """Training process for data sinking mode."""
-        raise NotImplementedError
+    def _run_ds_sink(self, run_context, tgt_columns=None):
+        """
+        Training process for data sinking mode. The batches are fed through the device data queue and each host call
+        runs `sink_size` steps, the callbacks fire at the boundaries of the calls and `loss` is the one of the last
+        step.
+        """
+        if self.jit:
+            context.set_context(mode=context.GRAPH_MODE)
+
+        self._check_reuse_dataset(self.train_dataset)
+        total = self.train_dataset.get_dataset_size()
+        sink_size = total if self.sink_size <= 0 else self.sink_size
+        if total % sink_size != 0:
+            raise ValueError(f"`sink_size` should divide the {total} steps of an epoch, but got {sink_size}.")
+        sink_fn = data_sink(self._get_sink_step_fn(tgt_columns), self.train_dataset, sink_size=sink_size,
+                            jit_config=JitConfig() if self.jit else None)
+        if self._resume_step:
+            # the data queue can not skip batches, the interrupted epoch is run again
+            log.warning(f"Data sink mode resumes at the beginning of epoch {self._start_epoch}.")
+            self.global_step -= self._resume_step
+            self._resume_step = 0
+
+        for epoch in range(self._start_epoch, self.epochs):
+            self.network.set_train()
+            self.cur_epoch_nums = epoch + 1
+            self.cur_step_nums = 0
+            run_context.cur_epoch_nums = self.cur_epoch_nums
+            run_context.cur_step_nums = 0
+            if self.earlystop is True:
+                break
+            self.callback_manager.train_epoch_begin(run_context)
+            with tqdm(total=total) as progress:
+                progress.set_description(f'Epoch {epoch}')
+                for _ in range(total // sink_size):
+                    run_context.cur_step_nums += sink_size
+                    self.cur_step_nums += sink_size
+                    self.global_step += sink_size
+                    run_context.global_step = self.global_step
+                    self.callback_manager.ds_sink_begin(run_context)
+                    self.callback_manager.train_step_begin(run_context)
+                    loss = sink_fn()
+                    run_context.loss = loss
+                    progress.set_postfix(loss=loss)
+                    progress.update(sink_size)
+                    self.callback_manager.train_step_end(run_context)
+                    self.callback_manager.ds_sink_end(run_context)
+            progress.close()
+            self.callback_manager.train_epoch_end(run_context)
+            if self.evaluator is not None:
+                self._do_eval_epoch(run_context, tgt_columns)
+
+        context.set_context(mode=context.PYNATIVE_MODE)
+
+    def _get_sink_step_fn(self, tgt_columns):
+        """Train step taking the columns of the dataset in order, as the data sink feeds them."""
+        input_indices, tgt_indices = self._binding.indices(self.train_dataset.get_col_names())
+        train_fn = self.train_fn
+        obj_network = self.obj_network
+
+        def sink_step(*data):
+            inputs = ()
+            for idx in input_indices:
+                inputs = inputs + (data[idx],)
+            if obj_network:
+                return train_fn(inputs)
+            tgts = ()
+            for idx in tgt_indices:
+                tgts = tgts + (data[idx],)
+            return train_fn(inputs, tgts)
+
+        return sink_step
+
+    def _state_parameters(self):
+        """Parameters of the full training state."""
+        return training_state_parameters(self.network, self.optimizer, self.loss_scaler, self.accumulator)
 
     def _load_checkpoint(self, path):
-        """Load checkpoint."""
-        raise NotImplementedError
+        """
+        Load a full-state checkpoint, or the latest one of a directory, and set the position to resume from.
+        """
+        if os.path.isdir(path):
+            checkpoint = latest_checkpoint(path)
+            if checkpoint is None:
+                raise ValueError(f"There is no checkpoint to resume from in '{path}'.")
+            path = checkpoint
+        state = load_training_state(path, self._state_parameters())
+        self.global_step = state["global_step"]
+        self._start_epoch, self._resume_step = state["epoch"], state["step"]
+        if self._resume_step >= self.train_dataset.get_dataset_size():
+            self._start_epoch, self._resume_step = self._start_epoch + 1, 0
+        log.info(f"Resume training from '{path}' at epoch {self._start_epoch}, step {self._resume_step}.")
 
     def _save_checkpoint(self, path):
-        """Save checkpoint."""
-        raise NotImplementedError
+        """
+        Save the full training state to `path` on a background thread, returns the future of the write.
+        """
+        if self._checkpoint_writer is None:
+            self._checkpoint_writer = AsyncCheckpointWriter()
+        state = training_state(self.cur_epoch_nums - 1, self.cur_step_nums, self.global_step)
+        return self._checkpoint_writer.save(path, self._state_parameters(), state)
 
     def _do_eval_steps(self, steps, eval_dataset):
         """Evaluate the model after n steps."""
@@ -266,38 +424,16 @@ class Trainer:
         """Evaluate the model after an epoch."""
         self.callback_manager.evaluate_begin(run_context)
         self.evaluator.clear_metrics()
-        metrics_result, metrics_names, metrics_values = self.evaluator._run(tgt_columns)
+        if self.evaluator.dataset_sink_mode:
+            metrics_result, metrics_names, metrics_values = self.evaluator._run_ds_sink(tgt_columns)
+        else:
+            metrics_result, metrics_names, metrics_values = self.evaluator._run(tgt_columns)
         setattr(run_context, "metrics_values", metrics_values)
         setattr(run_context, "metrics_result", metrics_result)
         setattr(run_context, "metrics_names", metrics_names)
         self.callback_manager.evaluate_end(run_context)
         self.earlystop = run_context.earlystop
 
-    def _data_process(self, data, tgt_columns):
-        """Process data match the network construct"""
-        # prepare input dataset.
-        sig = signature(self.network.construct)
-        net_args = sig.parameters
-        inputs = ()
-        tgts = ()
-
-        for arg in net_args:
-            if arg == 'self':
-                continue
-            if arg not in data.keys():
-                if str(net_args[arg])[-4:] == 'None':
-                    continue
-            else:
-                inputs = inputs + (data[arg],)
-
-        if self.obj_network:
-            return mutable(inputs), mutable(tgts)
-        # process target dataset.
-        tgt_columns = self._prepare_tgt_columns(tgt_columns)
-        for tgt_column in tgt_columns:
-            tgts = tgts + (data[tgt_column],)
-        return mutable(inputs), mutable(tgts)
-
     def _prepare_tgt_columns(self, tgt_columns):
         """Check and prepare target columns for training."""
         out_columns = []
@@ -54,41 +54,43 @@ def get_default_forward_fn_without_loss_fn(network, loss_scaler):
 
     return forward_fn
 
-def get_default_train_step_fn(forward_fn, optimizer, loss_scaler, check_gradients, jit, for_object_net=False):
+def get_default_train_step_fn(forward_fn, optimizer, loss_scaler, check_gradients, jit, for_object_net=False,
+                              accumulator=None):
     """get default train function"""
     grad_fn = value_and_grad(forward_fn, None, optimizer.parameters, has_aux=False)
 
-    def default_run_step(inputs, labels):
-        """Core process of each step, including the forward propagation process and back propagation of data."""
-        status = init_status()
-        inputs = ops.depend(inputs, status)
-        loss, grads = grad_fn(inputs, labels)
-        loss = loss_scaler.unscale(loss)
+    def apply_grads(loss, grads, status):
+        """Update the parameters, or accumulate the gradients when an accumulator is given."""
         if check_gradients:
             is_finite = all_finite(grads, status)
-            if is_finite:
+            if accumulator is not None:
+                # the accumulator drops the windows with overflowed gradients
+                loss = ops.depend(loss, accumulator(loss_scaler.unscale(grads), is_finite))
+            elif is_finite:
                 grads = loss_scaler.unscale(grads)
                 loss = ops.depend(loss, optimizer(grads))
             loss = ops.depend(loss, loss_scaler.adjust(is_finite))
+        elif accumulator is not None:
+            loss = ops.depend(loss, accumulator(grads))
         else:
             loss = ops.depend(loss, optimizer(grads))
         return loss
 
+    def default_run_step(inputs, labels):
+        """Core process of each step, including the forward propagation process and back propagation of data."""
+        status = init_status()
+        inputs = ops.depend(inputs, status)
+        loss, grads = grad_fn(inputs, labels)
+        loss = loss_scaler.unscale(loss)
+        return apply_grads(loss, grads, status)
+
     def default_run_step_for_obj_net(inputs):
         """Core process of each step, including the forward propagation process and back propagation of data."""
         status = init_status()
         inputs = ops.depend(inputs, status)
         loss, grads = grad_fn(inputs)
         loss = loss_scaler.unscale(loss)
-        if check_gradients:
-            is_finite = all_finite(grads, status)
-            if is_finite:
-                grads = loss_scaler.unscale(grads)
-                loss = ops.depend(loss, optimizer(grads))
-            loss = ops.depend(loss, loss_scaler.adjust(is_finite))
-        else:
-            loss = ops.depend(loss, optimizer(grads))
-        return loss
+        return apply_grads(loss, grads, status)
 
     run_step = default_run_step_for_obj_net if for_object_net else default_run_step
 
@@ -0,0 +1,99 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Utils of the engine.
+"""
+from inspect import signature, Parameter
+from operator import itemgetter
+from typing import Callable, Sequence, Tuple
+
+from mindspore import mutable
+
+
+class InputBinding:
+    r"""
+    Binds the columns of the batches to the arguments of the network construct and to the targets of the loss
+    function.
+
+    The signature of the construct is inspected once, and the positions of the columns are resolved once per dataset
+    schema, a batch of `create_tuple_iterator` is then bound with two tuple lookups. The construct arguments missing
+    from the columns are skipped if they have a default value, the others are passed positionally in the order of the
+    construct.
+
+    Args:
+        network (Cell): The network whose construct takes the inputs.
+        tgt_columns (Sequence[str]): The target columns, passed to the loss function. Default: ().
+    """
+
+    def __init__(self, network, tgt_columns: Sequence[str] = ()):
+        parameters = signature(network.construct).parameters
+        self.arg_names = tuple(name for name, param in parameters.items()
+                               if name != 'self' and param.kind not in (Parameter.VAR_POSITIONAL,
+                                                                        Parameter.VAR_KEYWORD))
+        self.optional_args = frozenset(name for name in self.arg_names
+                                       if parameters[name].default is not Parameter.empty)
+        self.tgt_columns = tuple(tgt_columns)
+        self._indices = {}
+        self._binders = {}
+
+    def indices(self, columns: Sequence[str]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """
+        Positions of the columns passed to the construct and of the target columns, resolved once per schema.
+        """
+        columns = tuple(columns)
+        if columns not in self._indices:
+            input_indices = []
+            for name in self.arg_names:
+                if name in columns:
+                    input_indices.append(columns.index(name))
+                elif name not in self.optional_args:
+                    raise ValueError(f"The argument '{name}' of the network construct is not a column of the "
+                                     f"dataset, the columns are {columns}.")
+            missing = [name for name in self.tgt_columns if name not in columns]
+            if missing:
+                raise ValueError(f"The target columns {missing} are not columns of the dataset, "
+                                 f"the columns are {columns}.")
+            self._indices[columns] = (tuple(input_indices), tuple(columns.index(name) for name in self.tgt_columns))
+        return self._indices[columns]
+
+    def compile(self, columns: Sequence[str]) -> Callable:
+        """
+        Returns the function binding a batch of the columns, given as a tuple in the column order, to the
+        `(inputs, targets)` tuples of the train and eval steps.
+        """
+        columns = tuple(columns)
+        if columns not in self._binders:
+            input_indices, tgt_indices = self.indices(columns)
+            get_inputs = _tuple_getter(input_indices)
+            get_tgts = _tuple_getter(tgt_indices)
+
+            def bind(data):
+                return mutable(get_inputs(data)), mutable(get_tgts(data))
+
+            self._binders[columns] = bind
+        return self._binders[columns]
+
+
+def _tuple_getter(indices):
+    """itemgetter always returning a tuple"""
+    if not indices:
+        return lambda data: ()
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda data: (data[index],)
+    return itemgetter(*indices)
+
+
+__all__ = ['InputBinding']
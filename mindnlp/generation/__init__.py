@@ -20,3 +20,5 @@ from .beam_search import *
 from .logits_process import *
 from .stopping_criteria import *
 from .utils import *
+from .scheduler import *
+from .kv_cache import *
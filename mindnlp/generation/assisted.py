@@ -0,0 +1,204 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+# pylint: disable=W0613
+"""
+Assisted decoding, a greedy search checking the candidates of an assistant model
+"""
+import warnings
+from typing import Optional, List, Union
+
+import mindspore
+from mindspore import ops
+
+from .logits_process import LogitsProcessorList
+from .stopping_criteria import StoppingCriteriaList, validate_stopping_criteria
+
+
+def assisted_decoding(
+    model,
+    input_ids: mindspore.Tensor,
+    assistant_model: "PreTrainedModel",
+    num_assistant_tokens: int = 5,
+    logits_processor: Optional[LogitsProcessorList] = None,
+    stopping_criteria: Optional[StoppingCriteriaList] = None,
+    max_length: Optional[int] = None,
+    pad_token_id: Optional[int] = None,
+    eos_token_id: Optional[Union[int, List[int]]] = None,
+    output_scores: Optional[bool] = None,
+    return_dict_in_generate: Optional[bool] = None,
+    **model_kwargs,
+):
+    r"""
+    Generates sequences of token ids with **greedy decoding** assisted by a smaller model, also known as
+    speculative decoding.
+
+    At each step the assistant proposes `num_assistant_tokens` tokens greedily, then `model` scores the prompt
+    and all the candidates in one forward. The candidates matching the greedy choices of `model` are kept,
+    followed by the token `model` picks at the first mismatch, so every step commits at least one token and the
+    output is the one of [`~GenerationMixin.greedy_search`]. The tokens after the mismatch are rolled back from
+    the caches of both models with `_crop_cache`. The number of candidates grows by 2 when all of them are
+    accepted and shrinks by 1 otherwise.
+
+    Only a batch of one sequence is supported, the counts of the last call are kept in
+    `model.assisted_decoding_stats`.
+
+    Parameters:
+        model (`PreTrainedModel`):
+            The model generating the sequences, which checks the candidates of the assistant.
+        input_ids (`mindspore.Tensor` of shape `(1, sequence_length)`):
+            The sequence used as a prompt for the generation.
+        assistant_model (`PreTrainedModel`):
+            A decoder-only model sharing the vocabulary of `model`, much faster to run.
+        num_assistant_tokens (`int`, *optional*, defaults to 5):
+            The number of candidate tokens proposed by the assistant at the first step.
+        logits_processor (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsProcessor`]
+            used to modify the prediction scores of the language modeling head applied at each generation step.
+        stopping_criteria (`StoppingCriteriaList`, *optional*):
+            An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+            used to tell if the generation loop should stop.
+        max_length (`int`, *optional*, defaults to 20):
+            **DEPRECATED**. Use `logits_processor` or `stopping_criteria` directly to cap the number of generated
+            tokens. The maximum length of the sequence to be generated.
+        pad_token_id (`int`, *optional*):
+            The id of the *padding* token.
+        eos_token_id (`Union[int, List[int]]`, *optional*):
+            The id of the *end-of-sequence* token. Optionally, use a list to set multiple *end-of-sequence* tokens.
+        output_scores (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the prediction scores.
+        return_dict_in_generate (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the scores alongside the sequences.
+        model_kwargs:
+            Additional model specific keyword arguments, only `attention_mask` is used.
+
+    Return:
+        `mindspore.Tensor` containing the generated tokens, or a tuple `(sequences, scores, None, None)` laid out
+        as the one of [`~GenerationMixin.greedy_search`] if `return_dict_in_generate=True`.
+    """
+    # init values
+    logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+    stopping_criteria = stopping_criteria if stopping_criteria is not None else StoppingCriteriaList()
+    if max_length is not None:
+        warnings.warn(
+            "`max_length` is deprecated in this function, use"
+            " `stopping_criteria=StoppingCriteriaList(MaxLengthCriteria(max_length=max_length))` instead.",
+            UserWarning,
+        )
+        stopping_criteria = validate_stopping_criteria(stopping_criteria, max_length)
+    max_length = stopping_criteria.max_length
+    if max_length is None:
+        raise ValueError("`max_length` needs to be a stopping_criteria for assisted decoding.")
+    eos_token_id = eos_token_id if eos_token_id is not None else model.generation_config.eos_token_id
+    if isinstance(eos_token_id, int):
+        eos_token_id = [eos_token_id]
+    eos_token_id = set(eos_token_id) if eos_token_id is not None else set()
+    output_scores = output_scores if output_scores is not None else model.generation_config.output_scores
+    return_dict_in_generate = (
+        return_dict_in_generate
+        if return_dict_in_generate is not None
+        else model.generation_config.return_dict_in_generate
+    )
+
+    if input_ids.shape[0] != 1:
+        raise ValueError("Assisted decoding only supports a batch of one sequence.")
+    attention_mask = model_kwargs.get("attention_mask")
+    if attention_mask is not None and (attention_mask == 0).any():
+        raise ValueError("Assisted decoding does not support padded inputs.")
+
+    scores = () if (return_dict_in_generate and output_scores) else None
+    model.assisted_decoding_stats = {"num_steps": 0, "num_candidates": 0, "num_accepted": 0}
+
+    # caches of both models, with the number of tokens they hold
+    past_key_values, past_length = None, 0
+    assistant_past_key_values, assistant_past_length = None, 0
+
+    while True:
+        cur_len = input_ids.shape[-1]
+
+        # 1. the assistant proposes candidates, leaving room for the token picked by this model
+        candidate_input_ids = input_ids
+        for _ in range(int(min(num_assistant_tokens, max_length - cur_len - 1))):
+            assistant_outputs = assistant_model(
+                candidate_input_ids[:, assistant_past_length:],
+                past_key_values=assistant_past_key_values,
+                attention_mask=ops.ones(candidate_input_ids.shape, mindspore.int64),
+                use_cache=True,
+            )
+            assistant_past_key_values = assistant_model._extract_past_from_model_output(assistant_outputs)
+            assistant_past_length = candidate_input_ids.shape[-1]
+            assistant_scores = logits_processor(candidate_input_ids, assistant_outputs[0][:, -1, :])
+            new_token = ops.argmax(assistant_scores, dim=-1).astype(input_ids.dtype)
+            candidate_input_ids = ops.cat([candidate_input_ids, new_token[:, None]], axis=-1)
+            if int(new_token[0]) in eos_token_id:
+                break
+        candidate_length = candidate_input_ids.shape[-1] - cur_len
+
+        # 2. this model scores all the candidates in one forward
+        outputs = model(
+            candidate_input_ids[:, past_length:],
+            past_key_values=past_key_values,
+            attention_mask=ops.ones(candidate_input_ids.shape, mindspore.int64),
+            use_cache=True,
+        )
+        new_logits = outputs[0][:, -(candidate_length + 1):, :]
+        next_token_scores = [
+            logits_processor(candidate_input_ids[:, :cur_len + i], new_logits[:, i, :])
+            for i in range(candidate_length + 1)
+        ]
+        selected_tokens = ops.stack([ops.argmax(score, dim=-1) for score in next_token_scores], axis=1)
+
+        # 3. keep the candidates matching the greedy choices, then the choice at the first mismatch
+        candidates = candidate_input_ids[0, cur_len:].asnumpy().tolist()
+        selected = selected_tokens[0].asnumpy().tolist()
+        n_matches = 0
+        while n_matches < candidate_length and candidates[n_matches] == selected[n_matches]:
+            if candidates[n_matches] in eos_token_id:
+                break
+            n_matches += 1
+        valid_tokens = selected[:n_matches + 1]
+        finished = valid_tokens[-1] in eos_token_id
+
+        input_ids = ops.cat([input_ids, mindspore.Tensor([valid_tokens], input_ids.dtype)], axis=-1)
+        if scores is not None:
+            scores += tuple(next_token_scores[:n_matches + 1])
+        new_cur_len = input_ids.shape[-1]
+
+        # 4. roll back the caches, the last committed token is fed at the next step
+        past_length = new_cur_len - 1
+        past_key_values = model._crop_cache(model._extract_past_from_model_output(outputs), past_length)
+        if assistant_past_key_values is not None:
+            assistant_past_length = min(assistant_past_length, past_length)
+            assistant_past_key_values = assistant_model._crop_cache(assistant_past_key_values,
+                                                                    assistant_past_length)
+
+        model.assisted_decoding_stats["num_steps"] += 1
+        model.assisted_decoding_stats["num_candidates"] += candidate_length
+        model.assisted_decoding_stats["num_accepted"] += n_matches
+
+        # 5. propose more candidates when they were all accepted
+        if n_matches == candidate_length:
+            num_assistant_tokens += 2
+        else:
+            num_assistant_tokens = max(1, num_assistant_tokens - 1)
+
+        if finished or stopping_criteria(input_ids, scores):
+            break
+
+    if return_dict_in_generate:
+        return (input_ids, scores, None, None)
+    return input_ids
+
+
+__all__ = ['assisted_decoding']
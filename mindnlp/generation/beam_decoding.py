@@ -0,0 +1,238 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Beam search decoding
+"""
+import warnings
+from typing import Optional, List, Union
+
+import mindspore
+from mindspore import ops
+
+from .beam_search import BeamScorer
+from .logits_process import LogitsProcessorList
+from .stopping_criteria import StoppingCriteriaList, validate_stopping_criteria
+
+
+def beam_search(
+    model,
+    input_ids: mindspore.Tensor,
+    beam_scorer: BeamScorer,
+    logits_processor: Optional[LogitsProcessorList] = None,
+    stopping_criteria: Optional[StoppingCriteriaList] = None,
+    max_length: Optional[int] = None,
+    pad_token_id: Optional[int] = None,
+    eos_token_id: Optional[Union[int, List[int]]] = None,
+    output_attentions: Optional[bool] = None,
+    output_hidden_states: Optional[bool] = None,
+    output_scores: Optional[bool] = None,
+    return_dict_in_generate: Optional[bool] = None,
+    synced_gpus: bool = False,
+    **model_kwargs,
+):
+    r"""
+    Generates sequences of token ids for models with a language modeling head using **beam search decoding** and
+    can be used for text-decoder, text-to-text, speech-to-text, and vision-to-text models.
+
+    The `batch_size * num_beams` running hypotheses are kept in a single `input_ids` tensor. At every step the
+    beam scores are added to the log-probabilities of the next tokens, and the `2 * num_beams` best candidates of
+    each batch are selected with a single top-k over the flattened `num_beams * vocab_size` scores. The past key
+    values are then reordered with `_reorder_cache` to follow the selected beams.
+
+    Parameters:
+        model (`PreTrainedModel`):
+            The model generating the sequences, with a language modeling head.
+        input_ids (`mindspore.Tensor` of shape `(batch_size * num_beams, sequence_length)`):
+            The sequence used as a prompt for the generation.
+        beam_scorer (`BeamScorer`):
+            An derived instance of [`BeamScorer`] that defines how beam hypotheses are constructed, stored and
+            sorted during generation.
+        logits_processor (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsProcessor`]
+            used to modify the prediction scores of the language modeling head applied at each generation step.
+        stopping_criteria (`StoppingCriteriaList`, *optional*):
+            An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+            used to tell if the generation loop should stop.
+        max_length (`int`, *optional*, defaults to 20):
+            **DEPRECATED**. Use `logits_processor` or `stopping_criteria` directly to cap the number of generated
+            tokens. The maximum length of the sequence to be generated.
+        pad_token_id (`int`, *optional*):
+            The id of the *padding* token.
+        eos_token_id (`Union[int, List[int]]`, *optional*):
+            The id of the *end-of-sequence* token. Optionally, use a list to set multiple *end-of-sequence* tokens.
+        output_attentions (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the attentions tensors of all attention layers.
+        output_hidden_states (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the hidden states of all layers.
+        output_scores (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the prediction scores.
+        return_dict_in_generate (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the scores and beam indices alongside the sequences.
+        synced_gpus (`bool`, *optional*, defaults to `False`):
+            Whether to continue running the while loop until max_length (needed for ZeRO stage 3)
+        model_kwargs:
+            Additional model specific kwargs will be forwarded to the `construct` function of the model. If model is
+            an encoder-decoder model the kwargs should include `encoder_outputs`.
+
+    Return:
+        `mindspore.Tensor` containing the generated tokens, or a tuple `(sequences, sequences_scores, scores,
+        beam_indices)` if `return_dict_in_generate=True`.
+    """
+    # init values
+    logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+    stopping_criteria = stopping_criteria if stopping_criteria is not None else StoppingCriteriaList()
+    if max_length is not None:
+        warnings.warn(
+            "`max_length` is deprecated in this function, use"
+            " `stopping_criteria=StoppingCriteriaList([MaxLengthCriteria(max_length=max_length)])` instead.",
+            UserWarning,
+        )
+        stopping_criteria = validate_stopping_criteria(stopping_criteria, max_length)
+    if len(stopping_criteria) == 0:
+        warnings.warn("You don't have defined any stopping_criteria, this will likely loop forever", UserWarning)
+    pad_token_id = pad_token_id if pad_token_id is not None else model.generation_config.pad_token_id
+    eos_token_id = eos_token_id if eos_token_id is not None else model.generation_config.eos_token_id
+    if isinstance(eos_token_id, int):
+        eos_token_id = [eos_token_id]
+    output_scores = output_scores if output_scores is not None else model.generation_config.output_scores
+    output_attentions = (
+        output_attentions if output_attentions is not None else model.generation_config.output_attentions
+    )
+    output_hidden_states = (
+        output_hidden_states if output_hidden_states is not None else model.generation_config.output_hidden_states
+    )
+    return_dict_in_generate = (
+        return_dict_in_generate
+        if return_dict_in_generate is not None
+        else model.generation_config.return_dict_in_generate
+    )
+
+    batch_size = len(beam_scorer._beam_hyps)
+    num_beams = beam_scorer.num_beams
+
+    batch_beam_size, cur_len = input_ids.shape
+
+    if num_beams * batch_size != batch_beam_size:
+        raise ValueError(
+            f"Batch dimension of `input_ids` should be {num_beams * batch_size}, but is {batch_beam_size}."
+        )
+
+    # init scores and beam indices tuples
+    scores = () if (return_dict_in_generate and output_scores) else None
+    beam_indices = (
+        ops.zeros((batch_beam_size, 0), mindspore.int32) if (return_dict_in_generate and output_scores) else None
+    )
+
+    # initialise score of first beam with 0 and the rest with -1e9. This makes sure that only tokens
+    # of the first beam are considered to avoid sampling the exact same tokens across all beams.
+    beam_scores = ops.zeros((batch_size, num_beams), mindspore.float32)
+    beam_scores[:, 1:] = -1e9
+    beam_scores = beam_scores.view((batch_size * num_beams,))
+
+    this_peer_finished = False  # used by synced_gpus only
+    while True:
+        if synced_gpus:
+            # Under synced_gpus the `forward` call must continue until all gpus complete their sequence.
+            this_peer_finished_flag = mindspore.Tensor(0.0 if this_peer_finished else 1.0)
+            ops.AllReduce()(this_peer_finished_flag)
+            if this_peer_finished_flag.item() == 0.0:
+                break
+
+        model_inputs = model.prepare_inputs_for_generation(input_ids, **model_kwargs)
+
+        outputs = model(
+            **model_inputs,
+            return_dict=True,
+            output_attentions=output_attentions,
+            output_hidden_states=output_hidden_states,
+        )
+
+        if synced_gpus and this_peer_finished:
+            cur_len = cur_len + 1
+            continue  # don't waste resources running the code we don't need
+
+        next_token_logits = outputs[0][:, -1, :]
+        next_token_logits = model.adjust_logits_during_generation(next_token_logits, cur_len=cur_len)
+        next_token_scores = ops.log_softmax(next_token_logits.astype(mindspore.float32), axis=-1)
+
+        next_token_scores_processed = logits_processor(input_ids, next_token_scores)
+        next_token_scores = next_token_scores_processed + beam_scores[:, None]
+
+        # Store scores when required
+        if scores is not None:
+            scores += (next_token_scores_processed,)
+
+        # reshape for beam search
+        vocab_size = next_token_scores.shape[-1]
+        next_token_scores = next_token_scores.view(batch_size, num_beams * vocab_size)
+
+        # Sample 2 next tokens for each beam (so we have some spare tokens and match output of beam search)
+        next_token_scores, next_tokens = ops.topk(next_token_scores, 2 * num_beams, dim=1, largest=True, sorted=True)
+
+        next_indices = ops.floor_div(next_tokens, vocab_size)
+        next_tokens = next_tokens % vocab_size
+
+        # stateless
+        beam_outputs = beam_scorer.process(
+            input_ids,
+            next_token_scores,
+            next_tokens,
+            next_indices,
+            pad_token_id=pad_token_id,
+            eos_token_id=eos_token_id,
+            beam_indices=beam_indices,
+        )
+
+        beam_scores = beam_outputs["next_beam_scores"]
+        beam_next_tokens = beam_outputs["next_beam_tokens"]
+        beam_idx = beam_outputs["next_beam_indices"]
+
+        input_ids = ops.cat([input_ids[beam_idx], beam_next_tokens.unsqueeze(-1)], axis=-1)
+
+        model_kwargs = model._update_model_kwargs_for_generation(
+            outputs, model_kwargs, is_encoder_decoder=model.config.is_encoder_decoder
+        )
+        if model_kwargs["past_key_values"] is not None:
+            model_kwargs["past_key_values"] = model._reorder_cache(model_kwargs["past_key_values"], beam_idx)
+
+        if beam_indices is not None:
+            beam_indices = ops.cat([beam_indices[beam_idx], beam_idx.unsqueeze(-1)], axis=-1)
+
+        # increase cur_len
+        cur_len = cur_len + 1
+
+        if beam_scorer.is_done or stopping_criteria(input_ids, scores):
+            if not synced_gpus:
+                break
+            this_peer_finished = True
+
+    sequence_outputs = beam_scorer.finalize(
+        input_ids,
+        beam_scores,
+        next_tokens,
+        next_indices,
+        pad_token_id=pad_token_id,
+        eos_token_id=eos_token_id,
+        max_length=stopping_criteria.max_length,
+        beam_indices=beam_indices,
+    )
+
+    if return_dict_in_generate:
+        return (sequence_outputs["sequences"], sequence_outputs["sequence_scores"], scores,
+                sequence_outputs["beam_indices"])
+    return sequence_outputs["sequences"]
+
+
+__all__ = ['beam_search']
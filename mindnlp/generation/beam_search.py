@@ -12,20 +12,351 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ============================================================================
+# pylint: disable=W0613
 
 """
 Beam search
 """
 
-class BeamScorer:
-    """BeamScorer"""
-    def __init__(self) -> None:
-        pass
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Union, Dict
+
+import numpy as np
+import mindspore
+
+
+class BeamScorer(ABC):
+    """
+    Abstract base class for all beam scorers that are used for [`~PreTrainedModel.beam_search`] and
+    [`~PreTrainedModel.beam_sample`].
+    """
+
+    @abstractmethod
+    def process(
+        self,
+        input_ids: mindspore.Tensor,
+        next_scores: mindspore.Tensor,
+        next_tokens: mindspore.Tensor,
+        next_indices: mindspore.Tensor,
+        **kwargs,
+    ) -> Dict[str, mindspore.Tensor]:
+        """Select the `num_beams` best continuations of every batch among the `2 * num_beams` candidates."""
+        raise NotImplementedError("This is an abstract method.")
+
+    @abstractmethod
+    def finalize(
+        self,
+        input_ids: mindspore.Tensor,
+        final_beam_scores: mindspore.Tensor,
+        max_length: int,
+        **kwargs,
+    ) -> Dict[str, mindspore.Tensor]:
+        """Build the returned sequences from the finished hypotheses."""
+        raise NotImplementedError("This is an abstract method.")
+
+
+class BeamHypotheses:
+    """
+    Keeps the `num_beams` best finished hypotheses of one batch element.
+    """
+    def __init__(self, num_beams: int, length_penalty: float, early_stopping: Union[bool, str],
+                 max_length: Optional[int] = None):
+        self.length_penalty = length_penalty
+        self.early_stopping = early_stopping
+        self.max_length = max_length
+        self.num_beams = num_beams
+        self.beams = []
+        self.worst_score = 1e9
+
+    def __len__(self):
+        """Number of hypotheses in the list."""
+        return len(self.beams)
+
+    def add(self, hyp: np.ndarray, sum_logprobs: float, beam_indices: Optional[np.ndarray] = None):
+        """Add a new hypothesis to the list."""
+        score = sum_logprobs / (hyp.shape[-1] ** self.length_penalty)
+        if len(self) < self.num_beams or score > self.worst_score:
+            self.beams.append((score, hyp, beam_indices))
+            if len(self) > self.num_beams:
+                sorted_next_scores = sorted([(s, idx) for idx, (s, _, _) in enumerate(self.beams)])
+                del self.beams[sorted_next_scores[0][1]]
+                self.worst_score = sorted_next_scores[1][0]
+            else:
+                self.worst_score = min(score, self.worst_score)
+
+    def is_done(self, best_sum_logprobs: float, cur_len: int) -> bool:
+        """
+        If there are enough hypotheses and that none of the hypotheses being generated can become better than the worst
+        one in the heap, then we are done with this sentence.
+        """
+        if len(self) < self.num_beams:
+            return False
+        if self.early_stopping is True:
+            return True
+        if self.early_stopping is False:
+            highest_attainable_score = best_sum_logprobs / cur_len ** self.length_penalty
+        else:
+            # "never": with a positive length penalty the best score is reached at `max_length`
+            if self.length_penalty > 0.0:
+                highest_attainable_score = best_sum_logprobs / self.max_length ** self.length_penalty
+            else:
+                highest_attainable_score = best_sum_logprobs / cur_len ** self.length_penalty
+        return self.worst_score >= highest_attainable_score
+
+
+class BeamSearchScorer(BeamScorer):
+    r"""
+    [`BeamScorer`] implementing standard beam search decoding.
+
+    All the `batch_size * num_beams` running hypotheses are kept in one tensor by the decoding loop. The scorer only
+    copies the `2 * num_beams` top-k candidates of each batch to host once per step, selects the next beams of all the
+    batches at once, and falls back to a per-batch pass only for the batches in which a candidate ends with
+    `eos_token_id`. Batches whose hypotheses can no longer improve are finalized early and keep producing padding.
+
+    Args:
+        batch_size (`int`):
+            Batch Size of `input_ids` for which standard beam search decoding is run in parallel.
+        num_beams (`int`):
+            Number of beams for beam search.
+        length_penalty (`float`, *optional*, defaults to 1.0):
+            Exponential penalty to the length that is used with beam-based generation. It is applied as an exponent to
+            the sequence length, which in turn is used to divide the score of the sequence.
+        do_early_stopping (`bool` or `str`, *optional*, defaults to `False`):
+            Controls the stopping condition for beam-based methods. `True` stops as soon as there are `num_beams`
+            complete candidates, `False` stops when it is very unlikely to find better candidates, `"never"` only
+            stops when there cannot be better candidates.
+        num_beam_hyps_to_keep (`int`, *optional*, defaults to 1):
+            The number of beam hypotheses that shall be returned upon calling [`~BeamSearchScorer.finalize`].
+        num_beam_groups (`int`, *optional*, defaults to 1):
+            Number of groups to divide `num_beams` into in order to ensure diversity among different groups of beams.
+        max_length (`int`, *optional*):
+            The maximum length of the sequence to be generated.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        num_beams: int,
+        length_penalty: Optional[float] = 1.0,
+        do_early_stopping: Optional[Union[bool, str]] = False,
+        num_beam_hyps_to_keep: Optional[int] = 1,
+        num_beam_groups: Optional[int] = 1,
+        max_length: Optional[int] = None,
+    ):
+        if not isinstance(num_beams, int) or num_beams <= 1:
+            raise ValueError(
+                f"`num_beams` has to be an integer strictly greater than 1, but is {num_beams}. For `num_beams` == 1,"
+                " one should make use of `greedy_search` instead."
+            )
+        if not isinstance(num_beam_groups, int) or (num_beam_groups > num_beams) or (num_beams % num_beam_groups != 0):
+            raise ValueError(
+                "`num_beam_groups` has to be an integer smaller or equal than `num_beams` and `num_beams` has to be"
+                f" divisible by `num_beam_groups`, but is {num_beam_groups} with `num_beams` being {num_beams}."
+            )
+
+        self.num_beams = num_beams
+        self.length_penalty = length_penalty
+        self.do_early_stopping = do_early_stopping
+        self.num_beam_hyps_to_keep = num_beam_hyps_to_keep
+        self.num_beam_groups = num_beam_groups
+        self.group_size = self.num_beams // self.num_beam_groups
+
+        self._is_init = False
+        self._beam_hyps = [
+            BeamHypotheses(
+                num_beams=self.num_beams,
+                length_penalty=self.length_penalty,
+                early_stopping=self.do_early_stopping,
+                max_length=max_length,
+            )
+            for _ in range(batch_size)
+        ]
+        self._done = np.zeros(batch_size, dtype=np.bool_)
+
+    @property
+    def is_done(self) -> bool:
+        """whether all the batches are finished"""
+        return bool(self._done.all())
+
+    def process(
+        self,
+        input_ids: mindspore.Tensor,
+        next_scores: mindspore.Tensor,
+        next_tokens: mindspore.Tensor,
+        next_indices: mindspore.Tensor,
+        pad_token_id: Optional[int] = None,
+        eos_token_id: Optional[Union[int, List[int]]] = None,
+        beam_indices: Optional[mindspore.Tensor] = None,
+        **kwargs,
+    ) -> Dict[str, mindspore.Tensor]:
+        cur_len = input_ids.shape[-1]
+        batch_size = len(self._beam_hyps)
+        if batch_size != (input_ids.shape[0] // self.group_size):
+            if self.num_beam_groups > 1:
+                raise ValueError(
+                    f"A group beam size of {input_ids.shape[0]} is used as the input, but a group beam "
+                    f"size of {self.group_size} is expected by the beam scorer."
+                )
+            raise ValueError(
+                f"A beam size of {input_ids.shape[0]} is used as the input, but a beam size of "
+                f"{self.group_size} is expected by the beam scorer."
+            )
+
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+
+        # one device to host copy of the top-k candidates of all the batches
+        next_scores = next_scores.asnumpy()
+        next_tokens = next_tokens.asnumpy()
+        next_indices = next_indices.asnumpy()
+        batch_beam_idx = next_indices + np.arange(batch_size)[:, None] * self.group_size
+
+        if eos_token_id is not None:
+            is_eos = np.isin(next_tokens, eos_token_id)
+        else:
+            is_eos = np.zeros_like(next_tokens, dtype=np.bool_)
+
+        # fast path: batches without any eos candidate simply keep their `group_size` best candidates
+        next_beam_scores = next_scores[:, :self.group_size].copy()
+        next_beam_tokens = next_tokens[:, :self.group_size].copy()
+        next_beam_indices = batch_beam_idx[:, :self.group_size].copy()
+
+        if self._done.any():
+            if pad_token_id is None:
+                raise ValueError("Generated beams >= num_beams -> eos_token_id and pad_token have to be defined")
+            # pad the batches which are already finished
+            next_beam_scores[self._done] = 0
+            next_beam_tokens[self._done] = pad_token_id
+            next_beam_indices[self._done] = 0
+
+        slow_batches = np.nonzero(is_eos[:, :self.group_size].any(axis=1) & ~self._done)[0]
+        if slow_batches.size > 0:
+            host_input_ids = input_ids.asnumpy()
+            host_beam_indices = beam_indices.asnumpy() if beam_indices is not None else None
+        for batch_idx in slow_batches:
+            beam_idx = 0
+            for beam_token_rank in range(next_tokens.shape[1]):
+                if is_eos[batch_idx, beam_token_rank]:
+                    # if beam_token does not belong to top num_beams tokens, it should not be added
+                    if beam_token_rank >= self.group_size:
+                        continue
+                    index = batch_beam_idx[batch_idx, beam_token_rank]
+                    hyp_beam_indices = None
+                    if host_beam_indices is not None:
+                        hyp_beam_indices = np.append(host_beam_indices[index], index)
+                    self._beam_hyps[batch_idx].add(
+                        host_input_ids[index].copy(),
+                        float(next_scores[batch_idx, beam_token_rank]),
+                        beam_indices=hyp_beam_indices,
+                    )
+                else:
+                    # add next predicted token since it is not eos_token
+                    next_beam_scores[batch_idx, beam_idx] = next_scores[batch_idx, beam_token_rank]
+                    next_beam_tokens[batch_idx, beam_idx] = next_tokens[batch_idx, beam_token_rank]
+                    next_beam_indices[batch_idx, beam_idx] = batch_beam_idx[batch_idx, beam_token_rank]
+                    beam_idx += 1
+
+                # once the beam for next step is full, don't add more tokens to it.
+                if beam_idx == self.group_size:
+                    break
+
+            if beam_idx < self.group_size:
+                raise ValueError(
+                    f"At most {self.group_size} tokens in {next_tokens[batch_idx]} can be equal to `eos_token_id:"
+                    f" {eos_token_id}`. Make sure {next_tokens[batch_idx]} are corrected."
+                )
+
+        # check if we are done so that we can save a pad step if all(done)
+        for batch_idx in np.nonzero(~self._done)[0]:
+            self._done[batch_idx] = self._beam_hyps[batch_idx].is_done(
+                float(next_scores[batch_idx].max()), cur_len
+            )
+
+        return {
+            "next_beam_scores": mindspore.Tensor(next_beam_scores.reshape(-1), mindspore.float32),
+            "next_beam_tokens": mindspore.Tensor(next_beam_tokens.reshape(-1), input_ids.dtype),
+            "next_beam_indices": mindspore.Tensor(next_beam_indices.reshape(-1), mindspore.int32),
+        }
+
+    def finalize(
+        self,
+        input_ids: mindspore.Tensor,
+        final_beam_scores: mindspore.Tensor,
+        final_beam_tokens: mindspore.Tensor = None,
+        final_beam_indices: mindspore.Tensor = None,
+        max_length: int = None,
+        pad_token_id: Optional[int] = None,
+        eos_token_id: Optional[Union[int, List[int]]] = None,
+        beam_indices: Optional[mindspore.Tensor] = None,
+        **kwargs,
+    ) -> Tuple[mindspore.Tensor]:
+        batch_size = len(self._beam_hyps)
+
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+
+        host_input_ids = input_ids.asnumpy()
+        final_beam_scores = final_beam_scores.asnumpy()
+        host_beam_indices = beam_indices.asnumpy() if beam_indices is not None else None
+
+        # finalize all open beam hypotheses and add to generated hypotheses
+        for batch_idx, beam_hyp in enumerate(self._beam_hyps):
+            if self._done[batch_idx]:
+                continue
+
+            # all open beam hypotheses are added to the beam hypothesis
+            # beam hypothesis class automatically keeps the best beams
+            for beam_id in range(self.num_beams):
+                batch_beam_idx = batch_idx * self.num_beams + beam_id
+                hyp_beam_indices = host_beam_indices[batch_beam_idx] if host_beam_indices is not None else None
+                beam_hyp.add(host_input_ids[batch_beam_idx], float(final_beam_scores[batch_beam_idx]),
+                             beam_indices=hyp_beam_indices)
+
+        # select the best hypotheses
+        sent_lengths = np.zeros(batch_size * self.num_beam_hyps_to_keep, dtype=np.int64)
+        best = []
+        best_indices = []
+        best_scores = np.zeros(batch_size * self.num_beam_hyps_to_keep, dtype=np.float32)
+
+        # retrieve best hypotheses
+        for i, beam_hyp in enumerate(self._beam_hyps):
+            sorted_hyps = sorted(beam_hyp.beams, key=lambda x: x[0])
+            for j in range(self.num_beam_hyps_to_keep):
+                best_score, best_hyp, best_index = sorted_hyps.pop()
+                sent_lengths[self.num_beam_hyps_to_keep * i + j] = len(best_hyp)
+                best.append(best_hyp)
+                best_indices.append(best_index)
+                best_scores[i * self.num_beam_hyps_to_keep + j] = best_score
+
+        # prepare for adding eos
+        sent_max_len = min(int(sent_lengths.max()) + 1, max_length) if max_length is not None \
+            else int(sent_lengths.max()) + 1
+        decoded = np.zeros((batch_size * self.num_beam_hyps_to_keep, sent_max_len), dtype=host_input_ids.dtype)
+        indices = None
+        if best_indices and best_indices[0] is not None:
+            indices = np.full((batch_size * self.num_beam_hyps_to_keep, sent_max_len), -1, dtype=np.int32)
+
+        # shorter batches are padded if needed
+        if int(sent_lengths.min()) != int(sent_lengths.max()):
+            if pad_token_id is None:
+                raise ValueError("`pad_token_id` has to be defined")
+            decoded.fill(pad_token_id)
+
+        # fill with hypotheses and eos_token_id if the latter fits in
+        for i, (hypo, best_idx) in enumerate(zip(best, best_indices)):
+            decoded[i, :sent_lengths[i]] = hypo
+            if indices is not None:
+                indices[i, :len(best_idx)] = best_idx
+            if sent_lengths[i] < sent_max_len and eos_token_id is not None:
+                # inserting only the first eos_token_id
+                decoded[i, sent_lengths[i]] = eos_token_id[0]
+
+        return {
+            "sequences": mindspore.Tensor(decoded),
+            "sequence_scores": mindspore.Tensor(best_scores),
+            "beam_indices": mindspore.Tensor(indices) if indices is not None else None,
+        }
 
-class BeamSearchScorer:
-    """BeamSearchScorer"""
-    def __init__(self) -> None:
-        pass
 
 class ConstrainedBeamSearchScorer:
     """ConstrainedBeamSearchScorer"""
@@ -0,0 +1,350 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Key/value caches of the attention layers
+"""
+import math
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+import mindspore
+from mindspore import ops, Parameter
+
+
+class KVCache(ABC):
+    r"""
+    Abstract base class of the caches models can use instead of `past_key_values` tuples.
+
+    A model opts in by accepting a [`KVCache`] as `past_key_values`: the cache is indexed by layer, and the attention
+    of layer `i` calls `past_key_values[i].append(key, value)` to append the states of the new tokens, then computes
+    its attention with `attention_scores` and `attention_output`, which read the cached states where the cache keeps
+    them instead of getting them back as tensors. The model returns the cache itself as its `presents`.
+
+    Subclasses set `num_layers`, the cache has one [`KVCacheLayer`] per layer and iterating it stops after the last
+    one, as iterating `past_key_values` tuples does.
+    """
+    num_layers: int
+
+    @abstractmethod
+    def append(self, key: mindspore.Tensor, value: mindspore.Tensor, layer_idx: int):
+        """
+        Appends the key and value states of the new tokens to the cache of a layer.
+
+        Args:
+            key (`mindspore.Tensor` of shape `(batch_size, num_heads, seq_length, head_dim)`):
+                The key states of the new tokens.
+            value (`mindspore.Tensor` of shape `(batch_size, num_heads, seq_length, head_dim)`):
+                The value states of the new tokens.
+            layer_idx (`int`):
+                The index of the layer.
+        """
+
+    @abstractmethod
+    def attention_scores(self, query: mindspore.Tensor, layer_idx: int) -> mindspore.Tensor:
+        """
+        Computes `query @ key^T` against the keys of all the cached tokens of a layer.
+
+        Args:
+            query (`mindspore.Tensor` of shape `(batch_size, num_heads, query_length, head_dim)`):
+                The query states.
+            layer_idx (`int`):
+                The index of the layer.
+
+        Returns:
+            `mindspore.Tensor` of shape `(batch_size, num_heads, query_length, cached_length)`, in the dtype of the
+            query.
+        """
+
+    @abstractmethod
+    def attention_output(self, weights: mindspore.Tensor, layer_idx: int) -> mindspore.Tensor:
+        """
+        Computes `weights @ value` against the values of all the cached tokens of a layer.
+
+        Args:
+            weights (`mindspore.Tensor` of shape `(batch_size, num_heads, query_length, cached_length)`):
+                The attention weights.
+            layer_idx (`int`):
+                The index of the layer.
+
+        Returns:
+            `mindspore.Tensor` of shape `(batch_size, num_heads, query_length, head_dim)`, in the dtype of the
+            weights.
+        """
+
+    @abstractmethod
+    def get_seq_length(self, layer_idx: int = 0) -> int:
+        """Returns the number of tokens cached by a layer."""
+
+    @abstractmethod
+    def reorder_cache(self, beam_idx: mindspore.Tensor) -> "KVCache":
+        """Selects the sequences of the cache, used by beam search."""
+
+    @abstractmethod
+    def crop(self, max_length: int) -> "KVCache":
+        """Keeps the first `max_length` cached tokens, used to roll back the tokens rejected by speculative decoding."""
+
+    def __len__(self):
+        return self.num_layers
+
+    def __getitem__(self, layer_idx: int) -> "KVCacheLayer":
+        if not -self.num_layers <= layer_idx < self.num_layers:
+            raise IndexError(f"The key/value cache has {self.num_layers} layers, got the layer index {layer_idx}.")
+        return KVCacheLayer(self, layer_idx % self.num_layers)
+
+    def __iter__(self):
+        for layer_idx in range(self.num_layers):
+            yield KVCacheLayer(self, layer_idx)
+
+    def __bool__(self):
+        # `prepare_inputs_for_generation` tests `if past_key_values:` to only feed the last token once something is
+        # cached, an empty cache has to behave like `None`
+        return self.get_seq_length() > 0
+
+
+class KVCacheLayer:
+    r"""
+    View of a [`KVCache`] bound to a layer, passed to the attention of the layer as `layer_past`.
+    """
+
+    def __init__(self, cache: KVCache, layer_idx: int):
+        self.cache = cache
+        self.layer_idx = layer_idx
+
+    def append(self, key: mindspore.Tensor, value: mindspore.Tensor):
+        """Appends the key and value states of the new tokens, see [`KVCache.append`]."""
+        self.cache.append(key, value, self.layer_idx)
+
+    def attention_scores(self, query: mindspore.Tensor) -> mindspore.Tensor:
+        """Computes `query @ key^T` against the cached keys, see [`KVCache.attention_scores`]."""
+        return self.cache.attention_scores(query, self.layer_idx)
+
+    def attention_output(self, weights: mindspore.Tensor) -> mindspore.Tensor:
+        """Computes `weights @ value` against the cached values, see [`KVCache.attention_output`]."""
+        return self.cache.attention_output(weights, self.layer_idx)
+
+    def get_seq_length(self) -> int:
+        """Returns the number of tokens cached by the layer."""
+        return self.cache.get_seq_length(self.layer_idx)
+
+
+class BlockAllocator:
+    r"""
+    Free list of the blocks of a [`PagedKVCache`], with a reference count per block so that sequences can share
+    blocks after a beam search reorder.
+
+    Args:
+        num_blocks (`int`):
+            The number of blocks.
+    """
+
+    def __init__(self, num_blocks: int):
+        self.num_blocks = num_blocks
+        self._free = list(range(num_blocks - 1, -1, -1))
+        self.ref_counts = np.zeros(num_blocks, np.int32)
+
+    @property
+    def num_free(self) -> int:
+        """The number of free blocks."""
+        return len(self._free)
+
+    def allocate(self) -> int:
+        """Returns a free block."""
+        if not self._free:
+            raise RuntimeError(f"The paged key/value cache is out of blocks, all {self.num_blocks} blocks are used. "
+                               "Please increase `num_blocks`.")
+        block = self._free.pop()
+        self.ref_counts[block] = 1
+        return block
+
+    def share(self, block: int):
+        """Adds a reference to a block."""
+        self.ref_counts[block] += 1
+
+    def free(self, block: int):
+        """Removes a reference to a block, the block is free once no sequence references it."""
+        self.ref_counts[block] -= 1
+        if self.ref_counts[block] == 0:
+            self._free.append(block)
+
+
+class PagedKVCache(KVCache):
+    r"""
+    Key/value cache stored in fixed-size blocks of a preallocated pool.
+
+    Each sequence of the batch owns a block table, the list of the blocks holding its tokens, the block `b` of the
+    pool holds the tokens of the same positions in every layer. Appending a token writes its states in place in the
+    last block of its sequence and a new block is taken from the pool every `block_size` tokens, and the memory of
+    the cache is allocated once. The attention reads the blocks of the sequences one block column at a time, so a
+    step never builds a contiguous copy of the cached tokens as concatenating `past_key_values` tuples does, its
+    temporaries hold one block per sequence. Beam search reorders the block tables only, sequences sharing a block
+    copy it when they write to it.
+
+    The pool is allocated at the first update, from the shape and dtype of the states and the number of sequences.
+
+    Args:
+        num_layers (`int`):
+            The number of attention layers of the model.
+        block_size (`int`, *optional*, defaults to 16):
+            The number of tokens of a block.
+        max_length (`int`, *optional*):
+            The maximum number of tokens of a sequence, used to size the pool when `num_blocks` is not set.
+        num_blocks (`int`, *optional*):
+            The number of blocks of the pool.
+    """
+
+    def __init__(self, num_layers: int, block_size: int = 16, max_length: Optional[int] = None,
+                 num_blocks: Optional[int] = None):
+        if num_blocks is None and max_length is None:
+            raise ValueError("Either `num_blocks` or `max_length` has to be set to size the paged key/value cache.")
+        self.num_layers = num_layers
+        self.block_size = block_size
+        self.max_length = max_length
+        self.num_blocks = num_blocks
+
+        self.allocator = None
+        self.key_cache: List[Parameter] = []
+        self.value_cache: List[Parameter] = []
+        self.block_tables: List[List[int]] = []
+        self._seq_lengths = [0] * num_layers
+        # (block, offset) of the tokens written by the current step and the blocks of each position of the block
+        # tables, shared by the layers
+        self._write_indices = None
+        self._block_columns = []
+
+    @property
+    def batch_size(self) -> int:
+        """The number of sequences in the cache."""
+        return len(self.block_tables)
+
+    def get_seq_length(self, layer_idx: int = 0) -> int:
+        return self._seq_lengths[layer_idx]
+
+    def _allocate_pool(self, key):
+        batch_size, num_heads, _, head_dim = key.shape
+        if self.num_blocks is None:
+            # one spare block per sequence for the copies made after beam search reorders
+            self.num_blocks = batch_size * (math.ceil(self.max_length / self.block_size) + 1)
+        self.allocator = BlockAllocator(self.num_blocks)
+        shape = (self.num_blocks, self.block_size, num_heads, head_dim)
+        for layer_idx in range(self.num_layers):
+            self.key_cache.append(Parameter(ops.zeros(shape, key.dtype), name=f'key_cache.{layer_idx}',
+                                            requires_grad=False))
+            self.value_cache.append(Parameter(ops.zeros(shape, key.dtype), name=f'value_cache.{layer_idx}',
+                                              requires_grad=False))
+        self.block_tables = [[] for _ in range(batch_size)]
+
+    def _copy_block(self, src, dst):
+        src = mindspore.Tensor([src], mindspore.int32)
+        dst = mindspore.Tensor([dst], mindspore.int32)
+        for layer_idx in range(self.num_layers):
+            for cache in (self.key_cache[layer_idx], self.value_cache[layer_idx]):
+                ops.scatter_update(cache, dst, ops.gather(cache, src, 0))
+
+    def _prepare_append(self, num_tokens):
+        """takes the blocks needed by the new tokens and computes the indices of the step"""
+        start = self._seq_lengths[0]
+        end = start + num_tokens
+        for table in self.block_tables:
+            # the block of the first new token is written to, it is copied if other sequences share it
+            first = start // self.block_size
+            if first < len(table) and self.allocator.ref_counts[table[first]] > 1:
+                block = self.allocator.allocate()
+                self._copy_block(table[first], block)
+                self.allocator.free(table[first])
+                table[first] = block
+            while len(table) * self.block_size < end:
+                table.append(self.allocator.allocate())
+
+        positions = np.arange(start, end)
+        tables = np.array(self.block_tables, np.int32)
+        indices = np.stack([tables[:, positions // self.block_size],
+                            np.broadcast_to(positions % self.block_size, (len(tables), num_tokens))], -1)
+        self._write_indices = mindspore.Tensor(indices.reshape(-1, 2))
+        self._block_columns = [mindspore.Tensor(tables[:, idx]) for idx in range(math.ceil(end / self.block_size))]
+
+    def append(self, key, value, layer_idx):
+        if self.allocator is None:
+            self._allocate_pool(key)
+        _, num_heads, num_tokens, head_dim = key.shape
+        if layer_idx == 0:
+            self._prepare_append(num_tokens)
+
+        # (batch_size, num_heads, seq_length, head_dim) -> (batch_size * seq_length, num_heads, head_dim)
+        ops.scatter_nd_update(self.key_cache[layer_idx], self._write_indices,
+                              key.swapaxes(1, 2).reshape(-1, num_heads, head_dim))
+        ops.scatter_nd_update(self.value_cache[layer_idx], self._write_indices,
+                              value.swapaxes(1, 2).reshape(-1, num_heads, head_dim))
+        self._seq_lengths[layer_idx] += num_tokens
+
+    def attention_scores(self, query, layer_idx):
+        scores = []
+        for blocks in self._block_columns:
+            # (batch_size, block_size, num_heads, head_dim) -> (batch_size, num_heads, head_dim, block_size)
+            key = ops.gather(self.key_cache[layer_idx], blocks, 0).transpose(0, 2, 3, 1)
+            scores.append(ops.matmul(query, key.astype(query.dtype)))
+        # the positions after the last token of the last block are not cached tokens
+        return ops.cat(scores, -1)[..., :self._seq_lengths[layer_idx]]
+
+    def attention_output(self, weights, layer_idx):
+        padding = len(self._block_columns) * self.block_size - weights.shape[-1]
+        if padding:
+            weights = ops.pad(weights, (0, padding))
+        output = None
+        for idx, blocks in enumerate(self._block_columns):
+            # (batch_size, block_size, num_heads, head_dim) -> (batch_size, num_heads, block_size, head_dim)
+            value = ops.gather(self.value_cache[layer_idx], blocks, 0).swapaxes(1, 2)
+            block_output = ops.matmul(weights[..., idx * self.block_size:(idx + 1) * self.block_size],
+                                      value.astype(weights.dtype))
+            output = block_output if output is None else output + block_output
+        return output
+
+    def reorder_cache(self, beam_idx):
+        if self.allocator is None:
+            return self
+        beam_idx = beam_idx.asnumpy().tolist() if isinstance(beam_idx, mindspore.Tensor) else list(beam_idx)
+        block_tables = [list(self.block_tables[idx]) for idx in beam_idx]
+        for table in block_tables:
+            for block in table:
+                self.allocator.share(block)
+        self._release_blocks()
+        self.block_tables = block_tables
+        return self
+
+    def crop(self, max_length):
+        if self.allocator is None or max_length >= self.get_seq_length():
+            return self
+        num_blocks = math.ceil(max_length / self.block_size)
+        for table in self.block_tables:
+            for block in table[num_blocks:]:
+                self.allocator.free(block)
+            del table[num_blocks:]
+        self._seq_lengths = [max_length] * self.num_layers
+        return self
+
+    def _release_blocks(self):
+        for table in self.block_tables:
+            for block in table:
+                self.allocator.free(block)
+
+    def free(self):
+        """Returns the blocks of all the sequences to the pool and empties the cache."""
+        if self.allocator is not None:
+            self._release_blocks()
+        self.block_tables = [[] for _ in self.block_tables]
+        self._seq_lengths = [0] * self.num_layers
+
+
+__all__ = ['KVCache', 'KVCacheLayer', 'BlockAllocator', 'PagedKVCache']
@@ -0,0 +1,434 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Multinomial sampling and beam search multinomial sampling
+"""
+import warnings
+from typing import Optional, List, Union
+
+import mindspore
+from mindspore import ops
+
+from .beam_search import BeamScorer
+from .logits_process import LogitsProcessorList
+from .stopping_criteria import StoppingCriteriaList, validate_stopping_criteria
+from .utils import MultinomialSampler
+
+
+def sample(
+    model,
+    input_ids: mindspore.Tensor,
+    logits_processor: Optional[LogitsProcessorList] = None,
+    stopping_criteria: Optional[StoppingCriteriaList] = None,
+    logits_warper: Optional[LogitsProcessorList] = None,
+    max_length: Optional[int] = None,
+    pad_token_id: Optional[int] = None,
+    eos_token_id: Optional[Union[int, List[int]]] = None,
+    output_attentions: Optional[bool] = None,
+    output_hidden_states: Optional[bool] = None,
+    output_scores: Optional[bool] = None,
+    return_dict_in_generate: Optional[bool] = None,
+    synced_gpus: bool = False,
+    streamer: Optional["BaseStreamer"] = None,
+    seed: Optional[int] = None,
+    **model_kwargs,
+):
+    r"""
+    Generates sequences of token ids for models with a language modeling head using **multinomial sampling** and
+    can be used for text-decoder, text-to-text, speech-to-text, and vision-to-text models.
+
+    The warpers and the draw run on device, the next tokens are never copied to host, so a sampling step costs the
+    same as a greedy step.
+
+    Parameters:
+        model (`PreTrainedModel`):
+            The model generating the sequences, with a language modeling head.
+        input_ids (`mindspore.Tensor` of shape `(batch_size, sequence_length)`):
+            The sequence used as a prompt for the generation.
+        logits_processor (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsProcessor`]
+            used to modify the prediction scores of the language modeling head applied at each generation step.
+        stopping_criteria (`StoppingCriteriaList`, *optional*):
+            An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+            used to tell if the generation loop should stop.
+        logits_warper (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsWarper`] used
+            to warp the prediction score distribution of the language modeling head applied before multinomial
+            sampling at each generation step.
+        max_length (`int`, *optional*, defaults to 20):
+            **DEPRECATED**. Use `logits_processor` or `stopping_criteria` directly to cap the number of generated
+            tokens. The maximum length of the sequence to be generated.
+        pad_token_id (`int`, *optional*):
+            The id of the *padding* token.
+        eos_token_id (`Union[int, List[int]]`, *optional*):
+            The id of the *end-of-sequence* token. Optionally, use a list to set multiple *end-of-sequence* tokens.
+        output_attentions (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the attentions tensors of all attention layers.
+        output_hidden_states (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the hidden states of all layers.
+        output_scores (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the prediction scores.
+        return_dict_in_generate (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the scores alongside the sequences.
+        synced_gpus (`bool`, *optional*, defaults to `False`):
+            Whether to continue running the while loop until max_length (needed for ZeRO stage 3)
+        streamer (`BaseStreamer`, *optional*):
+            Streamer object that will be used to stream the generated sequences.
+        seed (`int`, *optional*):
+            Seed of the [`MultinomialSampler`] of this call, the same seed gives the same sequences.
+        model_kwargs:
+            Additional model specific kwargs will be forwarded to the `construct` function of the model. If model is
+            an encoder-decoder model the kwargs should include `encoder_outputs`.
+
+    Return:
+        `mindspore.Tensor` containing the generated tokens, or a tuple `(sequences, scores, attentions,
+        hidden_states)` if `return_dict_in_generate=True`.
+    """
+    # init values
+    logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+    stopping_criteria = stopping_criteria if stopping_criteria is not None else StoppingCriteriaList()
+    if max_length is not None:
+        warnings.warn(
+            "`max_length` is deprecated in this function, use"
+            " `stopping_criteria=StoppingCriteriaList(MaxLengthCriteria(max_length=max_length))` instead.",
+            UserWarning,
+        )
+        stopping_criteria = validate_stopping_criteria(stopping_criteria, max_length)
+    logits_warper = logits_warper if logits_warper is not None else LogitsProcessorList()
+    pad_token_id = pad_token_id if pad_token_id is not None else model.generation_config.pad_token_id
+    eos_token_id = eos_token_id if eos_token_id is not None else model.generation_config.eos_token_id
+    if isinstance(eos_token_id, int):
+        eos_token_id = [eos_token_id]
+    eos_token_id_tensor = mindspore.Tensor(eos_token_id) if eos_token_id is not None else None
+    output_scores = output_scores if output_scores is not None else model.generation_config.output_scores
+    output_attentions = (
+        output_attentions if output_attentions is not None else model.generation_config.output_attentions
+    )
+    output_hidden_states = (
+        output_hidden_states if output_hidden_states is not None else model.generation_config.output_hidden_states
+    )
+    return_dict_in_generate = (
+        return_dict_in_generate
+        if return_dict_in_generate is not None
+        else model.generation_config.return_dict_in_generate
+    )
+    sampler = MultinomialSampler(seed)
+
+    # init attention / hidden states / scores tuples
+    scores = () if (return_dict_in_generate and output_scores) else None
+    decoder_attentions = () if (return_dict_in_generate and output_attentions) else None
+    decoder_hidden_states = () if (return_dict_in_generate and output_hidden_states) else None
+
+    # keep track of which sequences are already finished
+    unfinished_sequences = ops.ones(input_ids.shape[0], dtype=input_ids.dtype)
+
+    this_peer_finished = False  # used by synced_gpus only
+    # auto-regressive generation
+    while True:
+        if synced_gpus:
+            # Under synced_gpus the `forward` call must continue until all gpus complete their sequence.
+            this_peer_finished_flag = mindspore.Tensor(0.0 if this_peer_finished else 1.0)
+            ops.AllReduce()(this_peer_finished_flag)
+            if this_peer_finished_flag.item() == 0.0:
+                break
+
+        # prepare model inputs
+        model_inputs = model.prepare_inputs_for_generation(input_ids, **model_kwargs)
+
+        # forward pass to get next token
+        outputs = model(
+            **model_inputs,
+            return_dict=True,
+            output_attentions=output_attentions,
+            output_hidden_states=output_hidden_states,
+        )
+
+        if synced_gpus and this_peer_finished:
+            continue  # don't waste resources running the code we don't need
+
+        next_token_logits = outputs[0][:, -1, :]
+
+        # pre-process distribution
+        next_token_scores = logits_processor(input_ids, next_token_logits)
+        next_token_scores = logits_warper(input_ids, next_token_scores)
+
+        # Store scores, attentions and hidden_states when required
+        if return_dict_in_generate:
+            if output_scores:
+                scores += (next_token_scores,)
+            attentions, hidden_states = model._extract_decoder_states_from_model_output(
+                outputs, output_attentions, output_hidden_states
+            )
+            if output_attentions:
+                decoder_attentions += (attentions,)
+            if output_hidden_states:
+                decoder_hidden_states += (hidden_states,)
+
+        # sample
+        probs = ops.softmax(next_token_scores.astype(mindspore.float32), axis=-1)
+        next_tokens = sampler(probs).astype(input_ids.dtype)
+
+        # finished sentences should have their next token be a padding token
+        if eos_token_id is not None:
+            if pad_token_id is None:
+                raise ValueError("If `eos_token_id` is defined, make sure that `pad_token_id` is defined.")
+            next_tokens = next_tokens * unfinished_sequences + pad_token_id * (1 - unfinished_sequences)
+
+        # update generated ids, model inputs, and length for next step
+        input_ids = ops.cat([input_ids, next_tokens[:, None]], axis=-1)
+        if streamer is not None:
+            streamer.put(next_tokens)
+        model_kwargs = model._update_model_kwargs_for_generation(
+            outputs, model_kwargs, is_encoder_decoder=model.config.is_encoder_decoder
+        )
+
+        # if eos_token was found in one sentence, set sentence to finished
+        if eos_token_id_tensor is not None:
+            unfinished_sequences = unfinished_sequences.mul(
+                next_tokens.tile((eos_token_id_tensor.shape[0], 1)).ne(eos_token_id_tensor.unsqueeze(1)).astype(input_ids.dtype).prod(axis=0)
+            )
+
+            # stop when each sentence is finished
+            if unfinished_sequences.max() == 0:
+                this_peer_finished = True
+
+        # stop if we exceed the maximum length
+        if stopping_criteria(input_ids, scores):
+            this_peer_finished = True
+
+        if this_peer_finished and not synced_gpus:
+            break
+
+    if streamer is not None:
+        streamer.end()
+
+    if return_dict_in_generate:
+        return (input_ids, scores, decoder_attentions, decoder_hidden_states)
+    return input_ids
+
+
+def beam_sample(
+    model,
+    input_ids: mindspore.Tensor,
+    beam_scorer: BeamScorer,
+    logits_processor: Optional[LogitsProcessorList] = None,
+    stopping_criteria: Optional[StoppingCriteriaList] = None,
+    logits_warper: Optional[LogitsProcessorList] = None,
+    max_length: Optional[int] = None,
+    pad_token_id: Optional[int] = None,
+    eos_token_id: Optional[Union[int, List[int]]] = None,
+    output_attentions: Optional[bool] = None,
+    output_hidden_states: Optional[bool] = None,
+    output_scores: Optional[bool] = None,
+    return_dict_in_generate: Optional[bool] = None,
+    synced_gpus: bool = False,
+    seed: Optional[int] = None,
+    **model_kwargs,
+):
+    r"""
+    Generates sequences of token ids for models with a language modeling head using **beam search multinomial
+    sampling** and can be used for text-decoder, text-to-text, speech-to-text, and vision-to-text models.
+
+    The `2 * num_beams` candidates of each batch are drawn without replacement from the flattened
+    `num_beams * vocab_size` distribution with the Gumbel-top-k trick, on device.
+
+    Parameters:
+        model (`PreTrainedModel`):
+            The model generating the sequences, with a language modeling head.
+        input_ids (`mindspore.Tensor` of shape `(batch_size * num_beams, sequence_length)`):
+            The sequence used as a prompt for the generation.
+        beam_scorer (`BeamScorer`):
+            A derived instance of [`BeamScorer`] that defines how beam hypotheses are constructed, stored and
+            sorted during generation.
+        logits_processor (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsProcessor`]
+            used to modify the prediction scores of the language modeling head applied at each generation step.
+        stopping_criteria (`StoppingCriteriaList`, *optional*):
+            An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+            used to tell if the generation loop should stop.
+        logits_warper (`LogitsProcessorList`, *optional*):
+            An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsWarper`] used
+            to warp the prediction score distribution of the language modeling head applied before multinomial
+            sampling at each generation step.
+        max_length (`int`, *optional*, defaults to 20):
+            **DEPRECATED**. Use `logits_processor` or `stopping_criteria` directly to cap the number of generated
+            tokens. The maximum length of the sequence to be generated.
+        pad_token_id (`int`, *optional*):
+            The id of the *padding* token.
+        eos_token_id (`Union[int, List[int]]`, *optional*):
+            The id of the *end-of-sequence* token. Optionally, use a list to set multiple *end-of-sequence* tokens.
+        output_attentions (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the attentions tensors of all attention layers.
+        output_hidden_states (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the hidden states of all layers.
+        output_scores (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the prediction scores.
+        return_dict_in_generate (`bool`, *optional*, defaults to `False`):
+            Whether or not to return the scores and beam indices alongside the sequences.
+        synced_gpus (`bool`, *optional*, defaults to `False`):
+            Whether to continue running the while loop until max_length (needed for ZeRO stage 3)
+        seed (`int`, *optional*):
+            Seed of the [`MultinomialSampler`] of this call, the same seed gives the same sequences.
+        model_kwargs:
+            Additional model specific kwargs will be forwarded to the `construct` function of the model. If model is
+            an encoder-decoder model the kwargs should include `encoder_outputs`.
+
+    Return:
+        `mindspore.Tensor` containing the generated tokens, or a tuple `(sequences, sequences_scores, scores,
+        beam_indices)` if `return_dict_in_generate=True`.
+    """
+    # init values
+    logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+    stopping_criteria = stopping_criteria if stopping_criteria is not None else StoppingCriteriaList()
+    if max_length is not None:
+        warnings.warn(
+            "`max_length` is deprecated in this function, use"
+            " `stopping_criteria=StoppingCriteriaList(MaxLengthCriteria(max_length=max_length))` instead.",
+            UserWarning,
+        )
+        stopping_criteria = validate_stopping_criteria(stopping_criteria, max_length)
+    logits_warper = logits_warper if logits_warper is not None else LogitsProcessorList()
+    pad_token_id = pad_token_id if pad_token_id is not None else model.generation_config.pad_token_id
+    eos_token_id = eos_token_id if eos_token_id is not None else model.generation_config.eos_token_id
+    if isinstance(eos_token_id, int):
+        eos_token_id = [eos_token_id]
+    output_scores = output_scores if output_scores is not None else model.generation_config.output_scores
+    output_attentions = (
+        output_attentions if output_attentions is not None else model.generation_config.output_attentions
+    )
+    output_hidden_states = (
+        output_hidden_states if output_hidden_states is not None else model.generation_config.output_hidden_states
+    )
+    return_dict_in_generate = (
+        return_dict_in_generate
+        if return_dict_in_generate is not None
+        else model.generation_config.return_dict_in_generate
+    )
+    sampler = MultinomialSampler(seed)
+
+    batch_size = len(beam_scorer._beam_hyps)
+    num_beams = beam_scorer.num_beams
+
+    batch_beam_size, cur_len = input_ids.shape
+
+    # init scores and beam indices tuples
+    scores = () if (return_dict_in_generate and output_scores) else None
+    beam_indices = (
+        ops.zeros((batch_beam_size, 0), mindspore.int32) if (return_dict_in_generate and output_scores) else None
+    )
+
+    beam_scores = ops.zeros((batch_size * num_beams,), mindspore.float32)
+
+    this_peer_finished = False  # used by synced_gpus only
+    while True:
+        if synced_gpus:
+            # Under synced_gpus the `forward` call must continue until all gpus complete their sequence.
+            this_peer_finished_flag = mindspore.Tensor(0.0 if this_peer_finished else 1.0)
+            ops.AllReduce()(this_peer_finished_flag)
+            if this_peer_finished_flag.item() == 0.0:
+                break
+
+        model_inputs = model.prepare_inputs_for_generation(input_ids, **model_kwargs)
+
+        outputs = model(
+            **model_inputs,
+            return_dict=True,
+            output_attentions=output_attentions,
+            output_hidden_states=output_hidden_states,
+        )
+
+        if synced_gpus and this_peer_finished:
+            cur_len = cur_len + 1
+            continue  # don't waste resources running the code we don't need
+
+        next_token_logits = outputs[0][:, -1, :]
+        next_token_logits = model.adjust_logits_during_generation(next_token_logits, cur_len=cur_len)
+        next_token_scores = ops.log_softmax(next_token_logits.astype(mindspore.float32), axis=-1)
+
+        next_token_scores_processed = logits_processor(input_ids, next_token_scores)
+        next_token_scores = next_token_scores_processed + beam_scores[:, None]
+        next_token_scores = logits_warper(input_ids, next_token_scores)
+
+        # Store scores when required
+        if scores is not None:
+            scores += (logits_warper(input_ids, next_token_scores_processed),)
+
+        # reshape for beam search
+        vocab_size = next_token_scores.shape[-1]
+        next_token_scores = next_token_scores.view(batch_size, num_beams * vocab_size)
+
+        # draw 2 * num_beams distinct candidates, then sort them by score as the beam scorer expects
+        next_tokens = sampler.sample_without_replacement(
+            ops.log_softmax(next_token_scores, axis=-1), 2 * num_beams
+        )
+        next_token_scores = ops.gather_elements(next_token_scores, -1, next_tokens)
+
+        next_token_scores, _indices = ops.sort(next_token_scores, axis=1, descending=True)
+        next_tokens = ops.gather_elements(next_tokens, -1, _indices)
+
+        next_indices = ops.floor_div(next_tokens, vocab_size)
+        next_tokens = next_tokens % vocab_size
+
+        # stateless
+        beam_outputs = beam_scorer.process(
+            input_ids,
+            next_token_scores,
+            next_tokens,
+            next_indices,
+            pad_token_id=pad_token_id,
+            eos_token_id=eos_token_id,
+            beam_indices=beam_indices,
+        )
+        beam_scores = beam_outputs["next_beam_scores"]
+        beam_next_tokens = beam_outputs["next_beam_tokens"]
+        beam_idx = beam_outputs["next_beam_indices"]
+
+        input_ids = ops.cat([input_ids[beam_idx], beam_next_tokens.unsqueeze(-1)], axis=-1)
+
+        model_kwargs = model._update_model_kwargs_for_generation(
+            outputs, model_kwargs, is_encoder_decoder=model.config.is_encoder_decoder
+        )
+        if model_kwargs["past_key_values"] is not None:
+            model_kwargs["past_key_values"] = model._reorder_cache(model_kwargs["past_key_values"], beam_idx)
+
+        if beam_indices is not None:
+            beam_indices = ops.cat([beam_indices[beam_idx], beam_idx.unsqueeze(-1)], axis=-1)
+
+        # increase cur_len
+        cur_len = cur_len + 1
+
+        if beam_scorer.is_done or stopping_criteria(input_ids, scores):
+            if not synced_gpus:
+                break
+            this_peer_finished = True
+
+    sequence_outputs = beam_scorer.finalize(
+        input_ids,
+        beam_scores,
+        next_tokens,
+        next_indices,
+        pad_token_id=pad_token_id,
+        eos_token_id=eos_token_id,
+        max_length=stopping_criteria.max_length,
+        beam_indices=beam_indices,
+    )
+
+    if return_dict_in_generate:
+        return (sequence_outputs["sequences"], sequence_outputs["sequence_scores"], scores,
+                sequence_outputs["beam_indices"])
+    return sequence_outputs["sequences"]
+
+
+__all__ = ['sample', 'beam_sample']
@@ -0,0 +1,356 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Continuous batching scheduler
+"""
+import itertools
+from collections import deque, OrderedDict
+from typing import List, Optional, Union
+
+import numpy as np
+import mindspore
+from mindspore import ops
+
+from .logits_process import LogitsProcessorList
+from .utils import MultinomialSampler
+
+
+class GenerationRequest:
+    r"""
+    A prompt submitted to the [`ContinuousBatchingScheduler`] and the tokens generated for it.
+
+    Args:
+        request_id (`int` or `str`):
+            The identifier of the request.
+        prompt (`List[int]`):
+            The token ids of the prompt.
+        max_new_tokens (`int`):
+            The maximum numbers of tokens to generate.
+    """
+
+    def __init__(self, request_id: Union[int, str], prompt: List[int], max_new_tokens: int):
+        self.request_id = request_id
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.output_ids = []
+        self.finish_reason = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the request is finished."""
+        return self.finish_reason is not None
+
+    @property
+    def sequence(self) -> List[int]:
+        """The prompt followed by the generated tokens."""
+        return self.prompt + self.output_ids
+
+    def __repr__(self):
+        return (f"GenerationRequest(request_id={self.request_id}, prompt_length={len(self.prompt)}, "
+                f"num_generated={len(self.output_ids)}, finish_reason={self.finish_reason})")
+
+
+class ContinuousBatchingScheduler:
+    r"""
+    Request-level scheduler for the generation of decoder-only models.
+
+    Between two decoding steps, the sequences which are finished leave the running batch and the queued prompts are
+    admitted into the freed slots, so that no step is spent on padded rows. Admitted prompts are prefilled in groups
+    of equal length, then joined to the running batch: the shorter of the two is left padded, its `past_key_values`
+    with zeros and its attention mask with 0. Each row thus keeps its own cache while the batch runs as a single
+    model call, and the leading positions which are padding in every row are dropped once rows leave.
+
+    The cache layout of the model is handled by its `_reorder_cache`, `_merge_cache` and `_trim_cache` methods and the
+    inputs of a step are built by its `prepare_inputs_for_continuous_batching`, see [`GenerationMixin`].
+
+    Args:
+        model ([`PreTrainedModel`]):
+            A decoder-only model with a language modeling head and a cache, e.g. GPT2, Bloom, LLaMA or ChatGLM.
+        max_batch_size (`int`, *optional*, defaults to 8):
+            The maximum number of sequences decoded together.
+        max_new_tokens (`int`, *optional*, defaults to 20):
+            The default maximum numbers of tokens to generate of a request.
+        eos_token_id (`Union[int, List[int]]`, *optional*):
+            The id of the *end-of-sequence* token, the `generation_config` of the model is used if not set.
+        pad_token_id (`int`, *optional*):
+            The id of the token used to left pad `input_ids`, it is never attended.
+        logits_processor (`LogitsProcessorList`, *optional*):
+            Processors applied to the scores of every step.
+        logits_warper (`LogitsProcessorList`, *optional*):
+            Warpers applied before sampling, only used with `do_sample=True`.
+        do_sample (`bool`, *optional*, defaults to `False`):
+            Whether to sample the next tokens, greedy decoding is used otherwise.
+        seed (`int`, *optional*):
+            Seed of the [`MultinomialSampler`] used with `do_sample=True`.
+
+    Example:
+
+    ```python
+    >>> scheduler = ContinuousBatchingScheduler(model, max_batch_size=4, max_new_tokens=32)
+    >>> for prompt in prompts:
+    ...     scheduler.add_request(prompt)
+    >>> for request in scheduler.run():
+    ...     print(request.request_id, request.output_ids)
+    ```
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 8,
+        max_new_tokens: int = 20,
+        eos_token_id: Optional[Union[int, List[int]]] = None,
+        pad_token_id: Optional[int] = None,
+        logits_processor: Optional[LogitsProcessorList] = None,
+        logits_warper: Optional[LogitsProcessorList] = None,
+        do_sample: bool = False,
+        seed: Optional[int] = None,
+    ):
+        if model.config.is_encoder_decoder:
+            raise ValueError("`ContinuousBatchingScheduler` only supports decoder-only models.")
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` has to be a strictly positive integer, but is {max_batch_size}")
+
+        generation_config = model.generation_config
+        eos_token_id = eos_token_id if eos_token_id is not None else generation_config.eos_token_id
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+        pad_token_id = pad_token_id if pad_token_id is not None else generation_config.pad_token_id
+        if pad_token_id is None:
+            pad_token_id = eos_token_id[0] if eos_token_id is not None else 0
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_new_tokens = max_new_tokens
+        self.eos_token_id = set(eos_token_id) if eos_token_id is not None else set()
+        self.pad_token_id = pad_token_id
+        self.logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+        self.logits_warper = logits_warper if logits_warper is not None else LogitsProcessorList()
+        self.do_sample = do_sample
+        self.sampler = MultinomialSampler(seed) if do_sample else None
+
+        self._waiting = deque()
+        self._running = []
+        self._request_counter = itertools.count()
+        # state of the running batch, `input_ids` and `attention_mask` are left padded
+        self._input_ids = None
+        self._attention_mask = None
+        self._past_key_values = None
+
+        self.num_steps = 0
+        self.num_generated_tokens = 0
+
+    @property
+    def num_running(self) -> int:
+        """The number of sequences in the running batch."""
+        return len(self._running)
+
+    @property
+    def num_waiting(self) -> int:
+        """The number of queued requests."""
+        return len(self._waiting)
+
+    def has_unfinished_requests(self) -> bool:
+        """Whether some requests are running or queued."""
+        return bool(self._running or self._waiting)
+
+    def add_request(
+        self,
+        input_ids: Union[List[int], np.ndarray, mindspore.Tensor],
+        max_new_tokens: Optional[int] = None,
+        request_id: Optional[Union[int, str]] = None,
+    ) -> Union[int, str]:
+        """
+        Queues a prompt, it is admitted into the running batch as soon as a slot is free.
+
+        Args:
+            input_ids (`Union[List[int], np.ndarray, mindspore.Tensor]`):
+                The token ids of a single prompt.
+            max_new_tokens (`int`, *optional*):
+                The maximum numbers of tokens to generate, `max_new_tokens` of the scheduler if not set.
+            request_id (`int` or `str`, *optional*):
+                The identifier of the request, a counter is used if not set.
+
+        Returns:
+            The identifier of the request.
+        """
+        if isinstance(input_ids, mindspore.Tensor):
+            input_ids = input_ids.asnumpy()
+        prompt = np.asarray(input_ids).reshape(-1).tolist()
+        if not prompt:
+            raise ValueError("The prompt of a request can not be empty.")
+        if request_id is None:
+            request_id = next(self._request_counter)
+        max_new_tokens = max_new_tokens if max_new_tokens is not None else self.max_new_tokens
+        self._waiting.append(GenerationRequest(request_id, prompt, max_new_tokens))
+        return request_id
+
+    def step(self) -> List[GenerationRequest]:
+        """
+        Admits the queued requests into the free slots, runs one decoding step on the running batch and evicts the
+        finished sequences.
+
+        Returns:
+            `List[GenerationRequest]` of the requests finished during this step.
+        """
+        finished = self._admit()
+        if self._running:
+            outputs = self.model(**self.model.prepare_inputs_for_continuous_batching(
+                self._input_ids, self._past_key_values, self._attention_mask
+            ))
+            self._past_key_values = self.model._extract_past_from_model_output(outputs)
+            next_tokens = self._next_tokens(self._input_ids, outputs[0][:, -1, :])
+            self._append_tokens(next_tokens)
+            finished += self._record_tokens(self._running, next_tokens.asnumpy().tolist())
+            self._evict()
+        self.num_steps += 1
+        return finished
+
+    def run(self) -> List[GenerationRequest]:
+        """
+        Runs the scheduler until every request is finished.
+
+        Returns:
+            `List[GenerationRequest]` of all the requests, in the order they are finished.
+        """
+        finished = []
+        while self.has_unfinished_requests():
+            finished += self.step()
+        return finished
+
+    def generate(self, prompts: List[List[int]], max_new_tokens: Optional[int] = None) -> List[List[int]]:
+        """
+        Generates the continuations of a list of prompts.
+
+        Returns:
+            `List[List[int]]` of the generated token ids, in the order of the prompts.
+        """
+        request_ids = [self.add_request(prompt, max_new_tokens) for prompt in prompts]
+        outputs = {request.request_id: request.output_ids for request in self.run()}
+        return [outputs[request_id] for request_id in request_ids]
+
+    def _next_tokens(self, input_ids, next_token_logits):
+        next_token_scores = self.logits_processor(input_ids, next_token_logits)
+        if self.do_sample:
+            next_token_scores = self.logits_warper(input_ids, next_token_scores)
+            probs = ops.softmax(next_token_scores.astype(mindspore.float32), axis=-1)
+            return self.sampler(probs).astype(input_ids.dtype)
+        return ops.argmax(next_token_scores, dim=-1).astype(input_ids.dtype)
+
+    def _record_tokens(self, requests, next_tokens):
+        finished = []
+        for request, token in zip(requests, next_tokens):
+            request.output_ids.append(token)
+            self.num_generated_tokens += 1
+            if token in self.eos_token_id:
+                request.finish_reason = "eos"
+            elif len(request.output_ids) >= request.max_new_tokens:
+                request.finish_reason = "length"
+            if request.finished:
+                finished.append(request)
+        return finished
+
+    def _append_tokens(self, next_tokens):
+        self._input_ids = ops.cat([self._input_ids, next_tokens[:, None]], axis=-1)
+        self._attention_mask = ops.cat(
+            [self._attention_mask, ops.ones((self._attention_mask.shape[0], 1), self._attention_mask.dtype)], axis=-1
+        )
+
+    def _admit(self):
+        """prefills the queued requests which fit in the free slots and joins them to the running batch"""
+        num_free = self.max_batch_size - len(self._running)
+        admitted = [self._waiting.popleft() for _ in range(min(num_free, len(self._waiting)))]
+        if not admitted:
+            return []
+
+        # prompts of the same length are prefilled together, without padding
+        groups = OrderedDict()
+        for request in admitted:
+            groups.setdefault(len(request.prompt), []).append(request)
+
+        finished = []
+        for requests in groups.values():
+            input_ids = mindspore.Tensor([request.prompt for request in requests], mindspore.int64)
+            attention_mask = ops.ones(input_ids.shape, mindspore.int64)
+            outputs = self.model(**self.model.prepare_inputs_for_continuous_batching(
+                input_ids, None, attention_mask
+            ))
+            past_key_values = self.model._extract_past_from_model_output(outputs)
+            next_tokens = self._next_tokens(input_ids, outputs[0][:, -1, :])
+            finished += self._record_tokens(requests, next_tokens.asnumpy().tolist())
+
+            keep = [idx for idx, request in enumerate(requests) if not request.finished]
+            if not keep:
+                continue
+            if len(keep) < len(requests):
+                keep_idx = mindspore.Tensor(keep, mindspore.int32)
+                past_key_values = self.model._reorder_cache(past_key_values, keep_idx)
+                input_ids, attention_mask = input_ids[keep_idx], attention_mask[keep_idx]
+                next_tokens = next_tokens[keep_idx]
+            input_ids = ops.cat([input_ids, next_tokens[:, None]], axis=-1)
+            attention_mask = ops.cat([attention_mask, ops.ones((attention_mask.shape[0], 1), attention_mask.dtype)],
+                                     axis=-1)
+            self._join(input_ids, attention_mask, past_key_values)
+            self._running += [requests[idx] for idx in keep]
+        return finished
+
+    def _join(self, input_ids, attention_mask, past_key_values):
+        """joins prefilled rows to the running batch, the shorter of the two is left padded"""
+        if self._input_ids is None:
+            self._input_ids, self._attention_mask, self._past_key_values = input_ids, attention_mask, past_key_values
+            return
+
+        length, new_length = self._input_ids.shape[-1], input_ids.shape[-1]
+        if length < new_length:
+            self._input_ids, self._attention_mask = self._left_pad(self._input_ids, self._attention_mask,
+                                                                   new_length - length)
+        elif new_length < length:
+            input_ids, attention_mask = self._left_pad(input_ids, attention_mask, length - new_length)
+        self._input_ids = ops.cat([self._input_ids, input_ids], axis=0)
+        self._attention_mask = ops.cat([self._attention_mask, attention_mask], axis=0)
+        self._past_key_values = self.model._merge_cache(self._past_key_values, past_key_values)
+
+    def _left_pad(self, input_ids, attention_mask, pad_length):
+        batch_size = input_ids.shape[0]
+        input_ids = ops.cat([ops.fill(input_ids.dtype, (batch_size, pad_length), self.pad_token_id), input_ids],
+                            axis=-1)
+        attention_mask = ops.cat([ops.zeros((batch_size, pad_length), attention_mask.dtype), attention_mask], axis=-1)
+        return input_ids, attention_mask
+
+    def _evict(self):
+        """removes the finished sequences from the running batch and drops the positions padded in every row"""
+        keep = [idx for idx, request in enumerate(self._running) if not request.finished]
+        if len(keep) == len(self._running):
+            return
+        if not keep:
+            self._running = []
+            self._input_ids, self._attention_mask, self._past_key_values = None, None, None
+            return
+
+        keep_idx = mindspore.Tensor(keep, mindspore.int32)
+        self._running = [self._running[idx] for idx in keep]
+        self._input_ids = self._input_ids[keep_idx]
+        self._attention_mask = self._attention_mask[keep_idx]
+        self._past_key_values = self.model._reorder_cache(self._past_key_values, keep_idx)
+
+        # the rows are left padded, the number of leading positions padded in every row is the smallest padding
+        num_pads = int((self._attention_mask == 0).astype(mindspore.int32).sum(-1).min())
+        if num_pads > 0:
+            self._input_ids = self._input_ids[:, num_pads:]
+            self._attention_mask = self._attention_mask[:, num_pads:]
+            self._past_key_values = self.model._trim_cache(self._past_key_values, num_pads)
+
+
+__all__ = ['GenerationRequest', 'ContinuousBatchingScheduler']
@@ -0,0 +1,128 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Greedy search into a preallocated token buffer
+"""
+from typing import Optional
+
+import mindspore
+from mindspore import ops
+
+from .logits_process import LogitsProcessorList
+from .stopping_criteria import MaxLengthCriteria, StoppingCriteriaList
+
+
+def _static_greedy_step(model, input_ids, attention_mask, cur_len):
+    """
+    Runs the model on the whole fixed-shape token buffer and returns the logits of the last valid position.
+    Positions after `cur_len` only hold padding, the causal mask keeps them from leaking into earlier positions.
+    """
+    model_inputs = model.prepare_inputs_for_generation(input_ids, attention_mask=attention_mask, use_cache=False)
+    outputs = model(**model_inputs, return_dict=True)
+    return ops.gather(outputs[0], cur_len - 1, 1)
+
+
+def _get_static_greedy_step(model, jit_step: bool = False):
+    """
+    Returns the single decoding step used by `static_greedy_search`. The compiled step is cached on the model, its
+    inputs keep the same shapes for a given `(batch_size, max_length)`, so it is only compiled once.
+    """
+    def step_fn(input_ids, attention_mask, cur_len):
+        return _static_greedy_step(model, input_ids, attention_mask, cur_len)
+
+    if not jit_step:
+        return step_fn
+    jit_step_fn = getattr(model, "_jit_static_greedy_step", None)
+    if jit_step_fn is None:
+        from mindnlp import ms_jit # pylint: disable=import-outside-toplevel
+        jit_step_fn = ms_jit(step_fn)
+        model._jit_static_greedy_step = jit_step_fn
+    return jit_step_fn
+
+
+def static_greedy_search(
+    model,
+    input_ids: mindspore.Tensor,
+    logits_processor: LogitsProcessorList,
+    stopping_criteria: StoppingCriteriaList,
+    pad_token_id: Optional[int] = None,
+    eos_token_id_tensor: Optional[mindspore.Tensor] = None,
+    output_scores: bool = False,
+    return_dict_in_generate: bool = False,
+    streamer: Optional["BaseStreamer"] = None,
+    jit_step: bool = False,
+    attention_mask: Optional[mindspore.Tensor] = None,
+):
+    """
+    Greedy decoding into a preallocated `(batch_size, max_length)` buffer. Every new token is written in place at
+    position `cur_len`, so the shapes seen by the model never change and the output matches `greedy_search`.
+    """
+    max_length = stopping_criteria.max_length
+    if max_length is None:
+        raise ValueError("`max_length` needs to be a stopping_criteria for static shape generation.")
+    # only the length check can be done without slicing the buffer
+    other_criteria = StoppingCriteriaList(
+        [criteria for criteria in stopping_criteria if not isinstance(criteria, MaxLengthCriteria)]
+    )
+
+    batch_size, cur_len = input_ids.shape
+    fill_value = pad_token_id if pad_token_id is not None else 0
+    sequences = ops.fill(input_ids.dtype, (batch_size, max_length), fill_value)
+    sequences[:, :cur_len] = input_ids
+    if attention_mask is None:
+        attention_mask = ops.ones((batch_size, cur_len), mindspore.int32)
+    sequence_mask = ops.zeros((batch_size, max_length), attention_mask.dtype)
+    sequence_mask[:, :cur_len] = attention_mask
+
+    step_fn = _get_static_greedy_step(model, jit_step)
+    scores = () if (return_dict_in_generate and output_scores) else None
+    unfinished_sequences = ops.ones(batch_size, dtype=sequences.dtype)
+
+    while cur_len < max_length:
+        next_token_logits = step_fn(sequences, sequence_mask, mindspore.Tensor(cur_len, mindspore.int32))
+        if logits_processor:
+            next_token_logits = logits_processor(sequences[:, :cur_len], next_token_logits)
+        if scores is not None:
+            scores += (next_token_logits,)
+
+        next_tokens = ops.argmax(next_token_logits, dim=-1).astype(sequences.dtype)
+        if eos_token_id_tensor is not None:
+            next_tokens = next_tokens * unfinished_sequences + pad_token_id * (1 - unfinished_sequences)
+
+        sequences[:, cur_len] = next_tokens
+        sequence_mask[:, cur_len] = 1
+        cur_len += 1
+        if streamer is not None:
+            streamer.put(next_tokens)
+
+        if eos_token_id_tensor is not None:
+            unfinished_sequences = unfinished_sequences.mul(
+                next_tokens.tile((eos_token_id_tensor.shape[0], 1)).ne(eos_token_id_tensor.unsqueeze(1)).astype(sequences.dtype).prod(axis=0)
+            )
+            if unfinished_sequences.max() == 0:
+                break
+        if other_criteria and other_criteria(sequences[:, :cur_len], scores):
+            break
+
+    if streamer is not None:
+        streamer.end()
+
+    sequences = sequences[:, :cur_len]
+    if return_dict_in_generate:
+        return (sequences, scores, None, None)
+    return sequences
+
+
+__all__ = ['static_greedy_search']
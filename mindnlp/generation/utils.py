@@ -0,0 +1,157 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Generation utils
+"""
+from typing import Optional, Tuple, Union
+
+import mindspore
+from mindspore import ops
+
+
+class MultinomialSampler:
+    r"""
+    Draws tokens from categorical distributions without leaving the device.
+
+    The random stream is owned by the sampler, two samplers built with the same `seed` draw the same tokens from the
+    same distributions, so giving every request its own sampler makes sampling reproducible per request whatever the
+    other requests sharing the process do.
+
+    Args:
+        seed (`int`, *optional*):
+            Seed of the random stream. A non-deterministic stream is used if not set.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        if seed is None:
+            self._uniform = ops.UniformReal()
+        else:
+            # both seeds equal to 0 means a random seed for mindspore random operators
+            self._uniform = ops.UniformReal(seed=seed, seed2=1)
+
+    def uniform(self, shape):
+        """Returns samples of U(0, 1) clipped away from 0 and 1."""
+        return ops.clip(self._uniform(shape), 1e-10, 1 - 1e-7)
+
+    def __call__(self, probs: mindspore.Tensor) -> mindspore.Tensor:
+        """
+        Draws one token per row of `probs` of shape `(batch_size, vocab_size)` by inverse transform sampling.
+
+        Returns:
+            `mindspore.Tensor` of shape `(batch_size,)`.
+        """
+        probs = probs.astype(mindspore.float32)
+        cdf = ops.cumsum(probs, axis=-1)
+        # renormalize so that the last bin always catches the remaining mass
+        cdf = cdf / cdf[:, -1:]
+        samples = self.uniform((probs.shape[0], 1))
+        next_tokens = (cdf < samples).astype(mindspore.int32).sum(axis=-1)
+        return ops.minimum(next_tokens, probs.shape[-1] - 1)
+
+    def sample_without_replacement(self, log_probs: mindspore.Tensor, num_samples: int) -> mindspore.Tensor:
+        """
+        Draws `num_samples` distinct indices per row of the log-probabilities `log_probs` with the Gumbel-top-k trick.
+
+        Returns:
+            `mindspore.Tensor` of shape `(batch_size, num_samples)`.
+        """
+        gumbel = -ops.log(-ops.log(self.uniform(log_probs.shape)))
+        _, indices = ops.topk(log_probs.astype(mindspore.float32) + gumbel, num_samples)
+        return indices
+
+
+def _state_seq_axes(seq_axis, num_states):
+    if isinstance(seq_axis, int):
+        return (seq_axis,) * num_states
+    return tuple(seq_axis)
+
+
+def concat_past_key_values(
+    past_key_values: Tuple[Tuple[mindspore.Tensor]],
+    other_past_key_values: Tuple[Tuple[mindspore.Tensor]],
+    batch_axis: int = 0,
+    seq_axis: Union[int, Tuple[int]] = -2,
+) -> Tuple[Tuple[mindspore.Tensor]]:
+    """
+    Concatenates two caches along the batch axis, the shorter one is left padded with zeros along the sequence axis,
+    which matches a left padded attention mask.
+
+    Args:
+        past_key_values (`Tuple[Tuple[mindspore.Tensor]]`):
+            The cache of the rows placed first.
+        other_past_key_values (`Tuple[Tuple[mindspore.Tensor]]`):
+            The cache of the rows placed last.
+        batch_axis (`int`, *optional*, defaults to 0):
+            The batch axis of every cached tensor.
+        seq_axis (`Union[int, Tuple[int]]`, *optional*, defaults to -2):
+            The sequence axis of the cached tensors, a tuple gives one axis per tensor of a layer.
+    """
+    merged = ()
+    for layer_past, other_layer_past in zip(past_key_values, other_past_key_values):
+        seq_axes = _state_seq_axes(seq_axis, len(layer_past))
+        merged_layer = ()
+        for state, other_state, axis in zip(layer_past, other_layer_past, seq_axes):
+            length, other_length = state.shape[axis], other_state.shape[axis]
+            if length < other_length:
+                state = _left_pad(state, other_length - length, axis)
+            elif other_length < length:
+                other_state = _left_pad(other_state, length - other_length, axis)
+            merged_layer += (ops.cat((state, other_state), axis=batch_axis),)
+        merged += (merged_layer,)
+    return merged
+
+
+def trim_past_key_values(
+    past_key_values: Tuple[Tuple[mindspore.Tensor]],
+    num_tokens: int,
+    seq_axis: Union[int, Tuple[int]] = -2,
+) -> Tuple[Tuple[mindspore.Tensor]]:
+    """
+    Drops the first `num_tokens` positions of every cached tensor along the sequence axis.
+    """
+    if num_tokens == 0:
+        return past_key_values
+    trimmed = ()
+    for layer_past in past_key_values:
+        seq_axes = _state_seq_axes(seq_axis, len(layer_past))
+        trimmed += (tuple(state.narrow(axis % state.ndim, num_tokens, state.shape[axis] - num_tokens)
+                          for state, axis in zip(layer_past, seq_axes)),)
+    return trimmed
+
+
+def crop_past_key_values(
+    past_key_values: Tuple[Tuple[mindspore.Tensor]],
+    max_length: int,
+    seq_axis: Union[int, Tuple[int]] = -2,
+) -> Tuple[Tuple[mindspore.Tensor]]:
+    """
+    Keeps the first `max_length` positions of every cached tensor along the sequence axis, used to roll back the
+    tokens rejected by speculative decoding.
+    """
+    cropped = ()
+    for layer_past in past_key_values:
+        seq_axes = _state_seq_axes(seq_axis, len(layer_past))
+        cropped += (tuple(state.narrow(axis % state.ndim, 0, max_length) for state, axis in zip(layer_past, seq_axes)),)
+    return cropped
+
+
+def _left_pad(tensor, pad_length, axis):
+    shape = list(tensor.shape)
+    shape[axis] = pad_length
+    return ops.cat((ops.zeros(tuple(shape), tensor.dtype), tensor), axis=axis)
+
+
+__all__ = ['MultinomialSampler', 'concat_past_key_values', 'trim_past_key_values', 'crop_past_key_values']
@@ -16,9 +16,11 @@
 
 
 import numpy as np
+import mindspore
+from mindspore import ops
 
 from mindnlp.abc import Metric
-from .utils import _check_onehot_data, _check_shape, _convert_data_type
+from .utils import _check_onehot_data, _check_shape, _convert_data_type, _is_device_data, _to_host
 
 def accuracy_fn(preds, labels):
     r"""
@@ -96,6 +98,10 @@ class Accuracy(Metric):
     of true negative cases, `FP` is the number of false posistive cases, `FN` is the number
     of false negative cases.
 
+    When `preds` and `labels` are tensors, the number of correct predictions is accumulated on
+    device and only copied to the host by `eval`. Unless `preds` has a single class, `labels`
+    with the dimension of `preds` are checked to be one-hot on the host.
+
     Args:
         name (str): Name of the metric.
 
@@ -154,8 +160,10 @@ class Accuracy(Metric):
         preds = inputs[0]
         labels = inputs[1]
 
-        y_pred = _convert_data_type(preds)
-        y_true = _convert_data_type(labels)
+        # labels of the dimension of the predictions may not be one-hot, which is checked on the host
+        on_device = _is_device_data(preds, labels) and (preds.ndim != labels.ndim or preds.shape[1] == 1)
+        y_pred = preds if on_device else _convert_data_type(preds)
+        y_true = labels if on_device else _convert_data_type(labels)
 
         if self._class_num == 0:
             self._class_num = y_pred.shape[1]
@@ -171,6 +179,13 @@ class Accuracy(Metric):
 
         _check_shape(y_pred, y_true, self._class_num)
 
+        if on_device:
+            indices = ops.round(y_pred) if self._class_num == 1 else y_pred.argmax(axis=1)
+            res = ops.equal(indices.astype(y_true.dtype), y_true).reshape(-1)
+            self._correct_num += res.astype(mindspore.float32).sum().astype(mindspore.int32)
+            self._total_num += res.shape[0]
+            return
+
         if self._class_num == 1:
             indices = np.around(y_pred)
         else:
@@ -197,7 +212,7 @@ class Accuracy(Metric):
                                f' {0}, please check whether your inputs(`preds`, `labels`) are '
                                f'empty, or you have called update method before calling eval '
                                f'method.')
-        acc = self._correct_num / self._total_num
+        acc = _to_host(self._correct_num) / self._total_num
         return acc
 
     def get_metric_name(self):
@@ -16,9 +16,11 @@
 
 
 import numpy as np
+import mindspore
+from mindspore import ops
 
 from mindnlp.abc import Metric
-from .utils import _check_value_type, _convert_data_type
+from .utils import _check_value_type, _convert_data_type, _is_device_data, _to_host
 
 def confusion_matrix_fn(preds, labels, class_num=2):
     r"""
@@ -80,6 +82,9 @@ class ConfusionMatrix(Metric):
     the performance of classification models, including binary classification and
     multiple classification.
 
+    When `preds` and `labels` are tensors, the matrix is accumulated on device and only copied
+    to the host by `eval`.
+
     Args:
         class_num (int): Number of classes in the dataset. Default: 2.
         name (str): Name of the metric.
@@ -104,10 +109,12 @@ class ConfusionMatrix(Metric):
         self._name = name
         self.class_num = _check_value_type("class_num", class_num, [int])
         self.conf_mat = np.zeros((self.class_num, self.class_num))
+        self._device_conf_mat = 0
 
     def clear(self):
         """Clears the internal evaluation results."""
         self.conf_mat = np.zeros((self.class_num, self.class_num))
+        self._device_conf_mat = 0
 
     def update(self, *inputs):
         """
@@ -133,8 +140,10 @@ class ConfusionMatrix(Metric):
         preds = inputs[0]
         labels = inputs[1]
 
-        preds = _convert_data_type(preds)
-        labels = _convert_data_type(labels)
+        on_device = _is_device_data(preds, labels)
+        if not on_device:
+            preds = _convert_data_type(preds)
+            labels = _convert_data_type(labels)
 
         if preds.ndim not in (labels.ndim, labels.ndim + 1):
             raise ValueError(f'For `ConfusionMatrix.update`, `preds` and `labels` should have the '
@@ -143,7 +152,15 @@ class ConfusionMatrix(Metric):
                              f'ndim: {labels.ndim}.')
 
         if preds.ndim == labels.ndim + 1:
-            preds = np.argmax(preds, axis=1)
+            preds = preds.argmax(axis=1)
+
+        if on_device:
+            trans = (labels.reshape(-1).astype(mindspore.int32) * self.class_num +
+                     preds.reshape(-1).astype(mindspore.int32))
+            bincount = ops.unsorted_segment_sum(ops.ones(trans.shape, mindspore.float32), trans,
+                                                self.class_num ** 2)
+            self._device_conf_mat += bincount.reshape(self.class_num, self.class_num)
+            return
 
         trans = (labels.reshape(-1) * self.class_num + preds.reshape(-1)).astype(int)
         bincount = np.bincount(trans, minlength=self.class_num ** 2)
@@ -158,7 +175,7 @@ class ConfusionMatrix(Metric):
             - **conf_mat** (np.ndarray) - The computed result.
 
         """
-        conf_mat = self.conf_mat.astype(float)
+        conf_mat = (self.conf_mat + _to_host(self._device_conf_mat)).astype(float)
 
         return conf_mat
 
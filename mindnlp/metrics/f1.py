@@ -17,9 +17,11 @@
 
 import sys
 import numpy as np
+import mindspore
+from mindspore import ops, Tensor
 
 from mindnlp.abc import Metric
-from .utils import _check_onehot_data, _check_shape, _convert_data_type
+from .utils import _check_onehot_data, _check_shape, _convert_data_type, _is_device_data, _to_host
 
 def f1_score_fn(preds, labels):
     r"""
@@ -99,6 +101,10 @@ class F1Score(Metric):
     where `TP` is the number of true posistive cases, `FN` is the number of false negative cases,
     `FP` is the number of false positive cases.
 
+    When `preds` and `labels` are tensors, the positives are counted on device and only copied
+    to the host by `eval`, which also checks the range of `labels`. `labels` with the dimension
+    of `preds` are checked to be one-hot on the host.
+
     Args:
         name (str): Name of the metric.
 
@@ -124,6 +130,7 @@ class F1Score(Metric):
         self._actual_positives = 0
         self._positives = 0
         self._class_num = 0
+        self._max_label = None
 
     def clear(self):
         """Clears the internal evaluation results."""
@@ -131,6 +138,7 @@ class F1Score(Metric):
         self._actual_positives = 0
         self._positives = 0
         self._class_num = 0
+        self._max_label = None
 
     def update(self, *inputs):
         """
@@ -161,8 +169,10 @@ class F1Score(Metric):
         preds = inputs[0]
         labels = inputs[1]
 
-        y_pred = _convert_data_type(preds)
-        y_true = _convert_data_type(labels)
+        # labels of the dimension of the predictions may not be one-hot, which is checked on the host
+        on_device = _is_device_data(preds, labels) and preds.ndim != labels.ndim
+        y_pred = preds if on_device else _convert_data_type(preds)
+        y_true = labels if on_device else _convert_data_type(labels)
 
         if y_pred.ndim == y_true.ndim and _check_onehot_data(y_true):
             y_true = y_true.argmax(axis=1)
@@ -177,13 +187,16 @@ class F1Score(Metric):
                              f' please check your predicted value(`preds`).')
         class_num = self._class_num
 
-        if y_true.max() + 1 > class_num:
-            raise ValueError(f'For `F1Score.update`, `preds` and `labels` should contain '
-                             f'same classes, but got `preds` contains {class_num} classes '
-                             f'and true value contains {y_true.max() + 1}')
-        y_true = np.eye(class_num)[y_true.reshape(-1)]
-        indices = y_pred.argmax(axis=1).reshape(-1)
-        y_pred = np.eye(class_num)[indices]
+        if on_device:
+            # out of range labels have no one-hot row, their maximum is checked by `eval`
+            max_label = y_true.max().astype(mindspore.int32)
+            self._max_label = max_label if self._max_label is None else ops.maximum(self._max_label, max_label)
+            on_value, off_value = Tensor(1.0, mindspore.float32), Tensor(0.0, mindspore.float32)
+            y_true = ops.one_hot(y_true.reshape(-1).astype(mindspore.int32), class_num, on_value, off_value)
+            indices = y_pred.argmax(axis=1).reshape(-1).astype(mindspore.int32)
+            y_pred = ops.one_hot(indices, class_num, on_value, off_value)
+        else:
+            y_true, y_pred = self._host_one_hot(y_pred, y_true)
 
         positives = y_pred.sum(axis=0)
         actual_positives = y_true.sum(axis=0)
@@ -193,6 +206,22 @@ class F1Score(Metric):
         self._positives += positives
         self._actual_positives += actual_positives
 
+    def _host_one_hot(self, y_pred, y_true):
+        """One-hot labels and predictions of numpy inputs."""
+        class_num = self._class_num
+        self._check_label_range(y_true.max())
+        y_true = np.eye(class_num)[y_true.reshape(-1)]
+        indices = y_pred.argmax(axis=1).reshape(-1)
+        y_pred = np.eye(class_num)[indices]
+        return y_true, y_pred
+
+    def _check_label_range(self, max_label):
+        """Checks the labels are classes of the predictions."""
+        if max_label + 1 > self._class_num:
+            raise ValueError(f'For `F1Score.update`, `preds` and `labels` should contain '
+                             f'same classes, but got `preds` contains {self._class_num} classes '
+                             f'and true value contains {max_label + 1}')
+
     def eval(self):
         """
         Computes and returns the F1 score.
@@ -202,10 +231,15 @@ class F1Score(Metric):
 
         Raises:
             RuntimeError: If the number of samples is 0.
+            ValueError: If tensor `labels` contain more classes than `preds`.
 
         """
-        f1_s = 2 * self._true_positives / (self._actual_positives + self._positives + \
-            self.epsilon)
+        if self._max_label is not None:
+            self._check_label_range(int(_to_host(self._max_label)))
+        true_positives = np.asarray(_to_host(self._true_positives), np.float64)
+        actual_positives = np.asarray(_to_host(self._actual_positives), np.float64)
+        positives = np.asarray(_to_host(self._positives), np.float64)
+        f1_s = 2 * true_positives / (actual_positives + positives + self.epsilon)
         return f1_s
 
     def get_metric_name(self):
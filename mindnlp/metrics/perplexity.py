@@ -16,9 +16,10 @@
 
 import math
 import numpy as np
-from mindspore import Tensor
+import mindspore
+from mindspore import Tensor, ops
 from mindnlp.abc import Metric
-from .utils import _check_value_type, _convert_data_type, _check_onehot_data
+from .utils import _check_value_type, _convert_data_type, _check_onehot_data, _is_device_data, _to_host
 
 
 def perplexity_fn(preds, labels, ignore_label=None):
@@ -125,6 +126,10 @@ class Perplexity(Metric):
 
     Where :math:`w` represents words in corpus.
 
+    When `preds` and `labels` are tensors, the cross entropy and the number of words are
+    accumulated on device and only copied to the host by `eval`, `labels` with the dimension of
+    `preds` are checked to be one-hot on the host.
+
     Args:
         ignore_label (Union[int, None]): Index of an invalid label to be ignored when counting.
             If set to `None`, it means there's no invalid label. Default: None.
@@ -192,6 +197,13 @@ class Perplexity(Metric):
         preds = _check_value_type("preds", preds, [Tensor, list, np.ndarray])
         labels = _check_value_type("labels", labels, [Tensor, list, np.ndarray])
 
+        # labels of the dimension of the predictions may not be one-hot, which is checked on the host
+        if _is_device_data(preds, labels) and preds.ndim != labels.ndim:
+            cross_entropy, word_num = self._device_cross_entropy(preds, labels)
+            self.sum_cross_entropy += cross_entropy
+            self.sum_word_num += word_num
+            return
+
         y_pred = [_convert_data_type(preds)]
         y_true = [_convert_data_type(labels)]
 
@@ -228,6 +240,27 @@ class Perplexity(Metric):
         self.sum_cross_entropy += cross_entropy
         self.sum_word_num += word_num
 
+    def _device_cross_entropy(self, pred, label):
+        """Cross entropy and number of words of a batch of tensors, computed on device."""
+        if label.size != pred.size / pred.shape[-1]:
+            raise RuntimeError(f'For `Perplexity.update`, `preds` and `labels` should have '
+                               f'the same shape, but got `preds` shape {pred.shape}, label '
+                               f'shape {label.shape}.')
+
+        label = label.reshape(-1).astype(mindspore.int32)
+        pred = pred.reshape(-1, pred.shape[-1]).astype(mindspore.float32)
+        on_value, off_value = Tensor(1.0, mindspore.float32), Tensor(0.0, mindspore.float32)
+        pred = (pred * ops.one_hot(label, pred.shape[-1], on_value, off_value)).sum(axis=-1)
+
+        word_num = pred.size
+        if self.ignore_label is not None:
+            ignore = (label == self.ignore_label).astype(pred.dtype)
+            word_num = word_num - ignore.sum()
+            pred = pred * (1 - ignore) + ignore
+
+        cross_entropy = -ops.log(ops.maximum(pred, Tensor(1e-10, mindspore.float32))).sum()
+        return cross_entropy, word_num
+
     def eval(self):
         """
         Computes and returns the perplexity.
@@ -239,11 +272,12 @@ class Perplexity(Metric):
             RuntimeError: If the sample size is 0.
 
         """
-        if self.sum_word_num == 0:
+        sum_word_num = _to_host(self.sum_word_num)
+        if sum_word_num == 0:
             raise RuntimeError(f'Perplexity can not be calculated, because the number of '
                                f'samples is {0}')
 
-        ppl = np.exp(self.sum_cross_entropy / self.sum_word_num)
+        ppl = np.exp(_to_host(self.sum_cross_entropy) / sum_word_num)
 
         return ppl
 
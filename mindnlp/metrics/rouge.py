@@ -14,7 +14,7 @@
 # ============================================================================
 """"Classes for Metrics RougeN and RougeL"""
 
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from mindnlp.abc import Metric
 from .utils import _check_value_type
 
@@ -33,6 +33,10 @@ def _lcs(strg, sub):
     """
     Calculates the length of longest common subsequence of strg and sub.
 
+    The bit-parallel algorithm of Allison-Dix and Hyyrö: the tokens of the shorter sequence are turned into
+    bitsets of their positions, and one row of the dynamic programming table is updated for each token of the
+    longer sequence with a few operations on Python integers, which take O(n * m / w) word operations.
+
     Args:
         strg (list): The string to be calculated, usually longer the sub string.
         sub (list): The sub string to be calculated.
@@ -43,16 +47,90 @@ def _lcs(strg, sub):
     """
     if len(strg) < len(sub):
         sub, strg = strg, sub
-    lengths = np.zeros((len(strg) + 1, len(sub) + 1))
-    for j in range(1, len(sub) + 1):
-        for i in range(1, len(strg) + 1):
-            if strg[i - 1] == sub[j - 1]:
-                lengths[i][j] = lengths[i - 1][j - 1] + 1
-            else:
-                lengths[i][j] = max(lengths[i - 1][j], lengths[i][j - 1])
+    masks = {}
+    for i, token in enumerate(sub):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(sub)) - 1
+    row = full
+    for token in strg:
+        matches = row & masks.get(token, 0)
+        row = ((row + matches) | (row - matches)) & full
+    # every zero bit of the row is a matched token of sub
+    return float(len(sub) - bin(row).count('1'))
+
+
+def _rouge_l_score(cand_list, ref_list, beta):
+    """
+    Calculates the ROUGE-L score of a candidate against its references.
+    """
+    precs, recalls = [], []
+    for ref in ref_list:
+        basic_lcs = _lcs(cand_list, ref)
+        prec = basic_lcs / len(cand_list) if cand_list is not None else 0.
+        rec = basic_lcs / len(ref) if ref is not None else 0.
+        precs.append(prec)
+        recalls.append(rec)
 
-    length = lengths[len(strg)][len(sub)]
-    return length
+    prec_max = max(precs)
+    rec_max = max(recalls)
+
+    if prec_max != 0 and rec_max != 0:
+        score = ((1 + beta**2) * prec_max * rec_max) / \
+                float(rec_max + beta**2 * prec_max)
+    else:
+        score = 0.0
+    return score
+
+
+def _rouge_l_chunk(args):
+    """
+    Calculates the ROUGE-L scores of a chunk of candidates, run by the workers of the process pool.
+    """
+    cand_lists, ref_lists, beta = args
+    return [_rouge_l_score(cand_list, ref_list, beta) for cand_list, ref_list in zip(cand_lists, ref_lists)]
+
+
+def rouge_l_scores(cand_lists, ref_lists, beta=1.2, num_workers=None, chunk_size=256):
+    r"""
+    Calculates the ROUGE-L score of every candidate against its references, the same score as `rouge_l_fn`.
+
+    Args:
+        cand_lists (list): A list of tokenized candidate sentences.
+        ref_lists (list): A list of lists of tokenized true sentences, one list per candidate.
+        beta (float): A hyperparameter to decide the weight of recall. Defaults: 1.2.
+        num_workers (int): The number of processes scoring the pairs, the pairs are scored in the current
+            process if it is None or 1. Defaults: None.
+        chunk_size (int): The number of pairs sent to a process at once. Defaults: 256.
+
+    Returns:
+        - **rougel_scores** (list) - The score of each candidate.
+
+    Raises:
+        ValueError: If `cand_lists` and `ref_lists` have different lengths.
+
+    Example:
+        >>> from mindnlp.metrics import rouge_l_scores
+        >>> cand_lists = [["The","cat","The","cat","on","the","mat"], ["a","cat"]]
+        >>> ref_lists = [[["The","cat","is","on","the","mat"]], [["the","cat"]]]
+        >>> rouge_l_scores(cand_lists, ref_lists)
+        [0.7800511508951408, 0.5]
+
+    """
+    cand_lists = _check_value_type("cand_lists", cand_lists, list)
+    ref_lists = _check_value_type("ref_lists", ref_lists, list)
+    beta = _check_value_type("beta", beta, [float])
+    if len(cand_lists) != len(ref_lists):
+        raise ValueError(f'`cand_lists` and `ref_lists` should have the same length, but got {len(cand_lists)} '
+                         f'and {len(ref_lists)}.')
+
+    chunks = [(cand_lists[i:i + chunk_size], ref_lists[i:i + chunk_size], beta)
+              for i in range(0, len(cand_lists), chunk_size)]
+    if num_workers is None or num_workers <= 1 or len(chunks) <= 1:
+        chunk_scores = map(_rouge_l_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            chunk_scores = list(executor.map(_rouge_l_chunk, chunks))
+    return [score for scores in chunk_scores for score in scores]
 
 
 def rouge_n_fn(cand_list, ref_list, n_size=1):
@@ -145,25 +223,7 @@ def rouge_l_fn(cand_list, ref_list, beta=1.2):
     ref_list = _check_value_type("ref_list", ref_list, list)
     beta = _check_value_type("beta", beta, [float])
 
-    inst_scores = []
-
-    precs, recalls = [], []
-    for ref in ref_list:
-        basic_lcs = _lcs(cand_list, ref)
-        prec = basic_lcs / len(cand_list) if cand_list is not None else 0.
-        rec = basic_lcs / len(ref) if ref is not None else 0.
-        precs.append(prec)
-        recalls.append(rec)
-
-    prec_max = max(precs)
-    rec_max = max(recalls)
-
-    if prec_max != 0 and rec_max != 0:
-        score = ((1 + beta**2) * prec_max * rec_max) / \
-                float(rec_max + beta**2 * prec_max)
-    else:
-        score = 0.0
-    inst_scores.append(score)
+    inst_scores = [_rouge_l_score(cand_list, ref_list, beta)]
 
     rougel_score = 1. * sum(inst_scores) / len(inst_scores)
 
@@ -281,6 +341,8 @@ class RougeL(Metric):
     Args:
         beta (float): A hyperparameter to decide the weight of recall. Defaults: 1.2.
         name (str): Name of the metric.
+        num_workers (int): The number of processes scoring the pairs given to `update_batch`, the pairs are
+            scored in the current process if it is None or 1. Defaults: None.
 
     Example:
         >>> from mindnlp.common.metrics import RougeL
@@ -294,10 +356,11 @@ class RougeL(Metric):
         0.7800511508951408
 
     """
-    def __init__(self, beta=1.2, name='RougeL'):
+    def __init__(self, beta=1.2, name='RougeL', num_workers=None):
         super().__init__()
         self._name = name
         self.beta = _check_value_type("beta", beta, [float])
+        self.num_workers = num_workers
         self.inst_scores = []
 
     def clear(self):
@@ -327,23 +390,21 @@ class RougeL(Metric):
         cand_list = _check_value_type("cand_list", cand_list, list)
         ref_list = _check_value_type("ref_list", ref_list, list)
 
-        precs, recalls = [], []
-        for ref in ref_list:
-            basic_lcs = _lcs(cand_list, ref)
-            prec = basic_lcs / len(cand_list) if cand_list is not None else 0.
-            rec = basic_lcs / len(ref) if ref is not None else 0.
-            precs.append(prec)
-            recalls.append(rec)
+        self.inst_scores.append(_rouge_l_score(cand_list, ref_list, self.beta))
+
+    def update_batch(self, cand_lists, ref_lists):
+        """
+        Updates local variables with a batch of candidates, scored by `num_workers` processes.
 
-        prec_max = max(precs)
-        rec_max = max(recalls)
+        Args:
+            cand_lists (list): A list of tokenized candidate sentences.
+            ref_lists (list): A list of lists of tokenized ground truth sentences, one list per candidate.
 
-        if prec_max != 0 and rec_max != 0:
-            score = ((1 + self.beta**2) * prec_max * rec_max) / \
-                    float(rec_max + self.beta**2 * prec_max)
-        else:
-            score = 0.0
-        self.inst_scores.append(score)
+        Raises:
+            ValueError: If `cand_lists` and `ref_lists` have different lengths.
+
+        """
+        self.inst_scores.extend(rouge_l_scores(cand_lists, ref_lists, self.beta, self.num_workers))
 
     def eval(self):
         """
@@ -363,4 +424,4 @@ class RougeL(Metric):
         """
         return self._name
 
-__all__ = ['rouge_n_fn', 'rouge_l_fn', 'RougeL', 'RougeN']
+__all__ = ['rouge_n_fn', 'rouge_l_fn', 'rouge_l_scores', 'RougeL', 'RougeN']
@@ -90,6 +90,22 @@ def _convert_data_type(data):
                         f'np.ndarray, but got {type(data)}.')
     return data
 
+def _is_device_data(*inputs):
+    """
+    Checks whether all inputs are tensors, which the metrics accumulate on device without
+    copying them to the host.
+    """
+    return all(isinstance(data, Tensor) for data in inputs)
+
+def _to_host(value):
+    """
+    Copies an accumulator kept on device to the host, this is the only synchronization of the
+    metrics updated with tensors.
+    """
+    if isinstance(value, Tensor):
+        return value.asnumpy()
+    return value
+
 def _check_shape(y_pred, y_true, n_class=None):
     """
     Checks the shapes of y_pred and y_true.
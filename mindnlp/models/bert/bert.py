@@ -17,8 +17,6 @@
 # pylint: disable=E0401
 
 """MindNLP bert model"""
-import os
-import logging
 import mindspore.numpy as mnp
 import mindspore.common.dtype as mstype
 from mindspore import nn, ops
@@ -27,6 +25,7 @@ from mindspore.common.initializer import initializer, TruncatedNormal, Normal
 from mindnlp._legacy.nn import Dropout, Matmul
 from mindnlp.abc import PreTrainedModel
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from ..utils.activations import ACT2FN
 from .bert_config import BertConfig, BERT_SUPPORT_LIST
 
@@ -36,46 +35,19 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
 }
 
 
+register_conversion_rules('bert', [
+    RenameRule('LayerNorm', 'layer_norm'),
+    RenameRule('.weight', '.gamma', when=('layer_norm',)),
+    RenameRule('.bias', '.beta', when=('layer_norm',)),
+    RenameRule('weight', 'embedding_table', when=('embeddings',)),
+    RenameRule('self', 'self_attn'),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """convert torch checkpoint to mindspore"""
-    _ = kwargs.get('prefix', '')
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-                          from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logging.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for key, value in state_dict.items():
-        if 'LayerNorm' in key:
-            key = key.replace('LayerNorm', 'layer_norm')
-        if 'layer_norm' in key:
-            if '.weight' in key:
-                key = key.replace('.weight', '.gamma')
-            if '.bias' in key:
-                key = key.replace('.bias', '.beta')
-        if 'embeddings' in key:
-            key = key.replace('weight', 'embedding_table')
-        if 'self' in key:
-            key = key.replace('self', 'self_attn')
-        ms_ckpt.append({'name': key, 'data': Tensor(value.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin','mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, '
-                               f'please checkout the path.') from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'bert')
+
 
 class BertEmbeddings(nn.Cell):
     """
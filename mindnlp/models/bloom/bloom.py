@@ -20,7 +20,6 @@
 # pylint: disable=E0401
 """MindSpore BLOOM model."""
 
-import os
 import math
 from typing import Optional, Tuple
 import numpy as np
@@ -34,47 +33,24 @@ from mindspore.common.initializer import initializer, Normal
 from mindspore import log as logger
 
 from mindnlp.abc import PreTrainedModel
+from mindnlp.generation.utils import concat_past_key_values, trim_past_key_values, crop_past_key_values
+from mindnlp.parallel.layers import gather_lm_logits
+from mindnlp.parallel.plans import TensorParallelPlan, ColwiseParallel, RowwiseParallel, VocabParallel, LMHeadParallel
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from .bloom_config import BloomConfig
 
 
+register_conversion_rules('bloom', [
+    RenameRule('.weight', '.gamma', when=('layernorm', 'ln')),
+    RenameRule('.bias', '.beta', when=('layernorm', 'ln')),
+    RenameRule('weight', 'embedding_table', when=('embed',)),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """torch to mindspore."""
-    prefix = kwargs.get("prefix", "")
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-        from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logger.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for k, v in state_dict.items():
-        if 'layernorm' in k or 'ln' in k:
-            if '.weight' in k:
-                k = k.replace('.weight', '.gamma')
-            if '.bias' in k:
-                k = k.replace('.bias', '.beta')
-        if 'embed' in k:
-            k = k.replace('weight', 'embedding_table')
-        if prefix:
-            k = prefix + "." + k
-        ms_ckpt.append({'name': k, 'data': Tensor(v.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin','mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, please checkout the path.') \
-            from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'bloom', prefix=kwargs.get('prefix', ''))
+
 
 def _make_causal_mask(input_ids_shape, past_key_values_length):
     """
@@ -423,6 +399,18 @@ class BloomPreTrainedModel(PreTrainedModel):
     base_model_prefix = "transformer"
     supports_gradient_checkpointing = True
     _no_split_modules = ["BloomBlock"]
+    tensor_parallel_plan = TensorParallelPlan(
+        layers={
+            r"word_embeddings": VocabParallel(),
+            r"h\.\d+\.self_attention\.query_key_value": ColwiseParallel(),
+            r"h\.\d+\.self_attention\.dense": RowwiseParallel(),
+            r"h\.\d+\.mlp\.dense_h_to_4h": ColwiseParallel(),
+            r"h\.\d+\.mlp\.dense_4h_to_h": RowwiseParallel(),
+            r"lm_head": LMHeadParallel(),
+        },
+        divided_attributes={"BloomAttention": ("num_heads", "hidden_size", "split_size")},
+        head_ranges={"BloomModel": {"alibi_head_range": "num_heads"}},
+    )
 
     def _init_weights(self, cell):
         """Initialize the weights"""
@@ -444,6 +432,45 @@ class BloomPreTrainedModel(PreTrainedModel):
             cell.gamma.set_data(initializer('ones', cell.gamma.shape, cell.gamma.dtype))
             cell.beta.set_data(initializer('zeros', cell.beta.shape, cell.beta.dtype))
 
+    @staticmethod
+    def _convert_to_standard_cache(
+        past_key_value: Tuple[Tuple[mindspore.Tensor, mindspore.Tensor]], batch_size: int
+    ) -> Tuple[Tuple[mindspore.Tensor, mindspore.Tensor]]:
+        """
+        Standardizes the format of the cache so as to match most implementations, i.e. to tuple(tuple([batch_size,
+        num_heads, ...]))
+        """
+        batch_size_times_num_heads, head_dim, seq_length = past_key_value[0][0].shape
+        num_heads = batch_size_times_num_heads // batch_size
+        # key: [batch_size * num_heads, head_dim, seq_length] -> [batch_size, num_heads, head_dim, seq_length]
+        # value: [batch_size * num_heads, seq_length, head_dim] -> [batch_size, num_heads, seq_length, head_dim]
+        return tuple(
+            (
+                layer_past[0].view(batch_size, num_heads, head_dim, seq_length),
+                layer_past[1].view(batch_size, num_heads, seq_length, head_dim),
+            )
+            for layer_past in past_key_value
+        )
+
+    @staticmethod
+    def _convert_to_bloom_cache(
+        past_key_value: Tuple[Tuple[mindspore.Tensor, mindspore.Tensor]]
+    ) -> Tuple[Tuple[mindspore.Tensor, mindspore.Tensor]]:
+        """
+        Converts the cache to the format expected by Bloom, i.e. to tuple(tuple([batch_size * num_heads, ...]))
+        """
+        batch_size, num_heads, head_dim, seq_length = past_key_value[0][0].shape
+        batch_size_times_num_heads = batch_size * num_heads
+        # key:  [batch_size, num_heads, head_dim, seq_length] -> [batch_size * num_heads, head_dim, seq_length]
+        # value: [batch_size, num_heads, seq_length, head_dim] -> [batch_size * num_heads, seq_length, head_dim]
+        return tuple(
+            (
+                layer_past[0].view(batch_size_times_num_heads, head_dim, seq_length),
+                layer_past[1].view(batch_size_times_num_heads, seq_length, head_dim),
+            )
+            for layer_past in past_key_value
+        )
+
 
 class BloomModel(BloomPreTrainedModel):
     """Bloom Model"""
@@ -452,6 +479,8 @@ class BloomModel(BloomPreTrainedModel):
 
         self.embed_dim = config.hidden_size
         self.num_heads = config.n_head
+        # the heads of the rank when the model is tensor parallel
+        self.alibi_head_range = None
 
         # Embedding + LN Embedding
         self.word_embeddings = nn.Embedding(config.vocab_size, self.embed_dim)
@@ -468,7 +497,13 @@ class BloomModel(BloomPreTrainedModel):
 
     def build_alibi_tensor(self, attention_mask, num_heads, dtype) -> mindspore.Tensor:
         """build alibi tensor"""
-        return build_alibi_tensor(attention_mask, num_heads, dtype)
+        alibi = build_alibi_tensor(attention_mask, num_heads, dtype)
+        if self.alibi_head_range is None:
+            return alibi
+        start, end = self.alibi_head_range
+        batch_size = attention_mask.shape[0]
+        alibi = alibi.view(batch_size, num_heads, 1, -1)[:, start:end]
+        return alibi.reshape(batch_size * (end - start), 1, -1)
 
     def get_input_embeddings(self):
         return self.word_embeddings
@@ -600,6 +635,7 @@ class BloomForCausalLM(BloomPreTrainedModel):
         super().__init__(config)
         self.transformer = BloomModel(config)
         self.lm_head = nn.Dense(config.hidden_size, config.vocab_size, has_bias=False)
+        self.loss_fct = CrossEntropyLoss()
 
         # Initialize weights and apply final processing
         self.post_init()
@@ -689,10 +725,12 @@ class BloomForCausalLM(BloomPreTrainedModel):
             shift_labels = labels[..., 1:]
             batch_size, seq_length, vocab_size = shift_logits.shape
             # Flatten the tokens
-            loss_fct = CrossEntropyLoss()
-            loss = loss_fct(
+            loss = self.loss_fct(
                 shift_logits.view(batch_size * seq_length, vocab_size), shift_labels.view(batch_size * seq_length)
             )
+        else:
+            # the logits of a parallel lm head are split over the ranks, only its parallel loss takes them so
+            lm_logits = gather_lm_logits(self.lm_head, lm_logits)
 
         output = (lm_logits,) + transformer_outputs[1:]
         return ((loss,) + output) if loss is not None else output
@@ -707,21 +745,33 @@ class BloomForCausalLM(BloomPreTrainedModel):
 
         Output shares the same memory storage as `past`.
         """
-        standardized_past = self._convert_to_standard_cache(past, batch_size=len(beam_idx))
+        standardized_past = self._convert_to_standard_cache(past, batch_size=past[0][0].shape[0] // self.config.n_head)
 
-        # Get a copy of `beam_idx` on all the devices where we need those indices.
-        device_to_beam_idx = {
-            past_state.device: beam_idx.to(past_state.device) for layer_past in past for past_state in layer_past
-        }
         reordered_past = tuple(
             (
-                layer_past[0].index_select(0, device_to_beam_idx[layer_past[0].device]),
-                layer_past[1].index_select(0, device_to_beam_idx[layer_past[0].device]),
+                layer_past[0].index_select(0, beam_idx),
+                layer_past[1].index_select(0, beam_idx),
             )
             for layer_past in standardized_past
         )
         return self._convert_to_bloom_cache(reordered_past)
 
+    def _merge_cache(self, past, other_past):
+        """
+        Concatenates the `past_key_values` of two batches, the keys are cached as `(batch_size * num_heads, head_dim,
+        seq_length)` and the values as `(batch_size * num_heads, seq_length, head_dim)`.
+        """
+        # the batch axis is fused with the heads, so the tensors are concatenated along it as is
+        return concat_past_key_values(past, other_past, batch_axis=0, seq_axis=(2, 1))
+
+    def _trim_cache(self, past, num_tokens):
+        """Drops the first `num_tokens` positions of the `past_key_values`."""
+        return trim_past_key_values(past, num_tokens, seq_axis=(2, 1))
+
+    def _crop_cache(self, past, max_length):
+        """Keeps the first `max_length` positions of the `past_key_values`."""
+        return crop_past_key_values(past, max_length, seq_axis=(2, 1))
+
 
 class BloomForSequenceClassification(BloomPreTrainedModel):
     """bloom for sequence classification."""
@@ -26,6 +26,7 @@ from mindspore.common.initializer import Normal, initializer
 from mindnlp.models.utils.activations import ACT2FN
 from mindnlp.models.codegen.codegen_config import CodeGenConfig
 from mindnlp.abc import PreTrainedModel
+from mindnlp.generation.kv_cache import KVCache, KVCacheLayer
 
 
 _CHECKPOINT_FOR_DOC = "Salesforce/codegen-2B-mono"
@@ -136,16 +137,22 @@ class CodeGenAttention(nn.Cell):
             head_mask=None,
     ):
 
+        # a paged key/value cache is passed as both `key` and `value`, it reads the cached states block by block
+        paged = isinstance(key, KVCacheLayer)
+
         # compute causal mask from causal mask buffer
         # query_length, key_length = query.shape(-2), key.shape(-2)
-        query_length, key_length = query.shape[-2], key.shape[-2]
+        query_length, key_length = query.shape[-2], key.get_seq_length() if paged else key.shape[-2]
         causal_mask = self.causal_mask[:, :, key_length - query_length: key_length, :key_length]
+        dtype = query.dtype
 
         # Keep the attention weights computation in fp32 to avoid overflow issues
         query = query.astype(mindspore.float32)
-        key = key.astype(mindspore.float32)
-
-        attn_weights = ops.matmul(query, key.swapaxes(-1, -2))
+        if paged:
+            attn_weights = key.attention_scores(query)
+        else:
+            key = key.astype(mindspore.float32)
+            attn_weights = ops.matmul(query, key.swapaxes(-1, -2))
 
         attn_weights = attn_weights / self.scale_attn
         # mask_value = torch.finfo(attn_weights.dtype).min
@@ -162,14 +169,14 @@ class CodeGenAttention(nn.Cell):
             attn_weights = attn_weights + attention_mask
 
         attn_weights = nn.Softmax(axis=-1)(attn_weights)
-        attn_weights = attn_weights.astype(value.dtype)
+        attn_weights = attn_weights.astype(dtype)
         attn_weights = self.attn_dropout(attn_weights)
 
         # Mask heads if we want to
         if head_mask is not None:
             attn_weights = attn_weights * head_mask
 
-        attn_output = ops.matmul(attn_weights, value)
+        attn_output = value.attention_output(attn_weights) if paged else ops.matmul(attn_weights, value)
 
         return attn_output, attn_weights
 
@@ -199,7 +206,10 @@ class CodeGenAttention(nn.Cell):
         seq_len = key.shape[1]
         offset = 0
 
-        if layer_past is not None:
+        if isinstance(layer_past, KVCacheLayer):
+            offset = layer_past.get_seq_length()
+            seq_len += offset
+        elif layer_past is not None:
             offset = layer_past[0].shape[-2]
             seq_len += offset
 
@@ -224,14 +234,17 @@ class CodeGenAttention(nn.Cell):
         key = key.transpose(0, 2, 1, 3)
         query = query.transpose(0, 2, 1, 3)
 
-        if layer_past is not None:
+        if isinstance(layer_past, KVCacheLayer):
+            layer_past.append(key, value)
+            key = value = layer_past
+        elif layer_past is not None:
             past_key = layer_past[0]
             past_value = layer_past[1]
             key = mindspore.ops.cat((past_key, key), axis=-2)
             value = mindspore.ops.cat((past_value, value), axis=-2)
 
         if use_cache is True:
-            present = (key, value)
+            present = layer_past if isinstance(layer_past, KVCacheLayer) else (key, value)
         else:
             present = None
 
@@ -326,6 +339,7 @@ class CodeGenPreTrainedModel(PreTrainedModel):
     base_model_prefix = "transformer"
     supports_gradient_checkpointing = True
     _no_split_modules = ["CodeGenBlock"]
+    _supports_paged_kv_cache = True
 
     def get_position_embeddings(self):
         pass
@@ -436,6 +450,8 @@ class CodeGenModel(CodeGenPreTrainedModel):
         if past_key_values is None:
             past_length = 0
             past_key_values = tuple([None] * len(self.h))
+        elif isinstance(past_key_values, KVCache):
+            past_length = past_key_values.get_seq_length()
         else:
             past_length = past_key_values[0][0].shape[-2]
 
@@ -512,6 +528,9 @@ class CodeGenModel(CodeGenPreTrainedModel):
         if output_hidden_states:
             all_hidden_states = all_hidden_states + (hidden_states,)
 
+        if use_cache is True and isinstance(past_key_values, KVCache):
+            presents = past_key_values
+
         return tuple(v for v in [hidden_states, presents, all_hidden_states, all_self_attentions] if v is not None)
 
 
@@ -619,7 +638,9 @@ class CodeGenForCausalLM(CodeGenPreTrainedModel):
     def _reorder_cache(
             past_key_values: Tuple[Tuple[mindspore.Tensor]], beam_idx: mindspore.Tensor
     ):
+        if isinstance(past_key_values, KVCache):
+            return past_key_values.reorder_cache(beam_idx)
         return tuple(
-            tuple(past_state.index_select(0, beam_idx.to(past_state.device)) for past_state in layer_past)
+            tuple(past_state.index_select(0, beam_idx) for past_state in layer_past)
             for layer_past in past_key_values
         )
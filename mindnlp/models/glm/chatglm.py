@@ -22,7 +22,6 @@
 
 import math
 import copy
-import os
 import warnings
 import re
 
@@ -38,9 +37,13 @@ from mindspore import Parameter, Tensor
 from mindnlp.abc import PreTrainedModel
 from mindnlp.generation.logits_process import LogitsProcessor, LogitsProcessorList
 from mindnlp.generation.stopping_criteria import StoppingCriteriaList
+from mindnlp.generation.utils import concat_past_key_values, trim_past_key_values
 from mindnlp.abc import GenerationConfig
 from mindnlp.modules import functional as F
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.parallel.layers import gather_lm_logits
+from mindnlp.parallel.plans import TensorParallelPlan, ColwiseParallel, RowwiseParallel, VocabParallel, LMHeadParallel
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from .chatglm_config import ChatGLMConfig
 
 PRETRAINED_MODEL_ARCHIVE_MAP = {
@@ -48,44 +51,17 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
 }
 
 
+register_conversion_rules('chatglm', [
+    RenameRule('.weight', '.gamma', when=('layernorm',)),
+    RenameRule('.bias', '.beta', when=('layernorm',)),
+    RenameRule('weight', 'embedding_table', when=('embeddings',)),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """convert torch checkpoint to mindspore"""
-    _ = kwargs.get('prefix', '')
-
-    ms_ckpt_path = re.sub(r'pytorch_model(.*).bin', r'mindspore\1.ckpt', pth_file)
-    if os.path.exists(ms_ckpt_path):
-        return ms_ckpt_path
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-                          from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logger.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for key, value in state_dict.items():
-        if 'layernorm' in key:
-            if '.weight' in key:
-                key = key.replace('.weight', '.gamma')
-            if '.bias' in key:
-                key = key.replace('.bias', '.beta')
-        if 'embeddings' in key:
-            key = key.replace('weight', 'embedding_table')
-        ms_ckpt.append({'name': key, 'data': Tensor(value.numpy())})
-
-    try:
-        save_checkpoint(ms_ckpt, ms_ckpt_path)
-    except Exception as exc:
-        raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, '
-                            f'please checkout the path.') from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'chatglm')
+
 
 class InvalidScoreLogitsProcessor(LogitsProcessor):
     """Invalid Score Processer."""
@@ -590,6 +566,17 @@ class ChatGLMPreTrainedModel(PreTrainedModel):
     base_model_prefix = "transformer"
     _no_split_modules = ["GLMBlock"]
     pretrained_model_archive_map = PRETRAINED_MODEL_ARCHIVE_MAP
+    tensor_parallel_plan = TensorParallelPlan(
+        layers={
+            r"word_embeddings": VocabParallel(),
+            r"layers\.\d+\.attention\.query_key_value": ColwiseParallel(),
+            r"layers\.\d+\.attention\.dense": RowwiseParallel(),
+            r"layers\.\d+\.mlp\.dense_h_to_4h": ColwiseParallel(),
+            r"layers\.\d+\.mlp\.dense_4h_to_h": RowwiseParallel(),
+            r"lm_head": LMHeadParallel(),
+        },
+        divided_attributes={"SelfAttention": ("num_attention_heads_per_partition", "hidden_size_per_partition")},
+    )
     convert_torch_to_mindspore = torch_to_mindspore
 
     def _init_weights(self, cell: nn.Cell):
@@ -846,6 +833,7 @@ class ChatGLMForConditionalGeneration(ChatGLMPreTrainedModel):
         self.position_encoding_2d = config.position_encoding_2d
         self.transformer = ChatGLMModel(config)
         self.lm_head = nn.Dense(config.hidden_size, config.vocab_size, has_bias=False).to_float(mindspore.float16)
+        self.loss_fct = CrossEntropyLoss(ignore_index=-100)
 
         self.config = config
 
@@ -954,6 +942,40 @@ class ChatGLMForConditionalGeneration(ChatGLMPreTrainedModel):
             "attention_mask": attention_mask
         }
 
+    def prepare_inputs_for_continuous_batching(
+            self,
+            input_ids: mindspore.Tensor,
+            past_key_values: Optional[Tuple[Tuple[mindspore.Tensor, mindspore.Tensor], ...]] = None,
+            attention_mask: Optional[mindspore.Tensor] = None,
+    ) -> dict:
+        """
+        prepare inputs of a decoding step of the continuous batching scheduler, the positions are computed on the
+        unpadded sequences and the 2D padding mask is turned into the boolean mask of ChatGLM.
+        """
+        if past_key_values is None:
+            return self.prepare_inputs_for_generation(input_ids)
+
+        MASK, gMASK = self.config.mask_token_id, self.config.gmask_token_id
+        seqs = input_ids.asnumpy().tolist()
+        num_pads = (attention_mask == 0).astype(mindspore.int32).sum(-1).asnumpy().tolist()
+        position_ids = []
+        for seq, num_pad in zip(seqs, num_pads):
+            seq = seq[num_pad:]
+            mask_token = gMASK if gMASK in seq else MASK
+            mask_position = seq.index(mask_token)
+            if self.position_encoding_2d:
+                position_ids.append([mask_position, len(seq) - seq.index(self.config.bos_token_id)])
+            else:
+                position_ids.append(mask_position)
+
+        return {
+            "input_ids": input_ids[:, -1:],
+            "past_key_values": past_key_values,
+            "position_ids": mindspore.Tensor(position_ids, dtype=mindspore.int32).unsqueeze(-1),
+            # True marks the positions which can not be attended
+            "attention_mask": (attention_mask == 0)[:, None, None, :],
+        }
+
     def construct(
             self,
             input_ids: Optional[mindspore.Tensor] = None,
@@ -996,11 +1018,13 @@ class ChatGLMForConditionalGeneration(ChatGLMPreTrainedModel):
             shift_logits = lm_logits[..., :-1, :]
             shift_labels = labels[..., 1:]
             # Flatten the tokens
-            loss_fct = CrossEntropyLoss(ignore_index=-100)
-            loss = loss_fct(shift_logits.view(-1, shift_logits.shape[-1]), shift_labels.view(-1))
+            loss = self.loss_fct(shift_logits.view(-1, shift_logits.shape[-1]), shift_labels.view(-1))
 
             lm_logits = lm_logits.to(hidden_states.dtype)
             loss = loss.to(hidden_states.dtype)
+        else:
+            # the logits of a parallel lm head are split over the ranks, only its parallel loss takes them so
+            lm_logits = gather_lm_logits(self.lm_head, lm_logits)
 
         output = (lm_logits,) + transformer_outputs[1:]
         return ((loss,) + output) if loss is not None else output
@@ -1025,6 +1049,17 @@ class ChatGLMForConditionalGeneration(ChatGLMPreTrainedModel):
             for layer_past in past
         )
 
+    def _merge_cache(self, past, other_past):
+        """
+        Concatenates the `past_key_values` of two batches, the cached tensors are `(seq_length, batch_size,
+        num_heads, head_dim)`.
+        """
+        return concat_past_key_values(past, other_past, batch_axis=1, seq_axis=0)
+
+    def _trim_cache(self, past, num_tokens):
+        """Drops the first `num_tokens` positions of the `past_key_values`."""
+        return trim_past_key_values(past, num_tokens, seq_axis=0)
+
     def process_response(self, response):
         """process response."""
         response = response.strip()
@@ -21,8 +21,6 @@
 # pylint: disable=E0401
 
 """MindNLP gpt model"""
-import os
-import logging
 import numpy as np
 import mindspore
 from mindspore import nn
@@ -34,6 +32,7 @@ from mindnlp._legacy.nn import Dropout, Matmul
 from mindnlp._legacy.functional import split, softmax, arange
 from mindnlp.abc import PreTrainedModel
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from ..utils.utils import Conv1D, prune_conv1d_layer, find_pruneable_heads_and_indices
 from ..utils.utils import SequenceSummary
 from ..utils.activations import ACT2FN
@@ -45,44 +44,16 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
 }
 
 
+register_conversion_rules('openai-gpt', [
+    RenameRule('.weight', '.gamma', when=('ln',)),
+    RenameRule('.bias', '.beta', when=('ln',)),
+    RenameRule('weight', 'embedding_table', when=('embed',)),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """torch to mindspore."""
-    prefix = kwargs.get("prefix", "")
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-        from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logging.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for k, v in state_dict.items():
-        if 'ln' in k:
-            if '.weight' in k:
-                k = k.replace('.weight', '.gamma')
-            if '.bias' in k:
-                k = k.replace('.bias', '.beta')
-        if 'embed' in k:
-            k = k.replace('weight', 'embedding_table')
-        if prefix:
-            k = prefix + "." + k
-        ms_ckpt.append({'name': k, 'data': Tensor(v.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin','mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, please checkout the path.') \
-            from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'openai-gpt', prefix=kwargs.get('prefix', ''))
 
 
 class MLP(nn.Cell):
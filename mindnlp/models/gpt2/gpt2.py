@@ -16,11 +16,11 @@
 # pylint: disable=C0103
 # pylint: disable=C0415
 # pylint: disable=E0401
+# pylint: disable=W0613
 """MindNLP gpt2 model"""
 
 from typing import Optional, Tuple
 
-import os
 import math
 import mindspore
 import numpy as np
@@ -31,6 +31,10 @@ from mindnlp.abc import PreTrainedModel
 from mindnlp._legacy.functional import split, where, arange, softmax
 from mindnlp._legacy.nn import Dropout, Matmul
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.generation.kv_cache import KVCache, KVCacheLayer
+from mindnlp.parallel.layers import gather_lm_logits
+from mindnlp.parallel.plans import TensorParallelPlan, ColwiseParallel, RowwiseParallel, VocabParallel, LMHeadParallel
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from ..utils.activations import ACT2FN
 from ..utils.utils import SequenceSummary
 from ..utils.utils import Conv1D, prune_conv1d_layer, find_pruneable_heads_and_indices
@@ -45,46 +49,16 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
 __all__ = ['GPT2Attention', 'GPT2DoubleHeadsModel', 'GPT2ForSequenceClassification',
            'GPT2ForTokenClassification', 'GPT2LMHeadModel', 'GPT2Model', 'GPT2MLP']
 
+register_conversion_rules('gpt2', [
+    RenameRule('.weight', '.embedding_table', when=('wte.', 'wpe.')),
+    RenameRule('.weight', '.gamma', unless=('lm_head.weight', '.c_attn', '.q_attn', '.c_proj', '.c_fc')),
+    RenameRule('.bias', '.beta', unless=('.attn.bias', '.c_attn', '.q_attn', '.c_proj', '.c_fc')),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """torch to mindspore."""
-    prefix = kwargs.get("prefix", "")
-
-    import logging
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-            from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logging.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for k, v in state_dict.items():
-        if 'wte.' in k:
-            k = k.replace('.weight', '.embedding_table')
-        if 'wpe.' in k:
-            k = k.replace('.weight', '.embedding_table')
-        if 'weight' in k and not any(e in k for e in ['lm_head.weight', '.c_attn', '.q_attn', '.c_proj', '.c_fc']):
-            k = k.replace('.weight', '.gamma')
-        if '.bias' in k and not any(e in k for e in ['.attn.bias', '.c_attn', '.q_attn', '.c_proj', '.c_fc']):
-            k = k.replace('.bias', '.beta')
-        if prefix:
-            k = prefix + "." + k
-        ms_ckpt.append({'name': k, 'data': Tensor(v.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin', 'mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, please checkout the path.') \
-                from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'gpt2', prefix=kwargs.get('prefix', ''))
 
 
 class GPT2Attention(nn.Cell):
@@ -154,10 +128,12 @@ class GPT2Attention(nn.Cell):
         self.pruned_heads = self.pruned_heads.union(heads)
 
     def _attn(self, query, key, value, attention_mask=None, head_mask=None):
-        attn_weights = self.matmul(query, key.swapaxes(-1, -2))
+        # a paged key/value cache is passed as both `key` and `value`, it reads the cached states block by block
+        paged = isinstance(key, KVCacheLayer)
+        attn_weights = key.attention_scores(query) if paged else self.matmul(query, key.swapaxes(-1, -2))
 
         if self.scale_attn_weights:
-            attn_weights = attn_weights / ops.sqrt(ops.scalar_to_tensor(value.shape[-1]))
+            attn_weights = attn_weights / ops.sqrt(ops.scalar_to_tensor(query.shape[-1]))
 
         # Layer-wise attention scaling
         if self.scale_attn_by_inverse_layer_idx:
@@ -165,7 +141,7 @@ class GPT2Attention(nn.Cell):
 
         if not self.is_cross_attention:
             # if only "normal" attention layer implements causal mask
-            query_length, key_length = query.shape[-2], key.shape[-2]
+            query_length, key_length = query.shape[-2], key.get_seq_length() if paged else key.shape[-2]
             causal_mask = self.bias[:, :, key_length - query_length: key_length, :key_length]
             multiplu_out = Tensor(1.0, mindspore.float32) - causal_mask
             adder = multiplu_out * self.masked_bias
@@ -178,21 +154,22 @@ class GPT2Attention(nn.Cell):
         attn_weights = softmax(attn_weights, axis=-1)
 
         # Downcast (if necessary) back to V's dtype (if in mixed-precision) -- No-Op otherwise
-        attn_weights = attn_weights.astype(value.dtype)
+        attn_weights = attn_weights.astype(query.dtype if paged else value.dtype)
         attn_weights = self.attn_dropout(attn_weights)
 
         # Mask heads if we want to
         if head_mask is not None:
             attn_weights = attn_weights * head_mask
 
-        attn_output = self.matmul(attn_weights, value)
+        attn_output = value.attention_output(attn_weights) if paged else self.matmul(attn_weights, value)
 
         return attn_output, attn_weights
 
     def _upcast_and_reordered_attn(self, query, key, value, attention_mask=None, head_mask=None):
         # Use `mindspore.baddbmm` (a bit more efficient w/ alpha param for scaling -- from Megatron-LM)
+        paged = isinstance(key, KVCacheLayer)
         bsz, num_heads, q_seq_len, _ = query.shape
-        _, _, k_seq_len, _ = key.shape
+        k_seq_len = key.get_seq_length() if paged else key.shape[-2]
 
         # Preallocate attn_weights for `baddbmm`
         attn_weights = ops.zeros((bsz * num_heads, q_seq_len, k_seq_len), dtype=mindspore.float32)
@@ -200,13 +177,13 @@ class GPT2Attention(nn.Cell):
         # Compute Scale Factor
         scale_factor = 1.0
         if self.scale_attn_weights:
-            scale_factor /= float(value.shape[-1]) ** 0.5
+            scale_factor /= float(query.shape[-1]) ** 0.5
 
         if self.scale_attn_by_inverse_layer_idx:
             scale_factor /= float(self.layer_idx + 1)
 
         if not self.is_cross_attention:
-            query_length, key_length = query.shape[-2], key.shape[-2]
+            query_length, key_length = query.shape[-2], k_seq_len
             causal_mask = self.bias[:, :, key_length - query_length: key_length, :key_length].bool()
             mask_value = Tensor(np.finfo(dtype_to_nptype(attn_weights.dtype)).min, dtype=attn_weights.dtype)
             attn_weights = where(causal_mask, attn_weights, mask_value)
@@ -220,14 +197,14 @@ class GPT2Attention(nn.Cell):
         # Downcast (if necessary) back to V's dtype (if in mixed-precision) -- No-Op if otherwise
         if attn_weights.dtype != mindspore.float32:
             raise RuntimeError("Error with upcasting, attn_weights does not have dtype mindspore.float32")
-        attn_weights = attn_weights.astype(value.dtype)
+        attn_weights = attn_weights.astype(query.dtype if paged else value.dtype)
         attn_weights = self.attn_dropout(attn_weights)
 
         # Mask heads if we want to
         if head_mask is not None:
             attn_weights = attn_weights * head_mask
 
-        attn_output = self.matmul(attn_weights, value)
+        attn_output = value.attention_output(attn_weights) if paged else self.matmul(attn_weights, value)
 
         return attn_output, attn_weights
 
@@ -274,13 +251,16 @@ class GPT2Attention(nn.Cell):
         key = self._split_heads(key, self.num_heads, self.head_dim)
         value = self._split_heads(value, self.num_heads, self.head_dim)
 
-        if layer_past is not None:
+        if isinstance(layer_past, KVCacheLayer):
+            layer_past.append(key, value)
+            key = value = layer_past
+        elif layer_past is not None:
             past_key, past_value = layer_past
             key = ops.cat((past_key, key), axis=-2)
             value = ops.cat((past_value, value), axis=-2)
 
         if use_cache is True:
-            present = (key, value)
+            present = layer_past if isinstance(layer_past, KVCacheLayer) else (key, value)
         else:
             present = None
 
@@ -412,6 +392,21 @@ class GPT2PreTrainedModel(PreTrainedModel):
     is_parallelizable = True
     supports_gradient_checkpointing = True
     _no_split_modules = ["GPT2Block"]
+    _supports_paged_kv_cache = True
+    tensor_parallel_plan = TensorParallelPlan(
+        layers={
+            r"wte": VocabParallel(),
+            r"h\.\d+\.attn\.c_attn": ColwiseParallel(chunks=3),
+            r"h\.\d+\.attn\.c_proj": RowwiseParallel(),
+            r"h\.\d+\.crossattention\.c_attn": ColwiseParallel(chunks=2),
+            r"h\.\d+\.crossattention\.q_attn": ColwiseParallel(),
+            r"h\.\d+\.crossattention\.c_proj": RowwiseParallel(),
+            r"h\.\d+\.mlp\.c_fc": ColwiseParallel(),
+            r"h\.\d+\.mlp\.c_proj": RowwiseParallel(),
+            r"lm_head": LMHeadParallel(),
+        },
+        divided_attributes={"GPT2Attention": ("num_heads", "split_size", "embed_dim")},
+    )
 
     def get_head_mask(self, head_mask, num_hidden_layers, is_attention_chunked=False):
         """
@@ -550,6 +545,8 @@ class GPT2Model(GPT2PreTrainedModel):
         if past_key_values is None:
             past_length = 0
             past_key_values = tuple([None] * len(self.h))
+        elif isinstance(past_key_values, KVCache):
+            past_length = past_key_values.get_seq_length()
         else:
             past_length = past_key_values[0][0].shape[-2]
         if position_ids is None:
@@ -623,6 +620,8 @@ class GPT2Model(GPT2PreTrainedModel):
         if self.output_hidden_states:
             all_hidden_states = all_hidden_states + (hidden_states,)
 
+        if self.use_cache and isinstance(past_key_values, KVCache):
+            presents = past_key_values
         outputs = (hidden_states, presents)
         if self.output_attentions:
             outputs += (all_hidden_states, all_self_attentions)
@@ -676,7 +675,7 @@ class GPT2LMHeadModel(GPT2PreTrainedModel):
         if attention_mask is not None and position_ids is None:
             # create position_ids on the fly for batch generation
             position_ids = attention_mask.long().cumsum(-1) - 1
-            position_ids.masked_fill_(attention_mask == 0, 1)
+            position_ids = position_ids.masked_fill(attention_mask == 0, 1)
             if past_key_values:
                 position_ids = position_ids[:, -1].expand_dims(-1)
         else:
@@ -702,8 +701,13 @@ class GPT2LMHeadModel(GPT2PreTrainedModel):
             encoder_hidden_states: Optional[Tensor] = None,
             encoder_attention_mask: Optional[Tensor] = None,
             labels: Optional[Tensor] = None,
+            use_cache: Optional[bool] = None,
+            return_dict: Optional[bool] = None,
+            output_attentions: Optional[bool] = None,
+            output_hidden_states: Optional[bool] = None,
     ):
-
+        # `use_cache`, `return_dict` and the `output_*` flags are passed by `generate`, the outputs are controlled by
+        # the config of the model.
         transformer_outputs = self.transformer(
             input_ids,
             past_key_values=past_key_values,
@@ -726,6 +730,9 @@ class GPT2LMHeadModel(GPT2PreTrainedModel):
             shift_labels = labels[..., 1:]
             # Flatten the tokens
             loss = self.loss_fct(shift_logits.view(-1, shift_logits.shape[-1]), shift_labels.view(-1))
+        else:
+            # the logits of a parallel lm head are split over the ranks, only its parallel loss takes them so
+            lm_logits = gather_lm_logits(self.lm_head, lm_logits)
 
         output = (lm_logits,) + transformer_outputs[1:]
         if loss is not None:
@@ -739,8 +746,10 @@ class GPT2LMHeadModel(GPT2PreTrainedModel):
         [`~PreTrainedModel.beam_sample`] is called. This is required to match `past_key_values` with the correct
         beam_idx at every generation step.
         """
+        if isinstance(past, KVCache):
+            return past.reorder_cache(beam_idx)
         return tuple(
-            tuple(past_state.index_select(0, beam_idx.astype(past_state.device)) for past_state in layer_past)
+            tuple(past_state.index_select(0, beam_idx) for past_state in layer_past)
             for layer_past in past
         )
 
@@ -757,6 +766,7 @@ class GPT2DoubleHeadsModel(GPT2PreTrainedModel):
         self.transformer = GPT2Model(config)
         self.lm_head = nn.Dense(config.hidden_size, config.vocab_size, has_bias=False)
         self.multiple_choice_head = SequenceSummary(config)
+        self.loss_fct = nn.CrossEntropyLoss()
         # Initialize weights and apply final processing
         self.post_init()
 
@@ -790,7 +800,7 @@ class GPT2DoubleHeadsModel(GPT2PreTrainedModel):
         if attention_mask is not None and position_ids is None:
             # create position_ids on the fly for batch generation
             position_ids = attention_mask.long().cumsum(-1) - 1
-            position_ids.masked_fill_(attention_mask == 0, 1)
+            position_ids = position_ids.masked_fill(attention_mask == 0, 1)
             if past_key_values:
                 position_ids = position_ids[:, -1].unsqueeze(-1)
         else:
@@ -831,8 +841,10 @@ class GPT2DoubleHeadsModel(GPT2PreTrainedModel):
         if labels is not None:
             shift_logits = lm_logits[..., :-1, :]
             shift_labels = labels[..., 1:]
-            loss_fct = nn.CrossEntropyLoss()
-            lm_loss = loss_fct(shift_logits.view(-1, shift_logits.shape[-1]), shift_labels.view(-1))
+            lm_loss = self.loss_fct(shift_logits.view(-1, shift_logits.shape[-1]), shift_labels.view(-1))
+        else:
+            # the logits of a parallel lm head are split over the ranks, only its parallel loss takes them so
+            lm_logits = gather_lm_logits(self.lm_head, lm_logits)
 
         output = (lm_logits, mc_logits) + transformer_outputs[1:]
         if mc_loss is not None:
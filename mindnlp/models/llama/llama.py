@@ -128,12 +128,42 @@ class Attention(nn.Cell):
             has_bias=False
         )
 
-        self.cache_k = numpy.zeros(
-            (config.max_batch_size, config.max_seq_len, self.n_local_heads, self.head_dim)
-        )
-        self.cache_v = numpy.zeros(
-            (config.max_batch_size, config.max_seq_len, self.n_local_heads, self.head_dim)
-        )
+        self.max_batch_size = config.max_batch_size
+        self.max_seq_len = config.max_seq_len
+        # the cache is allocated at the first forward, for the batch actually used, and grows with the sequence
+        self.cache_k = None
+        self.cache_v = None
+
+    def reset_cache(self):
+        '''
+        release the key/value cache, needed before running the model with another dtype
+        '''
+        self.cache_k = None
+        self.cache_v = None
+
+    def _prepare_cache(self, bsz: int, end_pos: int, dtype):
+        '''
+        make sure the cache holds `bsz` sequences of `end_pos` positions, the dtype of the cache is the one of the
+        projections, fixed when the cache is first allocated
+        '''
+        if bsz > self.max_batch_size:
+            raise ValueError(f"The batch size {bsz} is larger than `max_batch_size` ({self.max_batch_size}).")
+        if end_pos > self.max_seq_len:
+            raise ValueError(f"The sequence length {end_pos} is larger than `max_seq_len` ({self.max_seq_len}).")
+
+        if self.cache_k is not None and self.cache_k.shape[0] >= bsz and self.cache_k.shape[1] >= end_pos:
+            return
+        cur_bsz, cur_len = (0, 0) if self.cache_k is None else self.cache_k.shape[:2]
+        # the length is doubled so that growing the cache costs amortized O(1) copies per token
+        new_bsz = max(bsz, cur_bsz)
+        new_len = min(self.max_seq_len, max(end_pos, 2 * cur_len))
+        dtype = dtype if self.cache_k is None else self.cache_k.dtype
+        cache_k = ops.zeros((new_bsz, new_len, self.n_local_heads, self.head_dim), dtype)
+        cache_v = ops.zeros((new_bsz, new_len, self.n_local_heads, self.head_dim), dtype)
+        if self.cache_k is not None:
+            cache_k[:cur_bsz, :cur_len] = self.cache_k
+            cache_v[:cur_bsz, :cur_len] = self.cache_v
+        self.cache_k, self.cache_v = cache_k, cache_v
 
     def construct(self, _x: mindspore.Tensor, start_pos: int,
                 freqs_cis: mindspore.Tensor, mask: Optional[mindspore.Tensor]):
@@ -152,9 +182,9 @@ class Attention(nn.Cell):
 
         x_q, x_k = apply_rotary_emb(x_q, x_k, freqs_cis=freqs_cis)
 
-        self.cache_k = self.cache_k.astype(x_q.dtype)
-        self.cache_v = self.cache_v.astype(x_q.dtype)
+        self._prepare_cache(bsz, start_pos + seqlen, x_k.dtype)
 
+        # only the new positions are written, in place
         self.cache_k[:bsz, start_pos : start_pos + seqlen] = x_k
         self.cache_v[:bsz, start_pos : start_pos + seqlen] = x_v
 
@@ -166,7 +196,7 @@ class Attention(nn.Cell):
         x_q = ops.transpose(x_q, (0, 2, 1, 3))
         keys = ops.transpose(keys, (0, 2, 1, 3))
         values = ops.transpose(values, (0, 2, 1, 3))
-        scores = numpy.matmul(x_q, ops.transpose(keys, (0, 1, 3, 2))) / math.sqrt(self.head_dim)
+        scores = ops.matmul(x_q, ops.transpose(keys, (0, 1, 3, 2))) / math.sqrt(self.head_dim)
         if mask is not None:
             scores = scores + mask  # (bs, n_local_heads, slen, cache_len + slen)
         scores = ops.softmax(scores.astype(mindspore.float32), axis=-1).astype(x_q.dtype)
@@ -252,7 +282,8 @@ class Transformer(nn.Cell):
 
         mask = None
         if seqlen > 1:
-            mask = numpy.full((1, 1, seqlen, seqlen), float("-inf"))
+            # the new tokens attend to all the cached positions and causally to each other
+            mask = numpy.full((1, 1, seqlen, start_pos + seqlen), float("-inf"))
             mask = numpy.triu(mask, k=start_pos + 1).astype(_h.dtype)
 
         for layer in self.layers:
@@ -260,3 +291,10 @@ class Transformer(nn.Cell):
         _h = self.norm(_h) # h = [bsz * seqlen * emb_dim]
         output = self.output(_h[:, -1, :])  # only compute last logits  output = [bsz * vocab_size]
         return ops.cast(output, mindspore.float32)
+
+    def reset_cache(self):
+        '''
+        release the key/value caches of all the layers, to start decoding a new batch
+        '''
+        for layer in self.layers:
+            layer.attention.reset_cache()
@@ -32,6 +32,8 @@ from mindspore.common.initializer import initializer, Normal
 from mindspore import log as logger
 
 from mindnlp.abc import PreTrainedModel
+from mindnlp.parallel.layers import gather_lm_logits
+from mindnlp.parallel.plans import TensorParallelPlan, ColwiseParallel, RowwiseParallel, VocabParallel, LMHeadParallel
 from .llama_hf_config import LlamaConfig
 from ..utils.activations import ACT2FN
 
@@ -332,6 +334,17 @@ class LlamaPreTrainedModel(PreTrainedModel):
     supports_gradient_checkpointing = True
     _no_split_modules = ["LlamaDecoderLayer"]
     _keys_to_ignore_on_load_unexpected = [r"decoder\.version"]
+    tensor_parallel_plan = TensorParallelPlan(
+        layers={
+            r"embed_tokens": VocabParallel(),
+            r"layers\.\d+\.self_attn\.(q_proj|k_proj|v_proj)": ColwiseParallel(),
+            r"layers\.\d+\.self_attn\.o_proj": RowwiseParallel(),
+            r"layers\.\d+\.mlp\.(gate_proj|up_proj)": ColwiseParallel(),
+            r"layers\.\d+\.mlp\.down_proj": RowwiseParallel(),
+            r"lm_head": LMHeadParallel(),
+        },
+        divided_attributes={"LlamaAttention": ("num_heads", "hidden_size")},
+    )
 
     def init_model_weights(self):
         """
@@ -593,6 +606,7 @@ class LlamaForCausalLM(LlamaPreTrainedModel):
         self.model = LlamaModel(config)
 
         self.lm_head = nn.Dense(config.hidden_size, config.vocab_size, has_bias=False)
+        self.loss_fct = nn.CrossEntropyLoss()
 
         # Initialize weights and apply final processing
         self.post_init()
@@ -691,11 +705,12 @@ class LlamaForCausalLM(LlamaPreTrainedModel):
             shift_logits = logits[..., :-1, :]
             shift_labels = labels[..., 1:]
             # Flatten the tokens
-            loss_fct = nn.CrossEntropyLoss()
-            shift_logits = shift_logits.view(-1, self.config.vocab_size)
+            shift_logits = shift_logits.view(-1, shift_logits.shape[-1])
             shift_labels = shift_labels.view(-1)
-            # Enable model parallelism
-            loss = loss_fct(shift_logits, shift_labels)
+            loss = self.loss_fct(shift_logits, shift_labels)
+        else:
+            # the logits of a parallel lm head are split over the ranks, only its parallel loss takes them so
+            logits = gather_lm_logits(self.lm_head, logits)
 
         output = (logits,) + outputs[1:]
         return (loss,) + output if loss is not None else output
@@ -713,7 +728,7 @@ class LlamaForCausalLM(LlamaPreTrainedModel):
         if attention_mask is not None and position_ids is None:
             # create position_ids on the fly for batch generation
             position_ids = attention_mask.long().cumsum(-1) - 1
-            position_ids.masked_fill_(attention_mask == 0, 1)
+            position_ids = position_ids.masked_fill(attention_mask == 0, 1)
             if past_key_values:
                 position_ids = position_ids[:, -1].unsqueeze(-1)
 
@@ -20,7 +20,6 @@
 T5 model
 """
 
-import os
 import logging
 import math
 import copy
@@ -33,6 +32,7 @@ from mindspore import Parameter, Tensor
 from mindnlp._legacy.nn import Dropout
 from mindnlp._legacy.functional import arange
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from ..utils.activations import ACT2FN
 from ...abc import PreTrainedModel
 
@@ -47,41 +47,16 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
     model: MINDNLP_MODEL_URL_BASE.format('t5', model) for model in T5_SUPPORT_LIST
 }
 
+register_conversion_rules('t5', [
+    RenameRule('shared.weight', 'decoder.embed_tokens.embedding_table'),
+    RenameRule('relative_attention_bias.weight', 'relative_attention_bias.embedding_table'),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """torch to mindspore."""
-    prefix = kwargs.get("prefix", "")
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-        from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logging.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for k, v in state_dict.items():
-        if 'shared.weight' in k:
-            k = k.replace('shared.weight', 'decoder.embed_tokens.embedding_table')
-        if 'relative_attention_bias.weight' in k:
-            k = k.replace('relative_attention_bias.weight', 'relative_attention_bias.embedding_table')
-        if prefix:
-            k = prefix + "." + k
-        ms_ckpt.append({'name': k, 'data': Tensor(v.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin','mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, please checkout the path.') \
-            from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 't5', prefix=kwargs.get('prefix', ''))
+
 
 class T5LayerNorm(nn.Cell):
     """T5LayerNorm"""
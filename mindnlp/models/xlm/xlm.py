@@ -20,7 +20,6 @@
 """
 xlm module
 """
-import os
 import math
 import itertools
 import inspect
@@ -34,6 +33,7 @@ from mindspore.nn import BCEWithLogitsLoss, CrossEntropyLoss, MSELoss
 from mindnlp.models.utils.utils import SequenceSummary, SQuADHead
 from mindnlp.abc import PreTrainedModel
 from mindnlp.configs import MINDNLP_MODEL_URL_BASE
+from mindnlp.utils.conversion import RenameRule, register_conversion_rules, convert_torch_checkpoint
 from .xlm_config import XLMConfig,XLM_SUPPORT_LIST
 from ..utils.activations import get_activation
 
@@ -42,50 +42,18 @@ PRETRAINED_MODEL_ARCHIVE_MAP = {
     model: MINDNLP_MODEL_URL_BASE.format('xlm', model) for model in XLM_SUPPORT_LIST
 }
 
+register_conversion_rules('xlm', [
+    RenameRule('embeddings.weight', 'embeddings.embedding_table'),
+    RenameRule('layer_norm_emb.weight', 'layer_norm_emb.gamma'),
+    RenameRule('layer_norm_emb.bias', 'layer_norm_emb.beta'),
+    RenameRule('weight', 'gamma', when=('layer_norm',)),
+    RenameRule('bias', 'beta', when=('layer_norm',)),
+])
+
+
 def torch_to_mindspore(pth_file, **kwargs):
     """convert torch checkpoint to mindspore"""
-    _ = kwargs.get('prefix', '')
-
-    try:
-        import torch
-    except Exception as exc:
-        raise ImportError("'import torch' failed, please install torch by "
-                          "`pip install torch` or instructions from 'https://pytorch.org'") \
-                          from exc
-
-    from mindspore.train.serialization import save_checkpoint
-
-    logging.info('Starting checkpoint conversion.')
-    ms_ckpt = []
-    state_dict = torch.load(pth_file, map_location=torch.device('cpu'))
-
-    for k, v in state_dict.items():
-        if 'embeddings.weight' in k:
-            print(k)
-            k = k.replace('embeddings.weight', 'embeddings.embedding_table')
-        if 'layer_norm_emb.weight' in k:
-            print(k)
-            k = k.replace('layer_norm_emb.weight', 'layer_norm_emb.gamma')
-        if 'layer_norm_emb.bias' in k:
-            print(k)
-            k = k.replace('layer_norm_emb.bias', 'layer_norm_emb.beta')
-        if 'weight' in k and 'layer_norm' in k:
-            print(k)
-            k = k.replace('weight', 'gamma')
-        if 'bias' in k and 'layer_norm' in k:
-            print(k)
-            k = k.replace('bias', 'beta')
-        ms_ckpt.append({'name': k, 'data': Tensor(v.numpy())})
-
-    ms_ckpt_path = pth_file.replace('pytorch_model.bin','mindspore.ckpt')
-    if not os.path.exists(ms_ckpt_path):
-        try:
-            save_checkpoint(ms_ckpt, ms_ckpt_path)
-        except Exception as exc:
-            raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, '
-                               f'please checkout the path.') from exc
-
-    return ms_ckpt_path
+    return convert_torch_checkpoint(pth_file, 'xlm')
 
 
 def create_sinusoidal_embeddings(n_pos, dim, out):
@@ -28,28 +28,56 @@ else:
 
 @jit_class
 class Accumulator():
-    """Gradient Accumulator."""
-    def __init__(self, optimizer, accumulate_step, clip_norm=1.0):
+    """
+    Gradient Accumulator.
+
+    The gradients of `accumulate_step` micro-batches are averaged in `inner_grads`, the global norm of the average is
+    clipped to `clip_norm` and the optimizer is applied on the last micro-batch of every window. A window with a
+    micro-batch whose gradients overflowed is dropped without updating the parameters.
+
+    Note that the optimizer receives the mean of the gradients of the window, not their sum: each micro-batch
+    gradient is scaled by `1 / accumulate_step`, so the learning rate tuned for the full batch applies as is.
+
+    Args:
+        optimizer (Cell): The optimizer applied to the accumulated gradients.
+        accumulate_step (int): Number of micro-batches per optimizer step.
+        clip_norm (float): Maximum global norm of the accumulated gradients, `None` disables clipping. Default: None.
+    """
+    def __init__(self, optimizer, accumulate_step, clip_norm=None):
         self.optimizer = optimizer
         self.clip_norm = clip_norm
         self.inner_grads = optimizer.parameters.clone(prefix="accumulate_", init='zeros')
-        self.zeros = optimizer.parameters.clone(prefix="zeros_", init='zeros')
         self.counter = Parameter(Tensor(1, mindspore.int32), 'counter_')
+        self.finite = Parameter(Tensor(True, mindspore.bool_), 'accumulate_finite_')
         assert accumulate_step > 0
         self.accumulate_step = accumulate_step
+        self.degree = Tensor(1.0 / accumulate_step, mindspore.float32)
         self.map = ops.HyperMap()
 
-    def __call__(self, grads):
-        # 将单步获得的梯度累加至Accumulator的inner_grads
+    def __call__(self, grads, is_finite=None):
+        # 将单步获得的梯度取平均后累加至Accumulator的inner_grads
+        grads = self.map(ops.partial(_scale_grad, self.degree), grads)
         self.map(ops.partial(ops.assign_add), self.inner_grads, grads)
+        if is_finite is not None:
+            ops.assign(self.finite, ops.logical_and(self.finite, is_finite))
         if self.counter % self.accumulate_step == 0:
-            # 如果达到累积步数，进行参数优化更新
-            self.optimizer(self.inner_grads)
+            # 如果达到累积步数且梯度均未溢出，裁剪梯度后进行参数优化更新
+            if self.finite:
+                accumulated = self.inner_grads
+                if self.clip_norm is not None:
+                    accumulated = ops.clip_by_global_norm(self.inner_grads, self.clip_norm)
+                self.optimizer(accumulated)
             # 完成参数优化更新后，清零inner_grads
-            self.map(ops.partial(ops.assign), self.inner_grads, self.zeros)
+            self.map(ops.partial(ops.assign), self.inner_grads, self.map(ops.zeros_like, self.inner_grads))
+            ops.assign(self.finite, Tensor(True, mindspore.bool_))
         # 计算步数加一
         ops.assign_add(self.counter, Tensor(1, mindspore.int32))
 
         return True
 
+
+def _scale_grad(degree, grad):
+    return grad * degree.astype(grad.dtype)
+
+
 __all__ = ['Accumulator']
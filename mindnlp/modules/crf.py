@@ -16,15 +16,16 @@
 
 """crf module"""
 
+import numpy as np
 import mindspore
 from mindspore import nn, ops, Tensor
 from mindspore import Parameter
 from mindspore.common.initializer import initializer, Uniform
 from mindnlp.utils import less_min_pynative_first
 if less_min_pynative_first:
-    from mindnlp._legacy.functional import full, arange, where, tensor_split
+    from mindnlp._legacy.functional import full, arange, where
 else:
-    from mindspore.ops import full, arange, where, tensor_split
+    from mindspore.ops import full, arange, where
 
 def sequence_mask(seq_length, max_length, batch_first=False):
     """generate mask matrix by seq_length"""
@@ -289,31 +290,103 @@ class CRF(nn.Cell):
 
         return score, history
 
+    def decode(self, emissions, seq_length=None, top_k=1):
+        """Find the `top_k` most likely tag sequences of a batch.
+
+        The best sequence is found by the Viterbi algorithm of the cell and traced back on a host copy of its
+        history, one vectorized step over the whole batch per timestep. The n-best sequences are found by a
+        list Viterbi keeping the `top_k` best partial sequences ending in each tag, run on the host.
+
+        Args:
+            emissions (Tensor): Emission score tensor of size ``(seq_length, batch_size, num_tags)`` if
+                ``batch_first`` is ``False``, ``(batch_size, seq_length, num_tags)`` otherwise.
+            seq_length (Tensor): The length of each sequence, of size ``(batch_size,)``. Default: None.
+            top_k (int): The number of sequences returned for each sample. Default: 1.
+
+        Returns:
+            - **tags** (Tensor) - The tags padded with 0, of size ``(batch_size, seq_length)`` if `top_k` is 1,
+              ``(batch_size, top_k, seq_length)`` otherwise, the best sequence first.
+            - **scores** (Tensor) - The scores of the sequences, of size ``(batch_size,)`` if `top_k` is 1,
+              ``(batch_size, top_k)`` otherwise. The score is ``-inf`` when a sample has fewer than `top_k`
+              sequences.
+            - **seq_length** (Tensor) - The length of each sequence, of size ``(batch_size,)``.
+        """
+        if top_k < 1:
+            raise ValueError(f'invalid top_k: {top_k}')
+        max_length, batch_size = emissions.shape[:2]
+        if self.batch_first:
+            batch_size, max_length = max_length, batch_size
+        if seq_length is None:
+            seq_length = full((batch_size,), max_length, dtype=mindspore.int64)
+
+        if top_k == 1:
+            score, history = self._decode(emissions, seq_length)
+            tags = self._backtrace(score.asnumpy(), history.asnumpy(), seq_length.asnumpy())
+            return Tensor(tags, mindspore.int64), score.max(axis=1), seq_length
+
+        if self.batch_first:
+            emissions = emissions.swapaxes(0, 1)
+        tags, scores = self._nbest_viterbi(emissions.asnumpy(), seq_length.asnumpy(), top_k)
+        return Tensor(tags, mindspore.int64), Tensor(scores, emissions.dtype), seq_length
+
+    @staticmethod
+    def _backtrace(score, history, seq_length):
+        """Trace back the best tags of all the samples at once, on host arrays."""
+        # score: (batch_size, num_tags)
+        # history: (seq_length, batch_size, num_tags)
+        batch_size = score.shape[0]
+        batch_indices = np.arange(batch_size)
+        seq_ends = seq_length.astype(np.int64) - 1
+        tags = np.zeros((batch_size, history.shape[0]), np.int64)
+        # shape: (batch_size,)
+        best_tags = score.argmax(axis=1)
+        tags[batch_indices, seq_ends] = best_tags
+        for i in range(history.shape[0] - 2, -1, -1):
+            # history[i] holds the best previous tag of every tag at timestep i + 1
+            active = i < seq_ends
+            best_tags = np.where(active, history[i, batch_indices, best_tags], best_tags)
+            tags[active, i] = best_tags[active]
+        return tags
+
+    def _nbest_viterbi(self, emissions, seq_length, top_k):
+        """List Viterbi algorithm on host arrays, keeps the `top_k` best sequences ending in each tag."""
+        # emissions: (seq_length, batch_size, num_tags)
+        max_length, batch_size, num_tags = emissions.shape
+        transitions = self.transitions.asnumpy()
+        batch_indices = np.arange(batch_size)[:, None]
+
+        # shape: (batch_size, num_tags, top_k)
+        score = np.full((batch_size, num_tags, top_k), -np.inf, emissions.dtype)
+        score[:, :, 0] = self.start_transitions.asnumpy() + emissions[0]
+        # the backpointers are flat indices ``prev_tag * top_k + prev_rank``, a padded timestep points to itself
+        identity = np.arange(num_tags * top_k).reshape(1, num_tags, top_k)
+        history = []
+        for i in range(1, max_length):
+            # shape: (batch_size, num_tags, num_tags * top_k), the previous tag and rank are the last axis
+            next_score = (score[:, :, None, :] + transitions[None, :, :, None]
+                          + emissions[i][:, None, :, None]).transpose(0, 2, 1, 3).reshape(batch_size, num_tags, -1)
+            indices = np.argsort(-next_score, axis=2, kind='stable')[:, :, :top_k]
+            next_score = np.take_along_axis(next_score, indices, axis=2)
+            active = (i < seq_length)[:, None, None]
+            score = np.where(active, next_score, score)
+            history.append(np.where(active, indices, identity).reshape(batch_size, -1))
+
+        # shape: (batch_size, num_tags * top_k)
+        score = (score + self.end_transitions.asnumpy()[None, :, None]).reshape(batch_size, -1)
+        best = np.argsort(-score, axis=1, kind='stable')[:, :top_k]
+        scores = score[batch_indices, best]
+        tags = np.zeros((batch_size, top_k, max_length), np.int64)
+        tags[:, :, max_length - 1] = best // top_k
+        for i in range(max_length - 1, 0, -1):
+            best = np.take_along_axis(history[i - 1], best, axis=1)
+            tags[:, :, i - 1] = best // top_k
+        tags = np.where(np.arange(max_length) < seq_length[:, None, None], tags, 0)
+        return tags, scores
+
     def post_decode(self, score, history, seq_length):
         """Trace back the best tag sequence based on the score and history tensors."""
-        # Now, compute the best path for each sample
-        batch_size = seq_length.shape[0]
-        seq_ends = seq_length - 1
-        # shape: (batch_size,)
-        best_tags_list = []
-
-        history = tensor_split(history, history.shape[0], 0)
-        history = [hist.squeeze() for hist in history]
-
-        for idx in range(batch_size):
-            # Find the tag which maximizes the score at the last timestep; this is our best tag
-            # for the last timestep
-            best_last_tag = score[idx].argmax(axis=0)
-            best_tags = [best_last_tag]
-            # We trace back where the best last tag comes from, append that to our best tag
-            # sequence, and trace it back again, and so on
-            for hist in reversed(history[:seq_ends[idx]]):
-                best_last_tag = hist[idx][best_tags[-1]]
-                best_tags.append(best_last_tag)
-            # Reverse the order because we start from the last timestep
-            best_tags.reverse()
-            best_tags_list.append(best_tags)
-
-        return best_tags_list
+        seq_length = seq_length.asnumpy()
+        tags = self._backtrace(score.asnumpy(), history.asnumpy(), seq_length)
+        return [sample_tags[:length].tolist() for sample_tags, length in zip(tags, seq_length)]
 
 __all__ = ["CRF", "sequence_mask"]
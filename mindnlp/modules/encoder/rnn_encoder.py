@@ -79,7 +79,7 @@ class RNNEncoder(EncoderBase):
         src_token = src_token * mask
         embed = self.embedding(src_token)
 
-        if self.static:
+        if self.static and not self.rnn.support_seq_length:
             output, hiddens_n = self.rnn(embed)
         else:
             output, hiddens_n = self.rnn(embed, seq_length=src_length)
@@ -138,12 +138,8 @@ class PeftModel(mindspore.nn.Cell):
         """
         trainable_params = 0
         all_param = 0
-        for _, param in self.named_parameters():
-            num_params = param.numel()
-            # if using DS Zero 3 and the weights are initialized empty
-            if num_params == 0 and hasattr(param, "ds_numel"):
-                num_params = param.ds_numel
-
+        for _, param in self.parameters_and_names():
+            num_params = param.size
             all_param += num_params
             if param.requires_grad:
                 trainable_params += num_params
@@ -158,11 +154,28 @@ class PeftModel(mindspore.nn.Cell):
         except AttributeError:
             return getattr(self.base_model, name)
 
-    def construct(self, *args, **kwargs):
+    def construct(self, *args, adapter_ids=None, **kwargs):
         """
-        Forward pass of the model.
+        Forward pass of the model. `adapter_ids` selects the adapter of every row of a batch mixing the adapters set
+        by `set_batched_adapters`.
         """
-        return self.get_base_model()(*args, **kwargs)
+        with self._adapter_ids(adapter_ids):
+            return self.get_base_model()(*args, **kwargs)
+
+    @contextmanager
+    def _adapter_ids(self, adapter_ids):
+        """
+        Selects the adapter of every row of the batches run in the context, nothing is changed when `adapter_ids` is
+        `None`.
+        """
+        if adapter_ids is None:
+            yield
+            return
+        self.base_model.set_adapter_ids(adapter_ids)
+        try:
+            yield
+        finally:
+            self.base_model.set_adapter_ids(None)
 
     @contextmanager
     def disable_adapter(self):
@@ -221,7 +234,7 @@ class PeftModelForSequenceClassification(PeftModel):
         else:
             self.modules_to_save.update({"classifier", "score"})
 
-        for name, _ in self.base_model.named_children():
+        for name in self.base_model.name_cells():
             if any(module_name in name for module_name in self.modules_to_save):
                 self.cls_layer_name = name
                 break
@@ -238,21 +251,23 @@ class PeftModelForSequenceClassification(PeftModel):
         output_attentions=None,
         output_hidden_states=None,
         return_dict=None,
+        adapter_ids=None,
         **kwargs,
     ):
         return_dict = return_dict if return_dict is not None else self.config.use_return_dict
         peft_config = self.active_peft_config
-        if not isinstance(peft_config):
-            return self.base_model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                inputs_embeds=inputs_embeds,
-                labels=labels,
-                output_attentions=output_attentions,
-                output_hidden_states=output_hidden_states,
-                return_dict=return_dict,
-                **kwargs,
-            )
+        if isinstance(peft_config, LoraConfig):
+            with self._adapter_ids(adapter_ids):
+                return self.get_base_model()(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    inputs_embeds=inputs_embeds,
+                    labels=labels,
+                    output_attentions=output_attentions,
+                    output_hidden_states=output_hidden_states,
+                    return_dict=return_dict,
+                    **kwargs,
+                )
 
         pass
 
@@ -325,23 +340,25 @@ class PeftModelForSeq2SeqLM(PeftModel):
         output_attentions=None,
         output_hidden_states=None,
         return_dict=None,
+        adapter_ids=None,
         **kwargs,
     ):
         peft_config = self.active_peft_config
         if isinstance(peft_config, LoraConfig):
-            return self.base_model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                inputs_embeds=inputs_embeds,
-                decoder_input_ids=decoder_input_ids,
-                decoder_attention_mask=decoder_attention_mask,
-                decoder_inputs_embeds=decoder_inputs_embeds,
-                labels=labels,
-                output_attentions=output_attentions,
-                output_hidden_states=output_hidden_states,
-                return_dict=return_dict,
-                **kwargs,
-            )
+            with self._adapter_ids(adapter_ids):
+                return self.get_base_model()(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    inputs_embeds=inputs_embeds,
+                    decoder_input_ids=decoder_input_ids,
+                    decoder_attention_mask=decoder_attention_mask,
+                    decoder_inputs_embeds=decoder_inputs_embeds,
+                    labels=labels,
+                    output_attentions=output_attentions,
+                    output_hidden_states=output_hidden_states,
+                    return_dict=return_dict,
+                    **kwargs,
+                )
 
     pass
 
@@ -362,7 +379,7 @@ class PeftModelForTokenClassification(PeftModel):
         else:
             self.modules_to_save.update({"classifier", "score"})
 
-        for name, _ in self.base_model.named_children():
+        for name in self.base_model.name_cells():
             if any(module_name in name for module_name in self.modules_to_save):
                 self.cls_layer_name = name
                 break
@@ -379,21 +396,23 @@ class PeftModelForTokenClassification(PeftModel):
         output_attentions=None,
         output_hidden_states=None,
         return_dict=None,
+        adapter_ids=None,
         **kwargs,
     ):
         peft_config = self.active_peft_config
         return_dict = return_dict if return_dict is not None else self.config.use_return_dict
 
         if isinstance(peft_config, LoraConfig):
-            return self.base_model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                inputs_embeds=inputs_embeds,
-                labels=labels,
-                output_attentions=output_attentions,
-                output_hidden_states=output_hidden_states,
-                return_dict=return_dict,
-                **kwargs,
-            )
+            with self._adapter_ids(adapter_ids):
+                return self.get_base_model()(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    inputs_embeds=inputs_embeds,
+                    labels=labels,
+                    output_attentions=output_attentions,
+                    output_hidden_states=output_hidden_states,
+                    return_dict=return_dict,
+                    **kwargs,
+                )
 
     pass
\ No newline at end of file
@@ -17,13 +17,16 @@
 import math
 import re
 import warnings
-from dataclasses import asdict, field, dataclass
+from dataclasses import asdict, field, dataclass, replace
 from enum import Enum
 from typing import List, Optional, Union
+import numpy as np
 import mindspore
 import mindspore.nn as nn
 import mindspore.ops as ops
-from mindspore.common.initializer import initializer, HeUniform
+from mindspore import Parameter
+from mindspore.common.initializer import initializer, HeUniform, Normal
+from mindnlp._legacy.nn import Dropout
 from mindnlp.models.utils.utils import Conv1D
 from ..utils import (
     TRANSFORMERS_MODELS_TO_LORA_TARGET_MODULES_MAPPING,
@@ -61,8 +64,8 @@ class LoraConfig(PeftConfig):
             "For example, ['q', 'v'] or '.*decoder.*(SelfAttention|EncDecAttention).*(q|v)$' "
         },
     )
-    lora_alpha: int = field(default=None, metadata={"help": "Lora alpha"})
-    lora_dropout: float = field(default=None, metadata={"help": "Lora dropout"})
+    lora_alpha: int = field(default=8, metadata={"help": "Lora alpha"})
+    lora_dropout: float = field(default=0.0, metadata={"help": "Lora dropout"})
     fan_in_fan_out: bool = field(
         default=False,
         metadata={"help": "Set this to True if the layer to replace stores weight like (fan_in, fan_out)"},
@@ -151,7 +154,7 @@ class LoraModel(mindspore.nn.Cell):
             "fan_in_fan_out": lora_config.fan_in_fan_out,
             "init_lora_weights": lora_config.init_lora_weights,
         }
-        key_list = [key for key, _ in self.model.named_modules()]
+        key_list = [key for key, _ in self.model.cells_and_names()]
         for key in key_list:
             if isinstance(lora_config.target_modules, str):
                 target_module_found = re.fullmatch(lora_config.target_modules, key)
@@ -162,11 +165,17 @@ class LoraModel(mindspore.nn.Cell):
                     is_target_modules_in_base_model = True
 
                 parent, target, target_name = _get_submodules(self.model, key)
-                
-                if hasattr(target, "bias"):
-                    bias = target.bias is not None
+                bias = getattr(target, "bias", None) is not None
 
-                if isinstance(target, LoraLayer):
+                if isinstance(target, Embedding):
+                    target.update_layer_embedding(
+                        adapter_name,
+                        lora_config.r,
+                        lora_config.lora_alpha,
+                        lora_config.lora_dropout,
+                        lora_config.init_lora_weights,
+                    )
+                elif isinstance(target, LoraLayer):
                     target.update_layer(
                         adapter_name,
                         lora_config.r,
@@ -178,21 +187,19 @@ class LoraModel(mindspore.nn.Cell):
                     if isinstance(target, mindspore.nn.Embedding):
                         embedding_kwargs = kwargs.copy()
                         embedding_kwargs.pop("fan_in_fan_out", None)
-                        in_features, out_features = target.num_embeddings, target.embedding_dim
+                        in_features, out_features = target.vocab_size, target.embedding_size
                         new_module = Embedding(adapter_name, in_features, out_features, **embedding_kwargs)
                     else:
                         if isinstance(target, mindspore.nn.Dense):
-                            in_features, out_features = target.in_features, target.out_features
+                            in_features, out_features = target.in_channels, target.out_channels
                             if kwargs["fan_in_fan_out"]:
                                 warnings.warn(
-                                    "fan_in_fan_out is set to True but the target module is `torch.nn.Linear`. "
+                                    "fan_in_fan_out is set to True but the target module is `mindspore.nn.Dense`. "
                                     "Setting fan_in_fan_out to False."
                                 )
                                 kwargs["fan_in_fan_out"] = lora_config.fan_in_fan_out = False
                         elif isinstance(target, Conv1D):
-                            in_features, out_features = (
-                                target.weight.ds_shape if hasattr(target.weight, "ds_shape") else target.weight.shape
-                            )
+                            in_features, out_features = target.weight.shape
                             if not kwargs["fan_in_fan_out"]:
                                 warnings.warn(
                                     "Setting fan_in_fan_out to True."
@@ -213,19 +220,13 @@ class LoraModel(mindspore.nn.Cell):
 
     def _replace_module(self, parent_module, child_name, new_module, old_module):
         setattr(parent_module, child_name, new_module)
-        new_module.weight = old_module.weight
-        if hasattr(old_module, "bias"):
-            if old_module.bias is not None:
-                new_module.bias = old_module.bias
-
-        if getattr(old_module, "state", None) is not None:
-            new_module.state = old_module.state
-            new_module.to(old_module.weight.device)
-
-        # dispatch to correct device
-        for name, module in new_module.named_modules():
-            if "lora_" in name:
-                module.to(old_module.weight.device)
+        # the base weights are shared, not copied
+        if isinstance(old_module, nn.Embedding):
+            new_module.embedding_table = old_module.embedding_table
+        else:
+            new_module.weight = old_module.weight
+        if getattr(old_module, "bias", None) is not None:
+            new_module.bias = old_module.bias
 
     def __getattr__(self, name: str):
         """Forward missing attributes to the wrapped module."""
@@ -243,10 +244,12 @@ class LoraModel(mindspore.nn.Cell):
         config_dict[key] = config
         return config
 
+    def _lora_layers(self):
+        return [cell for _, cell in self.model.cells_and_names() if isinstance(cell, LoraLayer)]
+
     def _set_adapter_layers(self, enabled=True):
-        for module in self.model.modules():
-            if isinstance(module, LoraLayer):
-                module.disable_adapters = False if enabled else True
+        for module in self._lora_layers():
+            module.disable_adapters = not enabled
 
     def enable_adapter_layers(self):
         self._set_adapter_layers(enabled=True)
@@ -255,22 +258,54 @@ class LoraModel(mindspore.nn.Cell):
         self._set_adapter_layers(enabled=False)
 
     def set_adapter(self, adapter_name):
-        for module in self.model.modules():
-            if isinstance(module, LoraLayer):
-                if module.merged:
-                    warnings.warn("Adapter cannot be set when the model is merged. Unmerging the model first.")
-                    module.unmerge()
-                module.active_adapter = adapter_name
+        for module in self._lora_layers():
+            if module.merged:
+                warnings.warn("Adapter cannot be set when the model is merged. Unmerging the model first.")
+                module.unmerge()
+            module.active_adapter = adapter_name
+
+    def set_batched_adapters(self, adapter_names):
+        r"""
+        Prepares the serving of batches mixing the adapters `adapter_names`, the rows of a batch then select their
+        adapter with [`~LoraModel.set_adapter_ids`]. Every layer stacks the factors of the adapters once, the base
+        weights stay shared, so one forward serves the requests of all the adapters.
+
+        Args:
+            adapter_names (`List[str]`): The adapters served, the id `i` of a row selects `adapter_names[i]`.
+                `None` leaves the batched serving.
+        """
+        if adapter_names is not None:
+            missing = [name for name in adapter_names if name not in self.peft_config]
+            if missing:
+                raise ValueError(f"The adapters {missing} are not adapters of the model.")
+        for module in self._lora_layers():
+            module.set_batched_adapters(adapter_names)
+            if adapter_names is None:
+                module.adapter_ids = None
+
+    def set_adapter_ids(self, adapter_ids):
+        r"""
+        Selects the adapter of every row of the next batches.
+
+        Args:
+            adapter_ids (`Tensor`): The ids of shape `(batch_size,)` of the adapters given to
+                [`~LoraModel.set_batched_adapters`], -1 for the base model. `None` goes back to the active adapter.
+        """
+        if isinstance(adapter_ids, mindspore.Tensor):
+            # read once on the host, the layers group their rows by adapter from it
+            adapter_ids = adapter_ids.asnumpy()
+        for module in self._lora_layers():
+            if adapter_ids is not None and module.batched_lora_A is None:
+                raise ValueError("The adapters of the batches are not set, call `set_batched_adapters` first.")
+            module.adapter_ids = adapter_ids
 
     def merge_adapter(self):
-        for module in self.model.modules():
-            if isinstance(module, LoraLayer):
-                module.merge()
+        for module in self._lora_layers():
+            module.merge()
 
     def unmerge_adapter(self):
-        for module in self.model.modules():
-            if isinstance(module, LoraLayer):
-                module.unmerge()
+        for module in self._lora_layers():
+            module.unmerge()
 
     @staticmethod
     def _prepare_lora_config(peft_config, model_config):
@@ -288,23 +323,29 @@ class LoraModel(mindspore.nn.Cell):
         r"""
         This method merges the LoRa layers into the base model. This is needed if someone wants to use the base model
         as a standalone model.
-        """
-        if getattr(self.config, "model_type", None) == "gpt2":
-            raise ValueError("GPT2 models are not supported for merging LORA layers")
 
+        The deltas are added to the base weights in place and every LoRA layer is replaced by the layer it adapted,
+        so the inference runs at the cost of the base model.
+        """
         if getattr(self.model, "is_loaded_in_8bit", False):
             raise ValueError("Cannot merge LORA layers when the model is loaded in 8-bit mode")
 
-        key_list = [key for key, _ in self.model.named_modules() if "lora" not in key]
+        key_list = [key for key, _ in self.model.cells_and_names() if "lora" not in key]
         for key in key_list:
             try:
                 parent, target, target_name = _get_submodules(self.model, key)
-            except AttributeError:
+            except KeyError:
                 continue
             if isinstance(target, LoraLayer):
-                bias = target.bias is not None
-                new_module = mindspore.nn.Dense(target.in_features, target.out_features, bias=bias)
-                target.merge()
+                if isinstance(target, Embedding):
+                    new_module = mindspore.nn.Embedding(target.vocab_size, target.embedding_size)
+                elif target.fan_in_fan_out:
+                    new_module = Conv1D(target.out_features, target.in_features)
+                else:
+                    new_module = mindspore.nn.Dense(target.in_features, target.out_features,
+                                                    has_bias=target.bias is not None)
+                if not target.merged:
+                    target.merge()
                 self._replace_module(parent, target_name, new_module, target)
 
             # save any additional trainable modules part of `modules_to_save`
@@ -314,7 +355,45 @@ class LoraModel(mindspore.nn.Cell):
         return self.model
 
     def add_weighted_adapter(self, adapters, weights, adapter_name):
-        pass
+        r"""
+        Adds the adapter `adapter_name`, the combination of `adapters` weighted by `weights`: its delta is the
+        weighted sum of their deltas. The factors of the adapters are concatenated along the rank, its `lora_A` stacks
+        their `lora_A` scaled by their weight and scaling and its `lora_B` their `lora_B`, so its rank is the sum of
+        their ranks.
+
+        Args:
+            adapters (`List[str]`): The names of the adapters to combine.
+            weights (`List[float]`): The weight of each adapter.
+            adapter_name (`str`): The name of the new adapter.
+        """
+        rank = sum(self.peft_config[adapter].r for adapter in adapters)
+        self.peft_config[adapter_name] = replace(self.peft_config[adapters[0]], r=rank, lora_alpha=rank)
+        self._find_and_replace(adapter_name)
+        mark_only_lora_as_trainable(self.model, self.peft_config[adapter_name].bias)
+        _freeze_adapter(self.model, adapter_name)
+
+        for target in self._lora_layers():
+            if adapter_name in target.lora_A:
+                lora_a, lora_b = target.lora_A, target.lora_B
+            elif adapter_name in target.lora_embedding_A:
+                lora_a, lora_b = target.lora_embedding_A, target.lora_embedding_B
+            else:
+                continue
+            new_a, new_b = lora_a.get_weight(adapter_name), lora_b.get_weight(adapter_name)
+            combined = [adapter for adapter in adapters if adapter in lora_a]
+            if not combined:
+                # the new adapter is initialized with a zero delta
+                continue
+            # A is (r, in) and B is (out, r), the ranks of the adapters missing from the layer stay zeros
+            cat_a = ops.cat([lora_a.get_weight(adapter) * weight * target.scaling[adapter]
+                             for adapter, weight in zip(adapters, weights) if adapter in lora_a], 0)
+            cat_b = ops.cat([lora_b.get_weight(adapter) for adapter in combined], 1)
+            padding = new_a.shape[0] - cat_a.shape[0]
+            if padding:
+                cat_a = ops.cat([cat_a, ops.zeros((padding, new_a.shape[1]), new_a.dtype)], 0)
+                cat_b = ops.cat([cat_b, ops.zeros((new_b.shape[0], padding), new_b.dtype)], 1)
+            new_a.set_data(cat_a.astype(new_a.dtype))
+            new_b.set_data(cat_b.astype(new_b.dtype))
 
 # Below code is based on https://github.com/microsoft/LoRA/blob/main/loralib/layers.py
 # and modified to work with PyTorch FSDP
@@ -328,25 +407,76 @@ class LoraModel(mindspore.nn.Cell):
 
 # had to adapt it for `lora_only` to work
 def mark_only_lora_as_trainable(model: nn.Cell, bias: str = "none") -> None:
-    pass
+    """
+    Freezes every parameter but the LoRA ones, and the biases selected by `bias`, so that the gradients and the
+    optimizer states are only allocated for the rank-r matrices.
+    """
+    for name, param in model.parameters_and_names():
+        if "lora_" not in name:
+            param.requires_grad = False
+    if bias == "none":
+        return
+    if bias == "all":
+        for name, param in model.parameters_and_names():
+            if "bias" in name:
+                param.requires_grad = True
+    elif bias == "lora_only":
+        for _, cell in model.cells_and_names():
+            if isinstance(cell, LoraLayer) and getattr(cell, "bias", None) is not None:
+                cell.bias.requires_grad = True
+    else:
+        raise ValueError(f"`bias` should be 'none', 'all' or 'lora_only', but got {bias!r}.")
+
+
+class AdapterDict(nn.Cell):
+    """
+    Cells or parameters of the adapters of a layer, by adapter name.
+
+    The entries are registered as children of the cell, so their parameters are named
+    `<attribute>.<adapter_name>.<parameter>` like the checkpoints of PEFT.
+    """
+    def __getitem__(self, adapter_name):
+        return getattr(self, adapter_name)
+
+    def __setitem__(self, adapter_name, value):
+        if isinstance(value, Parameter):
+            self.insert_param_to_cell(adapter_name, value)
+        else:
+            self.insert_child_to_cell(adapter_name, value)
+
+    def __contains__(self, adapter_name):
+        return adapter_name in self._cells or adapter_name in self._params
+
+    def keys(self):
+        """Names of the adapters."""
+        return list(self._cells.keys()) + list(self._params.keys())
+
+    def get_weight(self, adapter_name):
+        """The parameter of the adapter, the weight of its cell for a `Dense`."""
+        if adapter_name in self._params:
+            return self._params[adapter_name]
+        return self._cells[adapter_name].weight
 
 
 class LoraLayer:
+    """
+    The adapters of a LoRA layer, mixed into the layer they adapt.
+    """
     def __init__(
         self,
-        in_features: int, 
+        in_features: int,
         out_features: int,
     ):
         self.r = {}
         self.lora_alpha = {}
         self.scaling = {}
-        self.lora_dropout = nn.CellList()
-        self.lora_A = nn.CellList()
-        self.lora_B = nn.CellList()
+        self.lora_dropout = AdapterDict()
+        self.lora_A = AdapterDict()
+        self.lora_B = AdapterDict()
 
         # For Embedding layer
-        self.lora_embedding_A = nn.CellList()
-        self.lora_embedding_B = nn.CellList()
+        self.lora_embedding_A = AdapterDict()
+        self.lora_embedding_B = AdapterDict()
 
         # Mark the weight as unmerged
         self.merged = False
@@ -354,18 +484,144 @@ class LoraLayer:
         self.in_features = in_features
         self.out_features = out_features
 
+        # Batched serving: the factors of several adapters stacked along a leading adapter axis, and the adapter
+        # of every row of the current batch
+        self.batched_lora_A = None
+        self.batched_lora_B = None
+        self.batched_scaling = None
+        self.adapter_ids = None
+
+    def _update_config(self, adapter_name, r, lora_alpha, lora_dropout):
+        self.r[adapter_name] = r
+        self.lora_alpha[adapter_name] = lora_alpha
+        if lora_dropout:
+            self.lora_dropout[adapter_name] = Dropout(p=lora_dropout)
+        else:
+            self.lora_dropout[adapter_name] = nn.Identity()
+        if r > 0:
+            self.scaling[adapter_name] = lora_alpha / r
+
     def update_layer(self, adapter_name, r, lora_alpha, lora_dropout, init_lora_weights):
-        pass
+        """Adds the adapter `adapter_name`, a down projection `lora_A` of rank `r` and an up projection `lora_B`."""
+        self._update_config(adapter_name, r, lora_alpha, lora_dropout)
+        if r > 0:
+            self.lora_A[adapter_name] = nn.Dense(self.in_features, r, has_bias=False)
+            self.lora_B[adapter_name] = nn.Dense(r, self.out_features, has_bias=False)
+        if init_lora_weights:
+            self.reset_lora_parameters(adapter_name)
 
     def update_layer_embedding(self, adapter_name, r, lora_alpha, lora_dropout, init_lora_weights):
-        pass
+        """Adds the adapter `adapter_name` of an embedding, the low rank factors of its table."""
+        self._update_config(adapter_name, r, lora_alpha, lora_dropout)
+        if r > 0:
+            self.lora_embedding_A[adapter_name] = Parameter(initializer('zeros', (r, self.in_features)),
+                                                            name=f'lora_embedding_A.{adapter_name}')
+            self.lora_embedding_B[adapter_name] = Parameter(initializer('zeros', (self.out_features, r)),
+                                                            name=f'lora_embedding_B.{adapter_name}')
+        if init_lora_weights:
+            self.reset_lora_parameters(adapter_name)
 
     def reset_lora_parameters(self, adapter_name):
-        pass
+        """Initializes the adapter so that its delta is zero, `lora_B` or `lora_embedding_A` is zeros."""
+        if adapter_name in self.lora_A:
+            weight_a = self.lora_A[adapter_name].weight
+            weight_b = self.lora_B[adapter_name].weight
+            weight_a.set_data(initializer(HeUniform(math.sqrt(5)), weight_a.shape, weight_a.dtype))
+            weight_b.set_data(initializer('zeros', weight_b.shape, weight_b.dtype))
+        if adapter_name in self.lora_embedding_A:
+            weight_a = self.lora_embedding_A[adapter_name]
+            weight_b = self.lora_embedding_B[adapter_name]
+            weight_a.set_data(initializer('zeros', weight_a.shape, weight_a.dtype))
+            weight_b.set_data(initializer(Normal(1.0), weight_b.shape, weight_b.dtype))
+
+    def get_delta_weight(self, adapter_name):
+        """The update `B @ A * scaling` of the adapter, in the layout of the base weight."""
+        raise NotImplementedError
+
+    def _base_weight(self):
+        raise NotImplementedError
+
+    def merge(self):
+        """Adds the delta of the active adapter to the base weight in place, the forward is then the base one."""
+        if self.active_adapter not in self.r:
+            return
+        if self.merged:
+            warnings.warn("Already merged. Nothing to do.")
+            return
+        if self.r[self.active_adapter] > 0:
+            weight = self._base_weight()
+            weight.set_data((weight + self.get_delta_weight(self.active_adapter)).astype(weight.dtype))
+            self.merged = True
+
+    def unmerge(self):
+        """Subtracts the delta of the active adapter from the base weight in place."""
+        if self.active_adapter not in self.r:
+            return
+        if not self.merged:
+            warnings.warn("Already unmerged. Nothing to do.")
+            return
+        if self.r[self.active_adapter] > 0:
+            weight = self._base_weight()
+            weight.set_data((weight - self.get_delta_weight(self.active_adapter)).astype(weight.dtype))
+            self.merged = False
+
+    def _lora_factors(self):
+        """The `A` and `B` factors of the adapters, of shapes `(r, in_features)` and `(out_features, r)`."""
+        raise NotImplementedError
+
+    def set_batched_adapters(self, adapter_names):
+        """
+        Stacks the factors of `adapter_names` for the batched forward, the adapter `i` being selected by the rows
+        whose id is `i`. The ranks are padded with zeros to the largest one, an adapter absent from the layer has zero
+        factors. `None` drops the stacks.
+        """
+        if adapter_names is None:
+            self.batched_lora_A = self.batched_lora_B = self.batched_scaling = None
+            return
+        if self.merged:
+            warnings.warn("Batched adapters cannot be used when the model is merged. Unmerging the model first.")
+            self.unmerge()
+        lora_a, lora_b = self._lora_factors()
+        max_r = max([self.r[name] for name in adapter_names if name in lora_a] + [1])
+        stacked_a, stacked_b, scaling = [], [], []
+        for name in adapter_names:
+            if name in lora_a:
+                weight_a, weight_b = lora_a.get_weight(name), lora_b.get_weight(name)
+                pad = max_r - self.r[name]
+                stacked_a.append(ops.pad(weight_a, (0, 0, 0, pad)))
+                stacked_b.append(ops.pad(weight_b, (0, pad)))
+                scaling.append(self.scaling[name])
+            else:
+                dtype = self._base_weight().dtype
+                stacked_a.append(ops.zeros((max_r, self.in_features), dtype))
+                stacked_b.append(ops.zeros((self.out_features, max_r), dtype))
+                scaling.append(0.0)
+        # shape: (num_adapters, r, in_features), (num_adapters, out_features, r)
+        self.batched_lora_A = ops.stack(stacked_a)
+        self.batched_lora_B = ops.stack(stacked_b)
+        self.batched_scaling = mindspore.Tensor(scaling, self.batched_lora_A.dtype)
+
+    def _adapter_rows(self, num_rows):
+        """
+        The `(adapter, rows)` segments of the batch, the indices of the rows of every adapter. The ids of a batch
+        flattened to `batch * seq` rows are repeated, and the rows of id -1 are left out, that is the base layer.
+        """
+        adapter_ids = self.adapter_ids
+        if isinstance(adapter_ids, mindspore.Tensor):
+            adapter_ids = adapter_ids.asnumpy()
+        adapter_ids = np.repeat(np.asarray(adapter_ids, np.int32), num_rows // len(adapter_ids))
+        return [(int(adapter), mindspore.Tensor(np.nonzero(adapter_ids == adapter)[0], mindspore.int32))
+                for adapter in np.unique(adapter_ids) if adapter >= 0]
 
 
 class Dense(nn.Dense, LoraLayer):
-    # Lora implemented in a dense layer
+    """
+    LoRA implemented in a dense layer.
+
+    The adapter is applied as two thin matmuls, `x @ W + (dropout(x) @ A) @ B * scaling`, the product `A @ B` is
+    only computed to merge it into `W`. With `adapter_ids` set, every row of the batch gets the update of its own
+    adapter, the rows are grouped by adapter and every group goes through the factors of its adapter.
+    """
     def __init__(
         self,
         adapter_name: str,
@@ -374,14 +630,78 @@ class Dense(nn.Dense, LoraLayer):
         r: int = 0,
         lora_alpha: int = 1,
         lora_dropout: float = 0.0,
-        fan_in_fan_out: bool = False,  
+        fan_in_fan_out: bool = False,
         **kwargs,
     ):
-        pass
+        init_lora_weights = kwargs.pop("init_lora_weights", True)
+        has_bias = kwargs.pop("bias", True)
+
+        nn.Dense.__init__(self, in_features, out_features, has_bias=has_bias, **kwargs)
+        LoraLayer.__init__(self, in_features=in_features, out_features=out_features)
+        # Freezing the pre-trained weight matrix
+        self.weight.requires_grad = False
+
+        # the weight is stored like (fan_in, fan_out), e.g. in a `Conv1D`
+        self.fan_in_fan_out = fan_in_fan_out
+        if fan_in_fan_out:
+            self.weight = Parameter(self.weight.T, name='weight', requires_grad=False)
+
+        self.update_layer(adapter_name, r, lora_alpha, lora_dropout, init_lora_weights)
+        self.active_adapter = adapter_name
+
+    def _base_weight(self):
+        return self.weight
+
+    def get_delta_weight(self, adapter_name):
+        delta = ops.matmul(self.lora_B[adapter_name].weight, self.lora_A[adapter_name].weight)
+        return transpose(delta, self.fan_in_fan_out) * self.scaling[adapter_name]
+
+    def _linear(self, x):
+        if not self.fan_in_fan_out:
+            return nn.Dense.construct(self, x)
+        result = ops.matmul(x, self.weight.astype(x.dtype))
+        if self.has_bias:
+            result = result + self.bias.astype(x.dtype)
+        return result
+
+    def _lora_factors(self):
+        return self.lora_A, self.lora_B
+
+    def _batched_lora(self, x):
+        """The updates of a batch mixing adapters, one pair of matmuls per adapter over the rows of the adapter."""
+        # shape: (rows, tokens, in_features)
+        rows_x = x.reshape(x.shape[0], -1, x.shape[-1])
+        result = ops.zeros(rows_x.shape[:-1] + (self.out_features,), x.dtype)
+        for adapter, rows in self._adapter_rows(x.shape[0]):
+            lora_a = self.batched_lora_A[adapter].astype(x.dtype)
+            lora_b = self.batched_lora_B[adapter].astype(x.dtype)
+            after_a = ops.matmul(ops.gather(rows_x, rows, 0), lora_a.T)
+            after_b = ops.matmul(after_a, lora_b.T) * self.batched_scaling[adapter].astype(x.dtype)
+            result = ops.tensor_scatter_add(result, rows.reshape(-1, 1), after_b)
+        return result.reshape(x.shape[:-1] + (self.out_features,))
+
+    def construct(self, x):
+        if self.adapter_ids is not None and not self.disable_adapters:
+            return self._linear(x) + self._batched_lora(x)
+        if self.active_adapter not in self.lora_A:
+            return self._linear(x)
+        if self.disable_adapters:
+            if self.r[self.active_adapter] > 0 and self.merged:
+                self.unmerge()
+            return self._linear(x)
+
+        result = self._linear(x)
+        if self.r[self.active_adapter] > 0 and not self.merged:
+            lora_x = self.lora_dropout[self.active_adapter](x)
+            lora_x = self.lora_A[self.active_adapter](lora_x)
+            result = result + self.lora_B[self.active_adapter](lora_x) * self.scaling[self.active_adapter]
+        return result
 
 
 class Embedding(nn.Embedding, LoraLayer):
-    # LoRA implemented in a Embedding layer
+    """
+    LoRA implemented in an embedding layer, the rows of `A` are gathered and projected by `B`.
+    """
     def __init__(
         self,
         adapter_name: str,
@@ -392,6 +712,58 @@ class Embedding(nn.Embedding, LoraLayer):
         lora_dropout: float = 0.0,
         **kwargs,
     ):
-        pass
-
-
+        init_lora_weights = kwargs.pop("init_lora_weights", True)
+
+        nn.Embedding.__init__(self, num_embeddings, embedding_dim, **kwargs)
+        LoraLayer.__init__(self, in_features=num_embeddings, out_features=embedding_dim)
+        # Freezing the pre-trained embedding table
+        self.embedding_table.requires_grad = False
+
+        self.update_layer_embedding(adapter_name, r, lora_alpha, lora_dropout, init_lora_weights)
+        self.active_adapter = adapter_name
+
+    def _base_weight(self):
+        return self.embedding_table
+
+    def get_delta_weight(self, adapter_name):
+        delta = ops.matmul(self.lora_embedding_B[adapter_name], self.lora_embedding_A[adapter_name])
+        return transpose(delta, True) * self.scaling[adapter_name]
+
+    def _lora_factors(self):
+        return self.lora_embedding_A, self.lora_embedding_B
+
+    def set_batched_adapters(self, adapter_names):
+        LoraLayer.set_batched_adapters(self, adapter_names)
+        if self.batched_lora_A is not None:
+            # shape: (num_adapters, num_embeddings, r), the rows of `A` are gathered by token
+            self.batched_lora_A = ops.transpose(self.batched_lora_A, (0, 2, 1))
+
+    def _batched_lora(self, ids):
+        """The updates of a batch mixing adapters, the rows of every adapter gather their tokens from its `A`."""
+        tokens = ids.reshape(ids.shape[0], -1).astype(mindspore.int32)
+        result = ops.zeros(tokens.shape + (self.out_features,), self.batched_lora_B.dtype)
+        for adapter, rows in self._adapter_rows(ids.shape[0]):
+            # shape: (rows of the adapter, tokens, r)
+            after_a = ops.gather(self.batched_lora_A[adapter], ops.gather(tokens, rows, 0), 0)
+            after_b = ops.matmul(after_a, self.batched_lora_B[adapter].T) * self.batched_scaling[adapter]
+            result = ops.tensor_scatter_add(result, rows.reshape(-1, 1), after_b)
+        return result.reshape(ids.shape + (self.out_features,))
+
+    def construct(self, ids):
+        if self.adapter_ids is not None and not self.disable_adapters:
+            result = nn.Embedding.construct(self, ids)
+            return result + self._batched_lora(ids).astype(result.dtype)
+        if self.active_adapter not in self.lora_embedding_A:
+            return nn.Embedding.construct(self, ids)
+        if self.disable_adapters:
+            if self.r[self.active_adapter] > 0 and self.merged:
+                self.unmerge()
+            return nn.Embedding.construct(self, ids)
+
+        result = nn.Embedding.construct(self, ids)
+        if self.r[self.active_adapter] > 0 and not self.merged:
+            # shape: (..., r)
+            after_a = ops.gather(self.lora_embedding_A[self.active_adapter].T, ids, 0)
+            after_b = ops.matmul(after_a, self.lora_embedding_B[self.active_adapter].T)
+            result = result + (after_b * self.scaling[self.active_adapter]).astype(result.dtype)
+        return result
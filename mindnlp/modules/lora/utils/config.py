@@ -34,6 +34,7 @@ class TaskType(str, enum.Enum):
     TOKEN_CLS = "TOKEN_CLS"
 
 
+@dataclass
 class PeftConfigMixin():
     r"""
     This is the base configuration class for PEFT adapter models. 
@@ -124,6 +125,7 @@ class PeftConfigMixin():
         return json_object
 
 
+@dataclass
 class PeftConfig(PeftConfigMixin):
     """
     This is the base configuration class to store the configuration of a [`PeftModel`].
@@ -38,9 +38,10 @@ def _get_submodules(model, key):
     """
     get submodules
     """
-    parent = model.get_submodule(".".join(key.split(".")[:-1]))
+    cells = dict(model.cells_and_names())
+    parent = cells[".".join(key.split(".")[:-1])]
     target_name = key.split(".")[-1]
-    target = model.get_submodule(key)
+    target = cells[key]
     return parent, target, target_name
 
 
@@ -48,7 +49,7 @@ def _set_trainable(model, adapter_name):
     """
     set trainable
     """
-    key_list = [key for key, _ in model.named_modules()]
+    key_list = [key for key, _ in model.cells_and_names()]
     for key in key_list:
         target_module_found = any(key.endswith(target_key) for target_key in model.modules_to_save)
         if target_module_found:
@@ -58,7 +59,7 @@ def _set_trainable(model, adapter_name):
                 # 判断是否是此数据类型
                 target.update(adapter_name)
             else:
-                for param in target.parameters():
+                for param in target.get_parameters():
                     param.requires_grad = True
                 setattr(parent, target_name, ModulesToSaveWrapper(target, adapter_name))
 
@@ -67,13 +68,13 @@ def _freeze_adapter(model, adapter_name):
     """
     freeze adapter
     """
-    for n, p in model.named_parameters():
+    for n, p in model.parameters_and_names():
         if adapter_name in n:
             p.requires_grad = False
 
 
 def _set_adapter(model, adapter_name):
-    for module in model.modules():
+    for _, module in model.cells_and_names():
         if isinstance(module, ModulesToSaveWrapper):
             module.active_adapter = adapter_name
 
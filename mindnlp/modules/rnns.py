@@ -31,10 +31,10 @@ from mindspore.ops._primitive_cache import _get_cache_prim
 from mindnlp.utils import less_min_pynative_first
 if less_min_pynative_first:
     from mindnlp._legacy.nn import Dropout
-    from mindnlp._legacy.functional import tensor_split, sigmoid, reverse
+    from mindnlp._legacy.functional import tensor_split, sigmoid, reverse, arange, where
 else:
     from mindspore.nn import Dropout
-    from mindspore.ops import tensor_split, sigmoid, reverse
+    from mindspore.ops import tensor_split, sigmoid, reverse, arange, where
 
 @constexpr
 def _init_state(shape, dtype, is_lstm):
@@ -45,91 +45,121 @@ def _init_state(shape, dtype, is_lstm):
     return hx
 
 
-def gru_cell(inputs, hidden, w_ih, w_hh, b_ih=None, b_hh=None):
-    '''GRU cell function'''
-    if b_ih is None:
-        gi = ops.matmul(inputs, w_ih.T)
-        gh = ops.matmul(hidden, w_hh.T)
-    else:
-        gi = ops.matmul(inputs, w_ih.T) + b_ih
-        gh = ops.matmul(hidden, w_hh.T) + b_hh
-    i_r, i_i, i_n = tensor_split(gi, 3, 1)
-    h_r, h_i, h_n = tensor_split(gh, 3, 1)
+def _reverse_sequence(inputs, seq_length):
+    """Reverse the valid timesteps of each sequence of inputs shaped (seq_len, batch_size, ...)."""
+    if seq_length is None:
+        return reverse(inputs, [0])
+    return _get_cache_prim(ops.ReverseSequence)(seq_dim=0, batch_dim=1)(inputs, seq_length)
 
-    resetgate = sigmoid(i_r + h_r)
-    inputgate = sigmoid(i_i + h_i)
-    newgate = ops.tanh(i_n + resetgate * h_n)
-    hy = newgate + inputgate * (hidden - newgate)
 
-    return hy
+class RecurrentLayer_CPU(nn.Cell):
+    """
+    Single recurrent layer engine on CPU.
 
-class SingleGRULayer_CPU(nn.Cell):
-    """Single layer gru on CPU."""
-    def __init__(self, input_size, hidden_size, has_bias, bidirectional):
+    The input-to-hidden term of all the timesteps and directions is one matmul before the loop, only the
+    hidden-to-hidden term is left inside it, computed for both directions at once by a batched matmul. With
+    `seq_length` the loop stops at the longest sequence, the padded timesteps of shorter sequences keep their
+    state and output zeros, and the reverse direction starts at the last valid timestep of each sequence.
+    """
+    def __init__(self, mode, input_size, hidden_size, has_bias, bidirectional):
         super().__init__(False)
+        self.is_lstm = mode == 'LSTM'
         self.input_size = input_size
         self.hidden_size = hidden_size
         self.has_bias = has_bias
         self.bidirectional = bidirectional
-
-    def forward(self, x, h, weights, biases):
-        """forward direction."""
-        h_shape = h.shape
-        h = h.squeeze()
-        x_dtype = x.dtype
-
-        if not self.has_bias:
-            w_ih, w_hh = weights
-            w_ih, w_hh = w_ih.astype(x_dtype), w_hh.astype(x_dtype)
-            b_ih, b_hh = None, None
+        self.num_directions = 2 if bidirectional else 1
+
+    def _gru_step(self, gi, gh, h, c):
+        """GRU cell of all the directions, gi and gh shaped (num_directions, batch_size, 3 * hidden_size)."""
+        i_r, i_i, i_n = tensor_split(gi, 3, 2)
+        h_r, h_i, h_n = tensor_split(gh, 3, 2)
+
+        resetgate = sigmoid(i_r + h_r)
+        inputgate = sigmoid(i_i + h_i)
+        newgate = ops.tanh(i_n + resetgate * h_n)
+        hy = newgate + inputgate * (h - newgate)
+        return hy, c
+
+    def _lstm_step(self, gi, gh, h, c):
+        """LSTM cell of all the directions, gi and gh shaped (num_directions, batch_size, 4 * hidden_size)."""
+        ingate, forgetgate, cellgate, outgate = tensor_split(gi + gh, 4, 2)
+
+        cy = sigmoid(forgetgate) * c + sigmoid(ingate) * ops.tanh(cellgate)
+        hy = sigmoid(outgate) * ops.tanh(cy)
+        return hy, cy
+
+    def construct(self, inputs, h, weights, biases, seq_length=None):
+        time_step, batch_size = inputs.shape[:2]
+        x_dtype = inputs.dtype
+        num_directions = self.num_directions
+        if self.is_lstm:
+            h, c = h
         else:
-            w_ih, w_hh = weights
-            b_ih, b_hh = biases
-            w_ih, w_hh = w_ih.astype(x_dtype), w_hh.astype(x_dtype)
-            b_ih, b_hh = b_ih.astype(x_dtype), b_hh.astype(x_dtype)
+            c = None
+
+        # shape: (num_directions, gate_size, input_size), (num_directions, gate_size, hidden_size)
+        w_ih = ops.stack(weights[0::2]).astype(x_dtype)
+        w_hh = ops.stack(weights[1::2]).astype(x_dtype)
+        gate_size = w_ih.shape[1]
+
+        # one matmul for every timestep and direction
+        # shape: (seq_len, num_directions, batch_size, gate_size)
+        gi = ops.matmul(inputs.reshape((time_step * batch_size, -1)), w_ih.reshape((-1, self.input_size)).T)
+        gi = gi.reshape((time_step, batch_size, num_directions, gate_size)).transpose((0, 2, 1, 3))
+        b_hh = 0
+        if self.has_bias:
+            b_ih = ops.stack(biases[0::2]).astype(x_dtype)
+            b_hh = ops.stack(biases[1::2]).astype(x_dtype).expand_dims(1)
+            if self.is_lstm:
+                b_ih = b_ih + b_hh.squeeze(1)
+                b_hh = 0
+            gi = gi + b_ih.expand_dims(1)
+        if self.bidirectional:
+            gi = ops.stack([gi[:, 0], _reverse_sequence(gi[:, 1], seq_length)], 1)
 
-        time_step = x.shape[0]
-        outputs = Tensor(np.zeros((time_step, h_shape[1], h_shape[2])), x_dtype)
+        if seq_length is None:
+            max_length = Tensor(time_step)
+            mask = None
+        else:
+            max_length = seq_length.max()
+            # shape: (seq_len, 1, batch_size, 1)
+            mask = (arange(0, time_step, 1, dtype=seq_length.dtype).expand_dims(1) < seq_length.expand_dims(0))
+            mask = mask.view((time_step, 1, batch_size, 1))
 
+        outputs = ops.zeros((time_step, num_directions, batch_size, self.hidden_size), x_dtype)
+        w_hh = w_hh.swapaxes(1, 2)
         t = Tensor(0)
-        while t < time_step:
-            x_t = x[t]
-            h = gru_cell(x_t, h, w_ih, w_hh, b_ih, b_hh)
-            outputs[t,:,:] = h
+        while t < max_length:
+            # the hidden-to-hidden term of all the directions in one batched matmul
+            gh = ops.matmul(h, w_hh) + b_hh
+            if self.is_lstm:
+                h_t, c_t = self._lstm_step(gi[t], gh, h, c)
+            else:
+                h_t, c_t = self._gru_step(gi[t], gh, h, c)
+            if mask is None:
+                h, c = h_t, c_t
+                outputs[t] = h_t
+            else:
+                h = where(mask[t], h_t, h)
+                if self.is_lstm:
+                    c = where(mask[t], c_t, c)
+                outputs[t] = where(mask[t], h_t, ops.zeros_like(h_t))
             t += 1
 
-        return outputs, h.view(h_shape)
-
-
-    def bidirection(self, inputs, h, weights, biases):
-        """bidirectional."""
-        rev_inputs = reverse(inputs, [0])
-        h_f, h_b = tensor_split(h, 2)
-        if self.has_bias:
-            weights_f = weights[:2]
-            weights_b = weights[2:]
-            biases_f = biases[:2]
-            biases_b = biases[2:]
+        if self.bidirectional:
+            outputs = ops.concat([outputs[:, 0], _reverse_sequence(outputs[:, 1], seq_length)], 2)
         else:
-            weights_f = weights[:2]
-            weights_b = weights[2:]
-            biases_f = None
-            biases_b = None
-
-
-        outputs_f, hn_f = self.forward(inputs, h_f, weights_f, biases_f)
-        outputs_b, hn_b = self.forward(rev_inputs, h_b, weights_b, biases_b)
-
-        outputs_b = reverse(outputs_b, [0])
-        outputs = ops.concat([outputs_f, outputs_b], 2)
-        hn = ops.concat([hn_f, hn_b], 0)
+            outputs = outputs[:, 0]
+        if self.is_lstm:
+            return outputs, (h, c)
+        return outputs, h
 
-        return outputs, hn
 
-    def construct(self, inputs, h, weights, biases):
-        if self.bidirectional:
-            return self.bidirection(inputs, h, weights, biases)
-        return self.forward(inputs, h, weights, biases)
+class SingleGRULayer_CPU(RecurrentLayer_CPU):
+    """Single layer gru on CPU."""
+    def __init__(self, input_size, hidden_size, has_bias, bidirectional):
+        super().__init__('GRU', input_size, hidden_size, has_bias, bidirectional)
 
 
 class SingleLSTMLayerBase(nn.Cell):
@@ -156,6 +186,16 @@ class SingleLSTMLayerBase(nn.Cell):
 
 class SingleLSTMLayer_CPU(SingleLSTMLayerBase):
     """Single LSTM Layer CPU"""
+    def __init__(self, input_size, hidden_size, has_bias, bidirectional):
+        super().__init__(input_size, hidden_size, has_bias, bidirectional)
+        self.packed_rnn = RecurrentLayer_CPU('LSTM', input_size, hidden_size, has_bias, bidirectional)
+
+    def construct(self, inputs, h, weights, biases, seq_length=None):
+        # the fused LSTM kernel runs full-length sequences, the engine skips the padded timesteps
+        if seq_length is None:
+            return super().construct(inputs, h, weights, biases)
+        return self.packed_rnn(inputs, h, weights, biases, seq_length)
+
     def _flatten_weights(self, weights, biases):
         if self.bidirectional:
             weights = (weights[0].view((-1, 1, 1)), weights[2].view((-1, 1, 1)),
@@ -284,7 +324,7 @@ class MultiLayerRNN(nn.Cell):
         self.num_directions = num_directions
         self.has_bias = has_bias
 
-    def construct(self, inputs, hx, weights, biases):
+    def construct(self, inputs, hx, weights, biases, seq_length=None):
         """stacked mutil_layer static rnn"""
         pre_layer = inputs
         h_n = ()
@@ -309,7 +349,10 @@ class MultiLayerRNN(nn.Cell):
                 h_i = (hx_list[i], cx_list[i])
             else:
                 h_i = hx_list[i]
-            output, h_t = self.cell_list[i](pre_layer, h_i, w_list, b_list)
+            if seq_length is None:
+                output, h_t = self.cell_list[i](pre_layer, h_i, w_list, b_list)
+            else:
+                output, h_t = self.cell_list[i](pre_layer, h_i, w_list, b_list, seq_length)
             pre_layer = self.dropout(output) if (self.dropout_rate != 0 and i < self.num_layers - 1) else output
             if self.is_lstm:
                 h_n += (h_t[0],)
@@ -362,6 +405,7 @@ class _RNNBase(nn.Cell):
         self.num_layers = num_layers
         self.hidden_size = hidden_size
         is_gpu = context.get_context('device_target') == 'GPU'
+        self.support_seq_length = context.get_context('device_target') == 'CPU'
 
         if not 0 <= dropout <= 1:
             raise ValueError("dropout should be a number in range [0, 1] "
@@ -410,8 +454,11 @@ class _RNNBase(nn.Cell):
         self._weights = ParameterTuple(self._weights)
         self._biases = ParameterTuple(self._biases)
 
-    def construct(self, x, hx=None):
+    def construct(self, x, hx=None, seq_length=None):
         '''Defines the RNN like operators performed'''
+        if seq_length is not None and not self.support_seq_length:
+            raise ValueError(f"`seq_length` is only supported on CPU, but the device target is "
+                             f"{context.get_context('device_target')}.")
         max_batch_size = x.shape[0] if self.batch_first else x.shape[1]
         num_directions = 2 if self.bidirectional else 1
         x_dtype = x.dtype
@@ -423,7 +470,10 @@ class _RNNBase(nn.Cell):
         if self.batch_first:
             x = x.transpose((1, 0, 2))
 
-        x_n, hx_n = self.rnn(x, hx, self._weights, self._biases)
+        if seq_length is None:
+            x_n, hx_n = self.rnn(x, hx, self._weights, self._biases)
+        else:
+            x_n, hx_n = self.rnn(x, hx, self._weights, self._biases, seq_length)
 
         if self.batch_first:
             x_n = x_n.transpose((1, 0, 2))
@@ -478,6 +528,9 @@ class StaticGRU(_RNNBase):
           shape (seq_len, batch_size, `input_size`) or (batch_size, seq_len, `input_size`).
         - **hx** (Tensor) - Tensor of data type mindspore.float32 and
           shape (num_directions * `num_layers`, batch_size, `hidden_size`). Data type of `hx` must be the same as `x`.
+        - **seq_length** (Tensor) - The length of each sequence in the batch, of shape (batch_size,). The padded
+          timesteps are skipped, their outputs are zeros and `h_n` is the state at the last valid timestep. Only
+          supported on CPU. Default: None.
 
     Outputs:
         Tuple, a tuple contains (`output`, `h_n`).
@@ -562,6 +615,9 @@ class StaticLSTM(_RNNBase):
         - **hx** (tuple) - A tuple of two Tensors (h_0, c_0) both of data type mindspore.float32
           or mindspore.float16 and shape (num_directions * `num_layers`, batch_size, `hidden_size`).
           The data type of `hx` must be the same as `x`.
+        - **seq_length** (Tensor) - The length of each sequence in the batch, of shape (batch_size,). The padded
+          timesteps are skipped, their outputs are zeros and `h_n`, `c_n` are the states at the last valid
+          timestep. Only supported on CPU. Default: None.
 
     Outputs:
         Tuple, a tuple contains (`output`, (`h_n`, `c_n`)).
@@ -14,8 +14,12 @@
 # ============================================================================
 """MindNLP Parallel modules, which is ported from Megatron."""
 
-from . import layers
+from . import layers, cross_entropy, plans
 from .layers import *
+from .cross_entropy import *
+from .plans import *
 
 __all__ = []
 __all__.extend(layers.__all__)
+__all__.extend(cross_entropy.__all__)
+__all__.extend(plans.__all__)
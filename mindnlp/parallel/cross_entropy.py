@@ -0,0 +1,75 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tensor Parallel Cross Entropy"""
+
+import mindspore
+from mindspore import nn, ops
+from mindspore import Tensor
+
+from .mappings import _get_rank, _get_group_size, reduce_from_model_parallel_region
+
+
+def _reduce_max(input_: Tensor) -> Tensor:
+    """All-reduce the maximum of the input tensor across model parallel group."""
+    # Bypass the function if we are using only 1 GPU.
+    if _get_group_size() == 1:
+        return input_
+
+    _all_reduce = ops.AllReduce(ops.ReduceOp.MAX)
+    return _all_reduce(input_)
+
+
+class VocabParallelCrossEntropy(nn.Cell):
+    """Cross entropy of logits parallelized in the vocabulary dimension.
+
+    Every rank holds the logits of its vocabulary range, as returned by
+    `ParallelLMHead`. Only the maximum, the logit of the target and the sum of
+    the exponentials are all-reduced, three tensors of the size of the batch,
+    so the logits are never gathered. Takes the inputs of `nn.CrossEntropyLoss`
+    and returns the mean over the targets which are not ignored.
+    Arguments:
+        ignore_index: target value which does not contribute to the loss.
+    """
+
+    def __init__(self, ignore_index: int = -100) -> None:
+        super().__init__()
+        self.ignore_index = ignore_index
+
+    def construct(self, logits: Tensor, target: Tensor) -> Tensor:  # type: ignore
+        vocab_size_per_partition = logits.shape[-1]
+        vocab_start_index = _get_rank() * vocab_size_per_partition
+        vocab_end_index = vocab_start_index + vocab_size_per_partition
+
+        # Subtract the global maximum, which does not change the loss.
+        logits = logits.astype(mindspore.float32)
+        logits_max = ops.stop_gradient(_reduce_max(logits.max(axis=-1, keepdims=True)))
+        logits = logits - logits_max
+
+        # Logit of the target, which is held by a single rank.
+        target_mask = (target < vocab_start_index) | (target >= vocab_end_index)
+        masked_target = ops.masked_fill(target - vocab_start_index, target_mask, 0)
+        predicted_logits = ops.gather_elements(logits, -1, masked_target.astype(mindspore.int32).expand_dims(-1))
+        predicted_logits = ops.masked_fill(predicted_logits.squeeze(-1), target_mask, 0.0)
+        predicted_logits = reduce_from_model_parallel_region(predicted_logits)
+
+        # Sum of the exponentials over the whole vocabulary.
+        sum_exp_logits = reduce_from_model_parallel_region(ops.exp(logits).sum(-1))
+
+        loss = ops.log(sum_exp_logits) - predicted_logits
+        valid = (target != self.ignore_index).astype(loss.dtype)
+        return (loss * valid).sum() / ops.maximum(valid.sum(), 1.0)
+
+
+__all__ = ["VocabParallelCrossEntropy"]
@@ -308,9 +308,75 @@ class RowParallelLinear(nn.Cell):
         return output
 
 
+class ParallelLMHead(nn.Cell):
+    """Output projection parallelized in the vocabulary dimension.
+
+    The weight is laid out like the one of `VocabParallelEmbedding`, so that the
+    two can be tied, and every rank computes the logits of its vocabulary range,
+    which `VocabParallelCrossEntropy` takes without gathering them.
+    Arguments:
+        hidden_size: size of hidden state.
+        vocab_size: vocabulary size.
+        gather_output: If true, call all-gather on the logits and make the whole
+                       vocabulary available to all GPUs, e.g. to sample from it.
+        init_method: method to initialize weights.
+    """
+
+    def __init__(
+        self,
+        hidden_size: int,
+        vocab_size: int,
+        gather_output: bool = False,
+        init_method: Union[str, Initializer] = "normal",
+        dtype: mindspore.dtype = mindspore.float32,
+    ) -> None:
+        super().__init__()
+        # Keep the input dimensions.
+        self.hidden_size = hidden_size
+        self.vocab_size = vocab_size
+        self.gather_output = gather_output
+        # Divide the weight matrix along the vocaburaly dimension.
+        (
+            self.vocab_start_index,
+            self.vocab_end_index,
+        ) = VocabUtility.vocab_range_from_global_vocab_size(
+            self.vocab_size, get_rank(), get_group_size()
+        )
+        self.vocab_size_per_partition = self.vocab_end_index - self.vocab_start_index
+
+        # Allocate weights.
+        self.weight = Parameter(
+            initializer(
+                init_method, (self.vocab_size_per_partition, self.hidden_size), dtype
+            ),
+            "weight",
+        )
+
+    def construct(self, input_: Tensor) -> Tensor:  # type: ignore
+        # Set up backprop all-reduce.
+        input_parallel = copy_to_model_parallel_region(input_)
+        # Logits of the vocabulary of the rank.
+        logits_parallel = ops.matmul(input_parallel, self.weight.swapaxes(0, 1))
+        if self.gather_output:
+            # All-gather across the partitions.
+            return gather_from_model_parallel_region(logits_parallel)
+        return logits_parallel
+
+
+def gather_lm_logits(lm_head: nn.Cell, logits: Tensor) -> Tensor:
+    """The logits of the whole vocabulary, gathered from the ranks if `lm_head`
+    is a `ParallelLMHead` leaving them split, e.g. when no loss takes them.
+    """
+    if isinstance(lm_head, ParallelLMHead) and not lm_head.gather_output:
+        return gather_from_model_parallel_region(logits)
+    return logits
+
+
 __all__ = [
     "ColumnParallelLinear",
     "RowParallelLinear",
     "VocabParallelEmbedding",
     "ParallelEmbedding",
+    "ParallelLMHead",
+    "gather_lm_logits",
 ]
@@ -0,0 +1,252 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tensor Parallel Plans"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from mindspore import nn
+from mindspore import Tensor
+
+from mindspore.communication import get_rank, get_group_size
+
+from .cross_entropy import VocabParallelCrossEntropy
+from .layers import ColumnParallelLinear, RowParallelLinear, VocabParallelEmbedding, ParallelLMHead
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """The shard of a rank of a checkpoint array.
+
+    The array is split along `axis` in `chunks` fused blocks, e.g. the query,
+    key and value of a fused projection, and the rank keeps its part of every
+    block. The shard is transposed for the layers storing their weight like
+    (fan_in, fan_out) while the checkpoint stores it like `nn.Dense`.
+    """
+    axis: int
+    rank_id: int
+    rank_size: int
+    chunks: int = 1
+    transpose: bool = False
+
+    def shard(self, array: np.ndarray) -> np.ndarray:
+        """Take the shard of the rank, only the shard is read from a memory-mapped array."""
+        if array.shape[self.axis] % (self.chunks * self.rank_size) != 0:
+            raise ValueError(f"The dimension {self.axis} of shape {array.shape} can not be split in "
+                             f"{self.chunks} blocks over {self.rank_size} ranks.")
+        blocks = np.split(array, self.chunks, self.axis)
+        shards = [np.split(block, self.rank_size, self.axis)[self.rank_id] for block in blocks]
+        shard = shards[0] if self.chunks == 1 else np.concatenate(shards, self.axis)
+        if self.transpose:
+            shard = shard.T
+        return np.ascontiguousarray(shard)
+
+
+def _linear_sizes(cell):
+    """The input and output sizes of a `nn.Dense`, or of a layer storing its weight like (fan_in, fan_out)."""
+    if isinstance(cell, nn.Dense):
+        return cell.in_channels, cell.out_channels
+    return cell.weight.shape
+
+
+@dataclass(frozen=True)
+class ColwiseParallel:
+    """Parallelize a linear layer along its outputs, its output stays split over the ranks.
+
+    Arguments:
+        chunks: number of projections fused in the layer, laid out one after the
+                other like [q | k | v], every rank keeps its part of each one.
+    """
+    chunks: int = 1
+
+    def build(self, cell, rank_id, rank_size):
+        """The parallel layer and the shards of its parameters, by name in the layer and in the checkpoint."""
+        in_features, out_features = _linear_sizes(cell)
+        is_dense = isinstance(cell, nn.Dense)
+        has_bias = getattr(cell, "bias", None) is not None
+        layer = ColumnParallelLinear(in_features, out_features, bias=has_bias, gather_output=False,
+                                     dtype=cell.weight.dtype)
+        shards = {"weight": ("weight", ShardSpec(0 if is_dense else 1, rank_id, rank_size, self.chunks, is_dense))}
+        if has_bias:
+            shards["bias"] = ("bias", ShardSpec(0, rank_id, rank_size, self.chunks))
+        return layer, shards
+
+
+@dataclass(frozen=True)
+class RowwiseParallel:
+    """Parallelize a linear layer along its inputs, taking the split output of a `ColwiseParallel` layer."""
+
+    def build(self, cell, rank_id, rank_size):
+        """The parallel layer and the shards of its parameters, by name in the layer and in the checkpoint."""
+        in_features, out_features = _linear_sizes(cell)
+        is_dense = isinstance(cell, nn.Dense)
+        has_bias = getattr(cell, "bias", None) is not None
+        layer = RowParallelLinear(in_features, out_features, bias=has_bias, input_is_parallel=True,
+                                  dtype=cell.weight.dtype)
+        # the bias is added once the outputs are reduced, every rank keeps all of it
+        shards = {"weight": ("weight", ShardSpec(1 if is_dense else 0, rank_id, rank_size, transpose=is_dense))}
+        if has_bias:
+            shards["bias"] = ("bias", None)
+        return layer, shards
+
+
+@dataclass(frozen=True)
+class VocabParallel:
+    """Parallelize an embedding along its vocabulary."""
+
+    def build(self, cell, rank_id, rank_size):
+        """The parallel layer and the shards of its parameters, by name in the layer and in the checkpoint."""
+        table = cell.embedding_table
+        layer = VocabParallelEmbedding(cell.vocab_size, cell.embedding_size, padding_idx=cell.padding_idx,
+                                       dtype=table.dtype)
+        return layer, {"weight": ("embedding_table", ShardSpec(0, rank_id, rank_size))}
+
+
+@dataclass(frozen=True)
+class LMHeadParallel:
+    """Parallelize the output projection along the vocabulary, the logits stay split over the ranks.
+
+    The loss of the model, its `loss_fct`, is replaced by a `VocabParallelCrossEntropy`,
+    and the weight stays tied to the embedding if it was. Without labels the model gathers
+    the logits with `gather_lm_logits`, so a model computing its loss otherwise is refused.
+    """
+
+    def build(self, cell, rank_id, rank_size):
+        """The parallel layer and the shards of its parameters, by name in the layer and in the checkpoint."""
+        hidden_size, vocab_size = _linear_sizes(cell)
+        layer = ParallelLMHead(hidden_size, vocab_size, dtype=cell.weight.dtype)
+        is_dense = isinstance(cell, nn.Dense)
+        return layer, {"weight": ("weight", ShardSpec(0 if is_dense else 1, rank_id, rank_size,
+                                                      transpose=not is_dense))}
+
+
+@dataclass
+class TensorParallelPlan:
+    """Declares how a model is split over the ranks of a tensor parallel group.
+
+    Arguments:
+        layers: parallel style of the layers, by regular expression matching the
+                end of their path in the model, e.g. `h\\.\\d+\\.attn\\.c_attn`.
+        divided_attributes: attributes of the cells holding a number of heads or
+                            a width of the parallel layers, by cell class name,
+                            they are divided by the number of ranks.
+        head_ranges: attributes set to the range `(start, end)` of the heads of
+                     the rank, by cell class name, from the attribute holding
+                     the number of heads, e.g. to slice the ALiBi biases.
+    """
+    layers: Dict[str, object]
+    divided_attributes: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    head_ranges: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    def style(self, path: str):
+        """The parallel style of the layer at `path`, None if it is not parallelized."""
+        for pattern, style in self.layers.items():
+            if re.fullmatch(rf"(.*\.)?{pattern}", path):
+                return style
+        return None
+
+
+def _get_cell(model, path):
+    """The cell at a dotted path of the model."""
+    cell = model
+    for name in path.split(".") if path else ():
+        cell = getattr(cell, name)
+    return cell
+
+
+def parallelize(model: nn.Cell, plan: Optional[TensorParallelPlan] = None,
+                copy_weights: bool = True) -> Dict[str, Optional[ShardSpec]]:
+    """Replace the layers of a model by the parallel ones of its plan, on the rank of the process.
+
+    The parallel parameters keep the names of the parameters they replace, so
+    that the checkpoints of the whole model are loaded into them.
+    Arguments:
+        model: the model, whose class defines `tensor_parallel_plan` if `plan` is None.
+        plan: the tensor parallel plan.
+        copy_weights: If true, the parallel parameters are initialized with the
+                      shard of the rank of the replaced ones, otherwise they are
+                      left to be loaded, e.g. by `from_pretrained`.
+    Returns:
+        The shard of each parameter of the parallel layers, by parameter name,
+        None for the parameters kept whole on every rank.
+    """
+    if plan is None:
+        plan = getattr(model, "tensor_parallel_plan", None)
+    if plan is None:
+        raise ValueError(f"{model.__class__.__name__} has no tensor parallel plan, please give one.")
+    rank_id, rank_size = get_rank(), get_group_size()
+
+    shard_specs = {}
+    replaced = {}
+    paths = [path for path, _ in model.cells_and_names() if path and plan.style(path) is not None]
+    for path in paths:
+        parent = _get_cell(model, path.rpartition(".")[0])
+        if isinstance(plan.style(path), LMHeadParallel) and not isinstance(getattr(parent, "loss_fct", None), nn.Cell):
+            # any other loss would take the logits of the vocabulary of the rank for the whole ones
+            raise ValueError(f"The {path} of {parent.__class__.__name__} can only be parallelized if its loss is "
+                             f"computed by its `loss_fct`.")
+    for path in paths:
+        style = plan.style(path)
+        parent_path, _, name = path.rpartition(".")
+        parent = _get_cell(model, parent_path)
+        cell = getattr(parent, name)
+        layer, shards = style.build(cell, rank_id, rank_size)
+        names = {}
+        for param_name, (old_name, spec) in shards.items():
+            old_param = getattr(cell, old_name)
+            if id(old_param) in replaced:
+                # a tied weight is shared with the parallel layer which replaced its owner
+                _, param = replaced[id(old_param)]
+                setattr(layer, param_name, param)
+                names[param_name] = param.name
+                continue
+            param = getattr(layer, param_name)
+            if copy_weights:
+                array = old_param.asnumpy()
+                param.set_data(Tensor(array if spec is None else spec.shard(array), param.dtype))
+            # the replaced parameter is kept so that its id is not reused
+            replaced[id(old_param)] = (old_param, param)
+            names[param_name] = f"{path}.{old_name}"
+            shard_specs[names[param_name]] = spec
+        setattr(parent, name, layer)
+        for param_name, param_full_name in names.items():
+            getattr(layer, param_name).name = param_full_name
+        if isinstance(style, LMHeadParallel):
+            parent.loss_fct = VocabParallelCrossEntropy(getattr(parent.loss_fct, "ignore_index", -100))
+
+    for _, cell in model.cells_and_names():
+        for attr in plan.divided_attributes.get(cell.__class__.__name__, ()):
+            value = getattr(cell, attr)
+            if value % rank_size != 0:
+                raise ValueError(f"The {attr} of {cell.__class__.__name__}, {value}, can not be split over "
+                                 f"{rank_size} ranks.")
+            setattr(cell, attr, value // rank_size)
+        for attr, num_heads_attr in plan.head_ranges.get(cell.__class__.__name__, {}).items():
+            num_heads = getattr(cell, num_heads_attr) // rank_size
+            setattr(cell, attr, (rank_id * num_heads, (rank_id + 1) * num_heads))
+    return shard_specs
+
+
+__all__ = [
+    "ShardSpec",
+    "ColwiseParallel",
+    "RowwiseParallel",
+    "VocabParallel",
+    "LMHeadParallel",
+    "TensorParallelPlan",
+    "parallelize",
+]
@@ -0,0 +1,237 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+# pylint: disable=C0415
+"""
+Conversion of PyTorch checkpoints to MindSpore.
+
+Every model registers the rules renaming the parameters of its PyTorch checkpoints to the names of its MindSpore
+parameters. A checkpoint is converted tensor by tensor into a safetensors file of the conversion cache, keyed by the
+hash of the content of the checkpoint and of the rules, so that a checkpoint is converted once for all the processes.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from mindspore import log as logger
+
+from mindnlp.utils.download import get_cache_path
+from mindnlp.utils.serialization import write_safetensors
+
+# bump to invalidate the converted checkpoints of the cache when the output format changes
+_CONVERSION_VERSION = 1
+_HASH_CHUNK_SIZE = 16 * 1024 * 1024
+_hash_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RenameRule:
+    r"""
+    Rule renaming the parameters of a PyTorch checkpoint: `old` is replaced by `new` in the names containing one of
+    the `when` substrings and none of the `unless` substrings, an empty `when` matches every name.
+
+    Example:
+        >>> rule = RenameRule('.weight', '.gamma', when=('layernorm',))
+        >>> rule('h.0.input_layernorm.weight')
+        'h.0.input_layernorm.gamma'
+    """
+    old: str
+    new: str
+    when: Tuple[str, ...] = ()
+    unless: Tuple[str, ...] = ()
+
+    def __call__(self, name: str) -> str:
+        if self.when and not any(pattern in name for pattern in self.when):
+            return name
+        if any(pattern in name for pattern in self.unless):
+            return name
+        return name.replace(self.old, self.new)
+
+
+_CONVERSION_RULES: Dict[str, List[RenameRule]] = {}
+
+
+def register_conversion_rules(model_type: str, rules: List[RenameRule]):
+    r"""
+    Registers the rules renaming the parameters of the PyTorch checkpoints of a model, applied in order.
+
+    Args:
+        model_type (`str`):
+            The name the rules are registered under, usually the `model_type` of the config.
+        rules (`List[RenameRule]`):
+            The rules.
+    """
+    _CONVERSION_RULES[model_type] = list(rules)
+
+
+def get_conversion_rules(model_type: str) -> List[RenameRule]:
+    """Returns the rules registered for a model."""
+    if model_type not in _CONVERSION_RULES:
+        raise ValueError(f"No conversion rules are registered for '{model_type}', "
+                         f"the registered models are {sorted(_CONVERSION_RULES)}.")
+    return _CONVERSION_RULES[model_type]
+
+
+def convert_name(name: str, rules: List[RenameRule], prefix: str = "") -> str:
+    """Renames a parameter of a PyTorch checkpoint with the rules, under an optional prefix."""
+    for rule in rules:
+        name = rule(name)
+    return prefix + "." + name if prefix else name
+
+
+def checkpoint_hash(filename: str, cache_dir: Optional[str] = None) -> str:
+    r"""
+    Returns the sha256 of the content of a file. The hashes are memoized by path, size and modification time in the
+    conversion cache, so a large checkpoint is only read again once it changes.
+    """
+    cache_dir = cache_dir if cache_dir is not None else _default_cache_dir()
+    stat = os.stat(filename)
+    file_key = f"{os.path.realpath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+    memo_file = os.path.join(cache_dir, "hashes.json")
+
+    with _hash_lock:
+        memo = _read_json(memo_file)
+    if file_key in memo:
+        return memo[file_key]
+
+    sha256 = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    with _hash_lock:
+        # other processes may have added hashes meanwhile
+        memo = _read_json(memo_file)
+        memo[file_key] = digest
+        _atomic_write(memo_file, json.dumps(memo).encode("utf-8"))
+    return digest
+
+
+def convert_torch_checkpoint(pth_file: str, model_type: str, prefix: str = "", cache_dir: Optional[str] = None) -> str:
+    r"""
+    Converts a PyTorch checkpoint with the rules registered for a model, or returns the checkpoint converted before.
+
+    The checkpoint is memory-mapped when torch supports it, and every tensor is renamed and written to the converted
+    safetensors file on its own, so the state dict is never held twice in memory. The converted file is written to a
+    temporary file renamed once complete, processes converting the same checkpoint concurrently do not see partial
+    files.
+
+    Args:
+        pth_file (`str`):
+            The path of the PyTorch checkpoint.
+        model_type (`str`):
+            The name the conversion rules of the model are registered under.
+        prefix (`str`, *optional*):
+            The prefix of the converted names.
+        cache_dir (`str`, *optional*):
+            The directory of the converted checkpoints, defaults to `converted` in the mindnlp cache.
+
+    Returns:
+        `str`, the path of the converted checkpoint.
+    """
+    rules = get_conversion_rules(model_type)
+    cache_dir = cache_dir if cache_dir is not None else _default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    conversion_key = hashlib.sha256(
+        json.dumps([_CONVERSION_VERSION, checkpoint_hash(pth_file, cache_dir), prefix, [repr(rule) for rule in rules]])
+        .encode("utf-8")).hexdigest()
+    ms_ckpt_path = os.path.join(cache_dir, conversion_key + ".safetensors")
+    if os.path.exists(ms_ckpt_path):
+        logger.info(f"Using the converted checkpoint {ms_ckpt_path} of {pth_file}.")
+        return ms_ckpt_path
+
+    logger.info(f"Starting checkpoint conversion of {pth_file}.")
+    torch = _import_torch()
+    state_dict = _load_torch_state_dict(torch, pth_file)
+    names = [name for name, value in state_dict.items() if isinstance(value, torch.Tensor)]
+    specs = [(convert_name(name, rules, prefix), _torch_dtype_name(torch, state_dict[name].dtype),
+              tuple(state_dict[name].shape)) for name in names]
+    arrays = (_torch_to_numpy(torch, state_dict[name]) for name in names)
+
+    tmp_path = f"{ms_ckpt_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write_safetensors(tmp_path, specs, arrays, metadata={"source": os.path.basename(pth_file)})
+        os.replace(tmp_path, ms_ckpt_path)
+    except Exception as exc:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f'Save checkpoint to {ms_ckpt_path} failed, please checkout the path.') from exc
+    logger.info(f"Converted {pth_file} to {ms_ckpt_path}.")
+    return ms_ckpt_path
+
+
+def _default_cache_dir():
+    return os.path.join(get_cache_path(), "converted")
+
+
+def _read_json(filename):
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _atomic_write(filename, content):
+    tmp_path = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, filename)
+
+
+def _import_torch():
+    try:
+        import torch
+    except Exception as exc:
+        raise ImportError("'import torch' failed, please install torch by "
+                          "`pip install torch` or instructions from 'https://pytorch.org'") \
+            from exc
+    return torch
+
+
+def _load_torch_state_dict(torch, pth_file):
+    try:
+        return torch.load(pth_file, map_location=torch.device('cpu'), mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1 has no `mmap`, and checkpoints of the legacy format can not be mapped
+        return torch.load(pth_file, map_location=torch.device('cpu'))
+
+
+def _torch_dtype_name(torch, dtype):
+    names = {
+        torch.float64: "F64", torch.float32: "F32", torch.float16: "F16", torch.bfloat16: "BF16",
+        torch.int64: "I64", torch.int32: "I32", torch.int16: "I16", torch.int8: "I8", torch.uint8: "U8",
+        torch.bool: "BOOL",
+    }
+    if dtype not in names:
+        raise ValueError(f"Unsupported dtype {dtype} in the PyTorch checkpoint.")
+    return names[dtype]
+
+
+def _torch_to_numpy(torch, tensor):
+    if tensor.dtype == torch.bfloat16:
+        # numpy has no bfloat16, the bits are written as is
+        return tensor.contiguous().view(torch.int16).numpy().view(np.uint16)
+    return tensor.numpy()
+
+
+__all__ = ['RenameRule', 'register_conversion_rules', 'get_conversion_rules', 'convert_name', 'checkpoint_hash',
+           'convert_torch_checkpoint']
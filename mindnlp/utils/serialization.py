@@ -0,0 +1,190 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Memory-mapped checkpoint files in the safetensors format.
+
+A file starts with the length of its header as an unsigned little-endian 64 bits integer, followed by the header, a
+JSON object mapping every tensor name to its `dtype`, `shape` and the `data_offsets` of its bytes relative to the end of
+the header, the optional `__metadata__` entry maps strings to strings. The bytes of the tensors follow the header.
+"""
+
+import os
+import json
+import mmap
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import mindspore
+from mindspore import nn
+
+_DTYPES = {
+    "F64": np.float64,
+    "F32": np.float32,
+    "F16": np.float16,
+    "I64": np.int64,
+    "I32": np.int32,
+    "I16": np.int16,
+    "I8": np.int8,
+    "U8": np.uint8,
+    "BOOL": np.bool_,
+}
+_DTYPE_NAMES = {np.dtype(np_type): name for name, np_type in _DTYPES.items()}
+# numpy has no bfloat16, the values are widened to float32 when they are read
+_BF16 = "BF16"
+_ALIGNMENT = 8
+
+
+class SafeTensorsFile:
+    r"""
+    Read-only view of a safetensors file mapped in memory.
+
+    Only the header is parsed when the file is opened. [`SafeTensorsFile.get_array`] returns a numpy array backed by
+    the mapped bytes of a tensor, no bytes are read before the array is used, so a whole checkpoint never has to be
+    resident in memory at once.
+
+    Args:
+        filename (`str` or `os.PathLike`):
+            The path of the file.
+
+    Example:
+        >>> with SafeTensorsFile("mindspore.safetensors") as checkpoint:
+        ...     weight = checkpoint.get_array("dense.weight")
+    """
+
+    def __init__(self, filename: Union[str, os.PathLike]):
+        self.filename = str(filename)
+        with open(self.filename, "rb") as file:
+            header_length = struct.unpack("<Q", file.read(8))[0]
+            try:
+                header = json.loads(file.read(header_length))
+            except ValueError as exc:
+                raise ValueError(f"'{self.filename}' is not a safetensors file.") from exc
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.metadata = header.pop("__metadata__", None) or {}
+        self._header = header
+        self._data_start = 8 + header_length
+
+    def keys(self):
+        """The names of the tensors in the file."""
+        return list(self._header.keys())
+
+    def __contains__(self, name):
+        return name in self._header
+
+    def __len__(self):
+        return len(self._header)
+
+    def get_shape(self, name: str):
+        """The shape of a tensor, without reading it."""
+        return tuple(self._header[name]["shape"])
+
+    def get_array(self, name: str) -> np.ndarray:
+        """
+        Returns a tensor of the file as a read-only numpy array backed by the memory map. BF16 tensors are copied to
+        float32 arrays.
+        """
+        info = self._header[name]
+        start, end = info["data_offsets"]
+        offset = self._data_start + start
+        shape = tuple(info["shape"])
+        if info["dtype"] == _BF16:
+            array = np.frombuffer(self._mmap, np.uint16, (end - start) // 2, offset)
+            return (array.astype(np.uint32) << 16).view(np.float32).reshape(shape)
+        if info["dtype"] not in _DTYPES:
+            raise ValueError(f"Unsupported dtype {info['dtype']} of '{name}' in '{self.filename}'.")
+        np_type = np.dtype(_DTYPES[info["dtype"]])
+        return np.frombuffer(self._mmap, np_type, (end - start) // np_type.itemsize, offset).reshape(shape)
+
+    def close(self):
+        """Unmaps the file, the arrays returned by `get_array` must not be used afterwards."""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def save_safetensors(parameters: Union[nn.Cell, Dict[str, Union[mindspore.Tensor, np.ndarray]]],
+                     filename: Union[str, os.PathLike], metadata: Optional[Dict[str, str]] = None):
+    r"""
+    Saves tensors to a safetensors file, the tensors are written one at a time.
+
+    Args:
+        parameters (`nn.Cell` or `Dict[str, Union[mindspore.Tensor, np.ndarray]]`):
+            A cell, whose parameters are saved under their names, or a dict of tensors.
+        filename (`str` or `os.PathLike`):
+            The path of the file.
+        metadata (`Dict[str, str]`, *optional*):
+            Free-form strings saved in the header.
+    """
+    if isinstance(parameters, nn.Cell):
+        parameters = {param.name: param for param in parameters.get_parameters()}
+
+    specs = []
+    for name, tensor in parameters.items():
+        dtype = np.dtype(mindspore.dtype_to_nptype(tensor.dtype)) if isinstance(tensor, mindspore.Tensor) \
+            else tensor.dtype
+        if dtype not in _DTYPE_NAMES:
+            raise ValueError(f"Unsupported dtype {dtype} of '{name}'.")
+        specs.append((name, _DTYPE_NAMES[dtype], tuple(tensor.shape)))
+    arrays = (tensor.asnumpy() if isinstance(tensor, mindspore.Tensor) else tensor for tensor in parameters.values())
+    write_safetensors(filename, specs, arrays, metadata)
+
+
+def write_safetensors(filename: Union[str, os.PathLike], specs: List[Tuple[str, str, Tuple[int]]],
+                      arrays: Iterable[np.ndarray], metadata: Optional[Dict[str, str]] = None):
+    r"""
+    Writes a safetensors file from the specs of its tensors and their arrays. The header is built from the specs, so the
+    arrays can be produced lazily and are released once written, a checkpoint is streamed to the file one tensor at a
+    time.
+
+    Args:
+        filename (`str` or `os.PathLike`):
+            The path of the file.
+        specs (`List[Tuple[str, str, Tuple[int]]]`):
+            The name, the safetensors dtype (`"F32"`, `"BF16"`, ...) and the shape of every tensor.
+        arrays (`Iterable[np.ndarray]`):
+            The arrays of the tensors in the order of `specs`, BF16 tensors are given as their uint16 bits.
+        metadata (`Dict[str, str]`, *optional*):
+            Free-form strings saved in the header.
+    """
+    header = {}
+    offset = 0
+    for name, dtype, shape in specs:
+        itemsize = 2 if dtype == _BF16 else np.dtype(_DTYPES[dtype]).itemsize
+        size = int(np.prod(shape)) * itemsize
+        header[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + size]}
+        offset += size
+    if metadata:
+        header["__metadata__"] = {str(key): str(value) for key, value in metadata.items()}
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # the tensors start on an aligned offset
+    header_bytes += b" " * (-len(header_bytes) % _ALIGNMENT)
+    with open(filename, "wb") as file:
+        file.write(struct.pack("<Q", len(header_bytes)))
+        file.write(header_bytes)
+        for (name, _, _), array in zip(specs, arrays):
+            array = np.ascontiguousarray(array)
+            start, end = header[name]["data_offsets"]
+            if array.nbytes != end - start:
+                raise ValueError(f"The array of '{name}' does not match its spec.")
+            file.write(array.data)
+
+
+__all__ = ['SafeTensorsFile', 'save_safetensors', 'write_safetensors']
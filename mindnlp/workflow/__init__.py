@@ -19,3 +19,4 @@ MindNLP workflow module.
 from .works import *
 from .work import *
 from .downstream import *
+from .serving import *
@@ -0,0 +1,193 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Asynchronous micro-batching front-end of Workflow.
+"""
+
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_LATENCY_WINDOW = 1024
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+class BatchingWorkflow:
+    r"""
+    Serves a [`Workflow`] to concurrent callers submitting one text at a time.
+
+    The texts are queued and collected in batches of up to `max_batch_size` texts, a batch is closed when it is full
+    or `max_wait_ms` after its first text arrived. Every batch runs as one call of the workflow on a worker thread,
+    so the event loop keeps collecting the next batch meanwhile, and the results are sent back to the waiting
+    callers. The queue holds at most `max_queue_size` texts, callers wait for room once it is full.
+
+    Args:
+        workflow (Callable): The `Workflow`, or any callable taking a list of texts and returning one result per text.
+        max_batch_size (int): Maximum number of texts of a batch. Default: 32.
+        max_wait_ms (float): Maximum time a batch waits for more texts, in milliseconds. Default: 5.0.
+        max_queue_size (int): Maximum number of queued texts. Default: 1024.
+
+    Example:
+        >>> from mindnlp import Workflow
+        >>> from mindnlp.workflow import BatchingWorkflow
+        >>> async def main():
+        ...     async with BatchingWorkflow(Workflow("sentiment_analysis")) as senta:
+        ...         return await asyncio.gather(*(senta(review) for review in reviews))
+    """
+
+    def __init__(self, workflow, max_batch_size=32, max_wait_ms=5.0, max_queue_size=1024):
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` should be positive, but got {max_batch_size}.")
+        self.workflow = workflow
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._collector = None
+        self._executor = None
+        self._inflight = None
+        self._tasks = set()
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._num_requests = 0
+        self._num_completed = 0
+        self._num_batches = 0
+
+    async def start(self):
+        """Start collecting the batches, called by the first request otherwise."""
+        if self._collector is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        # a single worker runs the model, the next batch is collected while the current one runs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow")
+        self._inflight = asyncio.Semaphore(2)
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        """
+        Stop collecting the batches, the running batches are completed and the other requests are cancelled.
+        """
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # the worker is idle once the batches are done, shutting it down does not block the event loop
+        self._executor.shutdown(wait=False)
+        self._collector = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def __call__(self, text):
+        """
+        Submit a text and wait for its result, waits for room in the queue when it is full.
+        """
+        if not (isinstance(text, str) and len(text) > 0):
+            raise ValueError(f"Invalid input, the text should be a non-empty str, but got {text!r}.")
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        self._num_requests += 1
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self._inflight.acquire()
+                task = loop.create_task(self._run_batch(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                batch = []
+            finally:
+                # the texts taken off the queue but not run when the collection is cancelled, their callers would
+                # wait forever otherwise
+                for _, future, _ in batch:
+                    future.cancel()
+
+    async def _run_batch(self, batch):
+        try:
+            texts = [text for text, _, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.workflow, texts)
+            if len(results) != len(batch):
+                raise RuntimeError(f"The workflow returned {len(results)} results for {len(batch)} texts.")
+        except Exception as exc:  # pylint: disable=broad-except
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._inflight.release()
+        self._num_batches += 1
+        self._num_completed += len(batch)
+        end = time.perf_counter()
+        for (_, future, begin), result in zip(batch, results):
+            self._latencies.append(end - begin)
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self):
+        """
+        The state of the queue and the latencies of the latest requests.
+
+        Returns:
+            Dict, with `queue_depth`, `max_queue_size`, `requests`, `batches`, `mean_batch_size` and the mean and
+            percentiles of the latency from submission to result in milliseconds.
+        """
+        latencies = sorted(latency * 1000 for latency in self._latencies)
+        metrics = {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "requests": self._num_requests,
+            "batches": self._num_batches,
+            "mean_batch_size": self._num_completed / self._num_batches if self._num_batches else 0.0,
+        }
+        if latencies:
+            metrics.update({
+                "latency_mean_ms": sum(latencies) / len(latencies),
+                "latency_p50_ms": _percentile(latencies, 50),
+                "latency_p95_ms": _percentile(latencies, 95),
+                "latency_p99_ms": _percentile(latencies, 99),
+            })
+        return metrics
+
+
+__all__ = ['BatchingWorkflow']
@@ -22,9 +22,16 @@ import abc
 import os
 from abc import abstractmethod
 
+import numpy as np
+
 from mindnlp.configs import DEFAULT_ROOT
 from mindnlp.utils import cache_file
 
+# padded lengths of the batches, the model is compiled once per bucket in graph mode
+DEFAULT_SHAPE_BUCKETS = (16, 32, 64, 128, 256, 512)
+# texts tokenized per call of the batched tokenizer
+_TOKENIZE_CHUNK_SIZE = 1024
+
 
 class Work(metaclass=abc.ABCMeta):
     """
@@ -168,6 +175,55 @@ class Work(metaclass=abc.ABCMeta):
         the final results to match with the user inputs.
         """
 
+    def _tokenize_batch(self, texts, max_length=None):
+        """
+        Tokenize the texts with the batched encoder of the tokenizer, returns the token ids of every text.
+        """
+        if not hasattr(self._tokenizer, "encode_batch"):
+            return [np.asarray(self._tokenizer.execute_py(text))[:max_length] for text in texts]
+        token_ids = []
+        for idx in range(0, len(texts), _TOKENIZE_CHUNK_SIZE):
+            input_ids, attention_mask = self._tokenizer.encode_batch(
+                texts[idx: idx + _TOKENIZE_CHUNK_SIZE], max_length=max_length, return_token_type_ids=False)
+            lengths = attention_mask.sum(axis=1)
+            token_ids.extend(ids[:length] for ids, length in zip(input_ids, lengths))
+        return token_ids
+
+    def _bucket_batches(self, token_ids, batch_size, pad_value):
+        """
+        Group the sequences of similar lengths in batches, padded to the shape buckets.
+
+        Returns:
+            List of `(indices, input_ids, attention_mask)`, where `indices` are the positions of the rows of the
+            batch in `token_ids`, to restore the results to the order of the inputs with `_restore_order`.
+        """
+        shape_buckets = self.kwargs.get("shape_buckets", DEFAULT_SHAPE_BUCKETS)
+        lengths = np.array([len(ids) for ids in token_ids], np.int64)
+        order = np.argsort(lengths, kind="stable")
+        batches = []
+        for idx in range(0, len(order), batch_size):
+            indices = order[idx: idx + batch_size]
+            max_length = int(lengths[indices[-1]])
+            bucket = next((length for length in shape_buckets if length >= max_length), max_length)
+            input_ids = np.full((len(indices), bucket), pad_value, np.int32)
+            attention_mask = np.zeros((len(indices), bucket), np.int32)
+            for row, index in enumerate(indices):
+                input_ids[row, :lengths[index]] = token_ids[index]
+                attention_mask[row, :lengths[index]] = 1
+            batches.append((indices, input_ids, attention_mask))
+        return batches
+
+    @staticmethod
+    def _restore_order(indices, values):
+        """
+        Put the values computed in the order of the batches of `_bucket_batches` back to the order of the inputs.
+        """
+        indices = np.concatenate(indices)
+        values = np.concatenate(values)
+        restored = np.empty_like(values)
+        restored[indices] = values
+        return restored
+
     def help(self):
         """
         Return the usage message of the current work.
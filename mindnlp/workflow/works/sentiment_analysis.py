@@ -21,15 +21,14 @@ Sentiment Analysis Work
 
 import os
 
+import numpy as np
 import mindspore
 from mindspore import Tensor
 from mindspore.dataset import text
 from mindspore.ops import functional as F
-from mindnlp._legacy.functional import argmax
 from mindnlp.workflow.work import Work
 from mindnlp.workflow.downstream import BertForSentimentAnalysis
 from mindnlp.models import BertConfig
-from mindnlp.transforms import PadTransform
 from mindnlp.transforms.tokenizers import BertTokenizer
 
 usage = r"""
@@ -110,67 +109,47 @@ class SentimentAnalysisWork(Work):
         Preprocess the inputs.
         """
         # Get the config from the kwargs
-        batch_size = self.kwargs["batch_size"] if "batch_size" in self.kwargs else 1
-
-        examples = []
-        filter_inputs = []
-        for input_data in inputs:
-            if not (isinstance(input_data, str) and len(input_data) > 0):
-                continue
-            filter_inputs.append(input_data)
-            ids = self._tokenizer.execute_py(input_data)
-            lens = len(ids)
-            examples.append((ids, lens))
-
-        batches = [examples[idx: idx + batch_size]
-                   for idx in range(0, len(examples), batch_size)]
+        batch_size = self.kwargs["batch_size"] if "batch_size" in self.kwargs else 32
+        max_seq_len = self.kwargs["max_seq_len"] if "max_seq_len" in self.kwargs else 512
+
+        # the texts are given as arguments, or as a list in the first argument
+        if len(inputs) == 1 and isinstance(inputs[0], (list, tuple)):
+            inputs = inputs[0]
+        filter_inputs = [input_data for input_data in inputs if isinstance(input_data, str) and len(input_data) > 0]
+
+        token_ids = self._tokenize_batch(filter_inputs, max_length=max_seq_len)
         outputs = {}
         outputs["text"] = filter_inputs
-        outputs["data_loader"] = batches
+        outputs["data_loader"] = self._bucket_batches(token_ids, batch_size, self.kwargs["pad_token_id"])
 
         return outputs
 
-    def _batchify_fn(self, samples):
-        seq_list = [sample[1] for sample in samples]
-        max_length = max(seq_list)
-        outputs = []
-        pader = PadTransform(max_length=max_length,
-                             pad_value=self.kwargs["pad_token_id"])
-        for sample in samples:
-            outputs.append(pader(sample[0]))
-        return Tensor(outputs)
-
     def _run_model(self, inputs):
         """
         Run the model.
         """
-        results = []
+        indices = []
+        label_ids = []
         scores = []
-        for batch in inputs["data_loader"]:
-            ids = self._batchify_fn(batch)
-            outputs = self._model(ids)
-            probs = F.softmax(outputs, axis=-1)
-            idx = argmax(probs, dim=-1).asnumpy().tolist()
-            if isinstance(idx, int):
-                idx = [idx]
-            score = [max(prob.asnumpy().tolist()) for prob in probs]
-            labels = [self._label_map[i] for i in idx]
-            results.extend(labels)
-            scores.extend(score)
-
-        inputs["result"] = results
-        inputs["score"] = scores
+        for batch_indices, input_ids, attention_mask in inputs["data_loader"]:
+            outputs = self._model(Tensor(input_ids), Tensor(attention_mask))
+            probs = F.softmax(outputs, axis=-1).asnumpy()
+            indices.append(batch_indices)
+            label_ids.append(probs.argmax(axis=-1))
+            scores.append(probs.max(axis=-1))
+
+        if not indices:
+            inputs["result"] = []
+            inputs["score"] = []
+            return inputs
+        labels = np.array([self._label_map[idx] for idx in sorted(self._label_map)])
+        inputs["result"] = labels[self._restore_order(indices, label_ids)].tolist()
+        inputs["score"] = self._restore_order(indices, scores).tolist()
         return inputs
 
     def _postprocess(self, inputs):
         """
         Postprocess the outputs.
         """
-        final_results = []
-        for _text, label, score in zip(inputs["text"], inputs["result"], inputs["score"]):
-            result = {}
-            result["text"] = _text
-            result["label"] = label
-            result["score"] = score
-            final_results.append(result)
-        return final_results
+        return [{"text": _text, "label": label, "score": score}
+                for _text, label, score in zip(inputs["text"], inputs["result"], inputs["score"])]
@@ -19,6 +19,7 @@ from mindnlp.engine.callbacks.timer_callback import TimerCallback
 from mindnlp.engine.callbacks.earlystop_callback import EarlyStopCallback
 from mindnlp.engine.callbacks.best_model_callback import BestModelCallback
 from mindnlp.engine.callbacks.checkpoint_callback import CheckpointCallback
+from mindnlp.engine.callbacks.profiler_callback import ProfilerCallback
 
 class TestCallbackRun(unittest.TestCase):
     r"""
@@ -58,3 +59,10 @@ class TestCallbackRun(unittest.TestCase):
         except Exception as exception:
             raise exception
         print(checkpoint_callback)
+
+    def test_profiler_callback_init(self):
+        """Test Profiler Callback Initialization."""
+        with self.assertRaises(ValueError):
+            ProfilerCallback(save_path=None)
+        profiler_callback = ProfilerCallback(save_path='save/profile.csv', tokens_column='input_ids')
+        assert profiler_callback.summary()['fetch'] == (0.0, 0.0)
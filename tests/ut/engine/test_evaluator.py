@@ -67,3 +67,10 @@ class TestEvaluatorRun(unittest.TestCase):
         evaluator = Evaluator(network=self.net, eval_dataset=self.eval_dataset, metrics=self.metric,
                               callbacks=self.callbacks, jit=jit)
         evaluator.run(tgt_columns='label')
+
+    @data(True, False)
+    def test_evaluator_dataset_sink(self, jit):
+        """test evaluator run with data sink"""
+        evaluator = Evaluator(network=self.net, eval_dataset=self.eval_dataset, metrics=self.metric,
+                              callbacks=self.callbacks, jit=jit, dataset_sink_mode=True)
+        evaluator.run(tgt_columns='label')
@@ -15,6 +15,9 @@
 """Test Trainer run function"""
 # pylint: disable=C0103
 # pylint: disable=W0621
+import os
+import json
+import tempfile
 import unittest
 import numpy as np
 from ddt import ddt, data
@@ -22,11 +25,13 @@ from mindspore import nn, Tensor
 import mindspore.dataset as ds
 
 from mindnlp.engine.trainer import Trainer
+from mindnlp.engine.utils import InputBinding
 from mindnlp.metrics import Accuracy
 from mindnlp.engine.callbacks.timer_callback import TimerCallback
 from mindnlp.engine.callbacks.earlystop_callback import EarlyStopCallback
 from mindnlp.engine.callbacks.best_model_callback import BestModelCallback
 from mindnlp.engine.callbacks.checkpoint_callback import CheckpointCallback
+from mindnlp.engine.callbacks.profiler_callback import ProfilerCallback
 
 np.random.seed(1)
 
@@ -160,6 +165,69 @@ class TestTrainerRun(unittest.TestCase):
                           optimizer=self.optimizer, loss_fn=self.loss_fn, jit=jit)
         trainer.run(tgt_columns='length')
 
+    @data(True, False)
+    def test_trainer_accumulate(self, jit):
+        """test_trainer_accumulate"""
+        trainer = Trainer(network=self.net, train_dataset=self.train_dataset, eval_dataset=self.eval_dataset,
+                          metrics=self.metric, epochs=2, optimizer=self.optimizer, loss_fn=self.loss_fn,
+                          jit=jit, accumulate_steps=2, max_grad_norm=1.0)
+        trainer.run(tgt_columns='label')
+        assert trainer.accumulator.counter.asnumpy() == 11
+
+    def test_trainer_resume(self):
+        """test_trainer_resume"""
+        with tempfile.TemporaryDirectory() as save_path:
+            checkpoint_callback = CheckpointCallback(save_path=save_path, steps=7, keep_checkpoint_max=1)
+            trainer = Trainer(network=self.net, train_dataset=self.train_dataset, epochs=2, optimizer=self.optimizer,
+                              loss_fn=self.loss_fn, callbacks=checkpoint_callback)
+            trainer.run(tgt_columns='label')
+            expected = {param.name: param.asnumpy() for param in self.net.get_parameters()}
+
+            # resume from the checkpoint of step 7, the third step of the second epoch
+            net = MyModel()
+            net.update_parameters_name('net.')
+            optimizer = nn.Adam(net.trainable_params(), learning_rate=0.01)
+            resumed = Trainer(network=net, train_dataset=self.train_dataset, epochs=2, optimizer=optimizer,
+                              loss_fn=self.loss_fn)
+            resumed.run(tgt_columns='label', resume_from_checkpoint=save_path)
+            assert resumed.global_step == 10
+            for param in net.get_parameters():
+                assert np.allclose(param.asnumpy(), expected[param.name], 1e-6, 1e-6)
+
+    def test_trainer_checkpoint_steps(self):
+        """test_trainer_checkpoint_steps"""
+        with tempfile.TemporaryDirectory() as save_path:
+            checkpoint_callback = CheckpointCallback(save_path=save_path, steps=2, keep_checkpoint_max=1,
+                                                     ckpt_name='net')
+            trainer = Trainer(network=self.net, train_dataset=self.train_dataset, epochs=2, optimizer=self.optimizer,
+                              loss_fn=self.loss_fn, callbacks=checkpoint_callback)
+            trainer.run(tgt_columns='label')
+            # the older checkpoints are pruned once written
+            assert os.listdir(save_path) == [f'net_step_{trainer.global_step}.safetensors']
+
+    @data(True, False)
+    def test_trainer_profiler(self, jit):
+        """test_trainer_profiler"""
+        with tempfile.TemporaryDirectory() as save_path:
+            profiler_callback = ProfilerCallback(save_path=save_path + '/profile.jsonl', tokens_column='length')
+            trainer = Trainer(network=self.net, train_dataset=self.train_dataset, epochs=2, optimizer=self.optimizer,
+                              loss_fn=self.loss_fn, callbacks=profiler_callback, jit=jit)
+            trainer.run(tgt_columns='label')
+            with open(save_path + '/profile.jsonl', encoding='utf-8') as file:
+                records = [json.loads(line) for line in file]
+        assert len(records) == 10
+        assert records[0]['compile'] and not records[1]['compile']
+        assert records[0]['samples'] == 4
+        assert all(record['fetch_time'] >= 0 and 0 <= record['padding_ratio'] <= 1 for record in records)
+
+    def test_trainer_host_overhead(self):
+        """test_trainer_host_overhead"""
+        trainer = Trainer(network=self.net, train_dataset=self.train_dataset, eval_dataset=self.eval_dataset,
+                          metrics=self.metric, epochs=1, optimizer=self.optimizer, loss_fn=self.loss_fn)
+        trainer.run(tgt_columns='label')
+        assert trainer.host_overhead > 0
+        assert trainer.evaluator.host_overhead > 0
+
     @data(True, False)
     def test_train_object_netword(self, jit):
         """test_eval_in_trainer"""
@@ -167,3 +235,40 @@ class TestTrainerRun(unittest.TestCase):
         trainer = Trainer(network=net, train_dataset=self.train_dataset, epochs=2,
                           optimizer=self.optimizer, jit=jit)
         trainer.run()
+
+    @data(True, False)
+    def test_trainer_dataset_sink(self, jit):
+        """test_trainer_dataset_sink"""
+        trainer = Trainer(network=self.net, train_dataset=self.train_dataset, eval_dataset=self.eval_dataset,
+                          metrics=self.metric, epochs=2, optimizer=self.optimizer, loss_fn=self.loss_fn,
+                          callbacks=self.timer_callback_epochs, jit=jit, dataset_sink_mode=True, sink_size=5)
+        trainer.run(tgt_columns='label')
+        assert trainer.cur_step_nums == 5
+
+    def test_trainer_dataset_sink_size(self):
+        """test_trainer_dataset_sink_size"""
+        trainer = Trainer(network=self.net, train_dataset=self.train_dataset, epochs=2, optimizer=self.optimizer,
+                          loss_fn=self.loss_fn, dataset_sink_mode=True, sink_size=2)
+        with self.assertRaises(ValueError):
+            trainer.run(tgt_columns='label')
+
+
+class TestInputBinding(unittest.TestCase):
+    r"""
+    Test InputBinding
+    """
+    def test_bind_columns(self):
+        """test the columns are bound in the order of the construct"""
+        binding = InputBinding(MyModel2(), ['label'])
+        bind = binding.compile(['length', 'label', 'data'])
+        inputs, tgts = bind(('l', 'y', 'x'))
+        assert tuple(inputs) == ('x', 'y', 'l')
+        assert tuple(tgts) == ('y',)
+        assert binding.compile(['length', 'label', 'data']) is bind
+
+    def test_missing_columns(self):
+        """test missing columns raise"""
+        with self.assertRaises(ValueError):
+            InputBinding(MyModel2()).indices(['data', 'label'])
+        with self.assertRaises(ValueError):
+            InputBinding(MyModel(), ['label']).indices(['data'])
@@ -59,6 +59,18 @@ class TestClassPerplexity(unittest.TestCase):
         assert np.allclose(ppl, 2.23144, 1e-5, 1e-5)
 
 
+    def test_class_perplexity_tensor_soft_labels(self):
+        """
+        Test class Perplexity
+        """
+        preds = Tensor(np.array([[0.2, 0.5], [0.3, 0.1], [0.9, 0.6]]))
+        labels = Tensor(np.array([[0.4, 0.6], [0.8, 0.2], [0.1, 0.9]]))
+
+        metric = Perplexity()
+        with self.assertRaises(RuntimeError):
+            metric.update(preds, labels)
+
+
     def test_class_perplexity_np(self):
         """
         Test class Perplexity
@@ -394,6 +406,24 @@ class TestClassRougeL(unittest.TestCase):
 
         assert np.allclose(rougel_score, 0.78005, 1e-5, 1e-5)
 
+    def test_class_rougel_update_batch(self):
+        """
+        Test class RougeL update_batch
+        """
+        cand_lists = [["The","cat","The","cat","on","the","mat"], ["a","cat","sat"]]
+        ref_lists = [[["The","cat","is","on","the","mat"], ["There","is","a","cat","on","the","mat"]],
+                     [["the","cat","sat","down"]]]
+
+        metric = RougeL()
+        for cand_list, ref_list in zip(cand_lists, ref_lists):
+            metric.update(cand_list, ref_list)
+        batch_metric = RougeL(num_workers=2)
+        batch_metric.update_batch(cand_lists, ref_lists)
+
+        assert batch_metric.inst_scores == metric.inst_scores
+        assert batch_metric.eval() == metric.eval()
+
+
 class TestClassDistinct(unittest.TestCase):
     r"""
     Test class Distinct
@@ -483,6 +513,18 @@ class TestClassAccuracy(unittest.TestCase):
         assert np.allclose(acc, 0.66666, 1e-5, 1e-5)
 
 
+    def test_class_accuracy_tensor_soft_labels(self):
+        """
+        Test class Accuracy
+        """
+        preds = Tensor(np.array([[0.2, 0.5], [0.3, 0.1], [0.9, 0.6]]), mindspore.float32)
+        labels = Tensor(np.array([[0.4, 0.6], [0.8, 0.2], [0.1, 0.9]]), mindspore.float32)
+
+        metric = Accuracy()
+        with self.assertRaises(ValueError):
+            metric.update(preds, labels)
+
+
     def test_class_accuracy_np_multi(self):
         """
         Test class Accuracy
@@ -760,6 +802,19 @@ class TestClassF1Score(unittest.TestCase):
         assert np.array_equal(f1_s, [0.6666666666666666, 0.6666666666666666])
 
 
+    def test_class_f1_score_tensor_label_range(self):
+        """
+        Test class F1Score
+        """
+        preds = Tensor(np.array([[0.2, 0.5], [0.3, 0.1], [0.9, 0.6]]))
+        labels = Tensor(np.array([1, 0, 2]))
+
+        metric = F1Score()
+        metric.update(preds, labels)
+        with self.assertRaises(ValueError):
+            metric.eval()
+
+
     def test_class_f1_score_np_multi(self):
         """
         Test class F1Score
@@ -1222,3 +1277,48 @@ class TestClassConfusionMatrix(unittest.TestCase):
         conf_mat = metric.eval()
 
         assert np.array_equal(conf_mat, np.array([[1., 1.], [1., 1.]]))
+
+
+class TestClassDeviceAccumulation(unittest.TestCase):
+    r"""
+    Test metrics accumulated on device match the ones accumulated on host
+    """
+    def setUp(self):
+        np.random.seed(0)
+        self.batches = []
+        for _ in range(5):
+            preds = np.random.rand(8, 4).astype(np.float32)
+            preds = preds / preds.sum(axis=1, keepdims=True)
+            labels = np.random.randint(0, 4, (8,)).astype(np.int32)
+            self.batches.append((preds, labels))
+
+    def _check(self, metric_device, metric_host):
+        for preds, labels in self.batches:
+            metric_device.update(Tensor(preds), Tensor(labels))
+            metric_host.update(preds, labels)
+        assert np.allclose(metric_device.eval(), metric_host.eval(), 1e-5, 1e-5)
+
+    def test_class_accuracy_device(self):
+        """
+        Test class Accuracy
+        """
+        self._check(Accuracy(), Accuracy())
+
+    def test_class_f1_score_device(self):
+        """
+        Test class F1Score
+        """
+        self._check(F1Score(), F1Score())
+
+    def test_class_perplexity_device(self):
+        """
+        Test class Perplexity
+        """
+        self._check(Perplexity(), Perplexity())
+        self._check(Perplexity(ignore_label=2), Perplexity(ignore_label=2))
+
+    def test_class_confusion_matrix_device(self):
+        """
+        Test class ConfusionMatrix
+        """
+        self._check(ConfusionMatrix(class_num=4), ConfusionMatrix(class_num=4))
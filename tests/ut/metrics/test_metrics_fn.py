@@ -22,7 +22,8 @@ from mindspore import Tensor
 from mindnlp.metrics import (perplexity_fn, bleu_fn, rouge_n_fn, rouge_l_fn, distinct_fn, accuracy_fn,
                              precision_fn, recall_fn, f1_score_fn, confusion_matrix_fn,
                              matthews_correlation_fn, pearson_correlation_fn,
-                             spearman_correlation_fn, em_score_fn)
+                             spearman_correlation_fn, em_score_fn, rouge_l_scores)
+from mindnlp.metrics.rouge import _lcs
 
 class TestPerplexity(unittest.TestCase):
     r"""
@@ -233,6 +234,41 @@ class TestRougeL(unittest.TestCase):
 
         assert np.allclose(rougel_score, 0.73529, 1e-5, 1e-5)
 
+    def test_lcs_bit_parallel(self):
+        """
+        Test the bit-parallel lcs against the dynamic programming table
+        """
+        def lcs_table(strg, sub):
+            lengths = np.zeros((len(strg) + 1, len(sub) + 1))
+            for i in range(1, len(strg) + 1):
+                for j in range(1, len(sub) + 1):
+                    if strg[i - 1] == sub[j - 1]:
+                        lengths[i][j] = lengths[i - 1][j - 1] + 1
+                    else:
+                        lengths[i][j] = max(lengths[i - 1][j], lengths[i][j - 1])
+            return lengths[-1][-1]
+
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            strg = rng.integers(0, 5, rng.integers(0, 90)).tolist()
+            sub = rng.integers(0, 5, rng.integers(0, 90)).tolist()
+            assert _lcs(strg, sub) == lcs_table(strg, sub)
+
+    def test_rougel_scores(self):
+        """
+        Test rouge_l_scores
+        """
+        rng = np.random.default_rng(0)
+        cand_lists = [[str(token) for token in rng.integers(0, 8, rng.integers(1, 30))] for _ in range(20)]
+        ref_lists = [[[str(token) for token in rng.integers(0, 8, rng.integers(1, 30))] for _ in range(2)]
+                     for _ in range(20)]
+        expected = [rouge_l_fn(cand_list, ref_list) for cand_list, ref_list in zip(cand_lists, ref_lists)]
+
+        assert rouge_l_scores(cand_lists, ref_lists) == expected
+        assert rouge_l_scores(cand_lists, ref_lists, num_workers=2, chunk_size=4) == expected
+        with self.assertRaises(ValueError):
+            rouge_l_scores(cand_lists, ref_lists[:-1])
+
 class TestDistinct(unittest.TestCase):
     r"""
     Test distinct
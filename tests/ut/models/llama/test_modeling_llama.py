@@ -108,6 +108,38 @@ class TestModelingLlama(unittest.TestCase):
 
         assert output.shape == (config.max_batch_size, config.max_seq_len)
 
+    def test_llama_attention_lazy_cache(self):
+        '''
+        test the cache is sized to the batch actually used
+        '''
+        config = self.config
+        model = llama.Attention(config)
+        assert model.cache_k is None
+        attention_input = Tensor(np.random.randn(1, 8, config.dim), mindspore.float32)
+        freqs_cis = llama.precompute_freqs_cis(config.dim // config.n_heads, config.max_seq_len * 2)[0:8]
+        model(attention_input, start_pos=0, freqs_cis=freqs_cis, mask=None)
+
+        assert model.cache_k.shape[0] == 1
+        assert model.cache_k.shape[1] < config.max_seq_len
+        assert model.cache_k.dtype == mindspore.float32
+
+    def test_llama_transformer_incremental_decoding(self):
+        '''
+        test decoding token by token with the cache gives the logits of a full forward
+        '''
+        config = self.config
+        model = llama.Transformer(config)
+        tokens = Tensor(np.random.randint(0, config.vocab_size, (2, 12)), mindspore.int32)
+        expected = model(tokens, 0)
+
+        model.reset_cache()
+        model(tokens[:, :4], 0)
+        model(tokens[:, 4:9], 4)
+        for pos in range(9, 12):
+            output = model(tokens[:, pos:pos + 1], pos)
+
+        assert np.allclose(output.asnumpy(), expected.asnumpy(), atol=1e-4)
+
     def tearDown(self) -> None:
         gc.collect()
 
@@ -0,0 +1,348 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+# pylint: disable=W0613
+# pylint: disable=W0212
+"""
+Test GenerationMixin
+"""
+
+import unittest
+import numpy as np
+
+import mindspore
+from mindspore import nn, ops, Tensor
+
+from mindnlp.abc import PreTrainedConfig, PreTrainedModel
+from mindnlp.generation import BeamSearchScorer
+from mindnlp.generation.logits_process import TopKLogitsWarper, TopPLogitsWarper
+from mindnlp.generation.utils import MultinomialSampler
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+
+
+class DummyConfig(PreTrainedConfig):
+    """Config of DummyCausalLM"""
+    def __init__(self, vocab_size=32, hidden_size=16, **kwargs):
+        super().__init__(**kwargs)
+        self.vocab_size = vocab_size
+        self.hidden_size = hidden_size
+
+
+class DummyCausalLM(PreTrainedModel):
+    """
+    Tiny causal language model, the hidden state at position t is the sum of the embeddings up to t,
+    so the past key values of a sequence is a single `(batch_size, 1, hidden_size)` tensor.
+    """
+    config_class = DummyConfig
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.embedding = nn.Embedding(config.vocab_size, config.hidden_size)
+        self.lm_head = nn.Dense(config.hidden_size, config.vocab_size)
+
+    def prepare_inputs_for_generation(self, input_ids, past_key_values=None, attention_mask=None, **kwargs):
+        if past_key_values is not None:
+            input_ids = input_ids[:, -1:]
+        return {
+            "input_ids": input_ids,
+            "past_key_values": past_key_values,
+            "attention_mask": attention_mask,
+            "use_cache": kwargs.get("use_cache"),
+        }
+
+    def construct(self, input_ids, past_key_values=None, attention_mask=None, use_cache=None,
+                  return_dict=None, output_attentions=None, output_hidden_states=None):
+        hidden_states = self.embedding(input_ids)
+        if attention_mask is not None:
+            mask = attention_mask[:, -input_ids.shape[1]:]
+            hidden_states = hidden_states * mask.expand_dims(-1).astype(hidden_states.dtype)
+        hidden_states = ops.cumsum(hidden_states, 1)
+        if past_key_values is not None:
+            hidden_states = hidden_states + past_key_values[0][0]
+        logits = self.lm_head(ops.tanh(hidden_states))
+        presents = ((hidden_states[:, -1:],),)
+        return logits, presents
+
+
+class DummyCausalLMWithStates(DummyCausalLM):
+    """DummyCausalLM returning `(logits, presents, hidden_states, attentions)`, leaving out the ones not requested"""
+
+    def construct(self, input_ids, past_key_values=None, attention_mask=None, use_cache=None,
+                  return_dict=None, output_attentions=None, output_hidden_states=None):
+        logits, presents = super().construct(input_ids, past_key_values, attention_mask, use_cache)
+        outputs = (logits, presents)
+        if output_hidden_states:
+            outputs += ((self.embedding(input_ids),),)
+        if output_attentions:
+            seq_length = input_ids.shape[1]
+            outputs += ((ops.ones((input_ids.shape[0], 1, seq_length, seq_length), mindspore.float32),),)
+        return outputs
+
+
+def naive_beam_search(model, input_ids, num_beams, max_length):
+    """beam search without cache and eos, used as reference"""
+    results = []
+    for prompt in input_ids.asnumpy():
+        beams = [(0.0, list(prompt))]
+        while len(beams[0][1]) < max_length:
+            batch = Tensor(np.array([tokens for _, tokens in beams]), input_ids.dtype)
+            log_probs = ops.log_softmax(model(batch)[0][:, -1, :], axis=-1).asnumpy()
+            candidates = []
+            for (score, tokens), beam_log_probs in zip(beams, log_probs):
+                for token, log_prob in enumerate(beam_log_probs):
+                    candidates.append((score + float(log_prob), tokens + [token]))
+            candidates.sort(key=lambda x: x[0], reverse=True)
+            beams = candidates[:num_beams]
+        results.append(beams[0][1])
+    return np.array(results)
+
+
+def naive_greedy_search(model, input_ids, max_length):
+    """greedy search without cache, used as reference"""
+    while input_ids.shape[-1] < max_length:
+        logits = model(input_ids)[0][:, -1, :]
+        next_tokens = ops.argmax(logits, dim=-1).astype(input_ids.dtype)
+        input_ids = ops.cat([input_ids, next_tokens[:, None]], axis=-1)
+    return input_ids
+
+
+class TestGreedySearch(unittest.TestCase):
+    r"""
+    Test GenerationMixin.greedy_search
+    """
+    def setUp(self):
+        self.config = DummyConfig()
+        self.model = DummyCausalLM(self.config)
+        self.input_ids = Tensor(np.random.randint(1, self.config.vocab_size, (2, 4)), mindspore.int32)
+
+    def test_static_shape_greedy_search(self):
+        """test greedy search with a preallocated buffer"""
+        outputs = self.model.generate(self.input_ids, max_length=10, static_shape=True)
+        expected = naive_greedy_search(self.model, self.input_ids, 10)
+        assert outputs.shape == (2, 10)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+
+    def test_static_shape_greedy_search_jit_step(self):
+        """test greedy search with a compiled decoding step"""
+        outputs = self.model.generate(self.input_ids, max_length=10, static_shape=True, jit_step=True)
+        expected = naive_greedy_search(self.model, self.input_ids, 10)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+
+    def test_static_shape_greedy_search_eos(self):
+        """test finished sequences are padded in the buffer"""
+        expected = naive_greedy_search(self.model, self.input_ids, 5)
+        eos_token_id = int(expected.asnumpy()[0, -1])
+        outputs = self.model.generate(self.input_ids, max_length=10, static_shape=True,
+                                      eos_token_id=eos_token_id, pad_token_id=0)
+        assert outputs.asnumpy()[0, 4] == eos_token_id
+        assert (outputs.asnumpy()[0, 5:] == 0).all()
+
+    def test_greedy_search(self):
+        """test greedy search with past key values"""
+        outputs = self.model.generate(self.input_ids, max_length=10)
+        expected = naive_greedy_search(self.model, self.input_ids, 10)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+
+
+class TestBeamSearch(unittest.TestCase):
+    r"""
+    Test GenerationMixin.beam_search
+    """
+    def setUp(self):
+        self.config = DummyConfig()
+        self.model = DummyCausalLM(self.config)
+        self.input_ids = Tensor(np.random.randint(1, self.config.vocab_size, (2, 4)), mindspore.int32)
+
+    def test_beam_search(self):
+        """test beam search gives the best scored sequence"""
+        outputs = self.model.generate(self.input_ids, max_length=8, num_beams=3)
+        expected = naive_beam_search(self.model, self.input_ids, 3, 8)
+        assert outputs.shape == (2, 8)
+        assert np.array_equal(outputs.asnumpy(), expected)
+
+    def test_beam_search_num_return_sequences(self):
+        """test beam search returns sorted hypotheses"""
+        outputs = self.model.generate(self.input_ids, max_length=8, num_beams=4, num_return_sequences=2,
+                                      return_dict_in_generate=True, output_scores=True)
+        sequences, sequence_scores = outputs[0], outputs[1]
+        assert sequences.shape == (4, 8)
+        scores = sequence_scores.asnumpy().reshape(2, 2)
+        assert (scores[:, 0] >= scores[:, 1]).all()
+
+    def test_beam_search_eos(self):
+        """test finished hypotheses are finalized early"""
+        greedy = naive_greedy_search(self.model, self.input_ids, 5)
+        eos_token_id = int(greedy.asnumpy()[0, -1])
+        outputs = self.model.generate(self.input_ids, max_length=20, num_beams=2, early_stopping=True,
+                                      eos_token_id=eos_token_id, pad_token_id=0)
+        assert outputs.shape[0] == 2
+        assert outputs.shape[1] <= 20
+        # a hypothesis ends with its eos, the shorter ones are padded
+        for row in outputs.asnumpy()[:, 4:]:
+            eos = np.nonzero(row == eos_token_id)[0]
+            if eos.size > 0:
+                assert (row[eos[0] + 1:] == 0).all()
+
+        # an eos candidate finishes its hypothesis, which is returned by finalize
+        scorer = BeamSearchScorer(batch_size=1, num_beams=2, do_early_stopping=True)
+        input_ids = Tensor(np.array([[1, 2], [1, 3]]), mindspore.int32)
+        scorer.process(input_ids, Tensor(np.array([[-0.1, -0.2, -0.3, -0.4]]), mindspore.float32),
+                       Tensor(np.array([[9, 5, 6, 7]]), mindspore.int32), Tensor(np.array([[0, 0, 1, 1]]), mindspore.int32),
+                       pad_token_id=0, eos_token_id=9)
+        assert len(scorer._beam_hyps[0]) == 1 and not scorer.is_done
+        input_ids = Tensor(np.array([[1, 2, 5], [1, 3, 6]]), mindspore.int32)
+        outputs = scorer.process(input_ids, Tensor(np.array([[-0.5, -0.6, -0.7, -0.8]]), mindspore.float32),
+                                 Tensor(np.array([[9, 9, 4, 4]]), mindspore.int32),
+                                 Tensor(np.array([[0, 1, 0, 1]]), mindspore.int32), pad_token_id=0, eos_token_id=9)
+        assert scorer.is_done
+        input_ids = ops.concat([input_ids, outputs["next_beam_tokens"].reshape(-1, 1)], -1)
+        sequences = scorer.finalize(input_ids, outputs["next_beam_scores"], max_length=10, pad_token_id=0,
+                                    eos_token_id=9)["sequences"]
+        assert sequences.asnumpy().tolist() == [[1, 2, 9]]
+
+    def test_beam_search_early_stopping_never(self):
+        """test beam search only stops when no better hypothesis can be found"""
+        greedy = naive_greedy_search(self.model, self.input_ids, 5)
+        eos_token_id = int(greedy.asnumpy()[0, -1])
+        outputs = self.model.generate(self.input_ids, max_length=12, num_beams=2, early_stopping="never",
+                                      eos_token_id=eos_token_id, pad_token_id=0)
+        assert outputs.shape[0] == 2
+        assert outputs.shape[1] <= 12
+        outputs = self.model.generate(self.input_ids, max_length=12, do_sample=True, num_beams=2, seed=0,
+                                      early_stopping="never", eos_token_id=eos_token_id, pad_token_id=0)
+        assert outputs.shape[0] == 2
+
+    def test_beam_search_scorer_process(self):
+        """test BeamSearchScorer keeps the best non eos candidates"""
+        scorer = BeamSearchScorer(batch_size=1, num_beams=2)
+        input_ids = Tensor(np.array([[1, 2], [1, 3]]), mindspore.int32)
+        next_scores = Tensor(np.array([[-0.1, -0.2, -0.3, -0.4]]), mindspore.float32)
+        next_tokens = Tensor(np.array([[5, 9, 6, 7]]), mindspore.int32)
+        next_indices = Tensor(np.array([[0, 1, 1, 0]]), mindspore.int32)
+        outputs = scorer.process(input_ids, next_scores, next_tokens, next_indices, pad_token_id=0, eos_token_id=9)
+        assert outputs["next_beam_tokens"].asnumpy().tolist() == [5, 6]
+        assert outputs["next_beam_indices"].asnumpy().tolist() == [0, 1]
+        assert len(scorer._beam_hyps[0]) == 1
+
+
+class TestSampling(unittest.TestCase):
+    r"""
+    Test GenerationMixin.sample and GenerationMixin.beam_sample
+    """
+    def setUp(self):
+        self.config = DummyConfig()
+        self.model = DummyCausalLM(self.config)
+        self.input_ids = Tensor(np.random.randint(1, self.config.vocab_size, (2, 4)), mindspore.int32)
+
+    def test_sample_seed(self):
+        """test the same seed gives the same sequences"""
+        outputs = self.model.generate(self.input_ids, max_length=10, do_sample=True, seed=42)
+        outputs_again = self.model.generate(self.input_ids, max_length=10, do_sample=True, seed=42)
+        assert outputs.shape == (2, 10)
+        assert np.array_equal(outputs.asnumpy(), outputs_again.asnumpy())
+
+    def test_sample_top_k_1(self):
+        """test sampling from the top-1 token is greedy search"""
+        outputs = self.model.generate(self.input_ids, max_length=10, do_sample=True, top_k=1)
+        expected = naive_greedy_search(self.model, self.input_ids, 10)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+
+    def test_beam_sample(self):
+        """test beam sample with a seed"""
+        outputs = self.model.generate(self.input_ids, max_length=8, do_sample=True, num_beams=3, seed=7)
+        outputs_again = self.model.generate(self.input_ids, max_length=8, do_sample=True, num_beams=3, seed=7)
+        assert outputs.shape == (2, 8)
+        assert np.array_equal(outputs.asnumpy(), outputs_again.asnumpy())
+
+    def test_multinomial_sampler(self):
+        """test the sampler never draws tokens of zero probability"""
+        probs = Tensor(np.array([[0., 0., 1., 0.], [0.5, 0., 0., 0.5]]), mindspore.float32)
+        sampler = MultinomialSampler(seed=0)
+        for _ in range(10):
+            tokens = sampler(probs).asnumpy()
+            assert tokens[0] == 2
+            assert tokens[1] in (0, 3)
+
+    def test_sample_without_replacement(self):
+        """test the drawn indices are distinct"""
+        log_probs = ops.log_softmax(Tensor(np.random.randn(3, 20), mindspore.float32), axis=-1)
+        indices = MultinomialSampler(seed=0).sample_without_replacement(log_probs, 5).asnumpy()
+        assert indices.shape == (3, 5)
+        for row in indices:
+            assert len(set(row.tolist())) == 5
+
+    def test_top_k_top_p_warpers(self):
+        """test top-k and top-p filtering"""
+        scores = Tensor(np.log(np.array([[0.1, 0.2, 0.3, 0.4]])), mindspore.float32)
+        top_k = TopKLogitsWarper(top_k=2)(None, scores).asnumpy()
+        assert np.isinf(top_k[0, :2]).all() and np.isfinite(top_k[0, 2:]).all()
+        top_p = TopPLogitsWarper(top_p=0.6)(None, scores).asnumpy()
+        assert np.isinf(top_p[0, :2]).all() and np.isfinite(top_p[0, 2:]).all()
+
+    def test_sample_attentions_and_hidden_states(self):
+        """test sampling returns the attentions and the hidden states of every step"""
+        model = DummyCausalLMWithStates(self.config)
+        for output_attentions, output_hidden_states in [(True, True), (True, False), (False, True)]:
+            _, _, attentions, hidden_states = model.generate(
+                self.input_ids, max_length=7, do_sample=True, seed=0, return_dict_in_generate=True,
+                output_attentions=output_attentions, output_hidden_states=output_hidden_states)
+            if output_attentions:
+                assert len(attentions) == 3
+                assert [step[0].ndim for step in attentions] == [4, 4, 4]
+            else:
+                assert attentions is None
+            if output_hidden_states:
+                assert len(hidden_states) == 3
+                assert [step[0].shape[-1] for step in hidden_states] == [self.config.hidden_size] * 3
+            else:
+                assert hidden_states is None
+
+
+class TestAssistedDecoding(unittest.TestCase):
+    r"""
+    Test GenerationMixin.assisted_decoding
+    """
+    def setUp(self):
+        config = GPT2Config(vocab_size=64, n_positions=64, n_layer=2, n_embd=32, n_head=4,
+                            bos_token_id=None, eos_token_id=None, pad_token_id=0)
+        self.model = GPT2LMHeadModel(config)
+        self.model.set_train(False)
+        assistant_config = GPT2Config(vocab_size=64, n_positions=64, n_layer=1, n_embd=16, n_head=2,
+                                      bos_token_id=None, eos_token_id=None, pad_token_id=0)
+        self.assistant_model = GPT2LMHeadModel(assistant_config)
+        self.assistant_model.set_train(False)
+        self.input_ids = Tensor(np.random.randint(1, 64, (1, 5)), mindspore.int64)
+
+    def test_assisted_decoding_matches_greedy(self):
+        """test the tokens of assisted decoding are the greedy ones"""
+        expected = self.model.generate(self.input_ids, max_new_tokens=20)
+        outputs = self.model.generate(self.input_ids, max_new_tokens=20, assistant_model=self.assistant_model)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+        stats = self.model.assisted_decoding_stats
+        assert stats["num_steps"] + stats["num_accepted"] == 20
+
+    def test_self_assisted_decoding(self):
+        """test every candidate is accepted when the model assists itself"""
+        expected = self.model.generate(self.input_ids, max_new_tokens=16)
+        outputs = self.model.generate(self.input_ids, max_new_tokens=16, assistant_model=self.model,
+                                      num_assistant_tokens=3)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+        stats = self.model.assisted_decoding_stats
+        assert stats["num_accepted"] == stats["num_candidates"]
+
+    def test_assisted_decoding_batch(self):
+        """test assisted decoding rejects batches"""
+        input_ids = Tensor(np.random.randint(1, 64, (2, 5)), mindspore.int64)
+        with self.assertRaises(ValueError):
+            self.model.generate(input_ids, max_new_tokens=4, assistant_model=self.assistant_model)
@@ -0,0 +1,157 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test PagedKVCache
+"""
+
+import unittest
+from unittest import mock
+import numpy as np
+
+import mindspore
+from mindspore import ops, Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+from mindnlp.generation import PagedKVCache, BlockAllocator
+
+
+def random_states(batch_size, seq_length):
+    """random key or value states of 2 heads of size 3"""
+    return np.random.randn(batch_size, 2, seq_length, 3).astype(np.float32)
+
+
+def cached_attention(cache_layer, query):
+    """the scores and the output of the attention of a query against the cached states"""
+    scores = cache_layer.attention_scores(Tensor(query))
+    output = cache_layer.attention_output(scores)
+    return scores.asnumpy(), output.asnumpy()
+
+
+def naive_attention(query, keys, values):
+    """the scores and the output of the attention of a query against concatenated states"""
+    scores = query @ keys.swapaxes(-1, -2)
+    return scores, scores @ values
+
+
+class TestPagedKVCache(unittest.TestCase):
+    r"""
+    Test PagedKVCache
+    """
+    def test_attention_matches_concat(self):
+        """test the attention against the cache matches the one against all the appended states"""
+        cache = PagedKVCache(num_layers=2, block_size=4, max_length=16)
+        keys, values = np.zeros((2, 2, 0, 3), np.float32), np.zeros((2, 2, 0, 3), np.float32)
+        for seq_length in (5, 1, 1, 3, 1):
+            key, value = random_states(2, seq_length), random_states(2, seq_length)
+            keys, values = np.concatenate([keys, key], 2), np.concatenate([values, value], 2)
+            query = random_states(2, seq_length)
+            for layer_idx in range(2):
+                cache[layer_idx].append(Tensor(key), Tensor(value))
+                scores, output = cached_attention(cache[layer_idx], query)
+                expected_scores, expected_output = naive_attention(query, keys, values)
+                assert np.allclose(scores, expected_scores, atol=1e-5)
+                assert np.allclose(output, expected_output, atol=1e-5)
+        assert cache.get_seq_length() == 11
+        assert [len(table) for table in cache.block_tables] == [3, 3]
+
+    def test_no_copy_of_the_cache(self):
+        """test a step reads one block per sequence at a time, the cached tokens are never copied at once"""
+        cache = PagedKVCache(num_layers=1, block_size=4, max_length=32)
+        gathered = []
+
+        def gather(*args, **kwargs):
+            output = ops_gather(*args, **kwargs)
+            gathered.append(output.shape)
+            return output
+
+        ops_gather = ops.gather
+        with mock.patch.object(ops, "gather", gather):
+            for seq_length in (9, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1):
+                states = random_states(2, seq_length)
+                cache[0].append(Tensor(states), Tensor(states))
+                cached_attention(cache[0], random_states(2, 1))
+        assert cache.get_seq_length() == 19
+        assert gathered
+        assert all(shape[:2] == (2, 4) for shape in gathered)
+
+    def test_reorder_cache_copy_on_write(self):
+        """test sequences sharing blocks after a reorder do not overwrite each other"""
+        cache = PagedKVCache(num_layers=1, block_size=4, max_length=8)
+        prefix = random_states(2, 3)
+        cache.append(Tensor(prefix), Tensor(prefix), 0)
+        cache.reorder_cache(Tensor([0, 0], mindspore.int32))
+        assert cache.block_tables[0] == cache.block_tables[1]
+
+        new = random_states(2, 1)
+        cache.append(Tensor(new), Tensor(new), 0)
+        expected = np.concatenate([prefix[[0, 0]], new], 2)
+        query = random_states(2, 1)
+        scores, output = cached_attention(cache[0], query)
+        expected_scores, expected_output = naive_attention(query, expected, expected)
+        assert np.allclose(scores, expected_scores, atol=1e-5)
+        assert np.allclose(output, expected_output, atol=1e-5)
+        assert cache.block_tables[0] != cache.block_tables[1]
+
+    def test_free(self):
+        """test freed blocks go back to the pool"""
+        cache = PagedKVCache(num_layers=1, block_size=4, num_blocks=4)
+        states = random_states(2, 6)
+        cache.append(Tensor(states), Tensor(states), 0)
+        assert cache.allocator.num_free == 0
+        cache.free()
+        assert cache.allocator.num_free == 4
+        assert not cache
+
+    def test_iterate_layers(self):
+        """test the cache iterates over its layers and refuses the indices of other layers"""
+        cache = PagedKVCache(num_layers=3, max_length=8)
+        assert len(cache) == 3
+        assert [layer_past.layer_idx for layer_past in cache] == [0, 1, 2]
+        assert cache[-1].layer_idx == 2
+        for layer_idx in (3, -4):
+            with self.assertRaises(IndexError):
+                _ = cache[layer_idx]
+
+    def test_out_of_blocks(self):
+        """test the allocator raises once the pool is used"""
+        allocator = BlockAllocator(1)
+        allocator.allocate()
+        with self.assertRaises(RuntimeError):
+            allocator.allocate()
+
+
+class TestGenerateWithPagedKVCache(unittest.TestCase):
+    r"""
+    Test generate with paged_kv_cache
+    """
+    def setUp(self):
+        config = GPT2Config(vocab_size=64, n_positions=64, n_layer=2, n_embd=32, n_head=4,
+                            bos_token_id=None, eos_token_id=None, pad_token_id=0)
+        self.model = GPT2LMHeadModel(config)
+        self.model.set_train(False)
+        self.input_ids = Tensor(np.random.randint(1, 64, (2, 5)), mindspore.int64)
+
+    def test_greedy_search(self):
+        """test greedy search gives the same tokens with the paged cache"""
+        expected = self.model.generate(self.input_ids, max_new_tokens=20)
+        outputs = self.model.generate(self.input_ids, max_new_tokens=20, paged_kv_cache=True, kv_cache_block_size=4)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
+
+    def test_beam_search(self):
+        """test beam search gives the same tokens with the paged cache"""
+        expected = self.model.generate(self.input_ids, max_new_tokens=10, num_beams=3)
+        outputs = self.model.generate(self.input_ids, max_new_tokens=10, num_beams=3, paged_kv_cache=True,
+                                      kv_cache_block_size=4)
+        assert np.array_equal(outputs.asnumpy(), expected.asnumpy())
@@ -0,0 +1,196 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+# pylint: disable=W0212
+"""
+Test ContinuousBatchingScheduler
+"""
+
+import unittest
+import numpy as np
+
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+from mindnlp.models.bloom import BloomConfig, BloomForCausalLM
+from mindnlp.models.llama.llama_hf import LlamaForCausalLM
+from mindnlp.models.llama.llama_hf_config import LlamaConfig
+from mindnlp.models.glm.chatglm import ChatGLMForConditionalGeneration
+from mindnlp.models.glm.chatglm_config import ChatGLMConfig
+from mindnlp.generation import ContinuousBatchingScheduler, concat_past_key_values, trim_past_key_values
+
+
+def generate_greedy(model, prompt, max_new_tokens):
+    """greedy continuation of a single prompt by `generate`, up to its eos token"""
+    outputs = model.generate(Tensor([prompt], mindspore.int64), max_new_tokens=max_new_tokens, pad_token_id=0)
+    output_ids = outputs.asnumpy()[0, len(prompt):].tolist()
+    eos_token_id = model.generation_config.eos_token_id
+    if eos_token_id is not None and eos_token_id in output_ids:
+        output_ids = output_ids[:output_ids.index(eos_token_id) + 1]
+    return output_ids
+
+
+class SchedulerMatchesGenerate:
+    r"""
+    The scheduler gives every prompt of a batch mixing lengths the continuation of `generate`
+    """
+    model = None
+    prompts = None
+
+    def test_scheduler_matches_generate(self):
+        """test every request gets the continuation of its own prompt"""
+        scheduler = ContinuousBatchingScheduler(self.model, max_batch_size=3, max_new_tokens=6, pad_token_id=0)
+        outputs = scheduler.generate(self.prompts)
+        for prompt, output_ids in zip(self.prompts, outputs):
+            assert output_ids == generate_greedy(self.model, prompt, 6)
+
+
+class TestContinuousBatchingScheduler(unittest.TestCase):
+    r"""
+    Test ContinuousBatchingScheduler
+    """
+    def setUp(self):
+        self.config = GPT2Config(vocab_size=64, n_positions=64, n_layer=2, n_embd=32, n_head=4,
+                                 bos_token_id=None, eos_token_id=None, pad_token_id=0)
+        self.model = GPT2LMHeadModel(self.config)
+        self.model.set_train(False)
+        self.prompts = [np.random.randint(1, 62, (length,)).tolist() for length in (3, 7, 5, 3, 9, 4)]
+
+    def expected(self, prompt, max_new_tokens):
+        """greedy continuation of a single prompt, without padding"""
+        input_ids = Tensor([prompt], mindspore.int64)
+        outputs = self.model.generate(input_ids, max_new_tokens=max_new_tokens, pad_token_id=0)
+        return outputs.asnumpy()[0, len(prompt):].tolist()
+
+    def test_scheduler_matches_generate(self):
+        """test every request gets the continuation of its own prompt"""
+        scheduler = ContinuousBatchingScheduler(self.model, max_batch_size=3, max_new_tokens=6)
+        outputs = scheduler.generate(self.prompts)
+        for prompt, output_ids in zip(self.prompts, outputs):
+            assert output_ids == self.expected(prompt, 6)
+
+    def test_scheduler_admits_into_freed_slots(self):
+        """test short requests leave the batch and queued ones take their slots"""
+        scheduler = ContinuousBatchingScheduler(self.model, max_batch_size=2)
+        long_id = scheduler.add_request(self.prompts[0], max_new_tokens=8)
+        for prompt in self.prompts[1:4]:
+            scheduler.add_request(prompt, max_new_tokens=2)
+        finished = []
+        while scheduler.has_unfinished_requests():
+            assert scheduler.num_running <= 2
+            finished += scheduler.step()
+        assert finished[-1].request_id == long_id
+        assert all(request.finish_reason == "length" for request in finished)
+        assert finished[-1].output_ids == self.expected(self.prompts[0], 8)
+        assert scheduler.num_generated_tokens == 8 + 3 * 2
+
+    def test_scheduler_eos(self):
+        """test a request is finished by its eos token"""
+        eos_token_id = self.expected(self.prompts[1], 3)[-1]
+        scheduler = ContinuousBatchingScheduler(self.model, max_batch_size=4, max_new_tokens=10,
+                                                eos_token_id=eos_token_id)
+        request_id = scheduler.add_request(self.prompts[1])
+        scheduler.add_request(self.prompts[2])
+        finished = {request.request_id: request for request in scheduler.run()}
+        assert finished[request_id].finish_reason == "eos"
+        assert finished[request_id].output_ids[-1] == eos_token_id
+        assert len(finished[request_id].output_ids) <= 3
+
+    def test_concat_and_trim_past_key_values(self):
+        """test caches are left padded before being concatenated"""
+        past = ((Tensor(np.ones((1, 2, 3, 4)), mindspore.float32),),)
+        other_past = ((Tensor(np.ones((2, 2, 5, 4)), mindspore.float32),),)
+        merged = concat_past_key_values(past, other_past, batch_axis=0, seq_axis=2)
+        assert merged[0][0].shape == (3, 2, 5, 4)
+        assert (merged[0][0].asnumpy()[0, :, :2] == 0).all()
+        assert (merged[0][0].asnumpy()[0, :, 2:] == 1).all()
+        trimmed = trim_past_key_values(merged, 2, seq_axis=2)
+        assert trimmed[0][0].shape == (3, 2, 3, 4)
+        assert (trimmed[0][0].asnumpy() == 1).all()
+
+
+class TestBloomScheduler(SchedulerMatchesGenerate, unittest.TestCase):
+    r"""
+    Test ContinuousBatchingScheduler with Bloom, whose cache fuses the batch and the heads
+    """
+    def setUp(self):
+        self.config = BloomConfig(vocab_size=64, hidden_size=32, n_layer=2, n_head=4, pad_token_id=0)
+        self.model = BloomForCausalLM(self.config)
+        self.model.set_train(False)
+        self.prompts = [np.random.randint(3, 62, (length,)).tolist() for length in (3, 7, 5, 3, 9, 4)]
+
+    def test_cache_layout(self):
+        """test the cache of Bloom is converted, reordered, merged and trimmed along its own axes"""
+        num_heads, head_dim = 4, 8
+        key = np.random.randn(2 * num_heads, head_dim, 3).astype(np.float32)
+        value = np.random.randn(2 * num_heads, 3, head_dim).astype(np.float32)
+        past = ((Tensor(key), Tensor(value)),)
+
+        standard = self.model._convert_to_standard_cache(past, batch_size=2)
+        assert standard[0][0].shape == (2, num_heads, head_dim, 3)
+        assert standard[0][1].shape == (2, num_heads, 3, head_dim)
+        converted = self.model._convert_to_bloom_cache(standard)
+        assert np.array_equal(converted[0][0].asnumpy(), key)
+        assert np.array_equal(converted[0][1].asnumpy(), value)
+
+        # the batch size is recovered from the fused axis, a row keeps all its heads
+        reordered = self.model._reorder_cache(past, Tensor([1, 0, 1], mindspore.int32))
+        assert np.array_equal(reordered[0][0].asnumpy(), np.concatenate([key[num_heads:], key[:num_heads],
+                                                                         key[num_heads:]]))
+        assert np.array_equal(reordered[0][1].asnumpy(), np.concatenate([value[num_heads:], value[:num_heads],
+                                                                         value[num_heads:]]))
+
+        # the shorter batch is left padded along the last axis of the keys and the middle one of the values
+        other = ((Tensor(np.ones((num_heads, head_dim, 5)), mindspore.float32),
+                  Tensor(np.ones((num_heads, 5, head_dim)), mindspore.float32)),)
+        merged = self.model._merge_cache(past, other)
+        merged_key, merged_value = merged[0][0].asnumpy(), merged[0][1].asnumpy()
+        assert merged_key.shape == (3 * num_heads, head_dim, 5)
+        assert merged_value.shape == (3 * num_heads, 5, head_dim)
+        assert (merged_key[:2 * num_heads, :, :2] == 0).all()
+        assert np.array_equal(merged_key[:2 * num_heads, :, 2:], key)
+        assert (merged_value[:2 * num_heads, :2] == 0).all()
+        assert np.array_equal(merged_value[:2 * num_heads, 2:], value)
+
+        trimmed = self.model._trim_cache(merged, 2)
+        assert np.array_equal(trimmed[0][0].asnumpy(), merged_key[:, :, 2:])
+        assert np.array_equal(trimmed[0][1].asnumpy(), merged_value[:, 2:])
+
+
+class TestChatGLMScheduler(SchedulerMatchesGenerate, unittest.TestCase):
+    r"""
+    Test ContinuousBatchingScheduler with ChatGLM, whose cache is sequence first, its mask boolean and its positions
+    two-dimensional
+    """
+    def setUp(self):
+        self.config = ChatGLMConfig(vocab_size=64, hidden_size=32, num_layers=2, num_attention_heads=4,
+                                    inner_hidden_size=64, max_sequence_length=64, use_cache=True, bos_token_id=62,
+                                    eos_token_id=63, mask_token_id=61, gmask_token_id=60, pad_token_id=0)
+        self.model = ChatGLMForConditionalGeneration(self.config)
+        self.model.set_train(False)
+        # the prompts end with the generation mask and the start of the answer
+        self.prompts = [np.random.randint(1, 60, (length,)).tolist() + [60, 62] for length in (3, 7, 5, 3, 9, 4)]
+
+
+class TestLlamaScheduler(SchedulerMatchesGenerate, unittest.TestCase):
+    r"""
+    Test ContinuousBatchingScheduler with LLaMA, whose positions are computed from the padding mask
+    """
+    def setUp(self):
+        self.config = LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                  num_attention_heads=4, pad_token_id=0)
+        self.model = LlamaForCausalLM(self.config)
+        self.model.set_train(False)
+        self.prompts = [np.random.randint(3, 62, (length,)).tolist() for length in (3, 7, 5, 3, 9, 4)]
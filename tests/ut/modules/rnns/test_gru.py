@@ -116,3 +116,21 @@ class TestGRU(unittest.TestCase):
 
         assert np.allclose(output0.asnumpy(), output1.asnumpy(), 1e-3, 1e-3)
         assert np.allclose(h0.asnumpy(), h1.asnumpy(), 1e-3, 1e-3)
+
+    def test_gru_seq_length_precision(self):
+        """test bidirectional gru with variable lengths"""
+        static_rnn = StaticGRU(self.input_size, self.hidden_size, num_layers=2, batch_first=True, bidirectional=True)
+        nn_rnn = nn.GRU(self.input_size, self.hidden_size, num_layers=2, batch_first=True, bidirectional=True)
+        mindspore.load_param_into_net(static_rnn, nn_rnn.parameters_dict())
+        static_rnn.set_train(False)
+        nn_rnn.set_train(False)
+        inputs = Tensor(self.x, mindspore.float32)
+        seq_length = Tensor([10, 6, 1], mindspore.int32)
+        output0, h0 = static_rnn(inputs, seq_length=seq_length)
+        output1, h1 = nn_rnn(inputs, seq_length=seq_length)
+
+        output0, output1 = output0.asnumpy(), output1.asnumpy()
+        for idx, length in enumerate([10, 6, 1]):
+            assert np.allclose(output0[idx, :length], output1[idx, :length], 1e-3, 1e-3)
+            assert np.allclose(output0[idx, length:], 0)
+        assert np.allclose(h0.asnumpy(), h1.asnumpy(), 1e-3, 1e-3)
@@ -118,3 +118,22 @@ class TestLSTM(unittest.TestCase):
         assert np.allclose(output0.asnumpy(), output1.asnumpy(), 1e-3, 1e-3)
         assert np.allclose(h0.asnumpy(), h1.asnumpy(), 1e-3, 1e-3)
         assert np.allclose(c0.asnumpy(), c1.asnumpy(), 1e-3, 1e-3)
+
+    def test_lstm_seq_length_precision(self):
+        """test bidirectional lstm with variable lengths"""
+        static_rnn = StaticLSTM(self.input_size, self.hidden_size, num_layers=2, batch_first=True, bidirectional=True)
+        nn_rnn = nn.LSTM(self.input_size, self.hidden_size, num_layers=2, batch_first=True, bidirectional=True)
+        mindspore.load_param_into_net(static_rnn, nn_rnn.parameters_dict())
+        static_rnn.set_train(False)
+        nn_rnn.set_train(False)
+        inputs = Tensor(self.x, mindspore.float32)
+        seq_length = Tensor([10, 6, 1], mindspore.int32)
+        output0, (h0, c0) = static_rnn(inputs, seq_length=seq_length)
+        output1, (h1, c1) = nn_rnn(inputs, seq_length=seq_length)
+
+        output0, output1 = output0.asnumpy(), output1.asnumpy()
+        for idx, length in enumerate([10, 6, 1]):
+            assert np.allclose(output0[idx, :length], output1[idx, :length], 1e-3, 1e-3)
+            assert np.allclose(output0[idx, length:], 0)
+        assert np.allclose(h0.asnumpy(), h1.asnumpy(), 1e-3, 1e-3)
+        assert np.allclose(c0.asnumpy(), c1.asnumpy(), 1e-3, 1e-3)
@@ -0,0 +1,77 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test Accumulator
+"""
+
+import unittest
+import numpy as np
+import mindspore
+from mindspore import nn, Tensor
+from mindspore.ops import value_and_grad
+
+from mindnlp.modules import Accumulator
+
+
+class TestAccumulator(unittest.TestCase):
+    r"""
+    Test Accumulator
+    """
+    def setUp(self):
+        np.random.seed(0)
+        self.data = Tensor(np.random.randn(8, 3), mindspore.float32)
+        self.label = Tensor(np.random.randn(8, 1), mindspore.float32)
+
+    def _train(self, micro_batches, accumulate_step, clip_norm=None, overflow_step=None):
+        mindspore.set_seed(0)
+        net = nn.Dense(3, 1)
+        loss_fn = nn.MSELoss()
+        optimizer = nn.SGD(net.trainable_params(), learning_rate=0.1)
+        accumulator = Accumulator(optimizer, accumulate_step, clip_norm)
+        grad_fn = value_and_grad(lambda data, label: loss_fn(net(data), label), None, optimizer.parameters)
+
+        for step, (data, label) in enumerate(zip(np.split(self.data.asnumpy(), micro_batches),
+                                                  np.split(self.label.asnumpy(), micro_batches))):
+            _, grads = grad_fn(Tensor(data), Tensor(label))
+            if overflow_step is None:
+                accumulator(grads)
+            else:
+                accumulator(grads, Tensor(step != overflow_step, mindspore.bool_))
+        return [param.asnumpy() for param in net.trainable_params()]
+
+    def test_accumulate_equals_large_batch(self):
+        """test averaging the gradients of micro-batches equals a step on the whole batch"""
+        expected = self._train(1, 1)
+        for param, target in zip(self._train(4, 4), expected):
+            assert np.allclose(param, target, 1e-5, 1e-5)
+
+    def test_clip_norm(self):
+        """test the accumulated gradients are clipped"""
+        initial = self._train(4, 5)
+        clipped = self._train(4, 4, clip_norm=1e-3)
+        delta = np.sqrt(sum(((param - init) ** 2).sum() for param, init in zip(clipped, initial)))
+        # SGD moves the parameters by learning_rate times the clipped norm
+        assert np.allclose(delta, 0.1 * 1e-3, 1e-3, 1e-6)
+
+    def test_overflow_drops_window(self):
+        """test a window with an overflowed step does not update the parameters"""
+        initial = self._train(4, 5)
+        for param, init in zip(self._train(4, 4, overflow_step=1), initial):
+            assert np.array_equal(param, init)
+
+    def test_no_clip_by_default(self):
+        """test the accumulated gradients are not clipped unless `clip_norm` is given"""
+        optimizer = nn.SGD(nn.Dense(3, 1).trainable_params(), learning_rate=0.1)
+        assert Accumulator(optimizer, 2).clip_norm is None
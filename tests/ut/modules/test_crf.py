@@ -372,6 +372,45 @@ class TestDecode(unittest.TestCase):
 
         assert (best_tags[0] == best_tags_bf[0]).all()
 
+    def test_decode_padded(self):
+        """test decode returns padded tags and lengths."""
+        crf = make_crf()
+        emissions = make_emissions(crf, 4, 3)
+        seq_length = mindspore.Tensor([4, 2, 1], mindspore.int64)
+
+        tags, scores, lengths = crf.decode(emissions, seq_length)
+        score, history = crf(emissions, seq_length=seq_length)
+        best_tags = crf.post_decode(score, history, seq_length)
+
+        assert tags.shape == (3, 4)
+        assert scores.shape == (3,)
+        assert (lengths == seq_length).all()
+        tags = tags.asnumpy()
+        for sample_tags, best_tag, length in zip(tags, best_tags, [4, 2, 1]):
+            assert sample_tags[:length].tolist() == best_tag
+            assert (sample_tags[length:] == 0).all()
+
+    def test_decode_top_k(self):
+        """test n-best decode against all the tag sequences."""
+        crf = make_crf(3)
+        emissions = make_emissions(crf, 3, 2)
+        seq_length = mindspore.Tensor([3, 2], mindspore.int64)
+
+        tags, scores, _ = crf.decode(emissions, seq_length, top_k=4)
+        assert tags.shape == (2, 4, 3)
+        assert scores.shape == (2, 4)
+
+        emissions = emissions.swapaxes(0, 1)
+        for emission, sample_tags, sample_scores, length in zip(emissions, tags.asnumpy(), scores.asnumpy(), [3, 2]):
+            emission = emission[:length]
+            manual_scores = sorted((compute_score(crf, emission, t).asnumpy().item()
+                                    for t in itertools.product(range(crf.num_tags), repeat=length)), reverse=True)
+            assert np.allclose(sample_scores, manual_scores[:4], atol=1e-5)
+            for tag, score in zip(sample_tags, sample_scores):
+                assert np.allclose(compute_score(crf, emission, tuple(tag[:length].tolist())).asnumpy(), score,
+                                   atol=1e-5)
+                assert (tag[length:] == 0).all()
+
     def test_emissions_has_bad_number_of_dimension(self):
         """test emission has bad number of dimension."""
         emissions = Tensor(np.random.randn(1, 2), mindspore.float32)
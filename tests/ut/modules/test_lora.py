@@ -0,0 +1,232 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test LoRA layers
+"""
+
+import unittest
+import numpy as np
+import mindspore
+from mindspore import nn, ops, Tensor
+
+from mindnlp.modules.lora.tuners.lora import LoraConfig, LoraModel, Dense, Embedding
+from mindnlp.modules.lora.peft_model import PeftModelForSequenceClassification
+
+
+class TinyModel(nn.Cell):
+    """embedding followed by two dense layers"""
+    def __init__(self):
+        super().__init__()
+        self.config = {"model_type": "tiny"}
+        self.embed = nn.Embedding(10, 8)
+        self.query = nn.Dense(8, 8)
+        self.value = nn.Dense(8, 4)
+
+    def construct(self, ids):
+        return self.value(ops.tanh(self.query(self.embed(ids))))
+
+
+class TinyClassifier(TinyModel):
+    """the tiny model taking the inputs of a sequence classification model"""
+    def construct(self, input_ids=None, attention_mask=None, inputs_embeds=None, labels=None,
+                  output_attentions=None, output_hidden_states=None, return_dict=None):
+        return self.value(ops.tanh(self.query(self.embed(input_ids)))).mean(1)
+
+
+def _randomize_lora(model):
+    """set non-zero B matrices so that the adapters change the outputs"""
+    for name, param in model.parameters_and_names():
+        if "lora_" in name:
+            param.set_data(Tensor(np.random.randn(*param.shape), param.dtype))
+
+
+class TestLora(unittest.TestCase):
+    r"""
+    Test LoRA
+    """
+    def setUp(self):
+        np.random.seed(0)
+        mindspore.set_seed(0)
+        self.ids = Tensor(np.random.randint(0, 10, (2, 5)), mindspore.int32)
+
+    def _lora_model(self, **kwargs):
+        config = LoraConfig(r=2, lora_alpha=4, target_modules=["embed", "query", "value"], **kwargs)
+        return LoraModel(TinyModel(), {"default": config}, "default")
+
+    def test_dense_forward(self):
+        """test the dense output is the base output plus the low rank update"""
+        layer = Dense("default", 8, 4, r=2, lora_alpha=4)
+        _randomize_lora(layer)
+        inputs = Tensor(np.random.randn(3, 8), mindspore.float32)
+
+        weight = layer.weight.asnumpy()
+        lora_a = layer.lora_A["default"].weight.asnumpy()
+        lora_b = layer.lora_B["default"].weight.asnumpy()
+        expected = inputs.asnumpy() @ weight.T + layer.bias.asnumpy() + inputs.asnumpy() @ lora_a.T @ lora_b.T * 2
+
+        assert np.allclose(layer(inputs).asnumpy(), expected, 1e-4, 1e-4)
+
+    def test_embedding_forward(self):
+        """test the embedding output is the base output plus the low rank update"""
+        layer = Embedding("default", 10, 8, r=2, lora_alpha=2)
+        _randomize_lora(layer)
+
+        table = layer.embedding_table.asnumpy()
+        delta = (layer.lora_embedding_B["default"].asnumpy() @ layer.lora_embedding_A["default"].asnumpy()).T
+        expected = (table + delta)[self.ids.asnumpy()]
+
+        assert np.allclose(layer(self.ids).asnumpy(), expected, 1e-4, 1e-4)
+
+    def test_init_is_identity(self):
+        """test a new adapter does not change the outputs"""
+        model = TinyModel()
+        expected = model(self.ids).asnumpy()
+        lora_model = LoraModel(model, {"default": LoraConfig(r=2, target_modules=["query", "value"])}, "default")
+
+        assert np.allclose(lora_model.model(self.ids).asnumpy(), expected, 1e-5, 1e-5)
+
+    def test_only_lora_trainable(self):
+        """test the base weights are frozen"""
+        lora_model = self._lora_model()
+        trainable = [name for name, param in lora_model.model.parameters_and_names() if param.requires_grad]
+
+        assert len(trainable) == 6
+        assert all("lora_" in name for name in trainable)
+        assert len(lora_model.model.trainable_params()) == 6
+
+    def test_merge_unmerge(self):
+        """test merging keeps the outputs and unmerging restores the weights"""
+        lora_model = self._lora_model()
+        _randomize_lora(lora_model.model)
+        weight = lora_model.model.query.weight.asnumpy()
+        expected = lora_model.model(self.ids).asnumpy()
+
+        lora_model.merge_adapter()
+        assert np.allclose(lora_model.model(self.ids).asnumpy(), expected, 1e-4, 1e-4)
+        assert not np.allclose(lora_model.model.query.weight.asnumpy(), weight)
+
+        lora_model.unmerge_adapter()
+        assert np.allclose(lora_model.model.query.weight.asnumpy(), weight, 1e-5, 1e-5)
+        assert np.allclose(lora_model.model(self.ids).asnumpy(), expected, 1e-4, 1e-4)
+
+    def test_merge_and_unload(self):
+        """test the unloaded model has no adapter left"""
+        lora_model = self._lora_model()
+        _randomize_lora(lora_model.model)
+        expected = lora_model.model(self.ids).asnumpy()
+
+        model = lora_model.merge_and_unload()
+        assert type(model.query) is nn.Dense  # pylint: disable=unidiomatic-typecheck
+        assert type(model.embed) is nn.Embedding  # pylint: disable=unidiomatic-typecheck
+        assert not any("lora_" in name for name, _ in model.parameters_and_names())
+        assert np.allclose(model(self.ids).asnumpy(), expected, 1e-4, 1e-4)
+
+    def test_disable_adapters(self):
+        """test disabling the adapters gives the base outputs"""
+        model = TinyModel()
+        expected = model(self.ids).asnumpy()
+        lora_model = LoraModel(model, {"default": LoraConfig(r=2, target_modules=["query", "value"])}, "default")
+        _randomize_lora(lora_model.model)
+
+        lora_model.disable_adapter_layers()
+        assert np.allclose(lora_model.model(self.ids).asnumpy(), expected, 1e-5, 1e-5)
+        lora_model.enable_adapter_layers()
+        assert not np.allclose(lora_model.model(self.ids).asnumpy(), expected, 1e-5, 1e-5)
+
+    def test_add_weighted_adapter(self):
+        """test a weighted adapter of a single adapter reproduces its delta"""
+        lora_model = self._lora_model()
+        _randomize_lora(lora_model.model)
+        query = lora_model.model.query
+        delta = query.get_delta_weight("default").asnumpy()
+
+        lora_model.add_weighted_adapter(["default"], [0.5], "half")
+
+        assert np.allclose(query.get_delta_weight("half").asnumpy(), delta * 0.5, 1e-4, 1e-4)
+
+    def test_add_weighted_adapter_of_two_adapters(self):
+        """test a weighted adapter of two adapters is the weighted sum of their deltas"""
+        lora_model = self._lora_model()
+        lora_model.add_adapter("other", LoraConfig(r=4, lora_alpha=8, target_modules=["query", "value"]))
+        _randomize_lora(lora_model.model)
+        query = lora_model.model.query
+        default = query.get_delta_weight("default").asnumpy()
+        other = query.get_delta_weight("other").asnumpy()
+
+        lora_model.add_weighted_adapter(["default", "other"], [0.5, 2.0], "mix")
+
+        assert lora_model.peft_config["mix"].r == 6
+        assert np.allclose(query.get_delta_weight("mix").asnumpy(), default * 0.5 + other * 2.0, 1e-4, 1e-4)
+        # the embedding only has the first adapter
+        embed = lora_model.model.embed
+        assert np.allclose(embed.get_delta_weight("mix").asnumpy(),
+                           embed.get_delta_weight("default").asnumpy() * 0.5, 1e-4, 1e-4)
+
+    def test_unknown_bias(self):
+        """test an unknown bias mode is rejected"""
+        with self.assertRaises(ValueError):
+            self._lora_model(bias="some")
+
+    def test_batched_adapters(self):
+        """test a batch mixing adapters gives the outputs of every adapter alone"""
+        lora_model = self._lora_model()
+        lora_model.add_adapter("other", LoraConfig(r=4, lora_alpha=4, target_modules=["query", "value"]))
+        _randomize_lora(lora_model.model)
+        ids = Tensor(np.random.randint(0, 10, (3, 5)), mindspore.int32)
+
+        expected = []
+        for row, adapter in enumerate(["default", "other"]):
+            lora_model.set_adapter(adapter)
+            expected.append(lora_model.model(ids[row:row + 1]).asnumpy())
+        lora_model.disable_adapter_layers()
+        expected.append(lora_model.model(ids[2:]).asnumpy())
+        lora_model.enable_adapter_layers()
+
+        lora_model.set_batched_adapters(["default", "other"])
+        lora_model.set_adapter_ids(Tensor([0, 1, -1], mindspore.int32))
+        outputs = lora_model.model(ids).asnumpy()
+
+        assert np.allclose(outputs, np.concatenate(expected), 1e-4, 1e-4)
+
+    def test_batched_adapters_flattened_rows(self):
+        """test the adapter ids are repeated over the rows of a flattened batch"""
+        layer = Dense("default", 8, 4, r=2, lora_alpha=4)
+        layer.update_layer("other", 2, 2, 0.0, True)
+        _randomize_lora(layer)
+        inputs = Tensor(np.random.randn(2, 3, 8), mindspore.float32)
+
+        layer.set_batched_adapters(["default", "other"])
+        layer.adapter_ids = Tensor([1, 0], mindspore.int32)
+        expected = layer(inputs).asnumpy()
+
+        assert np.allclose(layer(inputs.reshape(6, 8)).asnumpy(), expected.reshape(6, 4), 1e-4, 1e-4)
+
+    def test_batched_adapters_of_task_model(self):
+        """test the task models select the adapter of every row with `adapter_ids`"""
+        peft_model = PeftModelForSequenceClassification(TinyClassifier(), LoraConfig(r=2, target_modules=["query"]))
+        peft_model.add_adapter("other", LoraConfig(r=4, target_modules=["query"]))
+        _randomize_lora(peft_model)
+
+        expected = []
+        for row, adapter in enumerate(["default", "other"]):
+            peft_model.base_model.set_adapter(adapter)
+            expected.append(peft_model(input_ids=self.ids[row:row + 1], return_dict=False).asnumpy())
+
+        peft_model.base_model.set_batched_adapters(["default", "other"])
+        outputs = peft_model(input_ids=self.ids, return_dict=False, adapter_ids=Tensor([0, 1], mindspore.int32))
+
+        assert np.allclose(outputs.asnumpy(), np.concatenate(expected), 1e-4, 1e-4)
+        # the adapter ids only hold for the call
+        assert peft_model.base_model.model.query.adapter_ids is None
@@ -0,0 +1,175 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test tensor parallel plans
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.parallel.plans import ShardSpec
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel, GPT2DoubleHeadsModel
+from mindnlp.models.bloom import BloomConfig, BloomForCausalLM
+from mindnlp.models.llama.llama_hf import LlamaForCausalLM
+from mindnlp.models.llama.llama_hf_config import LlamaConfig
+
+RANK_SIZE = 2
+
+MODELS = {
+    "gpt2": (GPT2LMHeadModel, lambda: GPT2Config(n_layer=2, n_embd=128, n_head=8, n_inner=256, vocab_size=1000)),
+    "bloom": (BloomForCausalLM, lambda: BloomConfig(vocab_size=1000, hidden_size=128, n_layer=2, n_head=8)),
+    "llama": (LlamaForCausalLM, lambda: LlamaConfig(num_hidden_layers=2, num_attention_heads=8, hidden_size=128,
+                                                    vocab_size=1000, intermediate_size=256)),
+}
+
+
+def _inputs():
+    input_ids = np.random.RandomState(0).randint(0, 1000, (2, 16))
+    labels = input_ids.copy()
+    labels[:, :3] = -100
+    return Tensor(input_ids, mindspore.int64), Tensor(labels, mindspore.int64)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _generate(model, input_ids):
+    """greedy generation of a few tokens"""
+    return model.generate(input_ids, do_sample=False, max_length=input_ids.shape[1] + 4, num_beams=1)
+
+
+def _worker(name, save_dir, reference):
+    """load the model split over the ranks and compare its loss, logits and generations with the reference ones"""
+    # pylint: disable=import-outside-toplevel
+    from mindspore.communication import init
+    from mindnlp.parallel.mappings import gather_from_model_parallel_region
+
+    init()
+    if os.environ["MS_ROLE"] == "MS_SCHED":
+        return
+    model_cls, config_cls = MODELS[name]
+    model = model_cls.from_pretrained(save_dir, config=config_cls(), tensor_parallel=True)
+    model.set_train(False)
+    input_ids, labels = _inputs()
+    loss, logits = model(input_ids=input_ids, labels=labels)[:2]
+    logits = gather_from_model_parallel_region(logits)
+
+    expected = np.load(reference)
+    assert np.allclose(loss.asnumpy(), expected["loss"], atol=1e-4), (loss, expected["loss"])
+    assert np.allclose(logits.asnumpy(), expected["logits"], atol=1e-4)
+
+    # without labels the logits of the whole vocabulary are returned, e.g. to generate
+    logits = model(input_ids=input_ids)[0]
+    assert np.allclose(logits.asnumpy(), expected["logits"], atol=1e-4)
+    assert np.array_equal(_generate(model, input_ids).asnumpy(), expected["generated"])
+
+
+class TestShardSpec(unittest.TestCase):
+    r"""
+    Test the shards of the checkpoint arrays
+    """
+
+    def test_fused_chunks(self):
+        """every rank keeps its part of each of the fused projections"""
+        array = np.arange(12 * 4).reshape(12, 4)
+        shards = [ShardSpec(0, rank_id, 2, chunks=3).shard(array) for rank_id in range(2)]
+        for shard in shards:
+            assert shard.shape == (6, 4)
+        blocks = [np.concatenate([np.split(shard, 3)[idx] for shard in shards]) for idx in range(3)]
+        assert np.array_equal(np.concatenate(blocks), array)
+
+    def test_column_and_row_shards(self):
+        """the column and row shards of two dense layers compute their composition"""
+        first = np.random.randn(8, 4).astype(np.float32)
+        second = np.random.randn(4, 8).astype(np.float32)
+        inputs = np.random.randn(3, 4).astype(np.float32)
+        output = np.zeros((3, 4), np.float32)
+        for rank_id in range(2):
+            hidden = inputs @ ShardSpec(0, rank_id, 2, transpose=True).shard(first)
+            output += hidden @ ShardSpec(1, rank_id, 2, transpose=True).shard(second)
+        assert np.allclose(output, inputs @ first.T @ second.T, atol=1e-5)
+
+    def test_not_divisible(self):
+        """the split dimension must be divisible by the number of ranks"""
+        with self.assertRaises(ValueError):
+            ShardSpec(0, 0, 2, chunks=3).shard(np.zeros((9, 4)))
+
+
+class TestLMHeadParallel(unittest.TestCase):
+    r"""
+    Test the models whose lm head is parallelized
+    """
+
+    def test_gpt2_double_heads_loss(self):
+        """the lm loss of the double heads model is its `loss_fct`, which the parallel plan replaces"""
+        model = GPT2DoubleHeadsModel(MODELS["gpt2"][1]())
+        assert isinstance(model.loss_fct, mindspore.nn.CrossEntropyLoss)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "the cluster processes are only started on linux")
+class TestTensorParallel(unittest.TestCase):
+    r"""
+    Test the models split over ranks of processes against the whole models
+    """
+
+    def run_parallel(self, name):
+        """save the model and its outputs, then run it on every rank"""
+        mindspore.set_seed(0)
+        model_cls, config_cls = MODELS[name]
+        model = model_cls(config_cls())
+        model.set_train(False)
+        input_ids, labels = _inputs()
+        loss, logits = model(input_ids=input_ids, labels=labels)[:2]
+
+        with tempfile.TemporaryDirectory() as save_dir:
+            model.save(save_dir, safe_serialization=True)
+            reference = os.path.join(save_dir, "reference.npz")
+            np.savez(reference, loss=loss.asnumpy(), logits=logits.asnumpy(),
+                     generated=_generate(model, input_ids).asnumpy())
+
+            env = dict(os.environ, MS_WORKER_NUM=str(RANK_SIZE), MS_SCHED_HOST="127.0.0.1",
+                       MS_SCHED_PORT=str(_free_port()))
+            command = [sys.executable, __file__, name, save_dir, reference]
+            processes = [subprocess.Popen(command, env=dict(env, MS_ROLE="MS_SCHED"))]
+            processes += [subprocess.Popen(command, env=dict(env, MS_ROLE="MS_WORKER", MS_NODE_ID=str(rank_id)))
+                          for rank_id in range(RANK_SIZE)]
+            returncodes = [process.wait(timeout=600) for process in processes]
+        assert returncodes == [0] * (RANK_SIZE + 1)
+
+    def test_gpt2(self):
+        """gpt2 with its fused attention and tied lm head"""
+        self.run_parallel("gpt2")
+
+    def test_bloom(self):
+        """bloom with its interleaved attention and alibi heads"""
+        self.run_parallel("bloom")
+
+    def test_llama(self):
+        """llama with its separate projections"""
+        self.run_parallel("llama")
+
+
+if __name__ == "__main__":
+    _worker(*sys.argv[1:])
@@ -14,6 +14,8 @@
 # ============================================================================
 """Test the BertTokenizer"""
 
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import mindspore as ms
 from mindspore.dataset import GeneratorDataset
 from mindspore.dataset.text import Vocab as msVocab
@@ -73,3 +75,66 @@ def test_bert_tokenizer_add_special_tokens():
     cls_id = bert_tokenizer.token_to_id("[CLS]")
 
     assert cls_id is not None
+
+
+def test_bert_tokenizer_encode_batch():
+    """test encode_batch pads the batch into int32 arrays"""
+    vocab_list = ["i", "make", "small", "mistake", "##s", "work", "##ing", "[CLS]", "[SEP]", "[UNK]", "[PAD]"]
+    bert_tokenizer = BertTokenizer(vocab=Vocab(vocab_list), lower_case=True)
+    texts = np.array(['i make small mistakes', 'working'])
+    input_ids, attention_mask, token_type_ids = bert_tokenizer.encode_batch(texts, pad_to_multiple_of=4)
+
+    expected = [bert_tokenizer.encode(str(text)).ids for text in texts]
+    assert input_ids.dtype == np.int32 and input_ids.flags['C_CONTIGUOUS']
+    assert input_ids.shape == attention_mask.shape == token_type_ids.shape == (2, 8)
+    for row, ids in enumerate(expected):
+        assert input_ids[row, :len(ids)].tolist() == ids
+        assert (input_ids[row, len(ids):] == bert_tokenizer.pad_token_id).all()
+        assert attention_mask[row].sum() == len(ids)
+
+
+def test_bert_tokenizer_encode_batch_truncation():
+    """test truncated sequences keep their special tokens"""
+    vocab_list = ["i", "make", "small", "mistake", "##s", "work", "##ing", "[CLS]", "[SEP]", "[UNK]", "[PAD]"]
+    bert_tokenizer = BertTokenizer(vocab=Vocab(vocab_list), lower_case=True)
+    texts = np.array(['i make small mistakes', 'working'])
+    input_ids, attention_mask, _ = bert_tokenizer.encode_batch(texts, max_length=5)
+
+    sep_id = bert_tokenizer.token_to_id("[SEP]")
+    assert input_ids.shape == (2, 5)
+    assert attention_mask.sum(axis=1).tolist() == [5, 4]
+    assert input_ids[0, -1] == sep_id
+    assert input_ids[1, 3] == sep_id
+    assert bert_tokenizer.encode('i make small mistakes').ids[-1] == sep_id
+    assert len(bert_tokenizer.encode('i make small mistakes').ids) == 7
+
+
+def test_bert_tokenizer_encode_batch_threads():
+    """test concurrent encode_batch calls truncate to their own lengths and leave the backend untouched"""
+    vocab_list = ["i", "make", "small", "mistake", "##s", "work", "##ing", "[CLS]", "[SEP]", "[UNK]", "[PAD]"]
+    bert_tokenizer = BertTokenizer(vocab=Vocab(vocab_list), lower_case=True)
+    texts = np.array(['i make small mistakes'] * 8)
+    lengths = [None, 4, 5, 6] * 8
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(lambda length: bert_tokenizer.encode_batch(texts, max_length=length,
+                                                                                return_token_type_ids=False),
+                                    lengths))
+
+    for length, (input_ids, attention_mask) in zip(lengths, outputs):
+        assert input_ids.shape == (8, 7 if length is None else length)
+        assert (attention_mask == 1).all()
+    assert bert_tokenizer.encode('i make small mistakes').ids == outputs[0][0][0].tolist()
+
+
+def test_bert_tokenizer_encode_batch_dataset():
+    """test encode_batch as a batched dataset.map"""
+    texts = ['i make small mistakes', 'working', 'i work']
+    vocab_list = ["i", "make", "small", "mistake", "##s", "work", "##ing", "[CLS]", "[SEP]", "[UNK]", "[PAD]"]
+    bert_tokenizer = BertTokenizer(vocab=Vocab(vocab_list), lower_case=True)
+    test_dataset = GeneratorDataset(texts, 'text', shuffle=False).batch(3)
+    test_dataset = test_dataset.map(operations=bert_tokenizer.encode_batch, input_columns='text',
+                                    output_columns=['input_ids', 'attention_mask', 'token_type_ids'])
+    input_ids, attention_mask, _ = next(test_dataset.create_tuple_iterator())
+
+    assert input_ids.shape == (3, 7)
+    assert attention_mask.asnumpy().sum(axis=1).tolist() == [7, 4, 4]
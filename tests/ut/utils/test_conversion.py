@@ -0,0 +1,116 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test checkpoint conversion
+"""
+
+import os
+import importlib.util
+import tempfile
+import unittest
+from unittest import skipUnless
+import numpy as np
+
+import mindnlp.models.gpt2 # pylint: disable=W0611
+import mindnlp.models.bloom # pylint: disable=W0611
+from mindnlp.utils.conversion import RenameRule, get_conversion_rules, convert_name, checkpoint_hash, \
+    convert_torch_checkpoint
+from mindnlp.utils.serialization import SafeTensorsFile
+
+
+class TestConversionRules(unittest.TestCase):
+    r"""
+    Test the conversion rules
+    """
+    def test_rename_rule(self):
+        """test the when and unless conditions"""
+        rule = RenameRule('.weight', '.gamma', when=('ln', 'layernorm'), unless=('lm_head',))
+        assert rule('h.0.ln_1.weight') == 'h.0.ln_1.gamma'
+        assert rule('h.0.mlp.weight') == 'h.0.mlp.weight'
+        assert rule('lm_head.ln.weight') == 'lm_head.ln.weight'
+
+    def test_gpt2_rules(self):
+        """test the names of a gpt2 checkpoint"""
+        rules = get_conversion_rules('gpt2')
+        expected = {
+            'wte.weight': 'transformer.wte.embedding_table',
+            'wpe.weight': 'transformer.wpe.embedding_table',
+            'h.0.ln_1.weight': 'transformer.h.0.ln_1.gamma',
+            'h.0.ln_1.bias': 'transformer.h.0.ln_1.beta',
+            'h.0.attn.c_attn.weight': 'transformer.h.0.attn.c_attn.weight',
+            'h.0.attn.c_proj.bias': 'transformer.h.0.attn.c_proj.bias',
+            'h.0.attn.bias': 'transformer.h.0.attn.bias',
+        }
+        for name, converted in expected.items():
+            assert convert_name(name, rules, 'transformer') == converted
+
+    def test_bloom_rules(self):
+        """test the names of a bloom checkpoint"""
+        rules = get_conversion_rules('bloom')
+        assert convert_name('word_embeddings.weight', rules) == 'word_embeddings.embedding_table'
+        assert convert_name('word_embeddings_layernorm.weight', rules) == 'word_embeddings_layernorm.gamma'
+        assert convert_name('h.0.self_attention.dense.weight', rules) == 'h.0.self_attention.dense.weight'
+
+    def test_unregistered(self):
+        """test an unknown model raises"""
+        with self.assertRaises(ValueError):
+            get_conversion_rules('not_a_model')
+
+
+class TestConvertTorchCheckpoint(unittest.TestCase):
+    r"""
+    Test convert_torch_checkpoint
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "converted")
+        os.makedirs(self.cache_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_checkpoint_hash(self):
+        """test the hash follows the content of the file"""
+        filename = os.path.join(self.tmp_dir.name, "weights.bin")
+        with open(filename, "wb") as file:
+            file.write(b"weights")
+        digest = checkpoint_hash(filename, self.cache_dir)
+        assert digest == checkpoint_hash(filename, self.cache_dir)
+        with open(filename, "wb") as file:
+            file.write(b"other weights")
+        assert digest != checkpoint_hash(filename, self.cache_dir)
+
+    @skipUnless(importlib.util.find_spec("torch") is not None, 'Convert with PyTorch')
+    def test_convert_once(self):
+        """test the converted checkpoint is reused"""
+        import torch # pylint: disable=C0415
+        state_dict = {
+            'h.0.ln_1.weight': torch.randn(8),
+            'h.0.attn.c_attn.weight': torch.randn(8, 24),
+            'wte.weight': torch.randn(16, 8).to(torch.bfloat16),
+        }
+        pth_file = os.path.join(self.tmp_dir.name, "pytorch_model.bin")
+        torch.save(state_dict, pth_file)
+
+        converted = convert_torch_checkpoint(pth_file, 'gpt2', prefix='transformer', cache_dir=self.cache_dir)
+        mtime = os.stat(converted).st_mtime_ns
+        assert convert_torch_checkpoint(pth_file, 'gpt2', prefix='transformer', cache_dir=self.cache_dir) == converted
+        assert os.stat(converted).st_mtime_ns == mtime
+
+        with SafeTensorsFile(converted) as checkpoint:
+            assert np.array_equal(checkpoint.get_array('transformer.h.0.ln_1.gamma'),
+                                  state_dict['h.0.ln_1.weight'].numpy())
+            assert np.array_equal(checkpoint.get_array('transformer.wte.embedding_table'),
+                                  state_dict['wte.weight'].float().numpy())
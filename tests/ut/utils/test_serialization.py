@@ -0,0 +1,100 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test safetensors serialization
+"""
+
+import os
+import json
+import struct
+import tempfile
+import unittest
+import numpy as np
+
+import mindspore
+from mindspore import Tensor
+
+from mindnlp.models.gpt2 import GPT2Config, GPT2LMHeadModel
+from mindnlp.utils.serialization import SafeTensorsFile, save_safetensors
+
+
+class TestSafeTensors(unittest.TestCase):
+    r"""
+    Test SafeTensorsFile and save_safetensors
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "mindspore.safetensors")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """test arrays and tensors are read back with their dtype and shape"""
+        tensors = {
+            "weight": np.random.randn(3, 5).astype(np.float32),
+            "bias": Tensor(np.random.randn(5), mindspore.float16),
+            "ids": np.arange(7, dtype=np.int64),
+        }
+        save_safetensors(tensors, self.filename, metadata={"format": "ms"})
+        with SafeTensorsFile(self.filename) as checkpoint:
+            assert sorted(checkpoint.keys()) == ["bias", "ids", "weight"]
+            assert checkpoint.metadata == {"format": "ms"}
+            assert checkpoint.get_shape("weight") == (3, 5)
+            assert np.array_equal(checkpoint.get_array("weight"), tensors["weight"])
+            assert np.array_equal(checkpoint.get_array("bias"), tensors["bias"].asnumpy())
+            assert checkpoint.get_array("ids").dtype == np.int64
+
+    def test_bf16(self):
+        """test bfloat16 tensors are read as float32"""
+        values = np.array([1.0, -2.5, 0.15625], np.float32)
+        header = json.dumps({"x": {"dtype": "BF16", "shape": [3], "data_offsets": [0, 6]}}).encode()
+        with open(self.filename, "wb") as file:
+            file.write(struct.pack("<Q", len(header)))
+            file.write(header)
+            file.write((values.view(np.uint32) >> 16).astype(np.uint16).tobytes())
+        with SafeTensorsFile(self.filename) as checkpoint:
+            assert np.array_equal(checkpoint.get_array("x"), values)
+
+    def test_from_pretrained(self):
+        """test a model saved as safetensors is loaded back by from_pretrained"""
+        config = GPT2Config(vocab_size=64, n_positions=32, n_layer=2, n_embd=32, n_head=4)
+        model = GPT2LMHeadModel(config)
+        model.save(self.tmp_dir.name, safe_serialization=True)
+        assert os.path.isfile(self.filename)
+
+        loaded = GPT2LMHeadModel.from_pretrained(self.tmp_dir.name, config=config)
+        params = {param.name: param.asnumpy() for param in model.get_parameters()}
+        for param in loaded.get_parameters():
+            assert np.array_equal(param.asnumpy(), params[param.name])
+
+    def test_from_pretrained_sharded(self):
+        """test the shards of a sharded checkpoint are all loaded"""
+        config = GPT2Config(vocab_size=64, n_positions=32, n_layer=2, n_embd=32, n_head=4)
+        model = GPT2LMHeadModel(config)
+        params = {param.name: param.asnumpy() for param in model.get_parameters()}
+        names = sorted(params)
+        weight_map = {}
+        for idx in range(3):
+            shard_name = f"mindspore-0000{idx + 1}-of-00003.safetensors"
+            shard = {name: params[name] for name in names[idx::3]}
+            save_safetensors(shard, os.path.join(self.tmp_dir.name, shard_name))
+            weight_map.update({name: shard_name for name in shard})
+        with open(os.path.join(self.tmp_dir.name, "mindspore.safetensors.index.json"), "w", encoding="utf-8") as file:
+            json.dump({"metadata": {}, "weight_map": weight_map}, file)
+
+        loaded = GPT2LMHeadModel.from_pretrained(self.tmp_dir.name, config=config)
+        for param in loaded.get_parameters():
+            assert np.array_equal(param.asnumpy(), params[param.name])
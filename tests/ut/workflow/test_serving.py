@@ -0,0 +1,102 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test BatchingWorkflow
+"""
+
+import asyncio
+import unittest
+
+from mindnlp.workflow.serving import BatchingWorkflow
+
+
+class MockWorkflow:
+    """Workflow recording its batches"""
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if "error" in texts:
+            raise RuntimeError("model failed")
+        return [text.upper() for text in texts]
+
+
+class TestBatchingWorkflow(unittest.TestCase):
+    r"""
+    Test BatchingWorkflow
+    """
+    def test_batching(self):
+        """test concurrent requests are batched and answered in order"""
+        workflow = MockWorkflow()
+
+        async def run():
+            async with BatchingWorkflow(workflow, max_batch_size=4, max_wait_ms=50) as server:
+                results = await asyncio.gather(*(server(f"text {idx}") for idx in range(10)))
+                return results, server.metrics()
+
+        results, metrics = asyncio.run(run())
+        assert results == [f"TEXT {idx}" for idx in range(10)]
+        assert [len(batch) for batch in workflow.batches] == [4, 4, 2]
+        assert metrics["requests"] == 10 and metrics["batches"] == 3
+        assert metrics["queue_depth"] == 0
+        assert metrics["latency_p95_ms"] >= metrics["latency_p50_ms"] > 0
+
+    def test_error(self):
+        """test the callers of a failed batch get its error"""
+        async def run():
+            async with BatchingWorkflow(MockWorkflow(), max_batch_size=2, max_wait_ms=50) as server:
+                return await asyncio.gather(server("error"), server("text"), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_stop_while_collecting(self):
+        """test the requests of a batch still being collected are cancelled by stop instead of hanging"""
+        async def run():
+            server = BatchingWorkflow(MockWorkflow(), max_batch_size=4, max_wait_ms=10000)
+            await server.start()
+            request = asyncio.ensure_future(server("text"))
+            await asyncio.sleep(0.05)
+            assert server.metrics()["queue_depth"] == 0
+            await server.stop()
+            return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), 1)
+
+        results = asyncio.run(run())
+        assert isinstance(results[0], asyncio.CancelledError)
+
+    def test_stop_completes_running_batches(self):
+        """test stop waits for the batches being run"""
+        workflow = MockWorkflow()
+
+        async def run():
+            server = BatchingWorkflow(workflow, max_batch_size=1)
+            await server.start()
+            request = asyncio.ensure_future(server("text"))
+            while not workflow.batches:
+                await asyncio.sleep(0.001)
+            await server.stop()
+            return await request
+
+        assert asyncio.run(run()) == "TEXT"
+
+    def test_invalid_text(self):
+        """test empty texts are rejected"""
+        async def run():
+            async with BatchingWorkflow(MockWorkflow()) as server:
+                await server("")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
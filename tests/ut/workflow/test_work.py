@@ -0,0 +1,66 @@
+# Copyright 2023 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""
+Test the batching of Work
+"""
+# pylint: disable=W0212
+
+import unittest
+import numpy as np
+
+from mindnlp.workflow.work import Work
+
+
+class MockWork(Work):
+    """Work without model"""
+    def _construct_model(self, model):
+        pass
+
+    def _construct_tokenizer(self, model):
+        pass
+
+    def _preprocess(self, inputs, padding=True, add_special_tokens=True):
+        pass
+
+    def _run_model(self, inputs):
+        pass
+
+    def _postprocess(self, inputs):
+        pass
+
+
+class TestWorkBatching(unittest.TestCase):
+    r"""
+    Test the length-bucketed batching of Work
+    """
+    def setUp(self):
+        self.work = MockWork("mock", "mock", shape_buckets=(4, 8))
+        self.token_ids = [np.arange(1, length + 1) for length in (7, 2, 10, 3, 5)]
+
+    def test_bucket_batches(self):
+        """test the batches are sorted by length and padded to the buckets"""
+        batches = self.work._bucket_batches(self.token_ids, 2, pad_value=0)
+        assert [batch[0].tolist() for batch in batches] == [[1, 3], [4, 0], [2]]
+        assert [batch[1].shape for batch in batches] == [(2, 4), (2, 8), (1, 10)]
+        _, input_ids, attention_mask = batches[1]
+        assert input_ids[0].tolist() == [1, 2, 3, 4, 5, 0, 0, 0]
+        assert attention_mask[0].tolist() == [1, 1, 1, 1, 1, 0, 0, 0]
+
+    def test_restore_order(self):
+        """test the results come back in the order of the inputs"""
+        batches = self.work._bucket_batches(self.token_ids, 2, pad_value=0)
+        lengths = [batch[2].sum(axis=1) for batch in batches]
+        restored = self.work._restore_order([batch[0] for batch in batches], lengths)
+        assert restored.tolist() == [7, 2, 10, 3, 5]